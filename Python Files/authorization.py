@@ -0,0 +1,170 @@
+"""
+Role-based access control for bot commands.
+
+Permissions are checked in the bot against the cached RegisteredUsers row (role_id and
+role_expires), so a command costs no extra round trip and no per-query stored procedure.
+Roles past their expiry date are treated as Guest immediately; RoleExpirySweeper then
+persists the downgrade with one set-based UPDATE per expiry date.
+"""
+
+import heapq
+import asyncio
+from datetime import date, datetime, timedelta
+from database import Database, Query, db_context, MAINTENANCE
+import cache
+
+
+class Role:
+    # Matches the rows in the Roles table (see SQL Files/inserts.sql).
+    OWNER = 1
+    ADMIN = 2
+    GUEST = 3
+
+
+class Permission:
+    VIEW_PORTFOLIO = "view_portfolio"
+    MANAGE_DATA = "manage_data"
+
+
+# Mirrors CheckBeforeQuery: owners may run everything, admins and guests are limited for now.
+ROLE_PERMISSIONS = {
+    Role.OWNER: {Permission.VIEW_PORTFOLIO, Permission.MANAGE_DATA},
+    Role.ADMIN: set(),
+    Role.GUEST: set(),
+}
+
+# How far ahead the sweeper loads upcoming expiries; later ones are picked up by a reload.
+SWEEP_HORIZON_DAYS = 7
+
+
+def effective_role(user, today=None):
+    """The user's role as of today: an assignment past its role_expires date counts as Guest."""
+    role_id = user.get("role_id") or Role.GUEST
+    expires = user.get("role_expires")
+    if expires is not None and expires < (today or date.today()):
+        return Role.GUEST
+    return role_id
+
+
+def has_permission(user, permission, today=None):
+    return permission in ROLE_PERMISSIONS.get(effective_role(user, today), set())
+
+
+def forget_users(user_ids):
+    """Drops the cached RegisteredUsers rows of user_ids; call it through cache.run_async from coroutines."""
+    for user_id in user_ids:
+        cache.registered_users.delete(user_id)
+
+
+async def assign_role(user_id, role_id, expires=None):
+    """Assigns role_id to the user until expires (None = no expiry) and schedules its expiry."""
+    await Database.callprocedure_async(Query.PROC_AssignRole, (user_id, role_id, expires))
+    await cache.run_async(forget_users, [user_id])
+    if expires is not None:
+        role_sweeper.schedule(user_id, expires)
+
+
+async def refresh_role(user_id, role_id):
+    """Sets the user's role and extends its expiry by one year (RefreshRole procedure)."""
+    await Database.callprocedure_async(Query.PROC_RefreshRole, (user_id, role_id))
+    await cache.run_async(forget_users, [user_id])
+    role_sweeper.schedule(user_id, date.today() + timedelta(days=365))
+
+
+class RoleExpirySweeper:
+    """
+    Downgrades expired roles to Guest in the database.
+
+    Upcoming expiry dates are held in a min-heap of (role_expires, user_id), loaded with one
+    indexed range query covering the next SWEEP_HORIZON_DAYS. The sweeper sleeps until the
+    earliest date has passed (or the horizon ends and it reloads), then expires every due
+    role with a single UPDATE. Heap entries are only wake-up hints: the UPDATE re-checks
+    role_expires, so an entry whose role was refreshed in the meantime does no harm.
+    """
+
+    def __init__(self, horizon_days=SWEEP_HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self._heap = []
+        self._horizon = None
+        self._wake = None
+        self._task = None
+        self.sweeps = 0
+        self.expired = 0
+
+    def start(self):
+        """Starts the sweeper. Must be called from inside the running event loop."""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            with db_context(work_class=MAINTENANCE):
+                self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def schedule(self, user_id, expires):
+        """Adds an expiry that falls inside the loaded horizon; later ones are loaded when it moves."""
+        if self._horizon is None or expires >= self._horizon:
+            return
+        heapq.heappush(self._heap, (expires, user_id))
+        if self._wake is not None and self._heap[0] == (expires, user_id):
+            self._wake.set()
+
+    async def load(self, today=None):
+        today = today or date.today()
+        horizon = today + timedelta(days=self.horizon_days)
+        rows = await Database.select_async(Query.ROLE_EXPIRIES_BEFORE, (horizon, Role.GUEST), primary=True) or []
+        self._heap = [(row["role_expires"], row["tracking_id"]) for row in rows]
+        heapq.heapify(self._heap)
+        self._horizon = horizon
+
+    async def sweep(self, today=None):
+        """Expires every role whose date has passed. Returns the IDs of the downgraded users."""
+        today = today or date.today()
+        while self._heap and self._heap[0][0] < today:
+            heapq.heappop(self._heap)
+        async with Database.transaction_async() as tx:
+            rows = await tx.select(Query.EXPIRED_ROLE_USERS, (Role.GUEST,)) or []
+            if rows:
+                await tx.update(Query.EXPIRE_ROLES, (Role.GUEST, Role.GUEST))
+        user_ids = [row["tracking_id"] for row in rows]
+        await cache.run_async(forget_users, user_ids)
+        self.sweeps += 1
+        self.expired += len(user_ids)
+        return user_ids
+
+    def next_wake(self, today=None):
+        """Seconds until the next expiry takes effect (the day after role_expires) or the horizon ends."""
+        today = today or date.today()
+        target = self._horizon
+        if self._heap and self._heap[0][0] < target:
+            target = self._heap[0][0] + timedelta(days=1)
+        if target <= today:
+            return 0.0
+        return max(0.0, (datetime.combine(target, datetime.min.time()) - datetime.now()).total_seconds())
+
+    async def _run(self):
+        while True:
+            try:
+                today = date.today()
+                if self._horizon is None or today >= self._horizon:
+                    await self.load(today)
+                if self._heap and self._heap[0][0] < today:
+                    await self.sweep(today)
+            except Exception as err:
+                print(f"Role expiry sweep failed: {err}")
+                await asyncio.sleep(60)
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.next_wake())
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {"scheduled": len(self._heap), "sweeps": self.sweeps, "expired": self.expired}
+
+
+role_sweeper = RoleExpirySweeper()
@@ -0,0 +1,126 @@
+"""
+Benchmark: the mortgage report read through the ViewMortgages view (detail rows UNION ALL a
+grouped totals branch) vs. the single-pass detail query with the totals row added in Python
+(ViewMortgagesModel).
+
+Seeds a throwaway user with N properties, each with one purchase record and one mortgage,
+except that every tenth property has none and every tenth (another one) has two, checks that
+both paths return the same rows, times them and removes the user again.
+Requires a live database (same .env variables as the bot), or runs offline on an embedded
+SQLite file with DB_BACKEND=sqlite:
+    python "Python Files/bench_mortgage_report.py" [properties] [iterations] [user_id]
+"""
+
+import sys
+import time
+import statistics
+from datetime import date, timedelta
+from database import Database, Query
+from models import ViewMortgagesModel
+
+SEED_CHUNK = 1000
+
+
+def mortgages_on(number):
+    # Property number's mortgage count: 0 for every tenth property, 2 for another tenth, else 1.
+    return {9: 0, 4: 2}.get(number % 10, 1)
+
+
+def seed(user_id, count):
+    with Database.transaction() as tx:
+        ids = tx.select(Query.MAX_SEED_IDS)[0]
+        portfolio_id = ids["portfolio_id"] + 1
+        tx.insert(Query.INSERT_REGISTERED_USER, {"tracking_id": user_id, "email": f"bench{user_id}@example.com",
+                                                 "first_name": "Bench", "last_name": "User", "role_id": 1})
+        tx.insert(Query.INSERT_PORTFOLIO, {"portfolio_id": portfolio_id})
+        tx.insert(Query.INSERT_USER_PORTFOLIO, {"user_id": user_id, "portfolio_id": portfolio_id})
+        for start in range(0, count, SEED_CHUNK):
+            numbers = range(start, min(count, start + SEED_CHUNK))
+            address_ids = [ids["address_id"] + 1 + i for i in numbers]
+            property_ids = [ids["property_id"] + 1 + i for i in numbers]
+            tx.insert(Query.INSERT_ADDRESS, [
+                {"address_id": a, "country": "USA", "state_province": "Texas", "city": "Austin",
+                 "street": "Bench St", "number": i} for a, i in zip(address_ids, numbers)], many_entities=True)
+            tx.insert(Query.INSERT_PROPERTIES, [
+                {"property_id": p, "total_rent": 2000, "monthly_capex": 150, "bedroom_count": 3, "bathroom_count": 2,
+                 "sqft": 1500, "lot_size": 5000, "target_arv": 400000, "address_id": a}
+                for p, a in zip(property_ids, address_ids)], many_entities=True)
+            tx.insert(Query.INSERT_PORTFOLIO_PROPERTY, [
+                {"property_id": p, "portfolio_id": portfolio_id, "property_rent": 2000} for p in property_ids],
+                many_entities=True)
+            tx.insert(Query.INSERT_MORTGAGE, [
+                {"lender_name": f"Bench Bank {n + 1}", "principal_balance": 250000 + i - 200000 * n,
+                 "interest_rate": 6.5, "monthly_payment": 1500 + i % 100 - 1000 * n,
+                 "start_date": date(2000, 1, 1) + timedelta(days=i, weeks=n),
+                 "end_date": date(2030, 1, 1) + timedelta(days=i), "property_id": p, "terms": "30-year fixed"}
+                for p, i in zip(property_ids, numbers) for n in range(mortgages_on(i))], many_entities=True)
+            tx.insert(Query.INSERT_PROPERTY_HISTORY, [
+                {"purchase_price": 300000 + i, "maintenance_notes": None, "last_appraised_val": 350000,
+                 "purchase_date": date(1999, 1, 1), "property_id": p}
+                for p, i in zip(property_ids, numbers)], many_entities=True)
+
+
+def clean_up(user_id):
+    with Database.transaction() as tx:
+        tx.callprocedure(Query.PROC_ResetUserData, (user_id,))
+        tx.callprocedure(Query.PROC_CleanOrphanedData)
+        tx.delete(Query.DELETE_USER_PORTFOLIO, (user_id,))
+        tx.delete(Query.DELETE_REGISTERED_USER, (user_id,))
+
+
+def same_rows(view_rows, model_rows):
+    # The totals are float sums added up in a different order, so they are compared to the cent.
+    if len(view_rows) != len(model_rows):
+        return False
+    for view_row, model_row in zip(view_rows, model_rows):
+        for column, value in view_row.items():
+            other = model_row.get(column)
+            if isinstance(value, float) and other is not None:
+                if round(value, 2) != round(other, 2):
+                    return False
+            elif value != other:
+                return False
+    return True
+
+
+def timed(fn, iterations):
+    fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    user_id = int(sys.argv[3]) if len(sys.argv) > 3 else 990000001
+
+    clean_up(user_id)
+    start = time.perf_counter()
+    seed(user_id, count)
+    mortgages = sum(mortgages_on(i) for i in range(count))
+    print(f"seeded {count} properties with {mortgages} mortgages in {time.perf_counter() - start:.1f}s")
+    try:
+        view_rows = Database.select(Query.MORTGAGES_BY_USER, (user_id,))
+        model_rows = ViewMortgagesModel(user_id).rows
+        print(f"identical output: {same_rows(view_rows, model_rows)} ({len(model_rows)} rows)")
+
+        print(f"{'path':28} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        results = {}
+        for label, fn in (("ViewMortgages view", lambda: Database.select(Query.MORTGAGES_BY_USER, (user_id,))),
+                          ("single pass + Python totals", lambda: ViewMortgagesModel(user_id))):
+            results[label] = timed(fn, iterations)
+            print(f"{label:28} {results[label][0]:9.2f} {results[label][1]:9.2f} {results[label][2]:9.2f}")
+        view_p50, model_p50 = results["ViewMortgages view"][1], results["single pass + Python totals"][1]
+        print(f"\nspeedup (p50): {view_p50 / model_p50:.2f}x")
+    finally:
+        clean_up(user_id)
+        Database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: per-query latency of the hot read paths with and without server-side prepared statements.
+
+Requires a live database (same .env variables as the bot) and a registered user with sample data:
+    python "Python Files/bench_prepared_statements.py" <user_id> [iterations]
+"""
+
+import sys
+import time
+import statistics
+import database
+from database import Database, Query
+
+HOT_QUERIES = {
+    "REGISTERED_USER": Query.REGISTERED_USER,
+    "PORTFOLIO_PERFORMANCE_BY_USER": Query.PORTFOLIO_PERFORMANCE_BY_USER,
+    "TENANTS_BY_USER": Query.TENANTS_BY_USER,
+    "MORTGAGES_BY_USER": Query.MORTGAGES_BY_USER,
+    "CURRENT_PROJECTS_BY_USER": Query.CURRENT_PROJECTS_BY_USER,
+}
+
+
+def run(query, user_id, iterations):
+    # One warm-up call so the prepared run is measured after its single PREPARE.
+    Database.select(query, (user_id,))
+    timings = []
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        Database.select(query, (user_id,))
+        timings.append((time.perf_counter() - start) * 1000)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / iterations
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.95)], cpu_ms
+
+
+def main():
+    user_id = int(sys.argv[1])
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    print(f"{'query':32} {'mode':9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'cpu ms':>9}")
+    for label, query in HOT_QUERIES.items():
+        for mode, enabled in (("text", False), ("prepared", True)):
+            database.prepared_statements_enabled = enabled
+            mean, p50, p95, cpu = run(query, user_id, iterations)
+            print(f"{label:32} {mode:9} {mean:9.3f} {p50:9.3f} {p95:9.3f} {cpu:9.3f}")
+
+    print(f"\nprepares: {database._statements.prepares}, reused: {database._statements.hits}")
+    database._get_pool().close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: !project_cashflow simulation cost on a synthetic portfolio (no database needed).
+
+  * wall time of projection.simulate() for N properties x P paths x M months
+  * throughput in simulated property-months per second
+
+    python "Python Files/bench_projection.py" [properties] [paths] [months] [runs]
+"""
+
+import sys
+import time
+import random
+import statistics
+import projection
+
+
+def synthetic_portfolio(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for property_id in range(1, count + 1):
+        rent = rng.uniform(1200, 6000)
+        units = rng.randint(1, 8)
+        rows.append({
+            "property_id": property_id,
+            "rent": rent,
+            "mortgage": rent * rng.uniform(0.3, 0.7),
+            "capex": rent * 0.05,
+            "tax": rent * rng.uniform(0.05, 0.12),
+            "insurance": rng.uniform(80, 250),
+            "units": units,
+            "vacant_units": sum(rng.random() < 0.08 for _ in range(units)),
+        })
+    return rows
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    paths = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    months = int(sys.argv[3]) if len(sys.argv) > 3 else projection.PROJECTION_MONTHS
+    runs = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+
+    if not projection.available():
+        print("NumPy is not installed (pip install numpy)")
+        return
+
+    rows = synthetic_portfolio(count)
+    timings = []
+    for run in range(runs):
+        start = time.perf_counter()
+        projection.simulate(rows, months, paths, seed=run)
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    print(f"{count} properties x {paths} paths x {months} months: median {median * 1000:8.1f} ms, "
+          f"{count * paths * months / median / 1e6:6.1f}M property-months/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: bot startup cost.
+
+  * import time of main.py (fresh interpreter each run, no Discord or DB access), as it is
+    now and with the command modules it defers (models, formatting, compute, projection...)
+    imported as well, which is what importing main cost before they were deferred
+  * time to first command: opening the connection pool serially vs in parallel,
+    followed by the first REGISTERED_USER lookup (requires a live database)
+
+    python "Python Files/bench_startup.py" [user_id] [runs]
+"""
+
+import os
+import sys
+import time
+import statistics
+import subprocess
+from database import Database, Query, ConnectionPool, POOL_SIZE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Modules main.py imports inside create_bot() and the command bodies instead of at the top.
+DEFERRED_MODULES = ("models", "formatting", "compute", "projection", "occupancy", "search", "contractors")
+
+
+def import_time_ms(also=()):
+    imports = "; ".join(f"import {module}" for module in ("main",) + tuple(also))
+    code = f"import time; t = time.perf_counter(); {imports}; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def first_command_ms(user_id, parallel):
+    start = time.perf_counter()
+    pool = ConnectionPool(POOL_SIZE, parallel=parallel)
+    conn = pool.acquire()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(Query.REGISTERED_USER, (user_id,))
+            cursor.fetchall()
+    finally:
+        pool.release(conn)
+        pool.close_all()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    eager = [import_time_ms(DEFERRED_MODULES) for _ in range(runs)]
+    imports = [import_time_ms() for _ in range(runs)]
+    print(f"import main, before (eager): median {statistics.median(eager):8.1f} ms")
+    print(f"import main, after (lazy):   median {statistics.median(imports):8.1f} ms")
+
+    if user_id is None:
+        print("(pass a registered user id to also measure time to first command)")
+        return
+    for label, parallel in (("serial pool open", False), ("parallel pool open", True)):
+        timings = [first_command_ms(user_id, parallel) for _ in range(runs)]
+        print(f"first command, {label:18}: median {statistics.median(timings):8.1f} ms")
+    Database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: PaymentHistories append throughput, one INSERT per row vs the write-behind queue.
+
+Both modes append the same number of rows from `concurrency` concurrent producers, as many
+users recording payments at once would. Requires a database (same .env variables as the bot,
+DB_BACKEND=sqlite works too) and a registered user with sample data; the rows are added to
+that user's tenant, so run !reset_user_data afterwards to remove them:
+    python "Python Files/bench_write_queue.py" <user_id> [tenant_id] [rows] [concurrency]
+"""
+
+import sys
+import time
+import asyncio
+from datetime import date
+from database import Database, Query, Tables
+from write_queue import WriteBehindQueue
+
+
+async def produce(rows, concurrency, append):
+    async def producer(count):
+        for _ in range(count):
+            await append()
+
+    start = time.perf_counter()
+    share, extra = divmod(rows, concurrency)
+    await asyncio.gather(*(producer(share + (1 if i < extra else 0)) for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run(user_id, tenant_id, rows, concurrency):
+    tenant = await Database.select_async(Query.TENANT_UNIT_BY_USER, (user_id, tenant_id))
+    if not tenant:
+        print(f"Tenant {tenant_id} is not in user {user_id}'s portfolio")
+        return
+    today = date.today()
+    payment = {"amount": 1.0, "paid_date": today, "due_date": today, "unit_id": tenant[0]["unit_id"],
+               "tenant_id": tenant_id}
+
+    direct = await produce(rows, concurrency, lambda: Database.insert_async(Query.INSERT_PAYMENT_HISTORY, payment))
+    queue = WriteBehindQueue()
+    behind = await produce(rows, concurrency, lambda: queue.write(Tables.PAYMENT_HISTORIES, payment))
+    await queue.close()
+
+    print(f"{'mode':14} {'seconds':>9} {'rows/s':>10}")
+    print(f"{'one per row':14} {direct:9.2f} {rows / direct:10.0f}")
+    print(f"{'write-behind':14} {behind:9.2f} {rows / behind:10.0f}   ({queue.stats()['batches']} batches)")
+
+
+def main():
+    user_id = int(sys.argv[1])
+    tenant_id = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+    asyncio.run(run(user_id, tenant_id, rows, concurrency))
+    Database.close()
+
+
+if __name__ == "__main__":
+    main()
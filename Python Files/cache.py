@@ -0,0 +1,259 @@
+"""
+Caches for hot, rarely changing data (registered users, per-user view results).
+
+By default the caches live in this process. When the bot runs as several worker processes
+(see supervisor.py) they are replaced by proxies to one shared cache tier: either the
+supervisor's cache server (CACHE_ADDRESS) or a Redis-compatible server (CACHE_URL).
+"""
+
+import os
+import math
+import asyncio
+import time
+import pickle
+import threading
+from ast import literal_eval
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+REGISTERED_USER_TTL = float(os.environ.get("REGISTERED_USER_TTL", "600"))
+VIEW_RESULT_TTL = float(os.environ.get("VIEW_RESULT_TTL", "60"))
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache with a per-entry time to live and LRU eviction.
+    Entries older than ttl seconds are treated as missing; once maxsize entries are held,
+    the least recently used one is dropped to make room.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        """Live keys, most recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [k for k, (expires, _) in reversed(self._data.items()) if expires >= now]
+
+    def items(self):
+        """Live (key, value) pairs, most recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, value) for k, (expires, value) in reversed(self._data.items()) if expires >= now]
+
+    def expiring_items(self):
+        """Live (key, value, seconds left to live) triples, most recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, value, expires - now) for k, (expires, value) in reversed(self._data.items()) if expires >= now]
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class UserIndexCache:
+    """
+    Live per-user indexes (search, contractors) for the users who used them recently.
+    They are updated in place, so they stay in-process even when the other caches are
+    shared between workers. Subclasses implement build() and keep them current.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._indexes = TTLCache(maxsize, ttl)
+        self.builds = 0
+        self.refreshed = 0
+
+    async def build(self, user_id):
+        """Loads the user's rows and returns a new index over them."""
+        raise NotImplementedError
+
+    async def index_for(self, user_id):
+        """The user's index, built on first use."""
+        index = self._indexes.get(user_id)
+        if index is None:
+            index = await self.build(user_id)
+            self._indexes.set(user_id, index)
+            self.builds += 1
+        return index
+
+    def drop(self, user_id):
+        self._indexes.delete(user_id)
+
+    def stats(self):
+        return {**self._indexes.stats(), "builds": self.builds, "refreshed": self.refreshed}
+
+
+class RedisCache:
+    """
+    TTLCache-compatible client for a Redis (or Redis-protocol) server. Values are pickled
+    and every key is prefixed with the cache's namespace. keys() cannot report recency,
+    so it returns keys in server scan order.
+    """
+
+    def __init__(self, client, namespace, ttl):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.namespace}:{key!r}"
+
+    def get(self, key, default=None):
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self._key(key), pickle.dumps(value), px=max(1, math.ceil(ttl * 1000)))
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=f"{self.namespace}:*"):
+            self.client.delete(key)
+
+    def keys(self):
+        prefix = len(self.namespace) + 1
+        return [literal_eval(k.decode()[prefix:]) for k in self.client.scan_iter(match=f"{self.namespace}:*")]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# Size and TTL of each named cache; used both in-process and by the shared cache server.
+CACHE_SETTINGS = {
+    "registered_users": (50000, REGISTERED_USER_TTL),
+    "view_results": (20000, VIEW_RESULT_TTL),
+}
+
+# RegisteredUsers rows keyed by Discord ID. Only existing users are cached, so a user who
+# registers is never shadowed by an earlier "not registered" lookup.
+registered_users = TTLCache(*CACHE_SETTINGS["registered_users"])
+
+# Per-user view rows keyed by (view model name, user_id); see UserViewModel.load_async.
+view_results = TTLCache(*CACHE_SETTINGS["view_results"])
+
+
+def is_local():
+    """True while this process uses its own in-process caches (no shared tier configured)."""
+    return isinstance(registered_users, TTLCache) and isinstance(view_results, TTLCache)
+
+
+async def run_async(fn, *args):
+    """
+    Runs a cache operation, e.g. run_async(registered_users.get, key), from a coroutine.
+    In-process caches answer from a dict and are called directly; proxies to the shared cache
+    server and Redis clients block on a network round trip, so with a shared tier the call
+    runs on a worker thread instead of stalling the event loop.
+    """
+    if is_local():
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+# --- Shared cache tier ---
+# The supervisor hosts one TTLCache per name in a separate server process; workers talk to it
+# through multiprocessing proxies. Each call is one local IPC round trip, far cheaper than
+# the MySQL query it saves, and every worker sees the same entries and invalidations.
+
+class SharedCacheManager(BaseManager):
+    pass
+
+
+_server_caches = {}
+
+def _server_cache(name):
+    if name not in _server_caches:
+        _server_caches[name] = TTLCache(*CACHE_SETTINGS[name])
+    return _server_caches[name]
+
+SharedCacheManager.register("cache", callable=_server_cache,
+                            exposed=("get", "set", "delete", "clear", "keys", "stats", "__len__"))
+
+
+def start_shared_cache(address=("127.0.0.1", 0), authkey=None):
+    """Starts the cache server process. Returns the manager; its .address is what workers connect to."""
+    manager = SharedCacheManager(address=address, authkey=authkey or os.urandom(16))
+    manager.start()
+    return manager
+
+
+def connect_shared_cache(address, authkey):
+    """Points this process's caches at the shared cache server."""
+    global registered_users, view_results
+    manager = SharedCacheManager(address=address, authkey=authkey)
+    manager.connect()
+    registered_users = manager.cache("registered_users")
+    view_results = manager.cache("view_results")
+    return manager
+
+
+def connect_redis(url):
+    """Points this process's caches at a Redis-compatible server (requires the redis package)."""
+    global registered_users, view_results
+    import redis  # Optional dependency, only needed for CACHE_URL deployments
+    client = redis.Redis.from_url(url)
+    registered_users = RedisCache(client, "registered_users", REGISTERED_USER_TTL)
+    view_results = RedisCache(client, "view_results", VIEW_RESULT_TTL)
+    return client
+
+
+def configure_from_env():
+    """
+    Selects the cache tier for this process:
+      CACHE_URL=redis://host:6379/0               -> Redis-compatible server
+      CACHE_ADDRESS=host:port + CACHE_AUTHKEY=hex -> the supervisor's shared cache server
+      neither                                      -> in-process caches
+    """
+    url = os.environ.get("CACHE_URL")
+    address = os.environ.get("CACHE_ADDRESS")
+    if url:
+        return connect_redis(url)
+    if address:
+        host, port = address.rsplit(":", 1)
+        return connect_shared_cache((host, int(port)), bytes.fromhex(os.environ["CACHE_AUTHKEY"]))
+    return None
@@ -0,0 +1,158 @@
+"""
+Change data capture: tails the ChangeLog table and publishes what changed to in-process subscribers.
+
+Triggers on the core tables (Business Requirement #7 in business_requirements.sql) append a
+compact (table_name, pk, op, user_id) row per changed row, so writes made by stored procedures
+or by other processes are seen here as well. ChangeLogTailer reads the log in sequence order,
+one indexed range query per batch, and hands each batch to its subscribers, which drop or
+refresh whatever they derived from the changed users' data.
+
+Every tailer records its position in ChangeLogConsumers; rows that all active consumers have
+read are deleted, so the log only ever holds the last minute or so of changes.
+"""
+
+import os
+import time
+import socket
+import asyncio
+import inspect
+from database import Database, Query, db_context, MAINTENANCE
+
+# Rows read per query; a full batch is followed immediately by the next one.
+CHANGELOG_BATCH_SIZE = int(os.environ.get("CHANGELOG_BATCH_SIZE", "500"))
+# Seconds between polls once the tailer has caught up.
+CHANGELOG_POLL_SECONDS = float(os.environ.get("CHANGELOG_POLL_SECONDS", "1.0"))
+# Seconds between saving this consumer's position and truncating the log.
+CHECKPOINT_SECONDS = 30.0
+# Consumers that have not checked in for this long no longer hold back truncation.
+CONSUMER_TIMEOUT_SECONDS = 300
+# Sequence numbers are assigned at insert but become visible at commit, so a lower one can
+# appear after a higher one was read. Skipped numbers are re-checked for this long before
+# they are given up on (a rolled-back insert leaves a permanent gap).
+GAP_TIMEOUT_SECONDS = 10.0
+# Rows deleted per truncation statement.
+TRUNCATE_CHUNK = 5000
+
+
+def changed_users(changes, tables=None):
+    """The owning user IDs in changes (optionally only changes to tables), without unknown owners."""
+    return {change["user_id"] for change in changes
+            if change["user_id"] is not None and (tables is None or change["table_name"] in tables)}
+
+
+class ChangeLogTailer:
+    """
+    Polls ChangeLog by sequence number and publishes each batch of changes.
+
+    subscribe(callback, tables) registers a function or coroutine function that is called
+    with the list of change rows (dicts with seq, table_name, pk, op and user_id) touching
+    the given tables, or every table when tables is None. A failing subscriber is logged
+    and does not stop the others or the tailer.
+    """
+
+    def __init__(self, batch_size=CHANGELOG_BATCH_SIZE, poll_interval=CHANGELOG_POLL_SECONDS, consumer_id=None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.consumer_id = consumer_id or f"{socket.gethostname()}:{os.getpid()}"[:64]
+        self.last_seq = None
+        self._subscribers = []
+        self._gaps = {}  # Skipped sequence number -> monotonic time it was first seen missing
+        self._truncated_upto = 0
+        self._task = None
+        self.changes_seen = 0
+        self.batches = 0
+
+    def subscribe(self, callback, tables=None):
+        self._subscribers.append((frozenset(tables) if tables is not None else None, callback))
+
+    def start(self):
+        """Starts tailing. Must be called from inside the running event loop."""
+        if self._task is None:
+            with db_context(work_class=MAINTENANCE):
+                self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def seek_to_end(self):
+        """Starts from the newest change: anything older was written before this process cached it."""
+        rows = await Database.select_async(Query.CHANGE_SEQ_RANGE, primary=True)
+        self.last_seq = rows[0]["last_seq"] if rows else 0
+        self._truncated_upto = rows[0]["first_seq"] - 1 if rows else 0
+
+    def position(self):
+        """The highest sequence number below which every change has been published."""
+        if self._gaps:
+            return min(self._gaps) - 1
+        return self.last_seq
+
+    async def poll(self):
+        """Reads and publishes the next batch of changes. Returns the number of new changes read."""
+        if self.last_seq is None:
+            await self.seek_to_end()
+        changes = []
+        if self._gaps:
+            missing = tuple(sorted(self._gaps)[:self.batch_size])
+            changes += await Database.select_async(Query.CHANGES_BY_SEQ, (missing,), primary=True) or []
+            for change in changes:
+                self._gaps.pop(change["seq"], None)
+            expired = time.monotonic() - GAP_TIMEOUT_SECONDS
+            self._gaps = {seq: seen for seq, seen in self._gaps.items() if seen > expired}
+        rows = await Database.select_async(Query.CHANGES_AFTER, (self.last_seq, self.batch_size), primary=True) or []
+        now = time.monotonic()
+        for row in rows:
+            for missing in range(self.last_seq + 1, row["seq"]):
+                self._gaps[missing] = now
+            self.last_seq = row["seq"]
+        changes += rows
+        if changes:
+            await self.publish(changes)
+        return len(rows)
+
+    async def publish(self, changes):
+        self.changes_seen += len(changes)
+        self.batches += 1
+        for tables, callback in self._subscribers:
+            selected = changes if tables is None else [c for c in changes if c["table_name"] in tables]
+            if not selected:
+                continue
+            try:
+                result = callback(selected)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as err:
+                print(f"Change log subscriber {getattr(callback, '__name__', callback)} failed: {err}")
+
+    async def checkpoint(self):
+        """Saves this consumer's position and deletes the changes every active consumer has read."""
+        await Database.insert_async(Query.SAVE_CHANGELOG_POSITION, (self.consumer_id, self.position()))
+        await Database.delete_async(Query.DELETE_STALE_CHANGELOG_CONSUMERS, (CONSUMER_TIMEOUT_SECONDS,))
+        rows = await Database.select_async(Query.CONSUMED_CHANGE_SEQ, (CONSUMER_TIMEOUT_SECONDS,), primary=True)
+        consumed = rows[0]["seq"] if rows and rows[0]["seq"] is not None else 0
+        # Deleted in primary key ranges so no single statement holds locks on a large part of the log.
+        while self._truncated_upto < consumed:
+            upto = min(consumed, self._truncated_upto + TRUNCATE_CHUNK)
+            await Database.delete_async(Query.TRUNCATE_CHANGELOG, (self._truncated_upto, upto))
+            self._truncated_upto = upto
+
+    async def _run(self):
+        next_checkpoint = time.monotonic() + CHECKPOINT_SECONDS
+        while True:
+            try:
+                read = await self.poll()
+                if time.monotonic() >= next_checkpoint:
+                    await self.checkpoint()
+                    next_checkpoint = time.monotonic() + CHECKPOINT_SECONDS
+            except Exception as err:
+                print(f"Change log tailing failed: {err}")
+                await asyncio.sleep(max(self.poll_interval, 5.0))
+                continue
+            if read < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self):
+        return {"position": self.position(), "pending_gaps": len(self._gaps), "changes": self.changes_seen,
+                "batches": self.batches, "truncated_upto": self._truncated_upto}
@@ -0,0 +1,114 @@
+"""
+A separate process pool for CPU-bound work (report formatting, projections, schedules).
+
+Database I/O runs on the thread pool in database.py; anything that burns CPU in Python
+would hold the GIL there and slow every other owner's lookups, so it runs here instead,
+in CPU_WORKERS worker processes. Inputs travel in a compact column-oriented form and
+results larger than MAX_RESULT_BYTES are refused rather than shipped back.
+"""
+
+import os
+import pickle
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def default_workers(processes=1):
+    """
+    Pool size for each of `processes` bot processes on this host: the cores left over after
+    one per process are split between them, so N shard workers do not start N × (cores - 1)
+    pool processes between them.
+    """
+    return max(1, ((os.cpu_count() or 2) - processes) // processes)
+
+
+# Number of worker processes; 0 runs every job inline on the event loop (useful for tests).
+# supervisor.py sets this for its shard workers from default_workers(WORKER_PROCESSES).
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", default_workers()))
+# Listings shorter than this are formatted inline; IPC would cost more than it saves.
+OFFLOAD_MIN_ROWS = int(os.environ.get("CPU_OFFLOAD_MIN_ROWS", "200"))
+# Largest pickled result a job may return.
+MAX_RESULT_BYTES = int(os.environ.get("CPU_MAX_RESULT_BYTES", str(8 * 1024 * 1024)))
+
+
+class ResultTooLarge(RuntimeError):
+    pass
+
+
+def pack_rows(rows):
+    """
+    Converts a list of row dicts into (columns, values): the column names once and one tuple
+    per row, which pickles to a fraction of the size of repeating every key in every row.
+    """
+    if not rows:
+        return (), ()
+    columns = tuple(rows[0].keys())
+    return columns, tuple(tuple(row.get(column) for column in columns) for row in rows)
+
+
+def unpack_rows(columns, values):
+    return [dict(zip(columns, row)) for row in values]
+
+
+def _call(fn, args, max_result_bytes):
+    # Runs in the worker process: the result is pickled here so its size can be checked
+    # before anything crosses the pipe.
+    data = pickle.dumps(fn(*args), protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) > max_result_bytes:
+        raise ResultTooLarge(f"{fn.__name__} returned {len(data)} bytes (limit {max_result_bytes})")
+    return data
+
+
+def _call_with_rows(fn, columns, values, args, max_result_bytes):
+    return _call(fn, (unpack_rows(columns, values),) + args, max_result_bytes)
+
+
+_pool = None
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # forkserver: workers never inherit the parent's DB connections or executor threads.
+        _pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    return _pool
+
+
+async def run_cpu(fn, *args, max_result_bytes=None):
+    """
+    Runs fn(*args) on the CPU pool and returns its result. fn must be a module-level
+    function and its arguments picklable.
+    """
+    max_result_bytes = max_result_bytes or MAX_RESULT_BYTES
+    if not CPU_WORKERS:
+        return pickle.loads(_call(fn, args, max_result_bytes))
+    data = await asyncio.get_running_loop().run_in_executor(_get_pool(), _call, fn, args, max_result_bytes)
+    return pickle.loads(data)
+
+
+async def run_rows(fn, rows, *args, max_result_bytes=None):
+    """
+    Runs fn(rows, *args). Short row lists run inline; longer ones are sent to the CPU pool
+    packed by column and rebuilt into dicts in the worker.
+    """
+    if not CPU_WORKERS or len(rows) < OFFLOAD_MIN_ROWS:
+        return fn(rows, *args)
+    columns, values = pack_rows(rows)
+    data = await asyncio.get_running_loop().run_in_executor(
+        _get_pool(), _call_with_rows, fn, columns, values, args, max_result_bytes or MAX_RESULT_BYTES)
+    return pickle.loads(data)
+
+
+def warm_up():
+    """Starts the worker processes ahead of the first heavy command."""
+    if CPU_WORKERS:
+        pool = _get_pool()
+        for future in [pool.submit(int) for _ in range(CPU_WORKERS)]:
+            future.result()
+
+
+def shut_down():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
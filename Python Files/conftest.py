@@ -1,10 +1,46 @@
+import os
 import pytest
-from database import Database, Query
+from unittest.mock import patch
+import database
+from database import Database, Query, SQLiteBackend
 
 TEST_USER_ID = 12340
 
+
+@pytest.fixture(scope="session")
+def offline_database(tmp_path_factory):
+    # With DB_BACKEND=sqlite and no DB_SQLITE_PATH, integration tests run on a throwaway
+    # database file, so the suite needs no MySQL server.
+    if database.db_backend != "sqlite" or os.environ.get("DB_SQLITE_PATH"):
+        yield
+        return
+    path = tmp_path_factory.mktemp("db") / "PropertyManagementDB.sqlite3"
+    with patch("database._backend", SQLiteBackend(str(path))), patch("database._pool", None):
+        yield
+        Database.close()
+
+
+@pytest.fixture()
+def sqlite_db(tmp_path):
+    # A fresh database file per test, created from sqlite_schema.sql on first connect.
+    backend = SQLiteBackend(str(tmp_path / "test.sqlite3"))
+    with patch("database._backend", backend), patch("database._pool", None):
+        yield backend
+        Database.close()
+
+
+@pytest.fixture()
+def sample_user(sqlite_db):
+    # The test user with the CreateSampleUserData rows (six properties, each with one unit, tenant,
+    # mortgage and project; payments due 2024-12-01, expenses dated 2024-01 to 2024-06) in sqlite_db.
+    Database.insert(Query.INSERT_REGISTERED_USER, {"tracking_id": TEST_USER_ID, "email": "test@email.com",
+                                                   "first_name": "First", "last_name": "Last", "role_id": 1})
+    Database.callprocedure(Query.PROC_CreateSampleUserData, (TEST_USER_ID,))
+    return TEST_USER_ID
+
+
 @pytest.fixture()
-def registered_test_user():
+def registered_test_user(offline_database):
 
     # --- setup ---
     # Delete contractor-linked data first — these are linked directly to the user
@@ -0,0 +1,176 @@
+"""
+Per-user contractor index for the !contractors and !find_contractor commands.
+
+A user's contractors and their project assignments are loaded with one query (Contractors,
+ProjectContractors and ProjectInfos, no views) the first time they are needed and kept in
+memory as:
+  * contractor -> its assignments (project, title, in progress), from which the workload
+    (active and total projects) is counted without touching the database;
+  * service word -> contractors, with the words kept sorted so a query word finds every
+    service it is a prefix of ("plumb" finds "plumbing") by bisection.
+
+Built indexes are kept current from the change log: a change to a contractor, to one of its
+assignments or to a project it works on re-reads just the contractors concerned.
+"""
+
+import os
+import re
+import bisect
+from collections import defaultdict
+from database import Database, Query
+from cache import UserIndexCache
+
+# How many users' indexes are kept in memory (least recently used are dropped).
+CONTRACTOR_INDEX_USERS = int(os.environ.get("CONTRACTOR_INDEX_USERS", "2000"))
+CONTRACTOR_INDEX_TTL = float(os.environ.get("CONTRACTOR_INDEX_TTL", "3600"))
+# Contractors with at least this many projects in progress are reported as overloaded.
+OVERLOAD_PROJECTS = int(os.environ.get("CONTRACTOR_OVERLOAD_PROJECTS", "3"))
+
+CONTRACTOR_TABLES = frozenset({"Contractors", "ProjectContractors", "ProjectInfos"})
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def service_words(text):
+    return {word for word in _WORD.findall((text or "").lower())}
+
+
+class ContractorIndex:
+    """Workload and service lookups over one user's contractors (CONTRACTOR_ASSIGNMENTS rows)."""
+
+    def __init__(self, rows=()):
+        self.contractors = {}   # contractor_id -> {contractor_id, company_name, full_name, services}
+        self.assignments = {}   # contractor_id -> {assignment_id: (project_id, project_title, in_progress)}
+        self.projects = defaultdict(set)  # project_id -> contractor IDs working on it
+        self.owners = {}        # assignment_id -> contractor_id
+        self._services = defaultdict(set)  # service word -> contractor IDs
+        self._words = None      # sorted service words, rebuilt lazily after changes
+        self.replace(rows)
+
+    def replace(self, rows, contractor_ids=()):
+        """Replaces contractor_ids and every contractor in rows with what rows say about them."""
+        for contractor_id in set(contractor_ids) | {row["contractor_id"] for row in rows}:
+            self.remove(contractor_id)
+        for row in rows:
+            contractor_id = row["contractor_id"]
+            if contractor_id not in self.contractors:
+                self.contractors[contractor_id] = {key: row.get(key) for key in
+                                                   ("contractor_id", "company_name", "full_name", "services")}
+                self.assignments[contractor_id] = {}
+                for word in service_words(row.get("services")):
+                    self._services[word].add(contractor_id)
+                self._words = None
+            if row.get("assignment_id") is not None:
+                self.assignments[contractor_id][row["assignment_id"]] = (
+                    row.get("project_id"), row.get("project_title"), bool(row.get("in_progress")))
+                self.owners[row["assignment_id"]] = contractor_id
+                if row.get("project_id") is not None:
+                    self.projects[row["project_id"]].add(contractor_id)
+
+    def remove(self, contractor_id):
+        contractor = self.contractors.pop(contractor_id, None)
+        if contractor is None:
+            return
+        for word in service_words(contractor.get("services")):
+            holders = self._services[word]
+            holders.discard(contractor_id)
+            if not holders:
+                del self._services[word]
+                self._words = None
+        for assignment_id, (project_id, _, _) in self.assignments.pop(contractor_id).items():
+            self.owners.pop(assignment_id, None)
+            holders = self.projects.get(project_id)
+            if holders is not None:
+                holders.discard(contractor_id)
+                if not holders:
+                    del self.projects[project_id]
+
+    def workload(self, contractor_id):
+        """The contractor's row with its active and total project counts and active project titles."""
+        assignments = self.assignments[contractor_id].values()
+        active = sorted({title or "Untitled" for _, title, in_progress in assignments if in_progress})
+        return dict(self.contractors[contractor_id], active_projects=len(active),
+                    total_projects=len({project_id for project_id, _, _ in assignments}),
+                    active_titles=active, overloaded=len(active) >= OVERLOAD_PROJECTS)
+
+    def workloads(self):
+        """Every contractor's workload, busiest first."""
+        rows = [self.workload(contractor_id) for contractor_id in self.contractors]
+        return sorted(rows, key=lambda row: (-row["active_projects"], -row["total_projects"],
+                                             row.get("company_name") or ""))
+
+    def find(self, service):
+        """Contractors offering every word of service (as a prefix), least busy first."""
+        words = service_words(service)
+        if not words:
+            return []
+        if self._words is None:
+            self._words = sorted(self._services)
+        matches = None
+        for word in words:
+            start = bisect.bisect_left(self._words, word)
+            found = set()
+            for candidate in self._words[start:]:
+                if not candidate.startswith(word):
+                    break
+                found |= self._services[candidate]
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+        rows = [self.workload(contractor_id) for contractor_id in matches]
+        return sorted(rows, key=lambda row: (row["active_projects"], row["total_projects"],
+                                             row.get("company_name") or ""))
+
+    def __len__(self):
+        return len(self.contractors)
+
+
+class ContractorIndexes(UserIndexCache):
+    """The contractor indexes of the users who asked recently."""
+
+    def __init__(self, maxsize=CONTRACTOR_INDEX_USERS, ttl=CONTRACTOR_INDEX_TTL):
+        super().__init__(maxsize, ttl)
+
+    async def build(self, user_id):
+        rows = await Database.select_async(Query.CONTRACTOR_ASSIGNMENTS_BY_USER, (user_id,)) or []
+        return ContractorIndex(rows)
+
+    async def apply_changes(self, changes):
+        """Change log subscriber: re-reads the contractors that changes touched in built indexes."""
+        stale = defaultdict(set)     # user_id -> contractor IDs to re-read
+        written = defaultdict(set)   # user_id -> inserted or updated assignment IDs, whose contractor is looked up
+        for change in changes:
+            user_id = change["user_id"]
+            index = self._indexes.get(user_id) if user_id is not None else None
+            if index is None:
+                continue
+            table, pk = change["table_name"], change["pk"]
+            if table == "Contractors":
+                stale[user_id].add(pk)
+            elif table == "ProjectInfos":
+                stale[user_id].update(index.projects.get(pk, ()))
+            else:
+                contractor_id = index.owners.get(pk)
+                if contractor_id is not None:
+                    stale[user_id].add(contractor_id)
+                if change["op"] != "D":
+                    written[user_id].add(pk)
+
+        for user_id, assignment_ids in written.items():
+            rows = await Database.select_async(Query.CONTRACTORS_OF_ASSIGNMENTS, (tuple(assignment_ids),),
+                                               primary=True) or []
+            stale[user_id].update(row["contractor_id"] for row in rows if row["contractor_id"] is not None)
+
+        for user_id, contractor_ids in stale.items():
+            index = self._indexes.get(user_id)
+            if index is None or not contractor_ids:
+                continue
+            rows = await Database.select_async(Query.CONTRACTOR_ASSIGNMENTS_BY_IDS,
+                                               (user_id, tuple(contractor_ids)), primary=True) or []
+            # IDs that no longer match are deleted or no longer the user's.
+            index.replace(rows, contractor_ids)
+            self.refreshed += len(contractor_ids)
+
+
+# Shared indexes used by the bot; kept current by the change log tailer (see main.create_bot).
+contractor_indexes = ContractorIndexes()
@@ -1,14 +1,25 @@
 # IMPORTANT: All SQL-related logic must be confined to this file.
 
 import os
+import re
 import queue
+import sqlite3
 import asyncio
+import time
+import hashlib
+import threading
+import weakref
+import contextvars
+from collections import deque
+from functools import lru_cache
+from contextlib import contextmanager, asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
 from dotenv import load_dotenv
 import pymysql.cursors
 
 POOL_SIZE = 4
-_executor = ThreadPoolExecutor(max_workers=POOL_SIZE)
 
 # Load .env if it exists for local development
 load_dotenv()
@@ -21,6 +32,37 @@ db_username = os.environ.get("DB_USER", "")
 db_password = os.environ.get("DB_PASSWORD", "")
 db_name = os.environ.get("DB_NAME", "")
 
+# Storage backend: "mysql" (default) or "sqlite" for an embedded database file, which needs no
+# server and is meant for single-node deployments and offline tests (see SQLiteBackend).
+db_backend = os.environ.get("DB_BACKEND", "mysql").lower()
+db_sqlite_path = os.environ.get("DB_SQLITE_PATH", "PropertyManagementDB.sqlite3")
+db_sqlite_mmap_mb = int(os.environ.get("DB_SQLITE_MMAP_MB", "256"))
+
+# Set DB_PREPARED_STATEMENTS=1 to run the fixed Query SELECTs through server-side prepared statements.
+# Off by default: PyMySQL only speaks the text protocol, so each prepared read is a SET of the
+# parameters plus an EXECUTE, one more round trip than plain SQL. Turn it on only where
+# bench_prepared_statements.py shows a gain.
+prepared_statements_enabled = os.environ.get("DB_PREPARED_STATEMENTS", "0") == "1"
+
+# Optional read replicas, e.g. DB_REPLICA_HOSTS=replica-1.example.com,replica-2.example.com
+# Each replica gets its own pool of POOL_SIZE connections; see ReplicaRouter.
+db_replica_hosts = [h.strip() for h in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if h.strip()]
+db_replica_strategy = os.environ.get("DB_REPLICA_STRATEGY", "round_robin")  # or "least_connections"
+# Reads within this many seconds of a write go to the primary so users see their own writes.
+db_replica_lag_window = float(os.environ.get("DB_REPLICA_LAG_WINDOW", "5"))
+
+# One worker thread (and scheduler slot) per pooled connection across primary and replicas.
+MAX_DB_CONCURRENCY = POOL_SIZE * (1 + len(db_replica_hosts))
+_executor = ThreadPoolExecutor(max_workers=MAX_DB_CONCURRENCY)
+
+
+def _in_executor(loop, fn, *args):
+    """
+    Runs fn(*args) on the DB executor in a copy of the caller's context, so the user set by
+    db_context() still attributes the work (e.g. ReplicaRouter's read-your-writes window).
+    """
+    return loop.run_in_executor(_executor, contextvars.copy_context().run, fn, *args)
+
 
 class ConnectionPool:
     """
@@ -31,30 +73,60 @@ class ConnectionPool:
     so no explicit mutex is needed to protect the pool itself.
     """
 
-    def __init__(self, size):
+    def __init__(self, size, host=None, parallel=True):
+        self.host = host or db_host
+        self.size = size
+        self.in_use = 0  # Checked-out connections, used for least-connections routing
+        self._in_use_lock = threading.Lock()
         self._pool = queue.Queue(maxsize=size)
-        for _ in range(size):
-            self._pool.put(self._make_connection())
+        if parallel and size > 1:
+            # Open all connections at once so startup pays one TCP+auth handshake
+            # latency instead of `size` of them back to back.
+            with ThreadPoolExecutor(max_workers=size) as opener:
+                connections = list(opener.map(lambda _: self._make_connection(), range(size)))
+        else:
+            connections = [self._make_connection() for _ in range(size)]
+        for conn in connections:
+            self._pool.put(conn)
 
     def _make_connection(self):
+        # autocommit: single statements are committed by the server without a separate
+        # COMMIT round trip; multi-statement work uses Database.transaction().
+        # MULTI_STATEMENTS is deliberately left off, so one execute() can never run a
+        # second, stacked statement.
         return pymysql.connect(
-            host=db_host, port=3306, user=db_username, password=db_password,
-            database=db_name, charset="utf8mb4", cursorclass=pymysql.cursors.DictCursor
+            host=self.host, port=3306, user=db_username, password=db_password,
+            database=db_name, charset="utf8mb4", cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True
         )
 
     def acquire(self):
         """Check out a connection. Blocks if all connections are in use."""
         conn = self._pool.get()
+        with self._in_use_lock:
+            self.in_use += 1
         try:
             conn.ping(reconnect=True)  # Reconnect automatically if connection went stale
         except Exception:
-            conn = self._make_connection()
+            try:
+                conn = self._make_connection()
+            except Exception:
+                self.release(conn)  # Keep the pool at full size; the dead slot reconnects next time
+                raise
         return conn
 
     def release(self, conn):
         """Return a connection to the pool."""
+        with self._in_use_lock:
+            self.in_use -= 1
         self._pool.put(conn)
 
+    def validate(self):
+        """Check out every connection once and ping it, so a bad pool fails at startup."""
+        connections = [self.acquire() for _ in range(self.size)]
+        for conn in connections:
+            self.release(conn)
+
     def close_all(self):
         """Close every connection in the pool (call on bot shutdown)."""
         while not self._pool.empty():
@@ -72,18 +144,671 @@ _pool = None
 def _get_pool():
     global _pool
     if _pool is None:
-        _pool = ConnectionPool(POOL_SIZE)
+        _pool = _get_backend().make_pool()
     return _pool
 
-# Semaphore is created lazily on first use — asyncio requires it to be
-# instantiated inside the running event loop, not at module import time.
-_db_semaphore = None
+class ReplicaRouter:
+    """
+    Chooses which pool serves a read: one of the read replicas, or None for the primary.
+
+    Replica pools are opened lazily on first use. A replica that fails to connect or errors
+    during a query is skipped for down_for seconds and its reads fall back to the primary.
+    After a user's write, that user's reads go to the primary for lag_window seconds, so a
+    command that just wrote (e.g. !register, !create_sample) reads its own data back even if
+    the replicas have not caught up yet. Writes are attributed through db_context; work
+    outside any user's context shares the None entry.
+    """
+
+    PRUNE_AT = 1024  # Expired write times are dropped once this many users are tracked
+
+    def __init__(self, hosts, strategy="round_robin", lag_window=5.0, down_for=30.0):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.hosts = list(hosts)
+        self.strategy = strategy
+        self.lag_window = lag_window
+        self.down_for = down_for
+        self._pools = {}
+        self._down_until = {}
+        self._next = 0
+        self._last_write = {}  # user -> monotonic time of their latest write
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.fallbacks = 0
+
+    def note_write(self):
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[_db_user.get()] = now
+            if len(self._last_write) > self.PRUNE_AT:
+                self._last_write = {user: at for user, at in self._last_write.items()
+                                    if now - at < self.lag_window}
+
+    def pinned_to_primary(self):
+        """True while the current user is inside the lag window of their own latest write."""
+        return time.monotonic() - self._last_write.get(_db_user.get(), float("-inf")) < self.lag_window
+
+    def note_replica_read(self):
+        with self._lock:
+            self.replica_reads += 1
+
+    def mark_down(self, host):
+        with self._lock:
+            self._down_until[host] = time.monotonic() + self.down_for
+            self.fallbacks += 1
+
+    def pool_for_read(self):
+        """Returns a replica ConnectionPool for the next read, or None to use the primary."""
+        if not self.hosts or self.pinned_to_primary():
+            return None
+        now = time.monotonic()
+        with self._lock:
+            healthy = [h for h in self.hosts if self._down_until.get(h, 0) <= now]
+            if not healthy:
+                return None
+            if self.strategy == "least_connections":
+                host = min(healthy, key=lambda h: self._pools[h].in_use if h in self._pools else 0)
+            else:
+                host = healthy[self._next % len(healthy)]
+                self._next += 1
+        try:
+            return self._get_pool(host)
+        except pymysql.err.MySQLError:
+            self.mark_down(host)
+            return None
+
+    def _get_pool(self, host):
+        pool = self._pools.get(host)
+        if pool is None:
+            pool = ConnectionPool(POOL_SIZE, host)
+            with self._lock:
+                # Another thread may have opened the same replica in the meantime.
+                if host in self._pools:
+                    pool.close_all()
+                    pool = self._pools[host]
+                else:
+                    self._pools[host] = pool
+        return pool
+
+    def warm_up(self):
+        """Opens and validates every replica pool up front; unreachable replicas are marked down."""
+        for host in self.hosts:
+            try:
+                self._get_pool(host).validate()
+            except pymysql.err.MySQLError as err:
+                print(f"Read replica {host} unavailable at startup: {err}")
+                self.mark_down(host)
+
+    def close_all(self):
+        for pool in list(self._pools.values()):
+            pool.close_all()
+        self._pools.clear()
+
+    def stats(self):
+        return {"replica_reads": self.replica_reads, "fallbacks": self.fallbacks,
+                "in_use": {h: p.in_use for h, p in self._pools.items()}}
+
+
+_router = None
+
+def _get_router():
+    global _router
+    if _router is None:
+        _router = ReplicaRouter(db_replica_hosts, db_replica_strategy, db_replica_lag_window)
+    return _router
+
+# Matches quoted literals and identifiers so whitespace inside them is left untouched.
+_QUOTED = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)")
+# A quoted segment (kept) or a "-- " comment running to the end of its line (dropped).
+_LINE_COMMENT = re.compile(_QUOTED.pattern + r"|--(?=\s|$)[^\n]*", re.MULTILINE)
+
+@lru_cache(maxsize=None)
+def normalize_query(query):
+    """
+    Collapses the indentation and line breaks of a Query constant into single spaces.
+    "-- " comments are removed first: once the lines are joined, a comment would otherwise
+    swallow the rest of the statement. /* */ comments are closed, so they are left in place.
+    The Query strings are fixed, so each one is normalized once and then served from the cache.
+    """
+    query = _LINE_COMMENT.sub(lambda match: match.group(1) or " ", query)
+    parts = _QUOTED.split(query)
+    # Odd indices are the quoted segments captured by the split.
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts)).strip()
+
+
+class PreparedStatementCache:
+    """
+    Keeps track of which server-side prepared statements exist on each pooled connection.
+    PyMySQL only speaks the text protocol, so statements are prepared with SQL-level
+    PREPARE once per connection and then run as "SET @p0 = ..." followed by
+    "EXECUTE stmt USING @p0", which skips MySQL's parse step on every later execution.
+    Prepared statements live inside a server session, so the cache is keyed by connection
+    and by its server thread id — a reconnect (e.g. ping(reconnect=True)) starts a new
+    session and the statements are prepared again.
+    """
+
+    def __init__(self):
+        self._by_connection = weakref.WeakKeyDictionary()
+        self._unpreparable = set()
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.hits = 0
+
+    @staticmethod
+    def statement_name(query):
+        """Stable per-query name, so a statement is named the same on every connection."""
+        return "repm_" + hashlib.sha1(normalize_query(query).encode()).hexdigest()[:16]
+
+    def is_unpreparable(self, query):
+        return query in self._unpreparable
+
+    def handle(self, connection, cursor, query):
+        """
+        Returns the name of the prepared statement for query on this connection,
+        preparing it first if this connection's session has not seen it yet.
+        Returns None if the server refused to prepare it (the caller falls back to plain text).
+        """
+        name = self.statement_name(query)
+        thread_id = connection.thread_id()
+        with self._lock:
+            session_id, prepared = self._by_connection.get(connection, (None, None))
+            if session_id != thread_id:
+                prepared = set()
+                self._by_connection[connection] = (thread_id, prepared)
+        if name in prepared:
+            with self._lock:
+                self.hits += 1
+            return name
+        try:
+            cursor.execute(f"PREPARE {name} FROM %s", (normalize_query(query).replace("%s", "?"),))
+        except pymysql.err.MySQLError:
+            self._unpreparable.add(query)
+            return None
+        prepared.add(name)
+        with self._lock:
+            self.prepares += 1
+        return name
+
+
+_statements = PreparedStatementCache()
+
+# Built lazily because Query is defined further down in this module.
+_preparable_queries = None
+
+def _is_preparable(query, values):
+    """
+    Only the fixed SELECTs in Query with positional scalar parameters are prepared.
+    Named parameters, IN-list tuples and ad-hoc SQL keep going through the text protocol.
+    """
+    global _preparable_queries
+    if _preparable_queries is None:
+        _preparable_queries = {
+            sql for name, sql in vars(Query).items()
+            if isinstance(sql, str) and not name.startswith("_") and not name.startswith("PROC_")
+            and normalize_query(sql).upper().startswith("SELECT") and "%(" not in sql and "%%" not in sql
+        }
+    if query not in _preparable_queries or _statements.is_unpreparable(query):
+        return False
+    if values is None:
+        return True
+    return isinstance(values, (tuple, list)) and not any(isinstance(v, (tuple, list, dict)) for v in values)
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight reads. When several coroutines ask for the same
+    (query, values) while a first request is still running, they all await that one
+    request's future instead of each taking a scheduler slot and a pooled connection.
+    The key is dropped as soon as the request finishes, so this never serves stale data —
+    it only merges requests that overlap in time.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            self.coalesced += 1
+        # shield() so one caller being cancelled does not cancel the query for everyone else.
+        result = await asyncio.shield(future)
+        # Each caller gets its own list so appending/sorting in one command cannot leak into another.
+        return list(result) if isinstance(result, (list, tuple)) else result
 
-def _get_semaphore():
-    global _db_semaphore
-    if _db_semaphore is None:
-        _db_semaphore = asyncio.Semaphore(POOL_SIZE)
-    return _db_semaphore
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+def _flight_key(query, values, fetch):
+    """Hashable key for a read, or None if the parameters cannot be hashed (no coalescing)."""
+    if isinstance(values, list):
+        values = tuple(values)
+    key = (query, values, fetch)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+# Created lazily alongside the scheduler so its futures belong to the running event loop.
+_single_flight = None
+
+def _get_single_flight():
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
+
+# --- DB work scheduling ---
+# Every async DB call waits for one of MAX_DB_CONCURRENCY slots. Slots are handed out by
+# priority class and, within a class, round-robin across users, with per-user and per-guild
+# caps so one owner's long procedures cannot occupy every connection.
+
+INTERACTIVE = 0   # Reads serving a command
+WRITES = 1        # Inserts, updates, deletes and short procedures
+MAINTENANCE = 2   # Long procedures and background jobs
+
+WORK_CLASS_NAMES = ("interactive", "writes", "maintenance")
+
+# Procedures that rewrite a whole portfolio; they run in the maintenance class.
+MAINTENANCE_PROCEDURES = {"ResetUserData", "CleanOrphanedData", "CreateSampleUserData"}
+
+# Who the current task's DB work is for; set per command by the bot (see db_context).
+_db_user = contextvars.ContextVar("db_user", default=None)
+_db_guild = contextvars.ContextVar("db_guild", default=None)
+_db_work_class = contextvars.ContextVar("db_work_class", default=None)
+
+
+@contextmanager
+def db_context(user=None, guild=None, work_class=None):
+    """
+    Attributes DB work started inside the block to user/guild and optionally forces its
+    priority class (e.g. MAINTENANCE for background jobs).
+    """
+    tokens = [(_db_user, _db_user.set(user)), (_db_guild, _db_guild.set(guild))]
+    if work_class is not None:
+        tokens.append((_db_work_class, _db_work_class.set(work_class)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class DBScheduler:
+    """
+    Priority- and fairness-aware replacement for a plain semaphore.
+
+    Waiters queue per class, and within a class per user, in arrival order. When a slot is
+    free the highest class with an eligible waiter wins; users take turns within the class.
+    A waiter is eligible while its user holds fewer than user_cap slots and its guild fewer
+    than guild_cap; maintenance work additionally never holds more than maintenance_cap.
+    A waiter that has waited longer than aging seconds is served ahead of higher classes so
+    background work cannot starve under constant interactive load.
+    """
+
+    def __init__(self, capacity, user_cap=None, guild_cap=None, maintenance_cap=None, aging=5.0):
+        self.capacity = capacity
+        self.user_cap = user_cap or max(1, capacity // 2)
+        self.guild_cap = guild_cap or max(1, capacity - 1)
+        self.maintenance_cap = maintenance_cap or max(1, capacity // 4)
+        self.aging = aging
+        self.running = 0
+        self._queues = [{} for _ in WORK_CLASS_NAMES]  # class -> {user: deque of waiters}
+        self._running_class = [0] * len(WORK_CLASS_NAMES)
+        self._running_user = {}
+        self._running_guild = {}
+        self._waits = [[0, 0.0, 0.0] for _ in WORK_CLASS_NAMES]  # count, total, max wait
+
+    def _eligible(self, work_class, user, guild):
+        if self._running_user.get(user, 0) >= self.user_cap:
+            return False
+        if guild is not None and self._running_guild.get(guild, 0) >= self.guild_cap:
+            return False
+        return work_class != MAINTENANCE or self._running_class[MAINTENANCE] < self.maintenance_cap
+
+    def _grant(self, work_class, user, guild, enqueued):
+        self.running += 1
+        self._running_class[work_class] += 1
+        self._running_user[user] = self._running_user.get(user, 0) + 1
+        if guild is not None:
+            self._running_guild[guild] = self._running_guild.get(guild, 0) + 1
+        waited = time.monotonic() - enqueued
+        stats = self._waits[work_class]
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2], waited)
+
+    def _release(self, work_class, user, guild):
+        self.running -= 1
+        self._running_class[work_class] -= 1
+        self._running_user[user] -= 1
+        if not self._running_user[user]:
+            del self._running_user[user]
+        if guild is not None:
+            self._running_guild[guild] -= 1
+            if not self._running_guild[guild]:
+                del self._running_guild[guild]
+        self._dispatch()
+
+    def _next_waiter(self):
+        now = time.monotonic()
+        candidates = []
+        for work_class, users in enumerate(self._queues):
+            for user, waiters in users.items():
+                future, guild, enqueued = waiters[0]
+                if self._eligible(work_class, user, guild):
+                    candidates.append((work_class, user, enqueued))
+                    break  # Users are kept in turn order, so the first eligible one is next in this class
+        if not candidates:
+            return None
+        aged = [c for c in candidates if now - c[2] > self.aging]
+        return min(aged, key=lambda c: c[2]) if aged else candidates[0]
+
+    def _dispatch(self):
+        while self.running < self.capacity:
+            chosen = self._next_waiter()
+            if chosen is None:
+                return
+            work_class, user, _ = chosen
+            users = self._queues[work_class]
+            waiters = users.pop(user)
+            future, guild, enqueued = waiters.popleft()
+            if waiters:
+                users[user] = waiters  # Re-inserted at the end: this user goes to the back of the turn order
+            self._grant(work_class, user, guild, enqueued)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, work_class=INTERACTIVE, user=None, guild=None):
+        enqueued = time.monotonic()
+        if self.running < self.capacity and self._eligible(work_class, user, guild) \
+                and not any(self._queues[c] for c in range(work_class + 1)):
+            self._grant(work_class, user, guild, enqueued)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._queues[work_class].setdefault(user, deque()).append((future, guild, enqueued))
+            self._dispatch()  # Earlier waiters may be capped while this one can run
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release(work_class, user, guild)  # Granted just as we were cancelled
+                else:
+                    self._remove(work_class, user, future)
+                raise
+        try:
+            yield
+        finally:
+            self._release(work_class, user, guild)
+
+    def _remove(self, work_class, user, future):
+        waiters = self._queues[work_class].get(user)
+        if waiters is None:
+            return
+        for entry in waiters:
+            if entry[0] is future:
+                waiters.remove(entry)
+                break
+        if not waiters:
+            del self._queues[work_class][user]
+
+    def stats(self):
+        """Queue depth, running slots and wait times (seconds) per class."""
+        result = {}
+        for work_class, name in enumerate(WORK_CLASS_NAMES):
+            count, total, longest = self._waits[work_class]
+            result[name] = {
+                "queued": sum(len(w) for w in self._queues[work_class].values()),
+                "running": self._running_class[work_class],
+                "avg_wait": total / count if count else 0.0,
+                "max_wait": longest,
+            }
+        return result
+
+
+def _work_class_for(default):
+    return _db_work_class.get() if _db_work_class.get() is not None else default
+
+
+# Created lazily on first use so its futures belong to the running event loop.
+_db_scheduler = None
+
+def _get_scheduler():
+    global _db_scheduler
+    if _db_scheduler is None:
+        _db_scheduler = DBScheduler(MAX_DB_CONCURRENCY)
+    return _db_scheduler
+
+
+def _db_slot(default_class):
+    """A scheduler slot for the current task's user, guild and work class."""
+    return _get_scheduler().slot(_work_class_for(default_class), _db_user.get(), _db_guild.get())
+
+
+# --- Storage backends ---
+# Database, Transaction and the pools reach the database only through a backend's make_pool(),
+# connect() and execute(), so the same Query constants run on a MySQL server (the default) or on
+# an embedded SQLite file (DB_BACKEND=sqlite).
+
+class MySQLBackend:
+    """PyMySQL connections to DB_HOST, with optional server-side prepared statements and read replicas."""
+
+    dialect = "mysql"
+    supports_replicas = True
+
+    @property
+    def database(self):
+        return db_name
+
+    def make_pool(self):
+        return ConnectionPool(POOL_SIZE)
+
+    def connect(self):
+        return pymysql.connect(host=db_host, port=3306, user=db_username, password=db_password,
+                               database=db_name, charset="utf8mb4", cursorclass=pymysql.cursors.DictCursor)
+
+    def execute(self, connection, query, values=None, fetch=False, many_entities=False, type=None):
+        """Runs one statement (or procedure call) on an already checked-out connection."""
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            if type == "Proc":
+                cursor.callproc(query, values or ())
+            elif prepared_statements_enabled and not many_entities and _is_preparable(query, values):
+                self._execute_prepared(connection, cursor, query, values)
+            else:
+                if values:
+                    if many_entities:
+                        cursor.executemany(normalize_query(query), values)
+                    else:
+                        cursor.execute(normalize_query(query), values)
+                else:
+                    cursor.execute(normalize_query(query))
+
+            if fetch:
+                return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _execute_prepared(self, connection, cursor, query, values):
+        """
+        Runs query through this connection's server-side prepared statement.
+        Parameters are bound to session variables by a SET, then the statement is executed
+        with them. They are two separate statements because the pooled connections do not
+        allow multi-statement queries.
+        """
+        name = _statements.handle(connection, cursor, query)
+        if name is None:
+            cursor.execute(normalize_query(query), values or None)
+            return
+        if values:
+            assignments = ", ".join(f"@p{i} = %s" for i in range(len(values)))
+            variables = ", ".join(f"@p{i}" for i in range(len(values)))
+            cursor.execute(f"SET {assignments}", tuple(values))
+            cursor.execute(f"EXECUTE {name} USING {variables}")
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "SQL Files", "sqlite_schema.sql")
+SQLITE_BUSY_TIMEOUT = 5.0  # Seconds a writer waits for another connection's write lock
+SQLITE_SCHEMA_VERSION = 6  # PRAGMA user_version set at the end of sqlite_schema.sql
+# Columns added to existing tables after version 1 (table, column, definition). CREATE TABLE IF NOT
+# EXISTS leaves older files' tables as they are, so these are added before the schema is re-applied.
+SQLITE_ADDED_COLUMNS = (
+    ("Portfolios", "mortgaged_purchase_price", "DOUBLE NOT NULL DEFAULT 0"),  # Version 6
+)
+
+# Dates are stored as ISO text, so they compare and sort correctly and read back as date objects
+# from DATE/TIMESTAMP columns, like PyMySQL returns them.
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _sqlite_row(cursor, row):
+    """Row factory returning dicts keyed by column name, like PyMySQL's DictCursor."""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _sqlite_concat(*args):
+    """MySQL CONCAT(): NULL if any argument is NULL."""
+    if any(arg is None for arg in args):
+        return None
+    return "".join(str(arg) for arg in args)
+
+
+class SQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection with the parts of the PyMySQL connection API that the pool and Database use."""
+
+    def begin(self):
+        # IMMEDIATE takes the write lock up front: concurrent writers wait on the busy timeout
+        # instead of both reading and then failing to upgrade their locks.
+        self.execute("BEGIN IMMEDIATE")
+
+    def ping(self, reconnect=True):
+        """An embedded connection has no server link that can go stale."""
+
+
+class SQLiteConnectionPool(ConnectionPool):
+    """
+    ConnectionPool over connections to one SQLite file. In WAL mode readers never block the
+    writer or each other, so the pool serves concurrent reads like the MySQL pool does;
+    writers are serialized by SQLite's write lock.
+    """
+
+    def __init__(self, size, backend):
+        self.backend = backend
+        super().__init__(size, host=backend.path, parallel=False)
+
+    def _make_connection(self):
+        return self.backend.connect()
+
+
+class SQLiteBackend:
+    """
+    Embedded SQLite database file for single-node deployments and offline tests: no server
+    and no network round trips. The file is opened in WAL mode with memory-mapped reads, and
+    created from SQL Files/sqlite_schema.sql on first use. Query text is translated to the
+    SQLite dialect (see _sqlite_statement), and the stored procedures run as their Python
+    ports in SQLiteProcedures.
+    """
+
+    dialect = "sqlite"
+    supports_replicas = False
+
+    def __init__(self, path=None, mmap_mb=None):
+        self.path = path or db_sqlite_path
+        self.mmap_mb = db_sqlite_mmap_mb if mmap_mb is None else mmap_mb
+        self._schema_checked = False
+        self._schema_lock = threading.Lock()
+
+    @property
+    def database(self):
+        return self.path
+
+    def make_pool(self):
+        return SQLiteConnectionPool(POOL_SIZE, self)
+
+    def connect(self):
+        # isolation_level=None: statements autocommit like the MySQL pool's connections, and
+        # transactions are opened explicitly with begin(). cached_statements keeps each
+        # connection's compiled statements, SQLite's counterpart of PreparedStatementCache.
+        conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, factory=SQLiteConnection,
+                               isolation_level=None, check_same_thread=False,
+                               detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                               cached_statements=512)
+        conn.row_factory = _sqlite_row
+        conn.create_function("CONCAT", -1, _sqlite_concat, deterministic=True)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")  # Durable at checkpoints; no fsync per commit
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_mb * 1024 * 1024}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        """Creates the schema in a new file, or brings an older file's schema up to date."""
+        with self._schema_lock:
+            if self._schema_checked:
+                return
+            version = conn.execute("PRAGMA user_version").fetchone()["user_version"]
+            if version < SQLITE_SCHEMA_VERSION:
+                if version:
+                    self._add_missing_columns(conn)
+                with open(SQLITE_SCHEMA_FILE) as schema:
+                    conn.executescript(schema.read())
+                print(f"{'Created' if version == 0 else 'Upgraded'} database schema in {self.path}")
+            self._schema_checked = True
+
+    @staticmethod
+    def _add_missing_columns(conn):
+        for table, column, definition in SQLITE_ADDED_COLUMNS:
+            columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if columns and column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def execute(self, connection, query, values=None, fetch=False, many_entities=False, type=None):
+        """Runs one statement (or ported procedure) on an already checked-out connection."""
+        if type == "Proc":
+            return SQLiteProcedures.call(connection, query, values or (), fetch)
+        cursor = connection.cursor()
+        try:
+            if many_entities:
+                cursor.executemany("?".join(_sqlite_statement(query)), values)
+            else:
+                cursor.execute(*_sqlite_bind(_sqlite_statement(query), values))
+            if fetch:
+                return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+# Backend is chosen lazily from DB_BACKEND, like the pool, so importing this module opens nothing.
+_backend = None
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        if db_backend == "sqlite":
+            _backend = SQLiteBackend()
+        elif db_backend == "mysql":
+            _backend = MySQLBackend()
+        else:
+            raise ValueError(f"Unknown DB_BACKEND {db_backend!r}; expected 'mysql' or 'sqlite'")
+    return _backend
 
 
 class Database:
@@ -110,10 +835,10 @@ class Database:
         Raises:
             ConnectionError: If the connection to the database fails.
         """
+        backend = _get_backend()
         try:
-            conn = pymysql.connect(host=db_host, port=3306, user=db_username, password=db_password,
-                                   database=db_name, charset="utf8mb4", cursorclass=pymysql.cursors.DictCursor)
-            print(f"Connected to database {db_name}")
+            conn = backend.connect()
+            print(f"Connected to database {backend.database}")
             return conn if not close_connection else True
         except ConnectionError as err:
             print(f"Failed to connect to the database: {err}")
@@ -122,7 +847,7 @@ class Database:
             raise
 
 
-    def get_response(self, query, values=None, fetch=False, many_entities=False, type=None):
+    def get_response(self, query, values=None, fetch=False, many_entities=False, type=None, pool=None):
         """
         Executes a SQL query with optional values and fetches results if requested.
 
@@ -131,85 +856,283 @@ class Database:
             values (tuple, optional): Parameters to be used with the query.
             fetch (bool): If True, fetches and returns the query results.
             many_entities (bool): If True, executes the query for many records.
+            pool (ConnectionPool, optional): Pool to run on; defaults to the primary.
 
         Returns:
             The result of the query if fetch is True; None otherwise.
         """
-        connection = _get_pool().acquire()
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        pool = pool or _get_pool()
+        connection = pool.acquire()
         try:
-            if type == "Proc":
-                cursor.callproc(query, values or ())
-            else:
-                if values:
-                    if many_entities:
-                        cursor.executemany(query, values)
-                    else:
-                        cursor.execute(query, values)
-                else:
-                    cursor.execute(query)
-
-            if fetch:
-                return cursor.fetchall()
+            # A single statement is committed by the server (autocommit), and plain reads
+            # need no commit at all. Procedures and executemany batches run several
+            # statements, so they are wrapped in one transaction to stay atomic.
+            if type == "Proc" or many_entities:
+                connection.begin()
+                try:
+                    result = self._execute(connection, query, values, fetch, many_entities, type)
+                except BaseException:
+                    connection.rollback()
+                    raise
+                connection.commit()
+                return result
+            return self._execute(connection, query, values, fetch, many_entities, type)
         finally:
-            connection.commit()
-            cursor.close()
-            _pool.release(connection)  # Return connection to pool instead of closing it
+            pool.release(connection)  # Return connection to pool instead of closing it
+
+    def _execute(self, connection, query, values=None, fetch=False, many_entities=False, type=None):
+        """Runs one statement (or procedure call) on an already checked-out connection."""
+        return _get_backend().execute(connection, query, values, fetch, many_entities, type)
+
+    # Reads are routed to a read replica when DB_REPLICA_HOSTS is set (see ReplicaRouter);
+    # pass primary=True for reads that must see the latest writes. Writes, procedures and
+    # transactions always run on the primary.
 
     @staticmethod
-    def select(query, values=None, fetch=True):
+    def select(query, values=None, fetch=True, primary=False):
+        router = _get_router()
+        replica = None if primary or not _get_backend().supports_replicas else router.pool_for_read()
+        if replica is not None:
+            try:
+                result = Database().get_response(query, values=values, fetch=fetch, pool=replica)
+                router.note_replica_read()
+                return result
+            except pymysql.err.OperationalError:
+                router.mark_down(replica.host)  # Replica unreachable — fall back to the primary
         return Database().get_response(query, values=values, fetch=fetch)
 
     @staticmethod
     def insert(query, values=None, many_entities=False):
+        _get_router().note_write()
         return Database().get_response(query, values=values, many_entities=many_entities)
 
     @staticmethod
     def update(query, values=None):
+        _get_router().note_write()
         return Database().get_response(query, values=values)
 
     @staticmethod
     def delete(query, values=None):
+        _get_router().note_write()
         return Database().get_response(query, values=values)
 
     @staticmethod
     def callprocedure(sql_stored_component, parameters=None, fetch=False):
+        _get_router().note_write()
         return Database().get_response(sql_stored_component, values=parameters, type="Proc", fetch=fetch)
 
+    @staticmethod
+    def dialect():
+        """The SQL dialect of the configured backend: "mysql" or "sqlite"."""
+        return _get_backend().dialect
+
+    @staticmethod
+    def warm_up():
+        """
+        Opens the primary pool (connections in parallel) and any read replica pools, then
+        validates every connection. Called once at startup so the first command after a
+        deploy does not pay for the connection handshakes.
+        """
+        _get_pool().validate()
+        if _get_backend().supports_replicas:
+            _get_router().warm_up()
+
+    @staticmethod
+    async def warm_up_async():
+        loop = asyncio.get_running_loop()
+        await _in_executor(loop, Database.warm_up)
+
+    @staticmethod
+    def close():
+        """Closes every pooled connection (call on bot shutdown)."""
+        global _pool
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+        if _router is not None:
+            _router.close_all()
+
+    @staticmethod
+    @contextmanager
+    def transaction(read_only=False):
+        """
+        Checks out one pooled connection and runs every statement issued through the
+        yielded Transaction on it. The work is committed once when the block exits, or
+        rolled back if it raises.
+
+        Args:
+            read_only (bool): If True, no BEGIN/COMMIT is sent at all — the statements just
+                share one connection — and write methods raise instead of running.
+
+        Usage:
+            with Database.transaction() as tx:
+                tx.delete(Query.DELETE_USER_CONTRACTORS, (user_id,))
+                tx.callprocedure(Query.PROC_ResetUserData, (user_id,))
+        """
+        if not read_only:
+            _get_router().note_write()
+        pool = _get_pool()
+        connection = pool.acquire()
+        try:
+            if read_only:
+                yield Transaction(connection, read_only=True)
+                return
+            connection.begin()
+            try:
+                yield Transaction(connection)
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+        finally:
+            pool.release(connection)
+
+    @staticmethod
+    @asynccontextmanager
+    async def transaction_async(read_only=False):
+        """
+        Async counterpart of transaction(). Holds one scheduler slot for the whole unit of
+        work and runs each statement on the executor, all on the same pooled connection.
+
+        Usage:
+            async with Database.transaction_async() as tx:
+                await tx.delete(Query.DELETE_USER_CONTRACTORS, (user_id,))
+        """
+        async with _db_slot(INTERACTIVE if read_only else WRITES):
+            loop = asyncio.get_running_loop()
+            context = Database.transaction(read_only)
+            tx = await _in_executor(loop, context.__enter__)
+            try:
+                yield AsyncTransaction(tx, loop)
+            except BaseException as err:
+                suppressed = await _in_executor(loop, context.__exit__, type(err), err, err.__traceback__)
+                if not suppressed:
+                    raise
+            else:
+                await _in_executor(loop, context.__exit__, None, None, None)
+
     # --- Async wrappers (run blocking DB calls on a background thread) ---
-    # Each wrapper acquires the semaphore before scheduling work on the executor.
-    # This caps the number of concurrent DB operations to POOL_SIZE, ensuring
-    # threads never compete for a connection that isn't available in the pool.
+    # Each wrapper acquires a scheduler slot before scheduling work on the executor.
+    # This caps the number of concurrent DB operations to MAX_DB_CONCURRENCY (one per
+    # pooled connection across primary and replicas), so threads rarely wait for a connection.
+
+    # Reads additionally go through the SingleFlight layer: identical concurrent selects
+    # share one executor job, so only distinct work competes for the scheduler slots.
+    # A user inside their read-your-writes window reads from the primary, and that choice is
+    # part of the key, so they never join another user's in-flight replica read.
+
+    @staticmethod
+    async def select_async(query, values=None, fetch=True, primary=False):
+        primary = primary or _get_router().pinned_to_primary()
+        key = _flight_key(query, values, (fetch, primary))
+        if key is None:
+            return await Database._select_in_executor(query, values, fetch, primary)
+        return await _get_single_flight().do(key, lambda: Database._select_in_executor(query, values, fetch, primary))
 
     @staticmethod
-    async def select_async(query, values=None, fetch=True):
-        async with _get_semaphore():
+    async def _select_in_executor(query, values=None, fetch=True, primary=False):
+        async with _db_slot(INTERACTIVE):
             loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(_executor, lambda: Database.select(query, values, fetch))
+            return await _in_executor(loop, lambda: Database.select(query, values, fetch, primary))
+
+    @staticmethod
+    def single_flight_stats():
+        """Counters for coalesced reads: total select_async calls, how many were merged, and how many are running."""
+        return _get_single_flight().stats()
+
+    @staticmethod
+    def scheduler_stats():
+        """Queue depth, running slots and wait times per priority class."""
+        return _get_scheduler().stats()
 
     @staticmethod
     async def insert_async(query, values=None, many_entities=False):
-        async with _get_semaphore():
+        async with _db_slot(WRITES):
             loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(_executor, lambda: Database.insert(query, values, many_entities))
+            return await _in_executor(loop, lambda: Database.insert(query, values, many_entities))
 
     @staticmethod
     async def update_async(query, values=None):
-        async with _get_semaphore():
+        async with _db_slot(WRITES):
             loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(_executor, lambda: Database.update(query, values))
+            return await _in_executor(loop, lambda: Database.update(query, values))
 
     @staticmethod
     async def delete_async(query, values=None):
-        async with _get_semaphore():
+        async with _db_slot(WRITES):
             loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(_executor, lambda: Database.delete(query, values))
+            return await _in_executor(loop, lambda: Database.delete(query, values))
 
     @staticmethod
     async def callprocedure_async(sql_stored_component, parameters=None, fetch=False):
-        async with _get_semaphore():
+        work_class = MAINTENANCE if sql_stored_component in MAINTENANCE_PROCEDURES else WRITES
+        async with _db_slot(work_class):
             loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(_executor, lambda: Database.callprocedure(sql_stored_component, parameters, fetch))
+            return await _in_executor(loop, lambda: Database.callprocedure(sql_stored_component, parameters, fetch))
+
+class Transaction:
+    """
+    Statements issued inside Database.transaction(). Mirrors the Database static
+    methods, but every call runs on the transaction's connection and nothing is
+    committed until the transaction block exits.
+    """
+
+    def __init__(self, connection, read_only=False):
+        self.connection = connection
+        self.read_only = read_only
+
+    def _run(self, query, values=None, fetch=False, many_entities=False, type=None):
+        return Database()._execute(self.connection, query, values, fetch, many_entities, type)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Cannot write inside a read-only transaction")
+
+    def select(self, query, values=None, fetch=True):
+        return self._run(query, values, fetch=fetch)
+
+    def insert(self, query, values=None, many_entities=False):
+        self._check_writable()
+        return self._run(query, values, many_entities=many_entities)
+
+    def update(self, query, values=None):
+        self._check_writable()
+        return self._run(query, values)
+
+    def delete(self, query, values=None):
+        self._check_writable()
+        return self._run(query, values)
+
+    def callprocedure(self, sql_stored_component, parameters=None, fetch=False):
+        self._check_writable()
+        return self._run(sql_stored_component, parameters, fetch=fetch, type="Proc")
+
+
+class AsyncTransaction:
+    """Awaitable view of a Transaction; each statement runs on the DB executor thread."""
+
+    def __init__(self, transaction, loop):
+        self._transaction = transaction
+        self._loop = loop
+
+    async def _call(self, method, *args, **kwargs):
+        return await _in_executor(self._loop, lambda: method(*args, **kwargs))
+
+    async def select(self, query, values=None, fetch=True):
+        return await self._call(self._transaction.select, query, values, fetch)
+
+    async def insert(self, query, values=None, many_entities=False):
+        return await self._call(self._transaction.insert, query, values, many_entities)
+
+    async def update(self, query, values=None):
+        return await self._call(self._transaction.update, query, values)
+
+    async def delete(self, query, values=None):
+        return await self._call(self._transaction.delete, query, values)
+
+    async def callprocedure(self, sql_stored_component, parameters=None, fetch=False):
+        return await self._call(self._transaction.callprocedure, sql_stored_component, parameters, fetch)
+
 
 class Query:
 
@@ -218,17 +1141,504 @@ class Query:
         WHERE tracking_id = %s
     """
 
+    REGISTERED_USERS_BY_IDS = """
+        SELECT * FROM RegisteredUsers
+        WHERE tracking_id IN %s
+    """
+
     INSERT_REGISTERED_USER = """
         INSERT INTO RegisteredUsers (tracking_id, email, first_name, last_name, role_id)
         VALUES (%(tracking_id)s, %(email)s, %(first_name)s, %(last_name)s, %(role_id)s)
     """
 
+    # Inserts for the portfolio tables. The ID columns may be None to let AUTO_INCREMENT assign them.
+    INSERT_ADDRESS = """
+        INSERT INTO Addresses (address_id, country, state_province, city, street, number)
+        VALUES (%(address_id)s, %(country)s, %(state_province)s, %(city)s, %(street)s, %(number)s)
+    """
+
+    INSERT_PROPERTIES = """
+        INSERT INTO Properties (property_id, total_rent, monthly_capex, bedroom_count, bathroom_count,
+                                sqft, lot_size, target_arv, address_id)
+        VALUES (%(property_id)s, %(total_rent)s, %(monthly_capex)s, %(bedroom_count)s, %(bathroom_count)s,
+                %(sqft)s, %(lot_size)s, %(target_arv)s, %(address_id)s)
+    """
+
+    INSERT_PORTFOLIO = """
+        INSERT INTO Portfolios (portfolio_id)
+        VALUES (%(portfolio_id)s)
+    """
+
+    INSERT_USER_PORTFOLIO = """
+        INSERT INTO UserPortfolios (user_id, portfolio_id)
+        VALUES (%(user_id)s, %(portfolio_id)s)
+    """
+
+    INSERT_PORTFOLIO_PROPERTY = """
+        INSERT INTO PortfolioProperties (property_id, portfolio_id, property_rent)
+        VALUES (%(property_id)s, %(portfolio_id)s, %(property_rent)s)
+    """
+
+    INSERT_MORTGAGE = """
+        INSERT INTO Mortgages (lender_name, principal_balance, interest_rate, monthly_payment,
+                               start_date, end_date, property_id, terms)
+        VALUES (%(lender_name)s, %(principal_balance)s, %(interest_rate)s, %(monthly_payment)s,
+                %(start_date)s, %(end_date)s, %(property_id)s, %(terms)s)
+    """
+
+    INSERT_PROPERTY_HISTORY = """
+        INSERT INTO PropertyHistories (purchase_price, maintenance_notes, last_appraised_val, purchase_date, property_id)
+        VALUES (%(purchase_price)s, %(maintenance_notes)s, %(last_appraised_val)s, %(purchase_date)s, %(property_id)s)
+    """
+
+    # Highest IDs in use, for writers that assign explicit IDs to bulk-inserted parent rows.
+    MAX_SEED_IDS = """
+        SELECT (SELECT COALESCE(MAX(address_id), 0) FROM Addresses) AS address_id,
+               (SELECT COALESCE(MAX(property_id), 0) FROM Properties) AS property_id,
+               (SELECT COALESCE(MAX(portfolio_id), 0) FROM Portfolios) AS portfolio_id
+    """
+
+    INSERT_PAYMENT_HISTORY = """
+        INSERT INTO PaymentHistories (amount, paid_date, due_date, unit_id, tenant_id)
+        VALUES (%(amount)s, %(paid_date)s, %(due_date)s, %(unit_id)s, %(tenant_id)s)
+    """
+
+    INSERT_PROJECT_UPDATE = """
+        INSERT INTO ProjectUpdates (project_id, updates, date)
+        VALUES (%(project_id)s, %(updates)s, %(date)s)
+    """
+
+    # Ownership checks for the appends written behind (!record_payment, !project_update).
+    TENANT_UNIT_BY_USER = """
+        SELECT ut.unit_id, t.tenant_id, t.first_name, t.last_name
+        FROM UserPortfolios up
+        JOIN PortfolioProperties pp ON pp.portfolio_id = up.portfolio_id
+        JOIN Units u ON u.property_id = pp.property_id
+        JOIN UnitTenants ut ON ut.unit_id = u.unit_id
+        JOIN Tenants t ON t.tenant_id = ut.tenant_id
+        WHERE up.user_id = %s AND ut.tenant_id = %s
+        LIMIT 1
+    """
+
+    PROJECT_BY_USER = """
+        SELECT pi.project_id, pi.project_title
+        FROM UserPortfolios up
+        JOIN PortfolioProperties pp ON pp.portfolio_id = up.portfolio_id
+        JOIN ProjectInfos pi ON pi.property_id = pp.property_id
+        WHERE up.user_id = %s AND pi.project_id = %s
+        LIMIT 1
+    """
+
+    ROLE_EXPIRIES_BEFORE = """
+        SELECT tracking_id, role_expires
+        FROM RegisteredUsers
+        WHERE role_expires < %s AND role_id <> %s
+    """
+
+    EXPIRED_ROLE_USERS = """
+        SELECT tracking_id
+        FROM RegisteredUsers
+        WHERE role_expires < CURDATE() AND role_id <> %s
+        FOR UPDATE
+    """
+
+    EXPIRE_ROLES = """
+        UPDATE RegisteredUsers
+        SET role_id = %s
+        WHERE role_expires < CURDATE() AND role_id <> %s
+    """
+
+    # Dated obligations across the owner's properties. Each branch takes its own (from, to)
+    # due-date range so every table is read with a range scan on its date index.
+    _DEADLINES = """
+        SELECT 'lease' AS kind, la.lease_id AS item_id, la.end_date AS due_date, up.user_id,
+               a.numbered_street AS property_address, NULL AS detail
+        FROM LeaseAgreements la
+        JOIN PortfolioProperties pp ON pp.property_id = la.property_id
+        JOIN UserPortfolios up ON up.portfolio_id = pp.portfolio_id
+        JOIN Properties p ON p.property_id = la.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE la.end_date >= %s AND la.end_date < %s {user_filter}
+        UNION ALL
+        SELECT 'insurance', ip.tracking_id, ip.end_date, up.user_id, a.numbered_street, ip.provider
+        FROM InsurancePolicies ip
+        JOIN PortfolioProperties pp ON pp.property_id = ip.property_id
+        JOIN UserPortfolios up ON up.portfolio_id = pp.portfolio_id
+        JOIN Properties p ON p.property_id = ip.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE ip.end_date >= %s AND ip.end_date < %s {user_filter}
+        UNION ALL
+        SELECT 'tax', tr.tracking_id, tr.due_date, up.user_id, a.numbered_street, tr.year
+        FROM TaxRecords tr
+        JOIN PortfolioProperties pp ON pp.property_id = tr.property_id
+        JOIN UserPortfolios up ON up.portfolio_id = pp.portfolio_id
+        JOIN Properties p ON p.property_id = tr.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE tr.due_date >= %s AND tr.due_date < %s AND tr.payment_date IS NULL {user_filter}
+        UNION ALL
+        SELECT 'payment', ph.history_id, ph.due_date, up.user_id, a.numbered_street, t.full_name
+        FROM PaymentHistories ph
+        JOIN Units u ON u.unit_id = ph.unit_id
+        JOIN Tenants t ON t.tenant_id = ph.tenant_id
+        JOIN PortfolioProperties pp ON pp.property_id = u.property_id
+        JOIN UserPortfolios up ON up.portfolio_id = pp.portfolio_id
+        JOIN Properties p ON p.property_id = u.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE ph.due_date >= %s AND ph.due_date < %s AND ph.paid_date IS NULL {user_filter}
+        UNION ALL
+        SELECT 'mortgage', m.tracking_id, m.end_date, up.user_id, a.numbered_street, m.lender_name
+        FROM Mortgages m
+        JOIN PortfolioProperties pp ON pp.property_id = m.property_id
+        JOIN UserPortfolios up ON up.portfolio_id = pp.portfolio_id
+        JOIN Properties p ON p.property_id = m.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE m.end_date >= %s AND m.end_date < %s {user_filter}
+    """
+
+    UPCOMING_DEADLINES = _DEADLINES.format(user_filter="")
+
+    UPCOMING_DEADLINES_BY_USER = _DEADLINES.format(user_filter="AND up.user_id = %s")
+
+    # Change data capture (see Business Requirement #7). The tailer reads by primary key range.
+    CHANGES_AFTER = """
+        SELECT seq, table_name, pk, op, user_id
+        FROM ChangeLog
+        WHERE seq > %s
+        ORDER BY seq
+        LIMIT %s
+    """
+
+    CHANGES_BY_SEQ = """
+        SELECT seq, table_name, pk, op, user_id
+        FROM ChangeLog
+        WHERE seq IN %s
+    """
+
+    CHANGE_SEQ_RANGE = """
+        SELECT COALESCE(MIN(seq), 1) AS first_seq, COALESCE(MAX(seq), 0) AS last_seq
+        FROM ChangeLog
+    """
+
+    # Owners of the changes in a sequence range; used to revalidate a cache snapshot.
+    CHANGED_USERS_BETWEEN = """
+        SELECT DISTINCT user_id
+        FROM ChangeLog
+        WHERE seq > %s AND seq <= %s AND user_id IS NOT NULL
+    """
+
+    SAVE_CHANGELOG_POSITION = """
+        INSERT INTO ChangeLogConsumers (consumer_id, last_seq)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE last_seq = VALUES(last_seq), updated_at = CURRENT_TIMESTAMP
+    """
+
+    # Lowest position of the consumers that checked in within the last %s seconds.
+    CONSUMED_CHANGE_SEQ = """
+        SELECT MIN(last_seq) AS seq
+        FROM ChangeLogConsumers
+        WHERE updated_at >= NOW() - INTERVAL %s SECOND
+    """
+
+    DELETE_STALE_CHANGELOG_CONSUMERS = """
+        DELETE FROM ChangeLogConsumers
+        WHERE updated_at < NOW() - INTERVAL %s SECOND
+    """
+
+    TRUNCATE_CHANGELOG = """
+        DELETE FROM ChangeLog
+        WHERE seq > %s AND seq <= %s
+    """
+
+    # Reads the maintained Portfolios.num_properties rollup (Business Requirement #8).
     CHECK_NUM_PROPERTIES = """
-        SELECT COUNT(pp.property_id) AS property_count
+        SELECT COALESCE(SUM(pf.num_properties), 0) AS property_count
+        FROM UserPortfolios up
+        JOIN Portfolios pf
+            ON up.portfolio_id = pf.portfolio_id
+        WHERE up.user_id = %s
+    """
+
+    PORTFOLIO = """
+        SELECT * FROM Portfolios
+        WHERE portfolio_id = %s
+    """
+
+    PORTFOLIOS_BY_USER = """
+        SELECT portfolio_id FROM UserPortfolios
+        WHERE user_id = %s
+    """
+
+    # Portfolio rollup reconciliation: a batch of stored rollups, locked so trigger updates
+    # wait until the batch is checked, and the same totals recomputed from the source rows.
+    PORTFOLIO_ROLLUPS_AFTER = """
+        SELECT portfolio_id, num_properties, num_mortgages, total_rent, total_mortgage_payment,
+               total_principal, total_capex, total_purchase_price, mortgaged_purchase_price, last_appraised_val
+        FROM Portfolios
+        WHERE portfolio_id > %s
+        ORDER BY portfolio_id
+        LIMIT %s
+        FOR UPDATE
+    """
+
+    PORTFOLIO_ROLLUP_ACTUALS = """
+        SELECT pp.portfolio_id,
+               COUNT(*) AS num_properties,
+               COALESCE(SUM(m.mortgages), 0) AS num_mortgages,
+               COALESCE(SUM(pp.property_rent), 0) AS total_rent,
+               COALESCE(SUM(m.payment), 0) AS total_mortgage_payment,
+               COALESCE(SUM(m.principal), 0) AS total_principal,
+               COALESCE(SUM(p.monthly_capex), 0) AS total_capex,
+               COALESCE(SUM(h.purchase), 0) AS total_purchase_price,
+               COALESCE(SUM(IF(m.mortgages > 0, h.purchase, 0)), 0) AS mortgaged_purchase_price,
+               COALESCE(SUM(h.appraised), 0) AS last_appraised_val
+        FROM PortfolioProperties pp
+        LEFT JOIN Properties p ON p.property_id = pp.property_id
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS mortgages, SUM(monthly_payment) AS payment, SUM(principal_balance) AS principal
+            FROM Mortgages
+            WHERE property_id = pp.property_id
+        ) m ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT SUM(purchase_price) AS purchase, SUM(last_appraised_val) AS appraised
+            FROM PropertyHistories
+            WHERE property_id = pp.property_id
+        ) h ON TRUE
+        WHERE pp.portfolio_id IN %s
+        GROUP BY pp.portfolio_id
+    """
+
+    SET_PORTFOLIO_ROLLUPS = """
+        UPDATE Portfolios
+        SET num_properties = %(num_properties)s, num_mortgages = %(num_mortgages)s,
+            total_rent = %(total_rent)s, total_mortgage_payment = %(total_mortgage_payment)s,
+            total_principal = %(total_principal)s, total_capex = %(total_capex)s,
+            total_purchase_price = %(total_purchase_price)s, mortgaged_purchase_price = %(mortgaged_purchase_price)s,
+            last_appraised_val = %(last_appraised_val)s
+        WHERE portfolio_id = %(portfolio_id)s
+    """
+
+    # Migration 1 backfill of a range of Portfolios: the purchase price of each mortgaged property, counted once.
+    BACKFILL_MORTGAGED_PURCHASE_PRICE = """
+        UPDATE Portfolios
+        SET mortgaged_purchase_price = (
+            SELECT COALESCE(SUM(h.purchase_price), 0)
+            FROM PortfolioProperties pp
+            JOIN PropertyHistories h ON h.property_id = pp.property_id
+            WHERE pp.portfolio_id = Portfolios.portfolio_id
+              AND EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = pp.property_id)
+        )
+        WHERE portfolio_id > %s AND portfolio_id <= %s
+    """
+
+    # Ledger archival (Business Requirement #9): the oldest closed rows are locked in batches,
+    # copied to the compressed archive tables and deleted from the hot tables in one transaction.
+    ARCHIVABLE_PAYMENTS = """
+        SELECT history_id
+        FROM PaymentHistories
+        WHERE due_date < %s AND paid_date IS NOT NULL
+        ORDER BY due_date, history_id
+        LIMIT %s
+        FOR UPDATE
+    """
+
+    COPY_PAYMENTS_TO_ARCHIVE = """
+        INSERT INTO PaymentHistoriesArchive (history_id, amount, paid_date, due_date, unit_id, tenant_id)
+        SELECT history_id, amount, paid_date, due_date, unit_id, tenant_id
+        FROM PaymentHistories
+        WHERE history_id IN %s
+    """
+
+    DELETE_ARCHIVED_PAYMENTS = """
+        DELETE FROM PaymentHistories
+        WHERE history_id IN %s
+    """
+
+    ARCHIVABLE_EXPENSES = """
+        SELECT expense_id
+        FROM ExpenseHistories
+        WHERE date < %s
+        ORDER BY date, expense_id
+        LIMIT %s
+        FOR UPDATE
+    """
+
+    COPY_EXPENSES_TO_ARCHIVE = """
+        INSERT INTO ExpenseHistoriesArchive (expense_id, date, cost, label, history_id, ExpenseHistoriescol)
+        SELECT expense_id, date, cost, label, history_id, ExpenseHistoriescol
+        FROM ExpenseHistories
+        WHERE expense_id IN %s
+    """
+
+    DELETE_ARCHIVED_EXPENSES = """
+        DELETE FROM ExpenseHistories
+        WHERE expense_id IN %s
+    """
+
+    # Ledger reads over the hot table and its archive. Each side is limited to the date range on
+    # its (tenant_id, due_date) / (history_id, date) index, which also prunes the archive's
+    # partitions to the years asked for. Params: (key, start, end) twice; end is exclusive.
+    PAYMENTS_BY_TENANT = """
+        SELECT history_id, amount, paid_date, due_date, unit_id, tenant_id, 0 AS archived
+        FROM PaymentHistories
+        WHERE tenant_id = %s AND due_date >= %s AND due_date < %s
+        UNION ALL
+        SELECT history_id, amount, paid_date, due_date, unit_id, tenant_id, 1 AS archived
+        FROM PaymentHistoriesArchive
+        WHERE tenant_id = %s AND due_date >= %s AND due_date < %s
+        ORDER BY due_date, history_id
+    """
+
+    EXPENSES_BY_HISTORY = """
+        SELECT expense_id, date, cost, label, history_id, ExpenseHistoriescol, 0 AS archived
+        FROM ExpenseHistories
+        WHERE history_id = %s AND date >= %s AND date < %s
+        UNION ALL
+        SELECT expense_id, date, cost, label, history_id, ExpenseHistoriescol, 1 AS archived
+        FROM ExpenseHistoriesArchive
+        WHERE history_id = %s AND date >= %s AND date < %s
+        ORDER BY date, expense_id
+    """
+
+    # Single ledger rows by ID, wherever they are stored. Params: (id, id).
+    PAYMENT_HISTORY = """
+        SELECT history_id, amount, paid_date, due_date, unit_id, tenant_id
+        FROM PaymentHistories
+        WHERE history_id = %s
+        UNION ALL
+        SELECT history_id, amount, paid_date, due_date, unit_id, tenant_id
+        FROM PaymentHistoriesArchive
+        WHERE history_id = %s
+    """
+
+    EXPENSE_HISTORY = """
+        SELECT expense_id, date, cost, label, history_id, ExpenseHistoriescol
+        FROM ExpenseHistories
+        WHERE expense_id = %s
+        UNION ALL
+        SELECT expense_id, date, cost, label, history_id, ExpenseHistoriescol
+        FROM ExpenseHistoriesArchive
+        WHERE expense_id = %s
+    """
+
+    # Monthly ledger rollups (Business Requirement #10): a user's income and expenses per month
+    # and category, summed over their properties. Reconciliation locks a batch of properties'
+    # rollup rows, so ledger triggers for them wait, and recomputes them from hot and archived rows.
+    CASHFLOW_HISTORY_BY_USER = """
+        SELECT lr.month, lr.kind, lr.category, SUM(lr.total) AS total, SUM(lr.entries) AS entries
+        FROM LedgerRollups lr
+        WHERE lr.property_id IN (
+            SELECT pp.property_id
+            FROM PortfolioProperties pp
+            JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
+            WHERE up.user_id = %s
+        )
+        GROUP BY lr.month, lr.kind, lr.category
+        HAVING SUM(lr.entries) > 0
+        ORDER BY lr.month, lr.kind, lr.category
+    """
+
+    LEDGER_ROLLUP_PROPERTIES_AFTER = """
+        SELECT property_id
+        FROM Properties
+        WHERE property_id > %s
+        ORDER BY property_id
+        LIMIT %s
+    """
+
+    LEDGER_ROLLUPS_BY_PROPERTIES = """
+        SELECT property_id, month, kind, category, total, entries
+        FROM LedgerRollups
+        WHERE property_id IN %s
+        FOR UPDATE
+    """
+
+    # Params: ((property IDs),) four times.
+    LEDGER_ROLLUP_ACTUALS = """
+        SELECT property_id, month, kind, category, SUM(amount) AS total, COUNT(*) AS entries
+        FROM (
+            SELECT u.property_id, DATE_SUB(ph.paid_date, INTERVAL DAYOFMONTH(ph.paid_date) - 1 DAY) AS month,
+                   'income' AS kind, 'Rent' AS category, IFNULL(ph.amount, 0) AS amount
+            FROM PaymentHistories ph
+            JOIN Units u ON ph.unit_id = u.unit_id
+            WHERE u.property_id IN %s AND ph.paid_date IS NOT NULL
+            UNION ALL
+            SELECT u.property_id, DATE_SUB(pha.paid_date, INTERVAL DAYOFMONTH(pha.paid_date) - 1 DAY),
+                   'income', 'Rent', IFNULL(pha.amount, 0)
+            FROM PaymentHistoriesArchive pha
+            JOIN Units u ON pha.unit_id = u.unit_id
+            WHERE u.property_id IN %s AND pha.paid_date IS NOT NULL
+            UNION ALL
+            SELECT h.property_id, DATE_SUB(eh.date, INTERVAL DAYOFMONTH(eh.date) - 1 DAY),
+                   'expense', IFNULL(eh.label, 'Other'), IFNULL(eh.cost, 0)
+            FROM ExpenseHistories eh
+            JOIN PropertyHistories h ON eh.history_id = h.history_id
+            WHERE h.property_id IN %s AND eh.date IS NOT NULL
+            UNION ALL
+            SELECT h.property_id, DATE_SUB(eha.date, INTERVAL DAYOFMONTH(eha.date) - 1 DAY),
+                   'expense', IFNULL(eha.label, 'Other'), IFNULL(eha.cost, 0)
+            FROM ExpenseHistoriesArchive eha
+            JOIN PropertyHistories h ON eha.history_id = h.history_id
+            WHERE h.property_id IN %s
+        ) ledger
+        GROUP BY property_id, month, kind, category
+    """
+
+    DELETE_LEDGER_ROLLUPS = """
+        DELETE FROM LedgerRollups
+        WHERE property_id IN %s
+    """
+
+    INSERT_LEDGER_ROLLUP = """
+        INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+        VALUES (%(property_id)s, %(month)s, %(kind)s, %(category)s, %(total)s, %(entries)s)
+    """
+
+    # Inputs of the cash flow projection (projection.py), one row per property of the user:
+    # today's monthly rent and costs (tax is the latest year's total spread over twelve months,
+    # insurance the latest policy) and how many of its units are vacant.
+    PROJECTION_INPUTS_BY_USER = """
+        SELECT
+            pp.property_id,
+            CONCAT(a.number, ' ', a.street, ', ', a.city) AS address,
+            IFNULL(pp.property_rent, 0) AS rent,
+            IFNULL(p.monthly_capex, 0) AS capex,
+            (SELECT IFNULL(SUM(m.monthly_payment), 0)
+             FROM Mortgages m WHERE m.property_id = pp.property_id) AS mortgage,
+            (SELECT IFNULL(SUM(t.amount_paid), 0) / 12
+             FROM TaxRecords t
+             WHERE t.property_id = pp.property_id
+               AND t.year = (SELECT MAX(t2.year) FROM TaxRecords t2 WHERE t2.property_id = pp.property_id)) AS tax,
+            IFNULL((SELECT i.monthly_cost
+                    FROM InsurancePolicies i WHERE i.property_id = pp.property_id
+                    ORDER BY i.start_date DESC LIMIT 1), 0) AS insurance,
+            (SELECT COUNT(*) FROM Units u WHERE u.property_id = pp.property_id) AS units,
+            (SELECT COUNT(*) FROM Units u WHERE u.property_id = pp.property_id AND u.vacant = 1) AS vacant_units
+        FROM PortfolioProperties pp
+        JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
+        JOIN Properties p ON p.property_id = pp.property_id
+        LEFT JOIN Addresses a ON a.address_id = p.address_id
+        WHERE up.user_id = %s
+        ORDER BY pp.property_id
+    """
+
+    # Occupancy timelines (occupancy.py): one row per unit of the user and lease linked to it
+    # through UnitTenants, units without leases included, grouped by property and unit.
+    UNIT_LEASES_BY_USER = """
+        SELECT
+            u.property_id,
+            CONCAT(a.number, ' ', a.street, ', ', a.city) AS address,
+            u.unit_id,
+            la.start_date,
+            la.end_date
         FROM UserPortfolios up
-        JOIN PortfolioProperties pp
-            ON up.portfolio_id = pp.portfolio_id
+        JOIN PortfolioProperties pp ON pp.portfolio_id = up.portfolio_id
+        JOIN Units u ON u.property_id = pp.property_id
+        JOIN Properties p ON p.property_id = u.property_id
+        LEFT JOIN Addresses a ON a.address_id = p.address_id
+        LEFT JOIN UnitTenants ut ON ut.unit_id = u.unit_id
+        LEFT JOIN LeaseAgreements la ON la.lease_id = ut.lease_id
         WHERE up.user_id = %s
+        ORDER BY u.property_id, u.unit_id, la.start_date
     """
 
     DELETE_REGISTERED_USER = """
@@ -265,6 +1675,36 @@ class Query:
         ORDER BY past_due_balance DESC
     """
 
+    # The mortgage report's detail rows in one pass: the user filter applies to the base tables
+    # directly and ViewMortgagesModel adds the totals row, so nothing is joined twice. The
+    # PortfolioProperties and PropertyHistories keys let it count each mortgage and purchase once.
+    MORTGAGE_DETAILS_BY_USER = """
+        SELECT
+            pp.tracking_id AS portfolio_property_id,
+            ph.history_id,
+            up.user_id,
+            m.tracking_id AS mortgage_id,
+            m.lender_name,
+            m.principal_balance,
+            m.interest_rate,
+            m.monthly_payment,
+            m.start_date,
+            m.end_date,
+            ph.purchase_price,
+            CONCAT(a.number, ' ', a.street, ', ', a.city, ', ', a.state_province, ', ', a.country) AS property_address,
+            ru.full_name AS registered_user
+        FROM UserPortfolios up
+        JOIN RegisteredUsers ru ON ru.tracking_id = up.user_id
+        JOIN Portfolios pf ON pf.portfolio_id = up.portfolio_id
+        JOIN PortfolioProperties pp ON pp.portfolio_id = pf.portfolio_id
+        JOIN Properties p ON p.property_id = pp.property_id
+        JOIN Mortgages m ON m.property_id = p.property_id
+        JOIN PropertyHistories ph ON ph.property_id = p.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE up.user_id = %s
+        ORDER BY m.start_date ASC
+    """
+
     MORTGAGES_BY_USER = """
         SELECT *
         FROM ViewMortgages
@@ -279,6 +1719,239 @@ class Query:
         ORDER BY in_progress DESC, numbered_street ASC
     """
 
+    # Documents for the !search index (see search.py), one shape per kind: doc_id, title,
+    # subtitle and body text. Tenants are owned through their lease, as in the change log.
+    _SEARCH_TENANTS = """
+        SELECT 'tenant' AS kind, t.tenant_id AS doc_id, t.full_name AS title,
+               a.numbered_street AS subtitle, t.notes AS body, t.past_due_balance
+        FROM UserPortfolios up
+        JOIN PortfolioProperties pp ON pp.portfolio_id = up.portfolio_id
+        JOIN LeaseAgreements la ON la.property_id = pp.property_id
+        JOIN Tenants t ON t.lease_id = la.lease_id
+        JOIN Properties p ON p.property_id = pp.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE up.user_id = %s {doc_filter}
+    """
+
+    _SEARCH_PROPERTIES = """
+        SELECT 'property' AS kind, p.property_id AS doc_id, a.numbered_street AS title,
+               CONCAT(a.city, ', ', a.state_province) AS subtitle, NULL AS body, NULL AS past_due_balance
+        FROM UserPortfolios up
+        JOIN PortfolioProperties pp ON pp.portfolio_id = up.portfolio_id
+        JOIN Properties p ON p.property_id = pp.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE up.user_id = %s {doc_filter}
+    """
+
+    _SEARCH_PROJECTS = """
+        SELECT 'project' AS kind, pi.project_id AS doc_id, pi.project_title AS title,
+               a.numbered_street AS subtitle, pi.project_description AS body, NULL AS past_due_balance
+        FROM UserPortfolios up
+        JOIN PortfolioProperties pp ON pp.portfolio_id = up.portfolio_id
+        JOIN ProjectInfos pi ON pi.property_id = pp.property_id
+        JOIN Properties p ON p.property_id = pp.property_id
+        JOIN Addresses a ON a.address_id = p.address_id
+        WHERE up.user_id = %s {doc_filter}
+    """
+
+    _SEARCH_CONTRACTORS = """
+        SELECT 'contractor' AS kind, c.tracking_id AS doc_id, c.company_name AS title,
+               c.full_name AS subtitle, c.services AS body, NULL AS past_due_balance
+        FROM Contractors c
+        WHERE c.user_id = %s {doc_filter}
+    """
+
+    # Every document of a user in one round trip; takes the user ID once per kind.
+    SEARCH_DOCUMENTS_BY_USER = " UNION ALL ".join(
+        query.format(doc_filter="") for query in (_SEARCH_TENANTS, _SEARCH_PROPERTIES, _SEARCH_PROJECTS, _SEARCH_CONTRACTORS))
+
+    # Changed documents of one kind, refreshed from the change log: (user_id, (doc_id, ...)).
+    SEARCH_TENANTS_BY_IDS = _SEARCH_TENANTS.format(doc_filter="AND t.tenant_id IN %s")
+
+    SEARCH_PROPERTIES_BY_IDS = _SEARCH_PROPERTIES.format(doc_filter="AND p.property_id IN %s")
+
+    SEARCH_PROJECTS_BY_IDS = _SEARCH_PROJECTS.format(doc_filter="AND pi.project_id IN %s")
+
+    SEARCH_CONTRACTORS_BY_IDS = _SEARCH_CONTRACTORS.format(doc_filter="AND c.tracking_id IN %s")
+
+    # The contractor index (see contractors.py): one row per contractor and project assignment,
+    # contractors without assignments included, straight from the three tables involved.
+    _CONTRACTOR_ASSIGNMENTS = """
+        SELECT c.tracking_id AS contractor_id, c.company_name, c.full_name, c.services,
+               pc.tracking_id AS assignment_id, pi.project_id, pi.project_title, pi.in_progress
+        FROM Contractors c
+        LEFT JOIN ProjectContractors pc ON pc.contractor_id = c.tracking_id
+        LEFT JOIN ProjectInfos pi ON pi.project_id = pc.project_id
+        WHERE c.user_id = %s {contractor_filter}
+        ORDER BY c.tracking_id, pc.tracking_id
+    """
+
+    CONTRACTOR_ASSIGNMENTS_BY_USER = _CONTRACTOR_ASSIGNMENTS.format(contractor_filter="")
+
+    # Changed contractors, refreshed from the change log: (user_id, (contractor_id, ...)).
+    CONTRACTOR_ASSIGNMENTS_BY_IDS = _CONTRACTOR_ASSIGNMENTS.format(contractor_filter="AND c.tracking_id IN %s")
+
+    CONTRACTORS_OF_ASSIGNMENTS = """
+        SELECT DISTINCT contractor_id
+        FROM ProjectContractors
+        WHERE tracking_id IN %s
+    """
+
+    # Schema migrations (see migrations.py): one row per migration started, with the step in
+    # progress and the last key that step has finished, so an interrupted run resumes there.
+    SCHEMA_MIGRATIONS = """
+        SELECT version, name, step, last_key, rows_done, started_at, finished_at
+        FROM SchemaMigrations
+        ORDER BY version
+    """
+
+    START_SCHEMA_MIGRATION = """
+        INSERT IGNORE INTO SchemaMigrations (version, name)
+        VALUES (%s, %s)
+    """
+
+    SAVE_SCHEMA_MIGRATION = """
+        UPDATE SchemaMigrations
+        SET step = %s, last_key = %s, rows_done = %s
+        WHERE version = %s
+    """
+
+    FINISH_SCHEMA_MIGRATION = """
+        UPDATE SchemaMigrations
+        SET finished_at = CURRENT_TIMESTAMP
+        WHERE version = %s
+    """
+
+    # Synthetic load-test data (see synthetic.py). Rows carry explicit IDs allocated above each
+    # table's highest, so a multi-row batch can hold parents and the children referencing them.
+    SYNTHETIC_INSERT = """
+        INSERT INTO {table} ({columns})
+        VALUES ({placeholders})
+    """
+
+    SYNTHETIC_USERS = """
+        SELECT tracking_id
+        FROM RegisteredUsers
+        WHERE tracking_id BETWEEN %s AND %s
+        ORDER BY tracking_id
+    """
+
+    SYNTHETIC_USER_PORTFOLIOS = """
+        SELECT portfolio_id
+        FROM UserPortfolios
+        WHERE user_id IN %s
+    """
+
+    SYNTHETIC_USER_PROPERTIES = """
+        SELECT pp.property_id, p.address_id
+        FROM UserPortfolios up
+        JOIN PortfolioProperties pp ON pp.portfolio_id = up.portfolio_id
+        JOIN Properties p ON p.property_id = pp.property_id
+        WHERE up.user_id IN %s
+    """
+
+    # Bulk removal of synthetic users, children first: (parameter, statement) pairs, where the
+    # parameter names the ID tuple the statement takes: "properties", "addresses", "users" or
+    # "portfolios".
+    SYNTHETIC_CLEANUP = (
+        ("properties", "DELETE FROM PaymentHistories WHERE unit_id IN (SELECT unit_id FROM Units WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM PaymentHistoriesArchive WHERE unit_id IN "
+                       "(SELECT unit_id FROM Units WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM UnitTenants WHERE unit_id IN (SELECT unit_id FROM Units WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM Tenants WHERE lease_id IN (SELECT lease_id FROM LeaseAgreements WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM LeaseAgreements WHERE property_id IN %s"),
+        ("properties", "DELETE FROM Units WHERE property_id IN %s"),
+        ("properties", "DELETE FROM ExpenseHistories WHERE history_id IN "
+                       "(SELECT history_id FROM PropertyHistories WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM ExpenseHistoriesArchive WHERE history_id IN "
+                       "(SELECT history_id FROM PropertyHistories WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM InspectionRecords WHERE history_id IN "
+                       "(SELECT history_id FROM PropertyHistories WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM PropertyHistories WHERE property_id IN %s"),
+        ("properties", "DELETE FROM ProjectContractors WHERE project_id IN "
+                       "(SELECT project_id FROM ProjectInfos WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM ProjectUpdates WHERE project_id IN "
+                       "(SELECT project_id FROM ProjectInfos WHERE property_id IN %s)"),
+        ("properties", "DELETE FROM ProjectInfos WHERE property_id IN %s"),
+        ("properties", "DELETE FROM InsurancePolicies WHERE property_id IN %s"),
+        ("properties", "DELETE FROM TaxRecords WHERE property_id IN %s"),
+        ("properties", "DELETE FROM Mortgages WHERE property_id IN %s"),
+        ("properties", "DELETE FROM LedgerRollups WHERE property_id IN %s"),
+        ("properties", "DELETE FROM PortfolioProperties WHERE property_id IN %s"),
+        ("properties", "DELETE FROM Properties WHERE property_id IN %s"),
+        ("addresses", "DELETE FROM Addresses WHERE address_id IN %s"),
+        ("users", "DELETE FROM Contractors WHERE user_id IN %s"),
+        ("users", "DELETE FROM UserPortfolios WHERE user_id IN %s"),
+        ("portfolios", "DELETE FROM Portfolios WHERE portfolio_id IN %s"),
+        ("users", "DELETE FROM RegisteredUsers WHERE tracking_id IN %s"),
+    )
+
+    # Session settings for migration DDL on MySQL: (lock_wait_timeout seconds, foreign_key_checks).
+    SET_MIGRATION_SESSION = """
+        SET SESSION lock_wait_timeout = %s, foreign_key_checks = %s
+    """
+
+    RESET_MIGRATION_SESSION = """
+        SET SESSION lock_wait_timeout = DEFAULT, foreign_key_checks = DEFAULT
+    """
+
+    # Migration batch templates, formatted by migrations.py with checked table, key and column names.
+    # The end of the next keyset batch after a key: (last_key, batch_size).
+    MIGRATION_BATCH_END = """
+        SELECT MAX({key}) AS batch_end, COUNT(*) AS batch_rows
+        FROM (SELECT {key} FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s) batch
+    """
+
+    TABLE_MAX_KEY = """
+        SELECT MAX({key}) AS max_key
+        FROM {table}
+    """
+
+    # Rows the mirror triggers already copied are newer than the source batch, so they are kept.
+    MIGRATION_COPY_ROWS = """
+        INSERT IGNORE INTO {shadow} ({columns})
+        SELECT {columns} FROM {table}
+        WHERE {key} > %s AND {key} <= %s
+    """
+
+    MIGRATION_TABLE_EXISTS = """
+        SELECT COUNT(*) AS found
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """
+
+    # Generated columns are computed by each table and cannot be copied.
+    MIGRATION_TABLE_COLUMNS = """
+        SELECT COLUMN_NAME AS name
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND EXTRA NOT LIKE '%%GENERATED%%'
+        ORDER BY ORDINAL_POSITION
+    """
+
+    MIGRATION_TABLE_TRIGGERS = """
+        SELECT TRIGGER_NAME AS name, ACTION_TIMING AS timing, EVENT_MANIPULATION AS event,
+               ACTION_STATEMENT AS body
+        FROM information_schema.TRIGGERS
+        WHERE TRIGGER_SCHEMA = DATABASE() AND EVENT_OBJECT_TABLE = %s
+        ORDER BY ACTION_TIMING, EVENT_MANIPULATION, ACTION_ORDER
+    """
+
+    # Foreign keys declared on a table or referencing it: (table, table).
+    MIGRATION_FOREIGN_KEYS = """
+        SELECT k.CONSTRAINT_NAME AS name, k.TABLE_NAME AS table_name,
+               GROUP_CONCAT(k.COLUMN_NAME ORDER BY k.ORDINAL_POSITION) AS columns,
+               k.REFERENCED_TABLE_NAME AS referenced_table,
+               GROUP_CONCAT(k.REFERENCED_COLUMN_NAME ORDER BY k.ORDINAL_POSITION) AS referenced_columns,
+               r.UPDATE_RULE AS update_rule, r.DELETE_RULE AS delete_rule
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+            ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+            AND r.TABLE_NAME = k.TABLE_NAME
+        WHERE k.CONSTRAINT_SCHEMA = DATABASE() AND k.REFERENCED_TABLE_NAME IS NOT NULL
+            AND (k.TABLE_NAME = %s OR k.REFERENCED_TABLE_NAME = %s)
+        GROUP BY k.CONSTRAINT_NAME, k.TABLE_NAME, k.REFERENCED_TABLE_NAME, r.UPDATE_RULE, r.DELETE_RULE
+    """
+
     PROC_AssignRole = """AssignRole"""
     PROC_CheckBeforeQuery = """CheckBeforeQuery"""
     PROC_RefreshRole = """RefreshRole"""
@@ -296,6 +1969,8 @@ class Tables:
 
     # Tables
     ADDRESSES = "Addresses"
+    CHANGE_LOG = "ChangeLog"
+    CHANGE_LOG_CONSUMERS = "ChangeLogConsumers"
     CONTRACTORS = "Contractors"
     EXPENSE_HISTORIES = "ExpenseHistories"
     INSPECTION_RECORDS = "InspectionRecords"
@@ -323,4 +1998,534 @@ class Tables:
     PORTFOLIO_PERFORMANCE = "PortfolioPerformance"
     VIEW_MORTGAGES = "ViewMortgages" 
     VIEW_TENANTS = "ViewTenants" 
-    
\ No newline at end of file
+    
+
+class SQLiteQuery:
+    """
+    SQLite versions of the Query constants whose MySQL syntax has no mechanical translation.
+    Attribute names match Query; SQLiteBackend runs these in place of the originals.
+    """
+
+    SAVE_CHANGELOG_POSITION = """
+        INSERT INTO ChangeLogConsumers (consumer_id, last_seq)
+        VALUES (%s, %s)
+        ON CONFLICT (consumer_id) DO UPDATE SET last_seq = excluded.last_seq, updated_at = CURRENT_TIMESTAMP
+    """
+
+    CONSUMED_CHANGE_SEQ = """
+        SELECT MIN(last_seq) AS seq
+        FROM ChangeLogConsumers
+        WHERE updated_at >= datetime('now', '-' || %s || ' seconds')
+    """
+
+    START_SCHEMA_MIGRATION = """
+        INSERT OR IGNORE INTO SchemaMigrations (version, name)
+        VALUES (%s, %s)
+    """
+
+    DELETE_STALE_CHANGELOG_CONSUMERS = """
+        DELETE FROM ChangeLogConsumers
+        WHERE updated_at < datetime('now', '-' || %s || ' seconds')
+    """
+
+    LEDGER_ROLLUP_ACTUALS = """
+        SELECT property_id, month, kind, category, SUM(amount) AS total, COUNT(*) AS entries
+        FROM (
+            SELECT u.property_id, date(ph.paid_date, 'start of month') AS month,
+                   'income' AS kind, 'Rent' AS category, IFNULL(ph.amount, 0) AS amount
+            FROM PaymentHistories ph
+            JOIN Units u ON ph.unit_id = u.unit_id
+            WHERE u.property_id IN %s AND ph.paid_date IS NOT NULL
+            UNION ALL
+            SELECT u.property_id, date(pha.paid_date, 'start of month'), 'income', 'Rent', IFNULL(pha.amount, 0)
+            FROM PaymentHistoriesArchive pha
+            JOIN Units u ON pha.unit_id = u.unit_id
+            WHERE u.property_id IN %s AND pha.paid_date IS NOT NULL
+            UNION ALL
+            SELECT h.property_id, date(eh.date, 'start of month'), 'expense', IFNULL(eh.label, 'Other'), IFNULL(eh.cost, 0)
+            FROM ExpenseHistories eh
+            JOIN PropertyHistories h ON eh.history_id = h.history_id
+            WHERE h.property_id IN %s AND eh.date IS NOT NULL
+            UNION ALL
+            SELECT h.property_id, date(eha.date, 'start of month'), 'expense', IFNULL(eha.label, 'Other'), IFNULL(eha.cost, 0)
+            FROM ExpenseHistoriesArchive eha
+            JOIN PropertyHistories h ON eha.history_id = h.history_id
+            WHERE h.property_id IN %s
+        ) ledger
+        GROUP BY property_id, month, kind, category
+    """
+
+    # No LATERAL joins: each property's mortgage and history totals are correlated subqueries.
+    PORTFOLIO_ROLLUP_ACTUALS = """
+        SELECT pp.portfolio_id,
+               COUNT(*) AS num_properties,
+               COALESCE(SUM((SELECT COUNT(*) FROM Mortgages m WHERE m.property_id = pp.property_id)), 0) AS num_mortgages,
+               COALESCE(SUM(pp.property_rent), 0) AS total_rent,
+               COALESCE(SUM((SELECT SUM(m.monthly_payment) FROM Mortgages m WHERE m.property_id = pp.property_id)), 0)
+                   AS total_mortgage_payment,
+               COALESCE(SUM((SELECT SUM(m.principal_balance) FROM Mortgages m WHERE m.property_id = pp.property_id)), 0)
+                   AS total_principal,
+               COALESCE(SUM(p.monthly_capex), 0) AS total_capex,
+               COALESCE(SUM((SELECT SUM(h.purchase_price) FROM PropertyHistories h WHERE h.property_id = pp.property_id)), 0)
+                   AS total_purchase_price,
+               COALESCE(SUM((SELECT SUM(h.purchase_price) FROM PropertyHistories h WHERE h.property_id = pp.property_id
+                              AND EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = pp.property_id))), 0)
+                   AS mortgaged_purchase_price,
+               COALESCE(SUM((SELECT SUM(h.last_appraised_val) FROM PropertyHistories h WHERE h.property_id = pp.property_id)), 0)
+                   AS last_appraised_val
+        FROM PortfolioProperties pp
+        LEFT JOIN Properties p ON p.property_id = pp.property_id
+        WHERE pp.portfolio_id IN %s
+        GROUP BY pp.portfolio_id
+    """
+
+    # Columns of a UNION ALL view carry no declared type, so the dates are typed by column name.
+    MORTGAGES_BY_USER = """
+        SELECT user_id, mortgage_id, lender_name, principal_balance, interest_rate, monthly_payment,
+               start_date AS "start_date [DATE]", end_date AS "end_date [DATE]",
+               purchase_price, property_address, registered_user
+        FROM ViewMortgages
+        WHERE user_id = %s
+        ORDER BY mortgage_id IS NULL, start_date ASC
+    """
+
+    DELETE_USER_PROJECT_CONTRACTORS = """
+        DELETE FROM ProjectContractors
+        WHERE contractor_id IN (SELECT tracking_id FROM Contractors WHERE user_id = %s)
+    """
+
+
+_SQLITE_OVERRIDES = {getattr(Query, name): text for name, text in vars(SQLiteQuery).items() if name.isupper()}
+_FOR_UPDATE = re.compile(r"\s+FOR UPDATE\b")
+_NAMED_PARAMETER = re.compile(r"%\((\w+)\)s")
+
+
+@lru_cache(maxsize=None)
+def _sqlite_statement(query):
+    """
+    Translates a Query constant to SQLite and splits it at its positional %s placeholders.
+    Row locks (FOR UPDATE) are dropped, since SQLite locks the whole file for a writer;
+    CURDATE() becomes date('now', 'localtime') and %(name)s becomes :name. String literals
+    are left untouched.
+
+    Returns:
+        tuple: The query text between placeholders; one element for queries with none.
+    """
+    segments = [""]
+    for i, part in enumerate(_QUOTED.split(normalize_query(_SQLITE_OVERRIDES.get(query, query)))):
+        if i % 2:
+            segments[-1] += part  # A quoted literal
+            continue
+        part = _FOR_UPDATE.sub("", part).replace("CURDATE()", "date('now', 'localtime')")
+        pieces = _NAMED_PARAMETER.sub(r":\1", part).split("%s")
+        segments[-1] += pieces[0].replace("%%", "%")
+        segments.extend(piece.replace("%%", "%") for piece in pieces[1:])
+    return tuple(segments)
+
+
+def _sqlite_bind(segments, values):
+    """
+    Joins translated query segments with ? placeholders and returns (sql, parameters).
+    A tuple or list value expands to a (?, ?, ...) list, as PyMySQL renders it for IN %s.
+    """
+    if len(segments) == 1:
+        return segments[0], () if values is None else values
+    if not isinstance(values, (tuple, list)):
+        values = (values,)
+    sql, parameters = [segments[0]], []
+    for value, segment in zip(values, segments[1:]):
+        if isinstance(value, (tuple, list)):
+            sql.append("(" + ", ".join("?" * len(value)) + ")")
+            parameters.extend(value)
+        else:
+            sql.append("?")
+            parameters.append(value)
+        sql.append(segment)
+    return "".join(sql), parameters
+
+
+# Sample rows of CreateSampleUserData, one per sample property, in the procedure's order.
+_SAMPLE_ADDRESSES = (
+    ("USA", "California", "Los Angeles", "Sunset Blvd", 101),
+    ("USA", "California", "Los Angeles", "Hollywood Blvd", 202),
+    ("USA", "New York", "New York City", "5th Ave", 303),
+    ("USA", "Florida", "Miami", "Ocean Dr", 404),
+    ("USA", "Texas", "Houston", "Main St", 505),
+    ("USA", "Illinois", "Chicago", "Lake Shore Dr", 606),
+)
+_SAMPLE_PROPERTIES = (  # total_rent, monthly_capex, bedrooms, bathrooms, sqft, lot_size, target_arv
+    (5000, 500, 3, 2, 1800, 5000, 1000000),
+    (2500, 250, 2, 1, 900, 2000, 500000),
+    (5500, 550, 3, 2, 1500, 4000, 1500000),
+    (1000, 100, 1, 1, 1200, 1200, 300000),
+    (1100, 110, 1, 1, 1300, 1300, 400000),
+    (5500, 550, 4, 2, 2000, 6000, 1000000),
+)
+_SAMPLE_TAX_RECORDS = (
+    ("2024-03-01", "2024-03-15", 5000, 2024), ("2024-04-01", "2024-04-15", 2500, 2024),
+    ("2024-05-01", "2024-05-15", 5500, 2024), ("2024-06-01", "2024-06-15", 1000, 2024),
+    ("2024-07-01", "2024-07-15", 1100, 2024), ("2024-08-01", "2024-08-15", 5500, 2024),
+)
+_SAMPLE_MORTGAGES = (
+    ("Bank A", 400000, 3.5, 1800, "2000-01-01", "2030-01-01", "30-year fixed"),
+    ("Bank B", 200000, 4.0, 1200, "2001-02-01", "2026-02-01", "25-year fixed"),
+    ("Bank C", 500000, 3.8, 2400, "2024-03-01", "2054-03-01", "30-year fixed"),
+    ("Bank D", 150000, 3.6, 800, "2005-04-01", "2025-04-01", "20-year fixed"),
+    ("Bank E", 250000, 3.9, 1300, "2010-05-01", "2035-05-01", "25-year fixed"),
+    ("Bank F", 600000, 3.7, 2800, "2007-06-01", "2037-06-01", "30-year fixed"),
+)
+_SAMPLE_INSURANCE_POLICIES = (
+    (101, "Insurance Co A", 150, "2024-01-01", "2025-01-01"), (102, "Insurance Co B", 120, "2024-02-01", "2025-02-01"),
+    (103, "Insurance Co C", 180, "2024-03-01", "2025-03-01"), (104, "Insurance Co D", 100, "2024-04-01", "2025-04-01"),
+    (105, "Insurance Co E", 110, "2024-05-01", "2025-05-01"), (106, "Insurance Co F", 160, "2024-06-01", "2025-06-01"),
+)
+_SAMPLE_PROJECTS = (  # in_progress, title, description, notes, (update, date)
+    (1, "Kitchen Renovation", "Renovating the kitchen for better functionality.", "Additional Notes",
+     ("Started demolition of old cabinets and countertops.", "2024-01-10")),
+    (0, "Bathroom Remodel", "Updating the bathroom with new fixtures and tiles.", "Details here",
+     ("Demolition complete, tiles selected for new bathroom.", "2024-02-20")),
+    (1, "Roof Repair", "Fixing leaks and ensuring the roof is stable.", "Roof inspection due soon",
+     ("Roof inspection complete, materials ordered for repair.", "2024-03-05")),
+    (0, "Landscaping", "Landscaping the front yard to increase curb appeal.", "Final design pending",
+     ("Landscaping team has started work on the front yard.", "2024-04-01")),
+    (1, "HVAC System Upgrade", "Installing new energy-efficient HVAC system.", "Work in progress",
+     ("HVAC system installation started, ducts being replaced.", "2024-05-10")),
+    (0, "Foundation Inspection", "Inspecting the foundation for any structural issues.", "Scheduled for next month",
+     ("Foundation inspection scheduled for next week.", "2024-06-15")),
+)
+_SAMPLE_CONTRACTORS = (  # company, services, first_name, last_name
+    ("Construction Co A", "General contracting, kitchen remodel", "John", "Doe"),
+    ("Construction Co B", "Bathroom remodeling, plumbing", "Jane", "Smith"),
+    ("Roofing Co C", "Roof repairs, maintenance", "Michael", "Johnson"),
+    ("Landscaping Co D", "Landscaping, yard design", "Emily", "Brown"),
+    ("HVAC Co E", "HVAC installation, maintenance", "David", "White"),
+    ("Foundation Co F", "Foundation inspection and repair", "Sarah", "Davis"),
+)
+_SAMPLE_HISTORIES = (  # purchase_price, maintenance_notes, last_appraised_val, purchase_date, (expense), (inspection)
+    (800000, "Kitchen remodel completed in 2024", 800000, "2023-05-01",
+     ("2024-01-01", 5000, "Kitchen remodel"), ("Kitchen remodel completed successfully", "James", "Taylor")),
+    (1700000, "Bathroom renovation started in 2024", 1700000, "2023-06-01",
+     ("2024-02-01", 2500, "Bathroom renovation"), ("Bathroom renovation is 50% complete", "Linda", "Martinez")),
+    (500000, "Roof repairs scheduled for 2024", 500000, "2023-07-01",
+     ("2024-03-01", 3000, "Roof repairs"), ("Roof repairs scheduled for March 2024", "Robert", "Lee")),
+    (700000, "Landscaping improvements in progress", 700000, "2023-08-01",
+     ("2024-04-01", 1500, "Landscaping"), ("Landscaping improvements started", "Patricia", "Harris")),
+    (600000, "HVAC system upgrade in progress", 600000, "2023-09-01",
+     ("2024-05-01", 2000, "HVAC upgrade"), ("HVAC system upgrade in progress", "William", "Clark")),
+    (650000, "Foundation inspection pending", 650000, "2023-10-01",
+     ("2024-06-01", 2500, "Foundation inspection"), ("Foundation inspection results pending", "Elizabeth", "Lewis")),
+)
+_SAMPLE_UNITS = ((3, 2, 5000, 1), (2, 1, 2500, 0), (3, 2, 5500, 0), (1, 1, 1000, 1), (1, 1, 1100, 0), (4, 2, 5500, 1))
+_SAMPLE_LEASES = (
+    (5000, "2024-01-01", "2025-01-01"), (2500, "2024-02-01", "2025-02-01"), (5500, "2024-03-01", "2025-03-01"),
+    (1000, "2024-04-01", "2025-04-01"), (1100, "2024-05-01", "2025-05-01"), (5500, "2024-06-01", "2025-06-01"),
+)
+_SAMPLE_TENANTS = (  # notes, first_name, last_name, past_due_balance, (amount, paid_date) due 2024-12-01
+    ("Tenant is a reliable renter.", "John", "Doe", 0, (5000, "2024-11-29")),
+    ("Tenant moved in early.", "Jane", "Smith", 0, (2500, "2024-12-01")),
+    ("Tenant is late with payments.", "Alice", "Johnson", 11000, (5500, "2024-10-01")),
+    ("Tenant is renting a small studio.", "Michael", "Williams", 0, (1000, "2024-12-01")),
+    ("Tenant has a family of three.", "Emily", "Brown", 0, (1100, "2024-11-29")),
+    ("Tenant requested an extension.", "Daniel", "Davis", 5500, (5500, "2024-11-01")),
+)
+
+# Properties in the user's portfolios, and properties in portfolios no user owns.
+_USER_PROPERTIES = """
+    SELECT pp.property_id FROM PortfolioProperties pp
+    JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
+    WHERE up.user_id = :user_id
+"""
+_UNOWNED_PROPERTIES = """
+    SELECT pp.property_id FROM PortfolioProperties pp
+    WHERE NOT EXISTS (SELECT 1 FROM UserPortfolios up WHERE up.portfolio_id = pp.portfolio_id)
+"""
+
+
+class SQLiteProcedures:
+    """
+    Python ports of the stored procedures in business_requirements.sql, for SQLiteBackend,
+    which has no stored routines. Each runs on the caller's connection, inside the
+    transaction Database opens for procedure calls, and keeps the original step order.
+    """
+
+    RESET_USER_DATA = (
+        # 1. PaymentHistories
+        f"DELETE FROM PaymentHistories WHERE unit_id IN (SELECT unit_id FROM Units WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 1b. Archived PaymentHistories
+        f"DELETE FROM PaymentHistoriesArchive WHERE unit_id IN "
+        f"(SELECT unit_id FROM Units WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 2. UnitTenants
+        f"DELETE FROM UnitTenants WHERE unit_id IN (SELECT unit_id FROM Units WHERE property_id IN ({_USER_PROPERTIES}))",
+        # Tenants before LeaseAgreements
+        f"DELETE FROM Tenants WHERE lease_id IN (SELECT lease_id FROM LeaseAgreements WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 3. LeaseAgreements
+        f"DELETE FROM LeaseAgreements WHERE property_id IN ({_USER_PROPERTIES})",
+        # 5. ExpenseHistories
+        f"DELETE FROM ExpenseHistories WHERE history_id IN "
+        f"(SELECT history_id FROM PropertyHistories WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 5b. Archived ExpenseHistories
+        f"DELETE FROM ExpenseHistoriesArchive WHERE history_id IN "
+        f"(SELECT history_id FROM PropertyHistories WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 6. InspectionRecords
+        f"DELETE FROM InspectionRecords WHERE history_id IN "
+        f"(SELECT history_id FROM PropertyHistories WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 7. ProjectContractors
+        f"DELETE FROM ProjectContractors WHERE project_id IN "
+        f"(SELECT project_id FROM ProjectInfos WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 8. ProjectUpdates
+        f"DELETE FROM ProjectUpdates WHERE project_id IN "
+        f"(SELECT project_id FROM ProjectInfos WHERE property_id IN ({_USER_PROPERTIES}))",
+        # 9. InsurancePolicies
+        f"DELETE FROM InsurancePolicies WHERE property_id IN ({_USER_PROPERTIES})",
+        # 10. ProjectInfos
+        f"DELETE FROM ProjectInfos WHERE property_id IN ({_USER_PROPERTIES})",
+        # 11. Contractors
+        "DELETE FROM Contractors WHERE user_id = :user_id",
+        # 12. PropertyHistories
+        f"DELETE FROM PropertyHistories WHERE property_id IN ({_USER_PROPERTIES})",
+        # 13. Units
+        f"DELETE FROM Units WHERE property_id IN ({_USER_PROPERTIES})",
+        # 13b. LedgerRollups
+        f"DELETE FROM LedgerRollups WHERE property_id IN ({_USER_PROPERTIES})",
+        # 14. PortfolioProperties
+        "DELETE FROM PortfolioProperties WHERE portfolio_id IN (SELECT portfolio_id FROM UserPortfolios WHERE user_id = :user_id)",
+    )
+
+    CLEAN_ORPHANED_DATA = (
+        # 1. PaymentHistories with no matching Unit or Tenant
+        """DELETE FROM PaymentHistories AS ph
+           WHERE NOT EXISTS (SELECT 1 FROM Units u WHERE u.unit_id = ph.unit_id)
+              OR NOT EXISTS (SELECT 1 FROM Tenants t WHERE t.tenant_id = ph.tenant_id)""",
+        # 2. UnitTenants with no matching Unit, Tenant, or LeaseAgreement
+        """DELETE FROM UnitTenants AS ut
+           WHERE NOT EXISTS (SELECT 1 FROM Units u WHERE u.unit_id = ut.unit_id)
+              OR NOT EXISTS (SELECT 1 FROM Tenants t WHERE t.tenant_id = ut.tenant_id)
+              OR NOT EXISTS (SELECT 1 FROM LeaseAgreements la WHERE la.lease_id = ut.lease_id)""",
+        # 3. Tenants whose LeaseAgreement no longer exists
+        """DELETE FROM Tenants AS t
+           WHERE NOT EXISTS (SELECT 1 FROM LeaseAgreements la WHERE la.lease_id = t.lease_id)""",
+        # 4. LeaseAgreements whose property is not in any portfolio
+        """DELETE FROM LeaseAgreements AS la
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = la.property_id)""",
+        # 5. ExpenseHistories whose PropertyHistory no longer exists
+        """DELETE FROM ExpenseHistories AS eh
+           WHERE NOT EXISTS (SELECT 1 FROM PropertyHistories ph WHERE ph.history_id = eh.history_id)""",
+        # 6. InspectionRecords whose PropertyHistory no longer exists
+        """DELETE FROM InspectionRecords AS ir
+           WHERE NOT EXISTS (SELECT 1 FROM PropertyHistories ph WHERE ph.history_id = ir.history_id)""",
+        # 7. ProjectContractors whose ProjectInfo or Contractor no longer exists
+        """DELETE FROM ProjectContractors AS pc
+           WHERE NOT EXISTS (SELECT 1 FROM ProjectInfos pi WHERE pi.project_id = pc.project_id)
+              OR NOT EXISTS (SELECT 1 FROM Contractors c WHERE c.tracking_id = pc.contractor_id)""",
+        # 8. ProjectUpdates whose ProjectInfo no longer exists
+        """DELETE FROM ProjectUpdates AS pu
+           WHERE NOT EXISTS (SELECT 1 FROM ProjectInfos pi WHERE pi.project_id = pu.project_id)""",
+        # 9. InsurancePolicies whose property is not in any portfolio
+        """DELETE FROM InsurancePolicies AS ip
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = ip.property_id)""",
+        # 10. ProjectInfos whose property is not in any portfolio
+        """DELETE FROM ProjectInfos AS pi
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = pi.property_id)""",
+        # 11. Contractors whose user no longer exists in RegisteredUsers
+        """DELETE FROM Contractors AS c
+           WHERE NOT EXISTS (SELECT 1 FROM RegisteredUsers ru WHERE ru.tracking_id = c.user_id)""",
+        # 12. PropertyHistories whose property is not in any portfolio
+        """DELETE FROM PropertyHistories AS ph
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = ph.property_id)""",
+        # 13. Units whose property is not in any portfolio
+        """DELETE FROM Units AS u
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = u.property_id)""",
+        # 14. TaxRecords whose property is not in any portfolio
+        """DELETE FROM TaxRecords AS tr
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = tr.property_id)""",
+        # 15. Mortgages whose property is not in any portfolio
+        """DELETE FROM Mortgages AS m
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = m.property_id)""",
+        # 16. PortfolioProperties entries whose Property or Portfolio no longer exists
+        """DELETE FROM PortfolioProperties AS pp
+           WHERE NOT EXISTS (SELECT 1 FROM Properties p WHERE p.property_id = pp.property_id)
+              OR NOT EXISTS (SELECT 1 FROM Portfolios pf WHERE pf.portfolio_id = pp.portfolio_id)""",
+        # 17. Properties not in any portfolio
+        """DELETE FROM Properties AS p
+           WHERE NOT EXISTS (SELECT 1 FROM PortfolioProperties pp WHERE pp.property_id = p.property_id)""",
+        # 18. Addresses not referenced by any Property or Unit
+        """DELETE FROM Addresses AS a
+           WHERE NOT EXISTS (SELECT 1 FROM Properties p WHERE p.address_id = a.address_id)
+             AND NOT EXISTS (SELECT 1 FROM Units u WHERE u.address_id = a.address_id)""",
+        # 19. UserPortfolios entries whose User or Portfolio no longer exists
+        """DELETE FROM UserPortfolios AS up
+           WHERE NOT EXISTS (SELECT 1 FROM RegisteredUsers ru WHERE ru.tracking_id = up.user_id)
+              OR NOT EXISTS (SELECT 1 FROM Portfolios pf WHERE pf.portfolio_id = up.portfolio_id)""",
+        # 19a-19n. Data tied to Portfolios that have no UserPortfolio owner, children before parents.
+        f"DELETE FROM PaymentHistories WHERE unit_id IN (SELECT unit_id FROM Units WHERE property_id IN ({_UNOWNED_PROPERTIES}))",
+        f"DELETE FROM UnitTenants WHERE unit_id IN (SELECT unit_id FROM Units WHERE property_id IN ({_UNOWNED_PROPERTIES}))",
+        f"DELETE FROM Tenants WHERE lease_id IN "
+        f"(SELECT lease_id FROM LeaseAgreements WHERE property_id IN ({_UNOWNED_PROPERTIES}))",
+        f"DELETE FROM LeaseAgreements WHERE property_id IN ({_UNOWNED_PROPERTIES})",
+        f"DELETE FROM ExpenseHistories WHERE history_id IN "
+        f"(SELECT history_id FROM PropertyHistories WHERE property_id IN ({_UNOWNED_PROPERTIES}))",
+        f"DELETE FROM InspectionRecords WHERE history_id IN "
+        f"(SELECT history_id FROM PropertyHistories WHERE property_id IN ({_UNOWNED_PROPERTIES}))",
+        f"DELETE FROM ProjectUpdates WHERE project_id IN "
+        f"(SELECT project_id FROM ProjectInfos WHERE property_id IN ({_UNOWNED_PROPERTIES}))",
+        f"DELETE FROM InsurancePolicies WHERE property_id IN ({_UNOWNED_PROPERTIES})",
+        f"DELETE FROM ProjectInfos WHERE property_id IN ({_UNOWNED_PROPERTIES})",
+        f"DELETE FROM PropertyHistories WHERE property_id IN ({_UNOWNED_PROPERTIES})",
+        f"DELETE FROM Units WHERE property_id IN ({_UNOWNED_PROPERTIES})",
+        f"DELETE FROM TaxRecords WHERE property_id IN ({_UNOWNED_PROPERTIES})",
+        f"DELETE FROM Mortgages WHERE property_id IN ({_UNOWNED_PROPERTIES})",
+        """DELETE FROM PortfolioProperties AS pp
+           WHERE NOT EXISTS (SELECT 1 FROM UserPortfolios up WHERE up.portfolio_id = pp.portfolio_id)""",
+        # 20. Portfolios with no owning user
+        """DELETE FROM Portfolios AS pf
+           WHERE NOT EXISTS (SELECT 1 FROM UserPortfolios up WHERE up.portfolio_id = pf.portfolio_id)""",
+        # 21. Archived ledger rows whose Unit, Tenant or PropertyHistory no longer exists
+        """DELETE FROM PaymentHistoriesArchive AS pha
+           WHERE NOT EXISTS (SELECT 1 FROM Units u WHERE u.unit_id = pha.unit_id)
+              OR NOT EXISTS (SELECT 1 FROM Tenants t WHERE t.tenant_id = pha.tenant_id)""",
+        """DELETE FROM ExpenseHistoriesArchive AS eha
+           WHERE NOT EXISTS (SELECT 1 FROM PropertyHistories ph WHERE ph.history_id = eha.history_id)""",
+        # 22. LedgerRollups of properties that no longer exist
+        """DELETE FROM LedgerRollups AS lr
+           WHERE NOT EXISTS (SELECT 1 FROM Properties p WHERE p.property_id = lr.property_id)""",
+    )
+
+    @staticmethod
+    def call(connection, name, parameters, fetch=False):
+        procedure = _SQLITE_PROCEDURES.get(name)
+        if procedure is None:
+            raise sqlite3.OperationalError(f"PROCEDURE {name} does not exist")
+        cursor = connection.cursor()
+        try:
+            rows = procedure(cursor, *parameters)
+            return rows if fetch else None
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def assign_role(cursor, user_id, role_id, expires):
+        cursor.execute("UPDATE RegisteredUsers SET role_id = ?, role_expires = ? WHERE tracking_id = ?",
+                       (role_id, expires, user_id))
+
+    @staticmethod
+    def refresh_role(cursor, user_id, role_id):
+        cursor.execute("UPDATE RegisteredUsers SET role_id = ?, role_expires = date('now', 'localtime', '+1 year') "
+                       "WHERE tracking_id = ?", (role_id, user_id))
+
+    @staticmethod
+    def check_before_query(cursor, user_id, query):
+        """Runs query for owners; an expired role is downgraded to Guest first."""
+        row = cursor.execute("SELECT role_id, role_expires FROM RegisteredUsers WHERE tracking_id = ?",
+                             (user_id,)).fetchone()
+        role_id, expires = (row["role_id"], row["role_expires"]) if row else (None, None)
+        if expires is not None and expires < date.today():
+            cursor.execute("UPDATE RegisteredUsers SET role_id = 3 WHERE tracking_id = ?", (user_id,))
+            role_id = 3
+        if role_id == 1:
+            return cursor.execute(*_sqlite_bind(_sqlite_statement(query), None)).fetchall()
+        if role_id == 2:
+            raise sqlite3.OperationalError("Admins may not execute this query.")
+        raise sqlite3.OperationalError("Guests may not execute this query.")
+
+    @staticmethod
+    def create_sample_user_data(cursor, user_id):
+        """Creates the six sample properties and their related rows, once per user."""
+        row = cursor.execute("SELECT has_sample_data FROM RegisteredUsers WHERE tracking_id = ?", (user_id,)).fetchone()
+        if row is not None and row["has_sample_data"] == 1:
+            return
+        cursor.execute("UPDATE RegisteredUsers SET has_sample_data = 1 WHERE tracking_id = ?", (user_id,))
+
+        row = cursor.execute("SELECT portfolio_id FROM UserPortfolios WHERE user_id = ? LIMIT 1", (user_id,)).fetchone()
+        portfolio_id = row["portfolio_id"] if row else None
+        if portfolio_id is None:
+            cursor.execute("INSERT INTO Portfolios (num_properties, last_appraised_val) VALUES (0, 0)")
+            portfolio_id = cursor.lastrowid
+            cursor.execute("INSERT INTO UserPortfolios (user_id, portfolio_id, last_appraised_val) VALUES (?, ?, 0)",
+                           (user_id, portfolio_id))
+
+        def insert_each(sql, rows):
+            ids = []
+            for values in rows:
+                cursor.execute(sql, values)
+                ids.append(cursor.lastrowid)
+            return ids
+
+        addresses = insert_each("INSERT INTO Addresses (country, state_province, city, street, number) "
+                                "VALUES (?, ?, ?, ?, ?)", _SAMPLE_ADDRESSES)
+        properties = insert_each(
+            "INSERT INTO Properties (total_rent, monthly_capex, bedroom_count, bathroom_count, sqft, lot_size, "
+            "target_arv, address_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [values + (address,) for values, address in zip(_SAMPLE_PROPERTIES, addresses)])
+        insert_each("INSERT INTO PortfolioProperties (portfolio_id, property_id, property_rent) VALUES (?, ?, ?)",
+                    [(portfolio_id, prop, values[0]) for prop, values in zip(properties, _SAMPLE_PROPERTIES)])
+        insert_each("INSERT INTO TaxRecords (property_id, payment_date, due_date, amount_paid, year) VALUES (?, ?, ?, ?, ?)",
+                    [(prop,) + values for prop, values in zip(properties, _SAMPLE_TAX_RECORDS)])
+        insert_each("INSERT INTO Mortgages (lender_name, principal_balance, interest_rate, monthly_payment, start_date, "
+                    "end_date, property_id, terms) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [values[:6] + (prop, values[6]) for prop, values in zip(properties, _SAMPLE_MORTGAGES)])
+        insert_each("INSERT INTO InsurancePolicies (policy_number, provider, monthly_cost, start_date, end_date, property_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [values + (prop,) for prop, values in zip(properties, _SAMPLE_INSURANCE_POLICIES)])
+        projects = insert_each(
+            "INSERT INTO ProjectInfos (in_progress, project_title, project_description, ProjectInfoscol, property_id) "
+            "VALUES (?, ?, ?, ?, ?)", [values[:4] + (prop,) for prop, values in zip(properties, _SAMPLE_PROJECTS)])
+        insert_each("INSERT INTO ProjectUpdates (project_id, updates, date) VALUES (?, ?, ?)",
+                    [(project,) + values[4] for project, values in zip(projects, _SAMPLE_PROJECTS)])
+        contractors = insert_each(
+            "INSERT INTO Contractors (company_name, services, first_name, last_name, user_id) VALUES (?, ?, ?, ?, ?)",
+            [values + (user_id,) for values in _SAMPLE_CONTRACTORS])
+        insert_each("INSERT INTO ProjectContractors (project_id, contractor_id, services) VALUES (?, ?, ?)",
+                    [(project, contractor, values[1])
+                     for project, contractor, values in zip(projects, contractors, _SAMPLE_CONTRACTORS)])
+        histories = insert_each(
+            "INSERT INTO PropertyHistories (purchase_price, maintenance_notes, last_appraised_val, purchase_date, "
+            "property_id) VALUES (?, ?, ?, ?, ?)", [values[:4] + (prop,) for prop, values in zip(properties, _SAMPLE_HISTORIES)])
+        insert_each("INSERT INTO ExpenseHistories (date, cost, label, history_id) VALUES (?, ?, ?, ?)",
+                    [values[4] + (history,) for history, values in zip(histories, _SAMPLE_HISTORIES)])
+        insert_each("INSERT INTO InspectionRecords (notes, inspector_firstname, inspector_lastname, history_id) "
+                    "VALUES (?, ?, ?, ?)", [values[5] + (history,) for history, values in zip(histories, _SAMPLE_HISTORIES)])
+        units = insert_each(
+            "INSERT INTO Units (property_id, bedroom_count, bathroom_count, rent, vacant, address_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(prop,) + values + (address,) for prop, values, address in zip(properties, _SAMPLE_UNITS, addresses)])
+        leases = insert_each(
+            "INSERT INTO LeaseAgreements (rent, start_date, end_date, terms, property_id) VALUES (?, ?, ?, ?, ?)",
+            [values + ("12-month lease", prop) for prop, values in zip(properties, _SAMPLE_LEASES)])
+        tenants = insert_each(
+            "INSERT INTO Tenants (notes, first_name, last_name, lease_id, past_due_balance) VALUES (?, ?, ?, ?, ?)",
+            [values[:3] + (lease, values[3]) for lease, values in zip(leases, _SAMPLE_TENANTS)])
+        insert_each("INSERT INTO PaymentHistories (amount, paid_date, due_date, unit_id, tenant_id) VALUES (?, ?, ?, ?, ?)",
+                    [values[4] + ("2024-12-01", unit, tenant)
+                     for unit, tenant, values in zip(units, tenants, _SAMPLE_TENANTS)])
+        insert_each("INSERT INTO UnitTenants (unit_id, tenant_id, tenant_name, address_id, lease_id) VALUES (?, ?, ?, ?, ?)",
+                    [(unit, tenant, f"{values[1]} {values[2]}", address, lease)
+                     for unit, tenant, address, lease, values in zip(units, tenants, addresses, leases, _SAMPLE_TENANTS)])
+
+    @staticmethod
+    def reset_user_data(cursor, user_id):
+        for statement in SQLiteProcedures.RESET_USER_DATA:
+            cursor.execute(statement, {"user_id": user_id})
+
+    @staticmethod
+    def clean_orphaned_data(cursor):
+        for statement in SQLiteProcedures.CLEAN_ORPHANED_DATA:
+            cursor.execute(statement)
+
+    @staticmethod
+    def select_for_user(query):
+        """A Get* procedure: the matching view query for one user."""
+        return lambda cursor, user_id: cursor.execute(*_sqlite_bind(_sqlite_statement(query), (user_id,))).fetchall()
+
+
+_SQLITE_PROCEDURES = {
+    Query.PROC_AssignRole: SQLiteProcedures.assign_role,
+    Query.PROC_RefreshRole: SQLiteProcedures.refresh_role,
+    Query.PROC_CheckBeforeQuery: SQLiteProcedures.check_before_query,
+    Query.PROC_CreateSampleUserData: SQLiteProcedures.create_sample_user_data,
+    Query.PROC_ResetUserData: SQLiteProcedures.reset_user_data,
+    Query.PROC_CleanOrphanedData: SQLiteProcedures.clean_orphaned_data,
+    Query.PROC_GetPortfolioPerformance: SQLiteProcedures.select_for_user(Query.PORTFOLIO_PERFORMANCE_BY_USER),
+    Query.PROC_GetTenants: SQLiteProcedures.select_for_user(Query.TENANTS_BY_USER),
+    Query.PROC_GetMortgages: SQLiteProcedures.select_for_user(Query.MORTGAGES_BY_USER),
+    Query.PROC_GetCurrentProjects: SQLiteProcedures.select_for_user(Query.CURRENT_PROJECTS_BY_USER),
+}
@@ -0,0 +1,254 @@
+"""
+Pure formatting of the portfolio listings sent by the Portfolio cog.
+
+Each function takes the view rows and returns the messages to send (a header, then one
+entry per row). They touch no Discord or database state, so large listings can be
+rendered on the CPU process pool (see compute.run_rows).
+"""
+
+
+def format_portfolio_performance(rows):
+    """PortfolioPerformance rows -> header plus one entry per property."""
+    entries = ["**Portfolio Performance** — ordered by cash flow (worst to best):\n"]
+
+    for i, row in enumerate(rows, 1):
+        mortgage  = row.get("Mortgage") or 0
+        capex     = row.get("Capital_Expenditures") or 0
+        cash_flow = row.get("cash_flow") or 0
+        entry = (
+            f"**#{i} — {row.get('Address', 'N/A')}**\n"
+            f"  Property ID:    {row.get('Property_ID')}\n"
+            f"  Rental Income:  ${row.get('Rental_Income', 0):,.2f}\n"
+            f"  Mortgage:       ${mortgage:,.2f}\n"
+            f"  CapEx:          ${capex:,.2f}\n"
+            f"  Cash Flow:      ${cash_flow:,.2f}\n"
+            f"  Purchase Price: ${row.get('Purchase_Price', 0):,.2f}\n"
+            f"  ARV:            ${row.get('ARV', 0):,.2f}\n"
+        )
+        entries.append(entry)
+
+    return entries
+
+
+def format_tenants(rows):
+    """ViewTenants rows -> header plus one entry per tenant."""
+    entries = ["**Tenants** — ordered by past due balance (highest first):\n"]
+
+    for i, row in enumerate(rows, 1):
+        past_due = row.get("past_due_balance") or 0
+        entry = (
+            f"**#{i} — {row.get('tenant_name', 'N/A')}**\n"
+            f"  Tenant ID:        {row.get('tenant_id')}\n"
+            f"  Unit ID:          {row.get('unit_id')}\n"
+            f"  Property Address: {row.get('property_address', 'N/A')}\n"
+            f"  Past Due Balance: ${past_due:,.2f}\n"
+        )
+        entries.append(entry)
+
+    return entries
+
+
+def format_mortgages(rows):
+    """ViewMortgages rows -> header plus one entry per mortgage; the totals row (mortgage_id NULL) last."""
+    entries = ["**Mortgages** — ordered by start date (totals row last):\n"]
+
+    for row in rows:
+        is_totals = row.get("mortgage_id") is None
+        if is_totals:
+            entry = (
+                f"**— Totals —**\n"
+                f"  Total Principal Balance: ${row.get('principal_balance', 0):,.2f}\n"
+                f"  Total Monthly Payment:   ${row.get('monthly_payment', 0):,.2f}\n"
+                f"  Total Purchase Price:    ${row.get('purchase_price', 0):,.2f}\n"
+            )
+        else:
+            entry = (
+                f"**{row.get('lender_name', 'N/A')}** (ID: {row.get('mortgage_id')})\n"
+                f"  Property:          {row.get('property_address', 'N/A')}\n"
+                f"  Principal Balance: ${row.get('principal_balance', 0):,.2f}\n"
+                f"  Interest Rate:     {row.get('interest_rate', 0)}%\n"
+                f"  Monthly Payment:   ${row.get('monthly_payment', 0):,.2f}\n"
+                f"  Term:              {row.get('start_date')} → {row.get('end_date')}\n"
+                f"  Purchase Price:    ${row.get('purchase_price', 0):,.2f}\n"
+            )
+        entries.append(entry)
+
+    return entries
+
+
+def format_projects(rows):
+    """CurrentProjects rows -> header plus one entry per project."""
+    entries = ["**Current Projects** — in-progress first:\n"]
+
+    for i, row in enumerate(rows, 1):
+        status = "In Progress" if row.get("in_progress") else "Not In Progress"
+        entry = (
+            f"**#{i} — {row.get('numbered_street', 'N/A')}, {row.get('city', 'N/A')}**\n"
+            f"  Project:     {row.get('project', 'N/A')}\n"
+            f"  Status:      {status}\n"
+            f"  Description: {row.get('project_description', 'N/A')}\n"
+            f"  Contractor:  {row.get('contractor', 'N/A')} ({row.get('contractor_company', 'N/A')})\n"
+            f"  Services:    {row.get('services', 'N/A')}\n"
+        )
+        entries.append(entry)
+
+    return entries
+
+
+SEARCH_KINDS = {"tenant": "Tenant", "property": "Property", "project": "Project", "contractor": "Contractor"}
+SNIPPET_LENGTH = 80
+
+
+def format_search_results(query, rows):
+    """Search index rows -> header plus one entry per match, best first."""
+    entries = [f"**Search results for \"{query}\"** — best matches first:\n"]
+
+    for i, row in enumerate(rows, 1):
+        entry = f"**#{i} — {row.get('title') or 'N/A'}** ({SEARCH_KINDS.get(row.get('kind'), row.get('kind'))} ID: {row.get('doc_id')})\n"
+        if row.get("subtitle"):
+            entry += f"  {row['subtitle']}\n"
+        if row.get("past_due_balance"):
+            entry += f"  Past Due Balance: ${row['past_due_balance']:,.2f}\n"
+        body = row.get("body")
+        if body:
+            snippet = body if len(body) <= SNIPPET_LENGTH else body[:SNIPPET_LENGTH - 1].rstrip() + "…"
+            entry += f"  {snippet}\n"
+        entries.append(entry)
+
+    return entries
+
+
+CHART_WIDTH = 20
+
+
+def format_cashflow_history(rows, months=12):
+    """
+    CashflowHistory rows -> header, one entry per month with its totals by category, and a
+    bar chart of the monthly net cash flow. Only the last `months` months with activity are shown.
+    """
+    by_month = {}
+    for row in rows:
+        month = by_month.setdefault(str(row.get("month"))[:7], {"income": {}, "expense": {}})
+        month.setdefault(row.get("kind"), {})[row.get("category")] = row.get("total") or 0
+
+    shown = sorted(by_month)[-months:]
+    entries = [f"**Cash Flow History** — last {len(shown)} months with activity (oldest first):\n"]
+    nets = []
+
+    for month in shown:
+        income = by_month[month]["income"]
+        expenses = by_month[month]["expense"]
+        net = sum(income.values()) - sum(expenses.values())
+        nets.append((month, net))
+        entry = f"**{month}**\n  Income:   ${sum(income.values()):,.2f}\n"
+        for category, total in sorted(income.items(), key=lambda item: -item[1]):
+            entry += f"    {category}: ${total:,.2f}\n"
+        entry += f"  Expenses: ${sum(expenses.values()):,.2f}\n"
+        for category, total in sorted(expenses.items(), key=lambda item: -item[1]):
+            entry += f"    {category}: ${total:,.2f}\n"
+        entry += f"  Net:      ${net:,.2f}\n"
+        entries.append(entry)
+
+    if nets:
+        scale = max(abs(net) for _, net in nets) or 1
+        chart = "\n".join(
+            f"{month} {'-' if net < 0 else '+'}{'█' * round(abs(net) / scale * CHART_WIDTH):<{CHART_WIDTH}} ${net:,.0f}"
+            for month, net in nets
+        )
+        entries.append(f"**Net cash flow by month:**\n```\n{chart}\n```")
+
+    return entries
+
+
+def format_cashflow_projection(rows, result):
+    """
+    ProjectionInputs rows and a projection.simulate() result -> header, the portfolio's bands
+    with a table of monthly bands, then one entry per property, most at risk first.
+    """
+    low, median, high = result["percentiles"]
+    portfolio = result["portfolio"]
+    entries = [
+        f"**Cash Flow Projection** — next {result['months']} months, {result['paths']:,} scenarios "
+        f"(P{low} / median / P{high}):\n",
+    ]
+
+    bands = portfolio["bands"]
+    table = "\n".join(
+        f"{month:>5} {portfolio['monthly'][0][month - 1]:>12,.0f} {portfolio['monthly'][1][month - 1]:>12,.0f} "
+        f"{portfolio['monthly'][2][month - 1]:>12,.0f}"
+        for month in range(1, result["months"] + 1)
+    )
+    entries.append(
+        f"**Portfolio**\n"
+        f"  Total:          ${bands[0]:,.0f} / ${bands[1]:,.0f} / ${bands[2]:,.0f}\n"
+        f"  Chance of loss: {portfolio['loss_probability']:.1%}\n"
+        f"```\n{'Month':>5} {f'P{low}':>12} {'Median':>12} {f'P{high}':>12}\n{table}\n```"
+    )
+
+    addresses = {row.get("property_id"): row.get("address") for row in rows}
+    for prop in sorted(result["properties"], key=lambda prop: prop["bands"][0]):
+        prop_low, prop_median, prop_high = prop["bands"]
+        entry = (
+            f"**{addresses.get(prop['property_id']) or 'N/A'}**\n"
+            f"  Property ID:    {prop['property_id']}\n"
+            f"  Baseline:       ${prop['baseline']:,.2f}\n"
+            f"  Projected:      ${prop_low:,.0f} / ${prop_median:,.0f} / ${prop_high:,.0f}\n"
+            f"  Chance of loss: {prop['loss_probability']:.1%}\n"
+        )
+        entries.append(entry)
+
+    return entries
+
+
+def format_occupancy(rows, window_days):
+    """Occupancy rows -> header, the portfolio totals, then one entry per property, least occupied first."""
+    *properties, portfolio = rows
+    entries = [f"**Occupancy** — last {window_days} days, with leases ending soon:\n"]
+
+    for row in [portfolio] + sorted(properties, key=lambda row: row.get("occupancy_rate") or 0):
+        next_roll_off = row.get("next_roll_off")
+        entry = (
+            f"**{row.get('address') or 'N/A'}**\n"
+            + (f"  Property ID:     {row.get('property_id')}\n" if row.get("property_id") is not None else "")
+            + f"  Occupied now:    {row.get('occupied_units')} of {row.get('units')} units\n"
+            f"  Occupancy rate:  {row.get('occupancy_rate') or 0:.1%}\n"
+            f"  Avg days vacant: {row.get('avg_days_vacant') or 0:,.0f} per unit\n"
+            f"  Turnover:        {row.get('turnover') or 0:.2f} move-outs per unit\n"
+            f"  Leases ending:   {row.get('roll_offs')}"
+            + (f" (next {next_roll_off})\n" if next_roll_off else "\n")
+        )
+        entries.append(entry)
+
+    return entries
+
+
+def format_contractor_workloads(rows):
+    """Contractor workload rows -> header plus one entry per contractor, busiest first."""
+    entries = ["**Contractors** — ordered by projects in progress (busiest first):\n"]
+
+    for row in rows:
+        entry = (
+            f"**{row.get('company_name') or 'N/A'}**{' — overloaded' if row.get('overloaded') else ''}\n"
+            f"  Contact:     {row.get('full_name') or 'N/A'}\n"
+            f"  Services:    {row.get('services') or 'N/A'}\n"
+            f"  In progress: {row.get('active_projects')} of {row.get('total_projects')} projects\n"
+        )
+        if row.get("active_titles"):
+            entry += f"  Working on:  {', '.join(row['active_titles'])}\n"
+        entries.append(entry)
+
+    return entries
+
+
+def format_contractor_matches(service, rows):
+    """Contractor workload rows matching service -> header plus one entry per contractor, least busy first."""
+    entries = [f"**Contractors for \"{service}\"** — least busy first:\n"]
+
+    for row in rows:
+        entries.append(
+            f"**{row.get('company_name') or 'N/A'}** ({row.get('full_name') or 'N/A'})\n"
+            f"  Services:    {row.get('services') or 'N/A'}\n"
+            f"  In progress: {row.get('active_projects')} projects\n"
+        )
+
+    return entries
@@ -0,0 +1,112 @@
+"""
+Payment and expense ledgers (PaymentHistories and ExpenseHistories) and their archives.
+
+Both ledgers only ever grow. LedgerArchiver moves the rows of closed months, older than
+ARCHIVE_AFTER_MONTHS, into PaymentHistoriesArchive and ExpenseHistoriesArchive (compressed and
+partitioned by year, Business Requirement #9 in business_requirements.sql), so the hot tables
+and their indexes stay the size of the recent working set. Unpaid payments are never archived.
+
+Reads go through payment_ledger() and expense_ledger(), which return hot and archived rows
+together, so callers do not need to know where a row is stored.
+"""
+
+import os
+from datetime import date
+from database import Database, Query
+from periodic import PeriodicJob
+
+# Rows whose month ended more than this many months ago are archived.
+ARCHIVE_AFTER_MONTHS = int(os.environ.get("ARCHIVE_AFTER_MONTHS", "24"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL_HOURS = float(os.environ.get("ARCHIVE_INTERVAL_HOURS", "24"))
+ARCHIVE_START_DELAY = 600.0
+
+# Default range of the ledger reads: everything.
+LEDGER_START = date(1000, 1, 1)
+LEDGER_END = date(9999, 12, 31)
+
+# Ledger name -> (ID column, archivable IDs query, copy query, delete query).
+LEDGERS = {
+    "payments": ("history_id", Query.ARCHIVABLE_PAYMENTS, Query.COPY_PAYMENTS_TO_ARCHIVE,
+                 Query.DELETE_ARCHIVED_PAYMENTS),
+    "expenses": ("expense_id", Query.ARCHIVABLE_EXPENSES, Query.COPY_EXPENSES_TO_ARCHIVE,
+                 Query.DELETE_ARCHIVED_EXPENSES),
+}
+
+
+def archive_cutoff(today=None, months=None):
+    """The first day of the month `months` months before today's: rows dated before it are archived."""
+    today = today or date.today()
+    months = ARCHIVE_AFTER_MONTHS if months is None else months
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def payment_ledger(tenant_id, start=None, end=None):
+    """A tenant's payments due in [start, end), hot and archived, oldest first."""
+    values = (tenant_id, start or LEDGER_START, end or LEDGER_END)
+    return await Database.select_async(Query.PAYMENTS_BY_TENANT, values * 2) or []
+
+
+async def expense_ledger(history_id, start=None, end=None):
+    """A property history's expenses dated in [start, end), hot and archived, oldest first."""
+    values = (history_id, start or LEDGER_START, end or LEDGER_END)
+    return await Database.select_async(Query.EXPENSES_BY_HISTORY, values * 2) or []
+
+
+class LedgerArchiver(PeriodicJob):
+    """
+    Periodically moves closed ledger rows into the archive tables in batches.
+
+    Each batch locks its rows (SELECT ... FOR UPDATE) and copies and deletes them in one
+    transaction, so a row is always in exactly one of the two tables and an interrupted run
+    simply continues with the next batch.
+    """
+
+    DESCRIPTION = "Ledger archival"
+
+    def __init__(self, batch_size=ARCHIVE_BATCH_SIZE, interval_hours=ARCHIVE_INTERVAL_HOURS,
+                 months=ARCHIVE_AFTER_MONTHS):
+        super().__init__(interval_hours * 3600, ARCHIVE_START_DELAY)
+        self.batch_size = batch_size
+        self.months = months
+        self.runs = 0
+        self.archived = {ledger: 0 for ledger in LEDGERS}
+
+    async def archive_batch(self, ledger, cutoff):
+        """Moves up to batch_size of the ledger's oldest rows dated before cutoff. Returns how many moved."""
+        key, select, copy, delete = LEDGERS[ledger]
+        async with Database.transaction_async() as tx:
+            rows = await tx.select(select, (cutoff, self.batch_size)) or []
+            if not rows:
+                return 0
+            ids = tuple(row[key] for row in rows)
+            await tx.insert(copy, (ids,))
+            await tx.delete(delete, (ids,))
+        self.archived[ledger] += len(ids)
+        return len(ids)
+
+    async def archive(self, today=None):
+        """Archives everything before the cutoff, one batch at a time. Returns the rows moved per ledger."""
+        cutoff = archive_cutoff(today, self.months)
+        moved = {}
+        for ledger in LEDGERS:
+            moved[ledger] = 0
+            while True:
+                count = await self.archive_batch(ledger, cutoff)
+                moved[ledger] += count
+                if count < self.batch_size:
+                    break
+        self.runs += 1
+        return moved
+
+    async def run_once(self):
+        moved = await self.archive()
+        if any(moved.values()):
+            print(f"Archived {moved['payments']} payments and {moved['expenses']} expenses")
+
+    def stats(self):
+        return {"runs": self.runs, **{f"{ledger}_archived": count for ledger, count in self.archived.items()}}
+
+
+ledger_archiver = LedgerArchiver()
@@ -4,17 +4,38 @@ are handled in separate, designated files to maintain a clean separation of conc
 
 """
 
+import time
+_process_started = time.perf_counter()  # Taken before the heavy imports so startup timing includes them
+
 import os
 import asyncio
 import discord
 from discord.ext import commands
-from models import *
+from authorization import Permission, has_permission
+from outbound import outbound, BULK
+# Models, formatting, the CPU pool and the NumPy projection are imported where they are used,
+# so importing main (tests, tooling, every spawned shard worker) does not pay for them up front.
+
+
+# Permission Checks
+
+class RoleNotPermitted(commands.CheckFailure):
+    pass
 
-# Add your Discord bot token to your project's environment variables using the secret key: 'DISCORD_TOKEN'
-TOKEN = os.environ["DISCORD_TOKEN"]
 
-# Setting up the bot with necessary intents to handle events and commands
-intents = discord.Intents.all()  # Adjust the intents according to your bot's needs
+def requires_permission(permission):
+    """
+    Command check: a registered user's current role must grant `permission`. The role and its
+    expiry come from the cached user row, so the check normally needs no database round trip.
+    Unregistered users pass through so the command itself can point them to !register.
+    """
+    async def predicate(ctx):
+        from models import find_registered_user
+        user = await find_registered_user(ctx.author.id)
+        if user is None or has_permission(user, permission):
+            return True
+        raise RoleNotPermitted("Your role does not allow this command. It may have expired — contact an admin to refresh it.")
+    return commands.check(predicate)
 
 
 # Custom Help Command
@@ -29,15 +50,6 @@ class CustomHelpCommand(commands.DefaultHelpCommand):
         await super().send_bot_help(mapping)
 
 
-# Bot Setup 
-
-bot = commands.Bot(
-    command_prefix='!',
-    intents=intents,
-    help_command=CustomHelpCommand()
-)
-
-
 # Cogs 
 
 class Setup(commands.Cog, name="Setup"):
@@ -69,20 +81,22 @@ class Setup(commands.Cog, name="Setup"):
                         "secrets are correct, check if your Ipv4 inbounds are open in your cloud instance for the port "
                         "reserved to databases 3306")
             print(f"This is the error message printed in console for more details: {err.args[1]}")
-        await ctx.send(response)
+        await outbound.send(ctx, response)
 
     @commands.command(name="register", help="Create your real estate property management DB account.")
     async def register_user(self, ctx, email=None, first_name=None, last_name=None):
+        from database import Tables
+        from models import find_registered_user, ModelFactory
         discord_id = ctx.author.id
 
-        existing_user = await Database.select_async(Query.REGISTERED_USER, (discord_id,))
+        existing_user = await find_registered_user(discord_id)
 
         if existing_user:
-            await ctx.send("You are already registered in the system.")
+            await outbound.send(ctx, "You are already registered in the system.")
             return
 
-        await ctx.send("Let's get you registered.\n"
-                       "Please enter your email:")
+        await outbound.send(ctx, "Let's get you registered.\n"
+                                 "Please enter your email:")
 
         def check(msg):
             return msg.author == ctx.author and msg.channel == ctx.channel
@@ -91,16 +105,16 @@ class Setup(commands.Cog, name="Setup"):
             email_msg = await self.bot.wait_for("message", timeout=60.0, check=check)
             email = email_msg.content.strip()
 
-            await ctx.send("Please enter your first name:")
+            await outbound.send(ctx, "Please enter your first name:")
             first_name_msg = await self.bot.wait_for("message", timeout=60.0, check=check)
             first_name = first_name_msg.content.strip()
 
-            await ctx.send("Please enter your last name:")
+            await outbound.send(ctx, "Please enter your last name:")
             last_name_msg = await self.bot.wait_for("message", timeout=60.0, check=check)
             last_name = last_name_msg.content.strip()
 
         except TimeoutError:
-            await ctx.send("Registration timed out. Please try again.")
+            await outbound.send(ctx, "Registration timed out. Please try again.")
             return
 
         new_user = {
@@ -112,27 +126,34 @@ class Setup(commands.Cog, name="Setup"):
         }
         registered_user = await asyncio.to_thread(ModelFactory.make, Tables.REGISTERED_USERS, new_user)
 
-        await ctx.send(f"Welcome, {registered_user.first_name}! Your Discord ID has been securely linked to your account.")
+        await outbound.send(ctx, f"Welcome, {registered_user.first_name}! Your Discord ID has been securely linked to your account.")
 
+    @requires_permission(Permission.MANAGE_DATA)
     @commands.command(name="create_sample", help="Create sample data set in your account for testing.")
     async def create_sample_data(self, ctx):
+        from database import Database, Query, Tables
+        from models import find_registered_user, invalidate_user_cache_async, getBy
         discord_id = ctx.author.id
 
-        existing_user = await Database.select_async(Query.REGISTERED_USER, (discord_id,))
+        existing_user = await find_registered_user(discord_id)
 
         if not existing_user:
             print("Account needed to create sample data - use !register to create an account.")
             return
 
         await Database.callprocedure_async(Query.PROC_CreateSampleUserData, (discord_id,))
+        await invalidate_user_cache_async(discord_id)
 
         user = await asyncio.to_thread(getBy, Tables.REGISTERED_USERS, discord_id)
-        await ctx.send(f"Sample data has been created for {user.full_name}")
+        await outbound.send(ctx, f"Sample data has been created for {user.full_name}")
 
+    @requires_permission(Permission.MANAGE_DATA)
     @commands.command(name="reset_user_data", help="Reset your data — clears all contents associated with your portfolio.")
     async def reset_user_data(self, ctx):
+        from database import Database, Query
+        from models import invalidate_user_cache_async
         discord_id = ctx.author.id
-        await ctx.send("Are you sure you want to reset your data? (y/n)")
+        await outbound.send(ctx, "Are you sure you want to reset your data? (y/n)")
 
         def check(msg):
             return msg.author == ctx.author and msg.channel == ctx.channel
@@ -140,14 +161,73 @@ class Setup(commands.Cog, name="Setup"):
         try:
             response_msg = await self.bot.wait_for("message", timeout=60.0, check=check)
         except TimeoutError:
-            await ctx.send("Timed out. Please try again.")
+            await outbound.send(ctx, "Timed out. Please try again.")
             return
 
         if response_msg.content.lower() == 'y':
             await Database.callprocedure_async(Query.PROC_ResetUserData, (discord_id,))
-            await ctx.send("User portfolio and associated contents have been reset.")
+            await invalidate_user_cache_async(discord_id)
+            await outbound.send(ctx, "User portfolio and associated contents have been reset.")
         else:
-            await ctx.send("Reset cancelled.")
+            await outbound.send(ctx, "Reset cancelled.")
+
+    # Payments and project updates are the high-volume appends: they go through the
+    # write-behind queue and are acknowledged once their batch has been committed.
+
+    @requires_permission(Permission.MANAGE_DATA)
+    @commands.command(name="record_payment", help="Record a tenant's payment, e.g. !record_payment 12 1500 or !record_payment 12 1500 2025-01-01 for a due date.")
+    async def record_payment(self, ctx, tenant_id: int = None, amount: float = None, due_date: str = None):
+        from datetime import date
+        from models import find_registered_user, record_payment
+        discord_id = ctx.author.id
+
+        existing_user = await find_registered_user(discord_id)
+
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to record payments. Use !register to create an account.")
+            return
+
+        usage = "Usage: !record_payment <tenant id> <amount> [due date YYYY-MM-DD]"
+        if tenant_id is None or amount is None or amount <= 0:
+            await outbound.send(ctx, usage)
+            return
+        try:
+            due = date.fromisoformat(due_date) if due_date else None
+        except ValueError:
+            await outbound.send(ctx, usage)
+            return
+
+        tenant = await record_payment(discord_id, tenant_id, amount, due)
+
+        if tenant is None:
+            await outbound.send(ctx, f"Tenant {tenant_id} is not in your portfolio.")
+            return
+
+        await outbound.send(ctx, f"Recorded a payment of ${amount:,.2f} from {tenant['first_name']} {tenant['last_name']}.")
+
+    @requires_permission(Permission.MANAGE_DATA)
+    @commands.command(name="project_update", help="Add a progress note to a project, e.g. !project_update 3 Drywall finished")
+    async def project_update(self, ctx, project_id: int = None, *, text=None):
+        from models import find_registered_user, add_project_update
+        discord_id = ctx.author.id
+
+        existing_user = await find_registered_user(discord_id)
+
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to update projects. Use !register to create an account.")
+            return
+
+        if project_id is None or not text:
+            await outbound.send(ctx, "Usage: !project_update <project id> <note>")
+            return
+
+        project = await add_project_update(discord_id, project_id, text)
+
+        if project is None:
+            await outbound.send(ctx, f"Project {project_id} is not in your portfolio.")
+            return
+
+        await outbound.send(ctx, f"Update added to \"{project['project_title']}\".")
 
 
 class Portfolio(commands.Cog, name="Portfolio"):
@@ -156,145 +236,422 @@ class Portfolio(commands.Cog, name="Portfolio"):
     def __init__(self, bot):
         self.bot = bot
 
+    @requires_permission(Permission.VIEW_PORTFOLIO)
     @commands.command(name="portfolio_performance", help="View your portfolio properties ordered by cash flow (lowest first).")
     async def portfolio_performance(self, ctx):
+        from models import find_registered_user, PortfolioPerformanceModel
+        from formatting import format_portfolio_performance
+        import compute
         discord_id = ctx.author.id
 
-        existing_user = await Database.select_async(Query.REGISTERED_USER, (discord_id,))
+        existing_user = await find_registered_user(discord_id)
 
         if not existing_user:
-            await ctx.send("You need to be registered to view portfolio performance. Use !register to create an account.")
+            await outbound.send(ctx, "You need to be registered to view portfolio performance. Use !register to create an account.")
             return
 
-        performance = await asyncio.to_thread(PortfolioPerformanceModel, discord_id)
+        performance = await PortfolioPerformanceModel.load_async(discord_id)
 
         if not performance.rows:
-            await ctx.send("No portfolio data found. Use !create_sample to add sample data.")
-            return
-
-        await ctx.send("**Portfolio Performance** — ordered by cash flow (worst to best):\n")
-
-        for i, row in enumerate(performance.rows, 1):
-            mortgage  = row.get("Mortgage") or 0
-            capex     = row.get("Capital_Expenditures") or 0
-            cash_flow = row.get("cash_flow") or 0
-            entry = (
-                f"**#{i} — {row.get('Address', 'N/A')}**\n"
-                f"  Property ID:    {row.get('Property_ID')}\n"
-                f"  Rental Income:  ${row.get('Rental_Income', 0):,.2f}\n"
-                f"  Mortgage:       ${mortgage:,.2f}\n"
-                f"  CapEx:          ${capex:,.2f}\n"
-                f"  Cash Flow:      ${cash_flow:,.2f}\n"
-                f"  Purchase Price: ${row.get('Purchase_Price', 0):,.2f}\n"
-                f"  ARV:            ${row.get('ARV', 0):,.2f}\n"
-            )
-            await ctx.send(entry)
+            await outbound.send(ctx, "No portfolio data found. Use !create_sample to add sample data.")
+            return
+
+        entries = await compute.run_rows(format_portfolio_performance, performance.rows)
+        await outbound.send_all(ctx, entries)
 
+    @requires_permission(Permission.VIEW_PORTFOLIO)
     @commands.command(name="view_tenants", help="View all tenants in your portfolio ordered by past due balance (highest first).")
     async def view_tenants(self, ctx):
+        from models import find_registered_user, ViewTenantsModel
+        from formatting import format_tenants
+        import compute
         discord_id = ctx.author.id
 
-        existing_user = await Database.select_async(Query.REGISTERED_USER, (discord_id,))
+        existing_user = await find_registered_user(discord_id)
 
         if not existing_user:
-            await ctx.send("You need to be registered to view tenants. Use !register to create an account.")
+            await outbound.send(ctx, "You need to be registered to view tenants. Use !register to create an account.")
             return
 
-        tenants = await asyncio.to_thread(ViewTenantsModel, discord_id)
+        tenants = await ViewTenantsModel.load_async(discord_id)
 
         if not tenants.rows:
-            await ctx.send("No tenant data found. Use !create_sample to add sample data.")
+            await outbound.send(ctx, "No tenant data found. Use !create_sample to add sample data.")
             return
 
-        await ctx.send("**Tenants** — ordered by past due balance (highest first):\n")
-
-        for i, row in enumerate(tenants.rows, 1):
-            past_due = row.get("past_due_balance") or 0
-            entry = (
-                f"**#{i} — {row.get('tenant_name', 'N/A')}**\n"
-                f"  Tenant ID:        {row.get('tenant_id')}\n"
-                f"  Unit ID:          {row.get('unit_id')}\n"
-                f"  Property Address: {row.get('property_address', 'N/A')}\n"
-                f"  Past Due Balance: ${past_due:,.2f}\n"
-            )
-            await ctx.send(entry)
+        entries = await compute.run_rows(format_tenants, tenants.rows)
+        await outbound.send_all(ctx, entries)
 
+    @requires_permission(Permission.VIEW_PORTFOLIO)
     @commands.command(name="view_mortgages", help="View all mortgages in your portfolio ordered by start date.")
     async def view_mortgages(self, ctx):
+        from models import find_registered_user, ViewMortgagesModel
+        from formatting import format_mortgages
+        import compute
         discord_id = ctx.author.id
 
-        existing_user = await Database.select_async(Query.REGISTERED_USER, (discord_id,))
+        existing_user = await find_registered_user(discord_id)
 
         if not existing_user:
-            await ctx.send("You need to be registered to view mortgages. Use !register to create an account.")
+            await outbound.send(ctx, "You need to be registered to view mortgages. Use !register to create an account.")
             return
 
-        mortgages = await asyncio.to_thread(ViewMortgagesModel, discord_id)
+        mortgages = await ViewMortgagesModel.load_async(discord_id)
 
         if not mortgages.rows:
-            await ctx.send("No mortgage data found. Use !create_sample to add sample data.")
-            return
-
-        await ctx.send("**Mortgages** — ordered by start date (totals row last):\n")
-
-        for row in mortgages.rows:
-            is_totals = row.get("mortgage_id") is None
-            if is_totals:
-                entry = (
-                    f"**— Totals —**\n"
-                    f"  Total Principal Balance: ${row.get('principal_balance', 0):,.2f}\n"
-                    f"  Total Monthly Payment:   ${row.get('monthly_payment', 0):,.2f}\n"
-                    f"  Total Purchase Price:    ${row.get('purchase_price', 0):,.2f}\n"
-                )
-            else:
-                entry = (
-                    f"**{row.get('lender_name', 'N/A')}** (ID: {row.get('mortgage_id')})\n"
-                    f"  Property:          {row.get('property_address', 'N/A')}\n"
-                    f"  Principal Balance: ${row.get('principal_balance', 0):,.2f}\n"
-                    f"  Interest Rate:     {row.get('interest_rate', 0)}%\n"
-                    f"  Monthly Payment:   ${row.get('monthly_payment', 0):,.2f}\n"
-                    f"  Term:              {row.get('start_date')} → {row.get('end_date')}\n"
-                    f"  Purchase Price:    ${row.get('purchase_price', 0):,.2f}\n"
-                )
-            await ctx.send(entry)
+            await outbound.send(ctx, "No mortgage data found. Use !create_sample to add sample data.")
+            return
 
+        entries = await compute.run_rows(format_mortgages, mortgages.rows)
+        await outbound.send_all(ctx, entries)
+
+    @requires_permission(Permission.VIEW_PORTFOLIO)
     @commands.command(name="view_projects", help="View all projects in your portfolio, in-progress projects first.")
     async def view_projects(self, ctx):
+        from models import find_registered_user, CurrentProjectsModel
+        from formatting import format_projects
+        import compute
         discord_id = ctx.author.id
 
-        existing_user = await Database.select_async(Query.REGISTERED_USER, (discord_id,))
+        existing_user = await find_registered_user(discord_id)
 
         if not existing_user:
-            await ctx.send("You need to be registered to view projects. Use !register to create an account.")
+            await outbound.send(ctx, "You need to be registered to view projects. Use !register to create an account.")
             return
 
-        projects = await asyncio.to_thread(CurrentProjectsModel, discord_id)
+        projects = await CurrentProjectsModel.load_async(discord_id)
 
         if not projects.rows:
-            await ctx.send("No project data found. Use !create_sample to add sample data.")
+            await outbound.send(ctx, "No project data found. Use !create_sample to add sample data.")
             return
 
-        await ctx.send("**Current Projects** — in-progress first:\n")
+        entries = await compute.run_rows(format_projects, projects.rows)
+        await outbound.send_all(ctx, entries)
 
-        for i, row in enumerate(projects.rows, 1):
-            status = "In Progress" if row.get("in_progress") else "Not In Progress"
-            entry = (
-                f"**#{i} — {row.get('numbered_street', 'N/A')}, {row.get('city', 'N/A')}**\n"
-                f"  Project:     {row.get('project', 'N/A')}\n"
-                f"  Status:      {status}\n"
-                f"  Description: {row.get('project_description', 'N/A')}\n"
-                f"  Contractor:  {row.get('contractor', 'N/A')} ({row.get('contractor_company', 'N/A')})\n"
-                f"  Services:    {row.get('services', 'N/A')}\n"
-            )
-            await ctx.send(entry)
+    @requires_permission(Permission.VIEW_PORTFOLIO)
+    @commands.command(name="search", help="Search your tenants, properties, projects and contractors, e.g. !search elm late")
+    async def search(self, ctx, *, text=None):
+        from models import find_registered_user
+        from formatting import format_search_results
+        from search import search_indexes
+        discord_id = ctx.author.id
 
+        existing_user = await find_registered_user(discord_id)
 
-# Register Cogs & Run
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to search. Use !register to create an account.")
+            return
+
+        if not text:
+            await outbound.send(ctx, "Usage: !search <words>, for example !search elm late")
+            return
 
-async def setup_hook():
-    await bot.add_cog(Setup(bot))
-    await bot.add_cog(Portfolio(bot))
+        results = await search_indexes.search(discord_id, text)
 
-bot.setup_hook = setup_hook
+        if not results:
+            await outbound.send(ctx, f"No matches for \"{text}\".")
+            return
+
+        await outbound.send_all(ctx, format_search_results(text, results))
+
+    @requires_permission(Permission.VIEW_PORTFOLIO)
+    @commands.command(name="cashflow_history", help="View your monthly income and expenses, e.g. !cashflow_history 24 for two years.")
+    async def cashflow_history(self, ctx, months: int = 12):
+        from models import find_registered_user, CashflowHistoryModel
+        from formatting import format_cashflow_history
+        discord_id = ctx.author.id
+
+        existing_user = await find_registered_user(discord_id)
+
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to view cash flow history. Use !register to create an account.")
+            return
+
+        if not 1 <= months <= 120:
+            await outbound.send(ctx, "Usage: !cashflow_history [months], with months between 1 and 120.")
+            return
 
-bot.run(TOKEN)
+        history = await CashflowHistoryModel.load_async(discord_id)
+
+        if not history.rows:
+            await outbound.send(ctx, "No payments or expenses found. Use !create_sample to add sample data.")
+            return
+
+        # A few hundred rollup rows at most, so they are formatted inline.
+        await outbound.send_all(ctx, format_cashflow_history(history.rows, months))
+
+    @requires_permission(Permission.VIEW_PORTFOLIO)
+    @commands.command(name="project_cashflow", help="Project your cash flow with vacancy and repair risk, e.g. !project_cashflow 24 for two years.")
+    async def project_cashflow(self, ctx, months: int = None):
+        from models import find_registered_user, ProjectionInputsModel
+        from formatting import format_cashflow_projection
+        import compute
+        import projection
+        discord_id = ctx.author.id
+        months = projection.PROJECTION_MONTHS if months is None else months
+
+        existing_user = await find_registered_user(discord_id)
+
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to project cash flow. Use !register to create an account.")
+            return
+
+        if not 1 <= months <= projection.MAX_PROJECTION_MONTHS:
+            await outbound.send(ctx, f"Usage: !project_cashflow [months], with months between 1 and {projection.MAX_PROJECTION_MONTHS}.")
+            return
+
+        if not projection.available():
+            await outbound.send(ctx, "Cash flow projections are not available: the bot needs NumPy installed.")
+            return
+
+        inputs = await ProjectionInputsModel.load_async(discord_id)
+
+        if not inputs.rows:
+            await outbound.send(ctx, "No portfolio data found. Use !create_sample to add sample data.")
+            return
+
+        # Tens of millions of draws for a large portfolio: always on the CPU pool.
+        result = await compute.run_cpu(projection.simulate, inputs.rows, months)
+        await outbound.send_all(ctx, format_cashflow_projection(inputs.rows, result))
+
+    @requires_permission(Permission.VIEW_PORTFOLIO)
+    @commands.command(name="occupancy", help="View occupancy, days vacant, turnover and upcoming lease ends for each property.")
+    async def occupancy(self, ctx):
+        from models import find_registered_user, OccupancyModel
+        from formatting import format_occupancy
+        import occupancy
+        discord_id = ctx.author.id
+
+        existing_user = await find_registered_user(discord_id)
+
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to view occupancy. Use !register to create an account.")
+            return
+
+        summary = await OccupancyModel.load_async(discord_id)
+
+        if not summary.rows:
+            await outbound.send(ctx, "No units found. Use !create_sample to add sample data.")
+            return
+
+        await outbound.send_all(ctx, format_occupancy(summary.rows, occupancy.WINDOW_DAYS))
+
+    @requires_permission(Permission.VIEW_PORTFOLIO)
+    @commands.command(name="contractors", help="View your contractors and their projects in progress (busiest first).")
+    async def contractors(self, ctx):
+        from models import find_registered_user
+        from formatting import format_contractor_workloads
+        from contractors import contractor_indexes
+        discord_id = ctx.author.id
+
+        existing_user = await find_registered_user(discord_id)
+
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to view contractors. Use !register to create an account.")
+            return
+
+        index = await contractor_indexes.index_for(discord_id)
+
+        if not index:
+            await outbound.send(ctx, "No contractors found. Use !create_sample to add sample data.")
+            return
+
+        await outbound.send_all(ctx, format_contractor_workloads(index.workloads()))
+
+    @requires_permission(Permission.VIEW_PORTFOLIO)
+    @commands.command(name="find_contractor", help="Find contractors offering a service, least busy first, e.g. !find_contractor plumbing")
+    async def find_contractor(self, ctx, *, service=None):
+        from models import find_registered_user
+        from formatting import format_contractor_matches
+        from contractors import contractor_indexes
+        discord_id = ctx.author.id
+
+        existing_user = await find_registered_user(discord_id)
+
+        if not existing_user:
+            await outbound.send(ctx, "You need to be registered to find contractors. Use !register to create an account.")
+            return
+
+        if not service:
+            await outbound.send(ctx, "Usage: !find_contractor <service>, for example !find_contractor plumbing")
+            return
+
+        matches = (await contractor_indexes.index_for(discord_id)).find(service)
+
+        if not matches:
+            await outbound.send(ctx, f"No contractors offer \"{service}\".")
+            return
+
+        await outbound.send_all(ctx, format_contractor_matches(service, matches))
+
+
+# Bot Setup, Register Cogs & Run
+
+def create_bot(timer=None, shard_ids=None, shard_count=None):
+    """
+    Builds the bot and wires its lifecycle: setup_hook warms the connection pools and caches
+    before the bot goes online, and close() flushes queued writes and closes the pools.
+    Nothing here touches Discord or the database until the bot is started.
+
+    With shard_count set, an AutoShardedBot is built that runs only shard_ids out of
+    shard_count total shards, so several processes can split the gateway load.
+    """
+    # Imported here so that importing main (e.g. from tests or tooling) stays side-effect free.
+    import startup
+    from authorization import role_sweeper
+    from changelog import ChangeLogTailer, changed_users
+    from contractors import contractor_indexes, CONTRACTOR_TABLES
+    from database import db_context
+    from ledger import ledger_archiver
+    from models import invalidate_user_cache_async
+    from reminders import DeadlineScheduler, DEADLINE_TABLES
+    from rollups import rollup_reconciler, ledger_rollup_reconciler
+    from search import search_indexes, SEARCH_TABLES
+    from snapshot import snapshot_writer
+    from write_queue import write_queue
+
+    timer = timer or startup.StartupTimer(_process_started)
+
+    # Setting up the bot with necessary intents to handle events and commands
+    intents = discord.Intents.all()  # Adjust the intents according to your bot's needs
+
+    if shard_count:
+        bot = commands.AutoShardedBot(
+            command_prefix='!',
+            intents=intents,
+            help_command=CustomHelpCommand(),
+            shard_ids=shard_ids,
+            shard_count=shard_count
+        )
+    else:
+        bot = commands.Bot(
+            command_prefix='!',
+            intents=intents,
+            help_command=CustomHelpCommand()
+        )
+
+    async def deliver_reminder(user_id, text):
+        user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+        await outbound.send(user, text, priority=BULK)
+
+    # Reminders are DMs, which any shard can send, so only the process running shard 0 sends them.
+    # The same process runs the other once-per-deployment jobs (rollup reconciliation).
+    bot.reminders = DeadlineScheduler(deliver_reminder)
+    primary_shard = not shard_ids or 0 in shard_ids
+
+    # Writes made by other workers, stored procedures or tools reach this process only through
+    # the change log; commands still invalidate their own user's cache immediately.
+    bot.changelog = ChangeLogTailer()
+
+    async def on_data_changed(changes):
+        for user_id in changed_users(changes):
+            await invalidate_user_cache_async(user_id)
+
+    def on_deadlines_changed(changes):
+        for user_id in changed_users(changes):
+            bot.reminders.refresh_user(user_id)
+
+    bot.changelog.subscribe(on_data_changed)
+    bot.changelog.subscribe(search_indexes.apply_changes, SEARCH_TABLES)
+    bot.changelog.subscribe(contractor_indexes.apply_changes, CONTRACTOR_TABLES)
+    if primary_shard:
+        bot.changelog.subscribe(on_deadlines_changed, DEADLINE_TABLES)
+
+    async def setup_hook():
+        await startup.warm_up(timer, bot.changelog)
+        write_queue.start()
+        role_sweeper.start()
+        bot.changelog.start()
+        snapshot_writer.start(bot.changelog)
+        if primary_shard:
+            bot.reminders.start()
+            rollup_reconciler.start()
+            ledger_rollup_reconciler.start()
+            ledger_archiver.start()
+        await bot.add_cog(Setup(bot))
+        await bot.add_cog(Portfolio(bot))
+
+    async def on_ready():
+        if not any(phase == "ready" for phase, _ in timer.phases):
+            timer.mark("ready")
+            print(timer.summary())
+
+    async def on_first_command(ctx):
+        timer.mark("first command")
+        print(f"Time to first command: {timer.total() * 1000:.0f}ms")
+        bot.remove_listener(on_first_command, "on_command_completion")
+
+    async def on_command_error(ctx, error):
+        if isinstance(error, RoleNotPermitted):
+            await outbound.send(ctx, str(error))
+            return
+        # Registering this listener replaces discord.py's default handler, so keep its traceback output.
+        import traceback
+        print(f"Ignoring exception in command {ctx.command}:")
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+    _bot_invoke = bot.invoke
+
+    async def invoke(ctx):
+        # Attribute the command's DB work to its user and guild for fair scheduling.
+        with db_context(user=ctx.author.id, guild=ctx.guild.id if ctx.guild else None):
+            await _bot_invoke(ctx)
+
+    bot.setup_hook = setup_hook
+    bot.invoke = invoke
+    bot.add_listener(on_command_error, "on_command_error")
+    bot.add_listener(on_ready, "on_ready")
+    bot.add_listener(on_first_command, "on_command_completion")
+
+    _bot_close = bot.close
+
+    async def close():
+        # Deliver queued replies and flush buffered write-behind rows before the event loop goes away.
+        await bot.changelog.close()
+        await bot.reminders.close()
+        await outbound.close()
+        await write_queue.close()
+        await role_sweeper.close()
+        await rollup_reconciler.close()
+        await ledger_rollup_reconciler.close()
+        await ledger_archiver.close()
+        await snapshot_writer.close()
+        await startup.shut_down(bot.changelog)
+        await _bot_close()
+
+    bot.close = close
+    return bot
+
+
+def run_worker(shard_ids=None, shard_count=None):
+    """
+    Runs one bot process. Called directly by main() or by supervisor.py for each worker,
+    which passes the worker's shard range and points it at the shared cache tier via env.
+    """
+    import cache
+    import signal
+    import startup
+    timer = startup.StartupTimer(_process_started)
+    timer.mark("imports")
+    cache.configure_from_env()
+
+    def _interrupt(*_):
+        # bot.run() treats KeyboardInterrupt as a clean shutdown and awaits bot.close(),
+        # so SIGTERM from the supervisor (or a container runtime) still flushes queued writes.
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    # Add your Discord bot token to your project's environment variables using the secret key: 'DISCORD_TOKEN'
+    token = os.environ["DISCORD_TOKEN"]
+    create_bot(timer, shard_ids, shard_count).run(token)
+
+
+def main():
+    # Optional: SHARD_COUNT=8 SHARD_IDS=0,1,2,3 runs this process as part of a sharded deployment.
+    shard_count = int(os.environ["SHARD_COUNT"]) if os.environ.get("SHARD_COUNT") else None
+    shard_ids = [int(i) for i in os.environ["SHARD_IDS"].split(",")] if os.environ.get("SHARD_IDS") else None
+    run_worker(shard_ids, shard_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Online schema migrations, run from the command line while the bot keeps serving:
+
+    python "Python Files/migrations.py" status
+    python "Python Files/migrations.py" apply [up_to_version]
+
+A Migration is a numbered list of steps; pending migrations are applied in version order.
+Progress is written to SchemaMigrations after every step and every batch, so a migration
+stopped at any point (a deploy, a crash, Ctrl-C) resumes from its last finished batch when
+apply is run again.
+
+No step holds a lock on a whole table for longer than one short statement:
+  * Statement runs one DDL statement. On MySQL, ALTERs of the tenant and payment tables must
+    say LOCK=NONE or ALGORITHM=INSTANT, so the server refuses a locking table copy instead of
+    quietly blocking writes. Every DDL statement waits at most MIGRATION_LOCK_WAIT seconds for
+    its metadata lock and is then retried, so it never queues the bot's queries behind it.
+  * Backfill runs an UPDATE over keyset batches (key > last ORDER BY key LIMIT n), one short
+    transaction per batch, pausing between batches and halving them when they run slow.
+  * copy_swap() rebuilds a table MySQL cannot alter in place: the change is made on an empty
+    shadow copy, triggers mirror live writes into it while the rows are copied over in
+    batches, and RENAME TABLE swaps it in atomically.
+
+Migrations are written for MySQL. On SQLite (a single-node file with no concurrent server
+clients) each step runs its optional SQLite statement instead, and new SQLite files get the
+latest schema from sqlite_schema.sql. A migration's change also goes into databasemodel.sql
+and sqlite_schema.sql, which record its version in SchemaMigrations so new databases skip it.
+
+Example:
+
+    Migration(1, "Tenant contact email",
+              Statement("ALTER TABLE Tenants ADD COLUMN email VARCHAR(100) NULL, ALGORITHM=INSTANT",
+                        sqlite="ALTER TABLE Tenants ADD COLUMN email VARCHAR(100) NULL"),
+              Backfill("Tenants", "tenant_id", "UPDATE Tenants SET email = ... "
+                       "WHERE tenant_id > %s AND tenant_id <= %s"))
+"""
+
+import os
+import re
+import sys
+import time
+import pymysql
+from database import Database, Query
+
+MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "1000"))
+MIGRATION_PAUSE_SECONDS = float(os.environ.get("MIGRATION_PAUSE_SECONDS", "0.05"))
+# Batches slower than this are halved (down to MIN_BATCH_SIZE); fast ones grow back to the batch size.
+MIGRATION_BATCH_SECONDS = float(os.environ.get("MIGRATION_BATCH_SECONDS", "0.5"))
+MIGRATION_LOCK_WAIT = int(os.environ.get("MIGRATION_LOCK_WAIT", "5"))
+MIGRATION_DDL_RETRIES = 10
+MIN_BATCH_SIZE = 10
+PROGRESS_SECONDS = 10.0
+
+# Tables the bot writes all the time: ALTERs of these must not lock them.
+ONLINE_TABLES = frozenset({"Tenants", "UnitTenants", "LeaseAgreements", "PaymentHistories"})
+
+LOCK_WAIT_TIMEOUT = 1205  # MySQL error code, for row and metadata lock waits alike
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+_ALTER_TABLE = re.compile(r"\s*ALTER\s+TABLE\s+`?(\w+)`?", re.IGNORECASE)
+_NON_LOCKING = re.compile(r"\bLOCK\s*=\s*NONE\b|\bALGORITHM\s*=\s*INSTANT\b", re.IGNORECASE)
+
+
+def identifier(name):
+    """name, if it is a plain table or column name that can be put into SQL text."""
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise ValueError(f"Not a plain table or column name: {name!r}")
+    return name
+
+
+class Statement:
+    """One DDL statement. sqlite is its SQLite version: None for the same text, "" to skip it there."""
+
+    def __init__(self, sql, sqlite=None):
+        match = _ALTER_TABLE.match(sql)
+        if match and match.group(1) in ONLINE_TABLES and not _NON_LOCKING.search(sql):
+            raise ValueError(f"ALTER TABLE {match.group(1)} must be LOCK=NONE or ALGORITHM=INSTANT; "
+                             "use copy_swap() for changes MySQL cannot make in place")
+        self.sql = sql
+        self.sqlite = sql if sqlite is None else sqlite
+
+    def describe(self):
+        return " ".join(self.sql.split())
+
+    def run(self, runner, last_key):
+        if runner.dialect == "mysql":
+            runner.ddl(self.sql)
+        elif self.sqlite:
+            runner.ddl(self.sqlite)
+
+
+class Backfill:
+    """
+    Runs update over table in keyset batches of its integer key column. update takes the
+    batch's key range (after, up_to] as its two parameters, e.g.
+        UPDATE Tenants SET ... WHERE tenant_id > %s AND tenant_id <= %s
+    """
+
+    def __init__(self, table, key, update):
+        self.table = identifier(table)
+        self.key = identifier(key)
+        self.update = update
+
+    def describe(self):
+        return f"backfill {self.table} by {self.key}"
+
+    def run(self, runner, last_key):
+        runner.batches(self.table, self.key, last_key,
+                       lambda tx, after, up_to: tx.update(self.update, (after, up_to)))
+
+
+def copy_swap(table, key, alter, sqlite=None):
+    """
+    The steps that rebuild table with alter (what follows ALTER TABLE, e.g. "MODIFY notes TEXT")
+    through a shadow copy, for changes MySQL cannot make in place. sqlite is run instead on SQLite.
+
+    Between the swap and the re-creation of the table's own triggers on the new table there is a
+    window of a few statements in which writes are not seen by those triggers; the rollups they
+    maintain are repaired by the reconciler, and cached rows expire.
+    """
+    table, key = identifier(table), identifier(key)
+    return [_CreateShadow(table, alter, sqlite), _MirrorWrites(table, key), _CopyRows(table, key),
+            _SwapIn(table), _DropOld(table)]
+
+
+def _shadow(table):
+    return f"{table}__new"
+
+
+def _old(table):
+    return f"{table}__old"
+
+
+def _mirror_triggers(table):
+    return {event: f"{table}__mirror_{event.lower()}" for event in ("INSERT", "UPDATE", "DELETE")}
+
+
+class _CreateShadow:
+
+    def __init__(self, table, alter, sqlite):
+        self.table, self.alter, self.sqlite = table, alter, sqlite
+
+    def describe(self):
+        return f"create {_shadow(self.table)}: {' '.join(self.alter.split())}"
+
+    def run(self, runner, last_key):
+        if runner.dialect != "mysql":
+            if self.sqlite:
+                runner.ddl(self.sqlite)
+            return
+        shadow = _shadow(self.table)
+        runner.ddl(f"DROP TABLE IF EXISTS {shadow}",
+                   f"CREATE TABLE {shadow} LIKE {self.table}",
+                   f"ALTER TABLE {shadow} {self.alter}")
+
+
+class _MirrorWrites:
+    """Triggers copying every write to the table into the shadow table while its rows are copied."""
+
+    def __init__(self, table, key):
+        self.table, self.key = table, key
+
+    def describe(self):
+        return f"mirror writes to {self.table} into {_shadow(self.table)}"
+
+    def run(self, runner, last_key):
+        if runner.dialect != "mysql":
+            return
+        table, key, shadow = self.table, self.key, _shadow(self.table)
+        columns = runner.common_columns(table, shadow)
+        names = ", ".join(columns)
+        values = ", ".join(f"NEW.{column}" for column in columns)
+        triggers = _mirror_triggers(table)
+        runner.ddl(
+            *(f"DROP TRIGGER IF EXISTS {name}" for name in triggers.values()),
+            f"CREATE TRIGGER {triggers['INSERT']} AFTER INSERT ON {table} FOR EACH ROW "
+            f"REPLACE INTO {shadow} ({names}) VALUES ({values})",
+            f"CREATE TRIGGER {triggers['UPDATE']} AFTER UPDATE ON {table} FOR EACH ROW BEGIN "
+            f"DELETE FROM {shadow} WHERE {key} = OLD.{key}; "
+            f"REPLACE INTO {shadow} ({names}) VALUES ({values}); END",
+            f"CREATE TRIGGER {triggers['DELETE']} AFTER DELETE ON {table} FOR EACH ROW "
+            f"DELETE FROM {shadow} WHERE {key} = OLD.{key}")
+
+
+class _CopyRows:
+
+    def __init__(self, table, key):
+        self.table, self.key = table, key
+
+    def describe(self):
+        return f"copy {self.table} into {_shadow(self.table)}"
+
+    def run(self, runner, last_key):
+        if runner.dialect != "mysql":
+            return
+        shadow = _shadow(self.table)
+        copy = Query.MIGRATION_COPY_ROWS.format(
+            shadow=shadow, table=self.table, key=self.key,
+            columns=", ".join(runner.common_columns(self.table, shadow)))
+        runner.batches(self.table, self.key, last_key, lambda tx, after, up_to: tx.insert(copy, (after, up_to)))
+
+
+class _SwapIn:
+    """
+    Renames the shadow table into place, then moves what stayed with the old table: its
+    triggers, its foreign keys and other tables' foreign keys to it. Every part is skipped
+    once done, so a swap interrupted halfway is finished by running it again.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def describe(self):
+        return f"swap {_shadow(self.table)} in for {self.table}"
+
+    def run(self, runner, last_key):
+        if runner.dialect != "mysql":
+            return
+        table, old, shadow = self.table, _old(self.table), _shadow(self.table)
+        if runner.table_exists(shadow):
+            runner.ddl(f"RENAME TABLE {table} TO {old}, {shadow} TO {table}")
+        runner.ddl(*(f"DROP TRIGGER IF EXISTS {name}" for name in _mirror_triggers(table).values()))
+        for trigger in runner.select(Query.MIGRATION_TABLE_TRIGGERS, (old,)):
+            runner.ddl(f"DROP TRIGGER {trigger['name']}",
+                       f"CREATE TRIGGER {trigger['name']} {trigger['timing']} {trigger['event']} ON {table} "
+                       f"FOR EACH ROW {trigger['body']}")
+        for key in runner.select(Query.MIGRATION_FOREIGN_KEYS, (old, old)):
+            owner = table if key["table_name"] == old else key["table_name"]
+            referenced = table if key["referenced_table"] == old else key["referenced_table"]
+            runner.ddl(f"ALTER TABLE {key['table_name']} DROP FOREIGN KEY {key['name']}",
+                       f"ALTER TABLE {owner} ADD CONSTRAINT {key['name']} FOREIGN KEY ({key['columns']}) "
+                       f"REFERENCES {referenced} ({key['referenced_columns']}) "
+                       f"ON DELETE {key['delete_rule']} ON UPDATE {key['update_rule']}, ALGORITHM=INPLACE, LOCK=NONE",
+                       foreign_key_checks=False)
+
+
+class _DropOld:
+
+    def __init__(self, table):
+        self.table = table
+
+    def describe(self):
+        return f"drop {_old(self.table)}"
+
+    def run(self, runner, last_key):
+        if runner.dialect == "mysql":
+            runner.ddl(f"DROP TABLE IF EXISTS {_old(self.table)}")
+
+
+class Migration:
+    """A numbered schema change: its steps run in order, each resumable (see the module docstring)."""
+
+    def __init__(self, version, name, *steps):
+        self.version = version
+        self.name = name
+        self.steps = []
+        for step in steps:
+            self.steps.extend(step if isinstance(step, list) else [step])
+
+
+# Every migration, in any order; versions are unique and never reused. Apply them before
+# re-running business_requirements.sql, whose procedures and triggers use the new columns.
+MIGRATIONS = [
+    Migration(1, "Mortgaged purchase price rollup",
+              Statement("ALTER TABLE Portfolios ADD COLUMN mortgaged_purchase_price DOUBLE NOT NULL DEFAULT 0 "
+                        "AFTER total_purchase_price, ALGORITHM=INSTANT",
+                        sqlite="ALTER TABLE Portfolios ADD COLUMN mortgaged_purchase_price DOUBLE NOT NULL DEFAULT 0"),
+              Backfill("Portfolios", "portfolio_id", Query.BACKFILL_MORTGAGED_PURCHASE_PRICE)),
+]
+
+
+class MigrationRunner:
+    """Applies pending migrations, recording each step and batch in SchemaMigrations."""
+
+    def __init__(self, migrations=None, batch_size=MIGRATION_BATCH_SIZE, pause=MIGRATION_PAUSE_SECONDS,
+                 batch_seconds=MIGRATION_BATCH_SECONDS, lock_wait=MIGRATION_LOCK_WAIT):
+        migrations = MIGRATIONS if migrations is None else migrations
+        versions = [migration.version for migration in migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError(f"Duplicate migration versions in {sorted(versions)}")
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.batch_seconds = batch_seconds
+        self.lock_wait = lock_wait
+        self.dialect = Database.dialect()
+        # The migration and step running, and that migration's rows done so far.
+        self.migration = None
+        self.step = 0
+        self.rows_done = 0
+
+    def select(self, query, values=None):
+        return Database.select(query, values, primary=True) or []
+
+    def status(self):
+        """(migration, its SchemaMigrations row or None if never started) for every migration."""
+        rows = {row["version"]: row for row in self.select(Query.SCHEMA_MIGRATIONS)}
+        return [(migration, rows.get(migration.version)) for migration in self.migrations]
+
+    def pending(self):
+        return [migration for migration, row in self.status() if row is None or row["finished_at"] is None]
+
+    def apply(self, up_to=None):
+        """Applies (or resumes) every pending migration up to version up_to. Returns the versions applied."""
+        applied = []
+        for migration in self.pending():
+            if up_to is not None and migration.version > up_to:
+                break
+            self.apply_migration(migration)
+            applied.append(migration.version)
+        return applied
+
+    def apply_migration(self, migration):
+        Database.insert(Query.START_SCHEMA_MIGRATION, (migration.version, migration.name))
+        row = next(row for row in self.select(Query.SCHEMA_MIGRATIONS) if row["version"] == migration.version)
+        self.migration, self.rows_done = migration, row["rows_done"]
+        last_key = row["last_key"]
+        total = len(migration.steps)
+        if row["step"] or last_key is not None:
+            print(f"Resuming migration {migration.version} at step {row['step'] + 1}/{total}")
+        for index in range(row["step"], total):
+            step = migration.steps[index]
+            self.step = index
+            print(f"Migration {migration.version} ({migration.name}) step {index + 1}/{total}: {step.describe()}")
+            step.run(self, last_key)
+            last_key = None
+            Database.update(Query.SAVE_SCHEMA_MIGRATION, (index + 1, None, self.rows_done, migration.version))
+        Database.update(Query.FINISH_SCHEMA_MIGRATION, (migration.version,))
+        print(f"Migration {migration.version} ({migration.name}) applied; {self.rows_done} rows changed")
+
+    def batches(self, table, key, last_key, apply):
+        """
+        Calls apply(tx, after, up_to) for table's rows in keyset batches of key, starting after
+        last_key. Each batch runs in its own transaction together with the progress update,
+        so a batch is recorded as done exactly when its changes are committed.
+        """
+        batch_end = Query.MIGRATION_BATCH_END.format(table=table, key=key)
+        max_key = self.select(Query.TABLE_MAX_KEY.format(table=table, key=key))[0]["max_key"]
+        after = 0 if last_key is None else last_key
+        size = self.batch_size
+        reported = time.monotonic()
+        while True:
+            started = time.monotonic()
+            with Database.transaction() as tx:
+                batch = tx.select(batch_end, (after, size))[0]
+                if batch["batch_end"] is None:
+                    return
+                apply(tx, after, batch["batch_end"])
+                self.rows_done += batch["batch_rows"]
+                tx.update(Query.SAVE_SCHEMA_MIGRATION,
+                          (self.step, batch["batch_end"], self.rows_done, self.migration.version))
+            after = batch["batch_end"]
+            elapsed = time.monotonic() - started
+            if elapsed > self.batch_seconds:
+                size = max(MIN_BATCH_SIZE, size // 2)
+            elif elapsed < self.batch_seconds / 4:
+                size = min(self.batch_size, size * 2)
+            if time.monotonic() - reported >= PROGRESS_SECONDS:
+                reported = time.monotonic()
+                done = f" of {max_key} ({100 * after / max_key:.0f}%)" if max_key else ""
+                print(f"  {table}: {key} {after}{done}, {self.rows_done} rows, batches of {size}")
+            time.sleep(self.pause)
+
+    def ddl(self, *statements, foreign_key_checks=True):
+        """
+        Runs DDL statements one at a time. On MySQL each waits at most lock_wait seconds for
+        its metadata lock and is retried with a backoff, rather than holding up every query
+        on the table while it waits.
+        """
+        for statement in statements:
+            for attempt in range(MIGRATION_DDL_RETRIES):
+                try:
+                    self._run_ddl(statement, foreign_key_checks)
+                    break
+                except pymysql.err.OperationalError as err:
+                    if err.args[0] != LOCK_WAIT_TIMEOUT or attempt == MIGRATION_DDL_RETRIES - 1:
+                        raise
+                    print(f"  Table busy, retrying: {' '.join(statement.split())[:80]}")
+                    time.sleep(min(2 ** attempt, 30))
+
+    def _run_ddl(self, statement, foreign_key_checks):
+        if self.dialect != "mysql":
+            Database.update(statement)
+            return
+        with Database.transaction() as tx:
+            tx.update(Query.SET_MIGRATION_SESSION, (self.lock_wait, int(foreign_key_checks)))
+            try:
+                tx.update(statement)
+            finally:
+                tx.update(Query.RESET_MIGRATION_SESSION)
+
+    def table_exists(self, table):
+        return self.select(Query.MIGRATION_TABLE_EXISTS, (table,))[0]["found"] > 0
+
+    def common_columns(self, table, other):
+        """table's columns that other has too, in table's order; generated columns are left out."""
+        theirs = {row["name"] for row in self.select(Query.MIGRATION_TABLE_COLUMNS, (other,))}
+        return [identifier(row["name"]) for row in self.select(Query.MIGRATION_TABLE_COLUMNS, (table,))
+                if row["name"] in theirs]
+
+
+def describe_state(migration, row):
+    if row is None:
+        return "pending"
+    if row["finished_at"] is not None:
+        return f"applied {row['finished_at']}"
+    at = f", after key {row['last_key']}" if row["last_key"] is not None else ""
+    return f"stopped at step {row['step'] + 1}/{len(migration.steps)}{at}, {row['rows_done']} rows done"
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "status"
+    if command not in ("status", "apply"):
+        print('Usage: python "Python Files/migrations.py" status | apply [up_to_version]')
+        return 2
+    try:
+        runner = MigrationRunner()
+        if command == "status":
+            for migration, row in runner.status():
+                print(f"{migration.version:>5}  {migration.name:<40} {describe_state(migration, row)}")
+            if not runner.migrations:
+                print("No migrations defined")
+        else:
+            applied = runner.apply(int(argv[2]) if len(argv) > 2 else None)
+            print(f"Applied migrations {', '.join(map(str, applied))}" if applied else "No pending migrations")
+    finally:
+        Database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,4 +1,8 @@
+from datetime import date
 from database import *
+from write_queue import write_queue
+import cache
+import occupancy
 
 class ModelInterface:
 
@@ -86,6 +90,59 @@ class ModelFactory:
         
         return getBy(table_identifier, data["tracking_id"])
 
+async def find_registered_user(discord_id):
+    """
+    Returns the RegisteredUsers row for discord_id, or None if the user is not registered.
+    Rows are served from the registered-user cache when possible; only hits are cached.
+    """
+    row = await cache.run_async(cache.registered_users.get, discord_id)
+    if row is not None:
+        return row
+    data = await Database.select_async(Query.REGISTERED_USER, (discord_id,))
+    if not data:
+        return None
+    await cache.run_async(cache.registered_users.set, discord_id, data[0])
+    return data[0]
+
+def invalidate_user_cache(user_id):
+    """Drops the cached user row and view results for user_id after their data changed."""
+    cache.registered_users.delete(user_id)
+    for view_model in UserViewModel.__subclasses__():
+        cache.view_results.delete((view_model.__name__, user_id))
+
+async def invalidate_user_cache_async(user_id):
+    """invalidate_user_cache() for coroutines; a shared cache tier is updated off the event loop."""
+    await cache.run_async(invalidate_user_cache, user_id)
+
+async def record_payment(user_id, tenant_id, amount, due_date=None, paid_date=None):
+    """
+    Appends a payment by one of the user's tenants through the write-behind queue and returns
+    the tenant's row once it is committed, or None if the tenant is not in the user's portfolio.
+    Both dates default to today.
+    """
+    rows = await Database.select_async(Query.TENANT_UNIT_BY_USER, (user_id, tenant_id))
+    if not rows:
+        return None
+    today = date.today()
+    await write_queue.write(Tables.PAYMENT_HISTORIES, {
+        "amount": amount, "paid_date": paid_date or today, "due_date": due_date or today,
+        "unit_id": rows[0]["unit_id"], "tenant_id": tenant_id})
+    await invalidate_user_cache_async(user_id)
+    return rows[0]
+
+async def add_project_update(user_id, project_id, text, on=None):
+    """
+    Appends a progress note to one of the user's projects through the write-behind queue and
+    returns the project's row once it is committed, or None if the project is not the user's.
+    """
+    rows = await Database.select_async(Query.PROJECT_BY_USER, (user_id, project_id))
+    if not rows:
+        return None
+    await write_queue.write(Tables.PROJECT_UPDATES, {"project_id": project_id, "updates": text,
+                                                    "date": on or date.today()})
+    await invalidate_user_cache_async(user_id)
+    return rows[0]
+
 @staticmethod
 def getBy(table_identifier, entity_identifier):
 
@@ -191,7 +248,7 @@ class ExpenseHistoryModel(ModelInterface):
         self._load()
 
     def _load(self):
-        data = Database.select(Query.EXPENSE_HISTORY, (self.expense_id,))
+        data = Database.select(Query.EXPENSE_HISTORY, (self.expense_id,) * 2)
         if not data:
             return
 
@@ -319,7 +376,7 @@ class PaymentHistoryModel(ModelInterface):
         self._load()
 
     def _load(self):
-        data = Database.select(Query.PAYMENT_HISTORY, (self.history_id,))
+        data = Database.select(Query.PAYMENT_HISTORY, (self.history_id,) * 2)
         if not data:
             return
 
@@ -353,9 +410,18 @@ class PortfolioPropertyModel(ModelInterface):
 
 class PortfolioModel(ModelInterface):
 
+    # The counts and totals are rollups kept current by triggers (Business Requirement #8),
+    # so a portfolio summary is this one row; last_appraised_val is the total appraised value.
+
     def __init__(self, portfolio_id):
         self.portfolio_id = portfolio_id
         self.num_properties = None
+        self.num_mortgages = None
+        self.total_rent = None
+        self.total_mortgage_payment = None
+        self.total_principal = None
+        self.total_capex = None
+        self.total_purchase_price = None
         self.last_appraised_val = None
         self._load()
 
@@ -366,6 +432,12 @@ class PortfolioModel(ModelInterface):
 
         row = data[0]
         self.num_properties = row.get("num_properties")
+        self.num_mortgages = row.get("num_mortgages")
+        self.total_rent = row.get("total_rent")
+        self.total_mortgage_payment = row.get("total_mortgage_payment")
+        self.total_principal = row.get("total_principal")
+        self.total_capex = row.get("total_capex")
+        self.total_purchase_price = row.get("total_purchase_price")
         self.last_appraised_val = row.get("last_appraised_val")
 
 
@@ -653,69 +725,144 @@ class UserPortfolioModel(ModelInterface):
         self.last_appraised_val = row.get("last_appraised_val")
 
 
-class CurrentProjectsModel(ModelInterface):
-    # Queries the CurrentProjects view and holds all rows for a given user,
-    # ordered by in-progress status first, then by address.
+class UserViewModel(ModelInterface):
+    # Base for the per-user view models below. Each subclass names the Query it reads and
+    # holds all matching rows for one user. load_async() builds the model through
+    # Database.select_async, so identical concurrent requests share a single query.
+
+    QUERY = None
 
-    def __init__(self, user_id):
+    def __init__(self, user_id, rows=None):
         self.user_id = user_id
         self.rows = []
-        self._load()
+        if rows is None:
+            self._load()
+        elif rows:
+            self.rows = rows
 
     def _load(self):
-        data = Database.select(Query.CURRENT_PROJECTS_BY_USER, (self.user_id,))
+        data = Database.select(self.QUERY, (self.user_id,))
         if not data:
             return
 
-        self.rows = data
+        self.rows = self.complete_rows(data)
 
+    @classmethod
+    def complete_rows(cls, rows):
+        # Hook for models that derive extra rows (such as a totals row) from the queried ones.
+        return rows
 
-class ViewMortgagesModel(ModelInterface):
-    # Queries the ViewMortgages view and holds all rows for a given user,
-    # ordered by start date ascending with the totals row last.
+    @classmethod
+    async def load_async(cls, user_id):
+        # View results are cached per user (shared across worker processes when a shared
+        # cache tier is configured) and dropped by invalidate_user_cache() on writes.
+        key = (cls.__name__, user_id)
+        rows = await cache.run_async(cache.view_results.get, key)
+        if rows is None:
+            rows = cls.complete_rows(await Database.select_async(cls.QUERY, (user_id,)) or [])
+            await cache.run_async(cache.view_results.set, key, rows)
+        return cls(user_id, rows=list(rows))
 
-    def __init__(self, user_id):
-        self.user_id = user_id
-        self.rows = []
-        self._load()
 
-    def _load(self):
-        data = Database.select(Query.MORTGAGES_BY_USER, (self.user_id,))
-        if not data:
-            return
+class CurrentProjectsModel(UserViewModel):
+    # Queries the CurrentProjects view and holds all rows for a given user,
+    # ordered by in-progress status first, then by address.
 
-        self.rows = data
+    QUERY = Query.CURRENT_PROJECTS_BY_USER
+
+
+class ViewMortgagesModel(UserViewModel):
+    # Holds the same rows as the ViewMortgages view for a given user: mortgages ordered by
+    # start date ascending with the totals row last. The detail rows are read in one pass
+    # and the totals row is summed from them here rather than by a second grouped join.
+
+    QUERY = Query.MORTGAGE_DETAILS_BY_USER
+
+    @classmethod
+    def complete_rows(cls, rows):
+        if not rows:
+            return rows
+        totals = mortgage_totals(rows)
+        for row in rows:
+            for column in MORTGAGE_ROW_KEYS:
+                del row[column]
+        return rows + [totals]
+
+
+# Columns of Query.MORTGAGE_DETAILS_BY_USER that identify a row's mortgage and purchase record
+# within a portfolio; they are used for the totals and are not part of the view's rows.
+MORTGAGE_ROW_KEYS = ("portfolio_property_id", "history_id")
+
+
+def mortgage_totals(rows):
+    """
+    The ViewMortgages totals row for a user's mortgage detail rows, matching the portfolio
+    rollups it is read from. A detail row is one mortgage and one purchase record of a property
+    in a portfolio, so each mortgage's balance and payment are counted once per portfolio
+    however many purchase records its property has, and each purchase price once however many
+    mortgages. Missing values count as 0, as they do in the rollups.
+    """
+    principal = payment = purchase = 0.0
+    mortgages, purchases = set(), set()
+    for row in rows:
+        mortgage = (row["portfolio_property_id"], row["mortgage_id"])
+        if mortgage not in mortgages:
+            mortgages.add(mortgage)
+            principal += row["principal_balance"] or 0.0
+            payment += row["monthly_payment"] or 0.0
+        record = (row["portfolio_property_id"], row["history_id"])
+        if record not in purchases:
+            purchases.add(record)
+            purchase += row["purchase_price"] or 0.0
+    return {
+        "user_id": rows[0]["user_id"],
+        "mortgage_id": None,
+        "lender_name": "Total",
+        "principal_balance": principal,
+        "interest_rate": None,
+        "monthly_payment": payment,
+        "start_date": None,
+        "end_date": None,
+        "purchase_price": purchase,
+        "property_address": None,
+        "registered_user": rows[0]["registered_user"],
+    }
 
 
-class ViewTenantsModel(ModelInterface):
+class ViewTenantsModel(UserViewModel):
     # Queries the ViewTenants view and holds all rows for a given user,
     # ordered by past due balance descending (highest first).
 
-    def __init__(self, user_id):
-        self.user_id = user_id
-        self.rows = []
-        self._load()
-
-    def _load(self):
-        data = Database.select(Query.TENANTS_BY_USER, (self.user_id,))
-        if not data:
-            return
-
-        self.rows = data
+    QUERY = Query.TENANTS_BY_USER
 
 
-class PortfolioPerformanceModel(ModelInterface):
+class PortfolioPerformanceModel(UserViewModel):
     # Queries the PortfolioPerformance view and holds all rows for a given user,
     # ordered by cash flow ascending (worst performers first).
 
-    def __init__(self, user_id):
-        self.user_id = user_id
-        self.rows = []
-        self._load()
+    QUERY = Query.PORTFOLIO_PERFORMANCE_BY_USER
 
-    def _load(self):
-        data = Database.select(Query.PORTFOLIO_PERFORMANCE_BY_USER, (self.user_id,))
-        if not data:
-            return
 
-        self.rows = data
+class CashflowHistoryModel(UserViewModel):
+    # Holds a user's monthly income and expense totals per category, summed over their
+    # properties from the LedgerRollups table, ordered by month ascending.
+
+    QUERY = Query.CASHFLOW_HISTORY_BY_USER
+
+
+class ProjectionInputsModel(UserViewModel):
+    # Holds one row per property of a user with its monthly rent, mortgage, capex, tax and
+    # insurance and its unit counts, the inputs of the !project_cashflow simulation.
+
+    QUERY = Query.PROJECTION_INPUTS_BY_USER
+
+
+class OccupancyModel(UserViewModel):
+    # Holds a user's occupancy summary: one row per property with units, built from the lease
+    # timelines of its units (see occupancy.py), followed by the portfolio row.
+
+    QUERY = Query.UNIT_LEASES_BY_USER
+
+    @classmethod
+    def complete_rows(cls, rows):
+        return occupancy.occupancy(rows)
@@ -0,0 +1,126 @@
+"""
+Unit occupancy from lease timelines, for the !occupancy command.
+
+Units.vacant only says whether a unit is vacant right now. The leases linked to a unit through
+UnitTenants say when it was occupied: occupancy() turns them into one sorted list of
+occupied intervals per unit and sweeps those lists once, so the cost grows with the number of
+leases rather than the number of days covered.
+
+For each property, and for the portfolio as a whole, it reports over the last WINDOW_DAYS:
+  * the occupancy rate (occupied unit-days over all unit-days);
+  * the average number of days a unit stood vacant;
+  * turnover, move-outs per unit (a move-out is the end of an occupied stretch, so a lease
+    renewed without a gap does not count);
+  * and, looking ahead ROLL_OFF_DAYS, the units whose occupied stretch ends (lease roll-offs).
+
+A lease covers [start_date, end_date); a lease without an end date runs indefinitely.
+"""
+
+import os
+from datetime import date
+
+WINDOW_DAYS = int(os.environ.get("OCCUPANCY_WINDOW_DAYS", "365"))
+ROLL_OFF_DAYS = int(os.environ.get("OCCUPANCY_ROLL_OFF_DAYS", "90"))
+
+# Ordinal standing in for a missing lease end date.
+OPEN_END = date.max.toordinal()
+
+
+def _ordinal(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.toordinal()
+
+
+def unit_timelines(rows):
+    """
+    UnitLeases rows -> {unit_id: [(start, end), ...]}: each unit's occupied intervals as date
+    ordinals, sorted and merged so that none overlap or touch. Units without leases map to [].
+    """
+    leases = {}
+    for row in rows:
+        intervals = leases.setdefault(row["unit_id"], [])
+        start = _ordinal(row.get("start_date"))
+        if start is not None:
+            end = _ordinal(row.get("end_date")) or OPEN_END
+            if end > start:
+                intervals.append((start, end))
+
+    timelines = {}
+    for unit_id, intervals in leases.items():
+        intervals.sort()
+        merged = []
+        for start, end in intervals:
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        timelines[unit_id] = merged
+    return timelines
+
+
+def _unit_stats(intervals, window_start, today, horizon):
+    """(occupied days in the window, move-outs in the window, occupied today, roll-off ordinal or None)."""
+    occupied = move_outs = 0
+    occupied_today = False
+    roll_off = None
+    for start, end in intervals:
+        if end <= window_start:
+            continue
+        if start > horizon:
+            break
+        occupied += max(0, min(end, today + 1) - max(start, window_start))
+        if end <= today:
+            move_outs += 1
+        if start <= today < end:
+            occupied_today = True
+            if end <= horizon:
+                roll_off = end
+    return occupied, move_outs, occupied_today, roll_off
+
+
+def _summary(property_id, address, units, window_days):
+    unit_days = len(units) * window_days
+    occupied = sum(unit[0] for unit in units)
+    roll_offs = sorted(unit[3] for unit in units if unit[3] is not None)
+    return {
+        "property_id": property_id,
+        "address": address,
+        "units": len(units),
+        "occupied_units": sum(1 for unit in units if unit[2]),
+        "occupancy_rate": occupied / unit_days if unit_days else None,
+        "avg_days_vacant": (unit_days - occupied) / len(units) if units else None,
+        "turnover": sum(unit[1] for unit in units) / len(units) if units else None,
+        "roll_offs": len(roll_offs),
+        "next_roll_off": date.fromordinal(roll_offs[0]) if roll_offs else None,
+    }
+
+
+def occupancy(rows, today=None, window_days=WINDOW_DAYS, roll_off_days=ROLL_OFF_DAYS):
+    """
+    UnitLeases rows (property_id, address, unit_id, start_date, end_date; one per unit and
+    lease, units without leases included) -> one summary row per property, in the order the
+    properties first appear, followed by a portfolio row whose property_id is None.
+    """
+    if not rows:
+        return []
+    today = (today or date.today()).toordinal()
+    window_start = today - window_days + 1
+    horizon = today + roll_off_days
+    timelines = unit_timelines(rows)
+
+    properties = {}
+    for row in rows:
+        entry = properties.setdefault(row["property_id"], {"address": row.get("address"), "units": {}})
+        if row["unit_id"] not in entry["units"]:
+            entry["units"][row["unit_id"]] = _unit_stats(timelines[row["unit_id"]], window_start, today, horizon)
+
+    summaries = [_summary(property_id, entry["address"], list(entry["units"].values()), window_days)
+                 for property_id, entry in properties.items()]
+    every_unit = [unit for entry in properties.values() for unit in entry["units"].values()]
+    summaries.append(_summary(None, "Portfolio", every_unit, window_days))
+    return summaries
+
@@ -0,0 +1,205 @@
+"""
+Outbound message delivery for the bot: every reply goes through one queue per destination
+instead of a direct ctx.send per row.
+
+Queued messages to the same channel are merged into as few Discord messages as fit in the
+2000-character limit, sends are paced with token buckets that match Discord's per-channel
+and global rate limits (so the bot waits before a 429 instead of after it), and interactive
+command replies are always sent ahead of bulk output such as reminders.
+"""
+
+import time
+import asyncio
+from collections import deque
+
+MAX_MESSAGE_LENGTH = 2000
+
+INTERACTIVE = 0
+BULK = 1
+
+# Discord allows roughly 5 messages per 5 seconds per channel and 50 requests per second overall.
+CHANNEL_RATE = (5, 5.0)
+GLOBAL_RATE = (50, 1.0)
+
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Splits text on line boundaries (or hard-wraps overlong lines) into chunks of at most limit characters."""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class TokenBucket:
+    """
+    Allows `capacity` sends per `period` seconds, refilled continuously. Bulk senders also
+    wait while any interactive sender is waiting, so replies get the next free token.
+    """
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._interactive_waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority=INTERACTIVE):
+        interactive = priority == INTERACTIVE
+        if interactive:
+            self._interactive_waiting += 1
+        try:
+            while True:
+                self._refill()
+                if self.tokens >= 1 and (interactive or not self._interactive_waiting):
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(max(0.01, (1 - self.tokens) / self.rate))
+        finally:
+            if interactive:
+                self._interactive_waiting -= 1
+
+
+class _Destination:
+
+    def __init__(self, target, channel_rate):
+        self.target = target
+        self.lanes = (deque(), deque())  # Indexed by priority
+        self.bucket = TokenBucket(*channel_rate)
+        self.worker = None
+
+
+def destination_key(target):
+    """Channel ID for contexts and channels, user ID for users (DMs)."""
+    return getattr(getattr(target, "channel", target), "id", id(target))
+
+
+class OutboundQueue:
+    """
+    Per-destination send queues with message merging and proactive rate limiting.
+
+    Each destination with pending messages has one worker task. It takes the next message
+    from the interactive lane (or, if that is empty, the bulk lane), appends following
+    messages from the same lane while the result still fits in one Discord message, waits
+    for a channel and a global token, and sends. Every queued message has a future that
+    resolves once the message carrying it was sent.
+    """
+
+    def __init__(self, channel_rate=CHANNEL_RATE, global_rate=GLOBAL_RATE):
+        self.channel_rate = channel_rate
+        self._global = TokenBucket(*global_rate)
+        self._destinations = {}
+        self.messages_queued = 0
+        self.messages_sent = 0
+        self.delivered = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    async def send(self, target, content, priority=INTERACTIVE):
+        """Queues content for target and waits until it has been delivered."""
+        await self.send_all(target, [content], priority)
+
+    async def send_all(self, target, contents, priority=INTERACTIVE):
+        """Queues several messages at once (so they can be merged) and waits until all are delivered."""
+        futures = [future for content in contents for future in self._enqueue(target, content, priority)]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def _enqueue(self, target, content, priority):
+        key = destination_key(target)
+        destination = self._destinations.get(key)
+        if destination is None:
+            destination = self._destinations[key] = _Destination(target, self.channel_rate)
+        loop = asyncio.get_running_loop()
+        futures = []
+        for part in split_message(str(content)) or [""]:
+            future = loop.create_future()
+            destination.lanes[priority].append((part, time.monotonic(), future))
+            futures.append(future)
+            self.messages_queued += 1
+        if destination.worker is None:
+            destination.worker = asyncio.create_task(self._drain(key, destination))
+        return futures
+
+    @staticmethod
+    def _next_batch(destination):
+        for priority, lane in enumerate(destination.lanes):
+            if not lane:
+                continue
+            batch = [lane.popleft()]
+            length = len(batch[0][0])
+            while lane and length + 1 + len(lane[0][0]) <= MAX_MESSAGE_LENGTH:
+                batch.append(lane.popleft())
+                length += 1 + len(batch[-1][0])
+            return priority, batch
+        return None, []
+
+    async def _drain(self, key, destination):
+        try:
+            while True:
+                priority, batch = self._next_batch(destination)
+                if not batch:
+                    return
+                await destination.bucket.acquire(priority)
+                await self._global.acquire(priority)
+                try:
+                    await destination.target.send("\n".join(part for part, _, _ in batch))
+                except Exception as err:
+                    self.failed += len(batch)
+                    print(f"Could not send message to {key}: {err}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(err)
+                    continue
+                self.messages_sent += 1
+                self.delivered += len(batch)
+                now = time.monotonic()
+                for _, queued_at, future in batch:
+                    latency = now - queued_at
+                    self.total_latency += latency
+                    self.max_latency = max(self.max_latency, latency)
+                    if not future.done():
+                        future.set_result(None)
+        finally:
+            destination.worker = None
+            if not any(destination.lanes):
+                self._destinations.pop(key, None)
+
+    async def close(self):
+        """Waits until every queued message has been sent (call on bot shutdown)."""
+        workers = [d.worker for d in self._destinations.values() if d.worker is not None]
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "queued": self.messages_queued,
+            "sent": self.messages_sent,
+            "saved": self.delivered - self.messages_sent,
+            "failed": self.failed,
+            "avg_latency": self.total_latency / self.delivered if self.delivered else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+
+# Shared queue used by the bot's cogs and reminders; drained on shutdown.
+outbound = OutboundQueue()
@@ -0,0 +1,46 @@
+"""
+Background maintenance jobs that run on a fixed interval (rollup reconciliation, ledger archival).
+
+A job waits start_delay seconds after start() so its first run does not compete with the
+startup warm-up, then calls run_once() every interval seconds. A failed run is logged and
+retried on the next interval. The task is created in a MAINTENANCE db_context, so every
+query it makes is scheduled behind interactive work.
+"""
+
+import asyncio
+from database import db_context, MAINTENANCE
+
+
+class PeriodicJob:
+    """Base class of the periodic jobs: subclasses set DESCRIPTION and implement run_once()."""
+
+    DESCRIPTION = "Periodic job"
+
+    def __init__(self, interval, start_delay=0.0):
+        self.interval = interval
+        self.start_delay = start_delay
+        self._task = None
+
+    def start(self):
+        """Starts the periodic runs. Must be called from inside the running event loop."""
+        if self._task is None:
+            with db_context(work_class=MAINTENANCE):
+                self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self):
+        raise NotImplementedError
+
+    async def _run(self):
+        await asyncio.sleep(self.start_delay)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as err:
+                print(f"{self.DESCRIPTION} failed: {err}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,146 @@
+"""
+Monte Carlo cash flow projection for the !project_cashflow command.
+
+A property's monthly cash flow is its rent, less mortgage, capex, tax and insurance, less the
+rent lost to vacancy and the cost of unplanned repairs. simulate() draws `paths` scenarios of
+the coming months as NumPy arrays (paths x months x properties) and returns percentile bands
+of each property's and the portfolio's cash flow. It is pure CPU work and runs on the process
+pool (compute.run_cpu), never on the event loop.
+
+In each scenario:
+  * rents follow one market-wide random walk, growing RENT_GROWTH a year on average;
+  * each property's long-run vacancy rate is drawn from a Beta distribution centred on its
+    share of vacant units (Units.vacant), shrunk towards VACANCY_PRIOR when it has few units.
+    Occupancy then moves between occupied and vacant month by month at that rate, with
+    vacancies lasting VACANCY_MONTHS on average, starting from the units' current state;
+  * a repair costing around REPAIR_COST_MONTHS of rent strikes with REPAIR_PROBABILITY a month.
+
+Large portfolios are simulated a slice of properties at a time, so memory stays around
+CHUNK_ELEMENTS values per array whatever the number of properties and paths.
+"""
+
+import os
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed for !project_cashflow
+    np = None
+
+PROJECTION_PATHS = int(os.environ.get("PROJECTION_PATHS", "10000"))
+PROJECTION_MONTHS = 12
+MAX_PROJECTION_MONTHS = 60
+PERCENTILES = (5, 50, 95)
+
+RENT_GROWTH = 0.03             # Mean yearly rent growth
+RENT_GROWTH_VOLATILITY = 0.02  # Yearly standard deviation of rent growth
+VACANCY_PRIOR = 0.08           # Vacancy rate assumed for properties without units on record
+VACANCY_PRIOR_UNITS = 5        # Weight of the prior, in units
+VACANCY_MONTHS = 2.0           # Average length of a vacancy
+REPAIR_PROBABILITY = 0.02      # Chance of an unplanned repair per property and month
+REPAIR_COST_MONTHS = 2.0       # Average repair cost, in months of rent
+REPAIR_COST_VOLATILITY = 0.75  # Log-normal spread of repair costs
+
+COST_COLUMNS = ("mortgage", "capex", "tax", "insurance")
+CHUNK_ELEMENTS = 2_000_000
+
+
+def available():
+    """Whether NumPy is installed, which projections need."""
+    return np is not None
+
+
+def _column(properties, name):
+    return np.array([float(row.get(name) or 0) for row in properties])
+
+
+def _occupancy(rng, vacancy_rate, initially_vacant, months):
+    """(paths, months, properties) occupancy (1.0 or 0.0) of a two-state monthly Markov chain."""
+    stay_vacant = np.float32(1.0 - 1.0 / VACANCY_MONTHS)
+    # Chosen so the chain's long-run share of vacant months equals vacancy_rate.
+    vacate = np.minimum(vacancy_rate / (VACANCY_MONTHS * (1.0 - vacancy_rate)), 1.0).astype(np.float32)
+    vacant = rng.random(vacancy_rate.shape, dtype=np.float32) < initially_vacant
+    occupied = np.empty((vacancy_rate.shape[0], months, vacancy_rate.shape[1]), dtype=np.float32)
+    for month in range(months):
+        vacant = rng.random(vacancy_rate.shape, dtype=np.float32) < np.where(vacant, stay_vacant, vacate)
+        np.logical_not(vacant, out=occupied[:, month])
+    return occupied
+
+
+def _repairs(rng, rent, shape):
+    """
+    Unplanned repairs as (flat cell indices, costs) over a (paths, months, properties) grid.
+    Only the struck cells are drawn: their number is binomial and their positions uniform.
+    """
+    cells = shape[0] * shape[1] * shape[2]
+    struck = rng.integers(0, cells, rng.binomial(cells, REPAIR_PROBABILITY))
+    property_index = struck % shape[2]
+    # Log-normal with mean 1, so repairs average REPAIR_COST_MONTHS of rent.
+    factor = rng.lognormal(-REPAIR_COST_VOLATILITY ** 2 / 2, REPAIR_COST_VOLATILITY, struck.size)
+    return struck, rent[property_index] * REPAIR_COST_MONTHS * factor
+
+
+def simulate(properties, months=PROJECTION_MONTHS, paths=PROJECTION_PATHS, seed=None):
+    """
+    Projects the cash flow of properties (rows with rent, the COST_COLUMNS, units and
+    vacant_units, all monthly amounts) over the coming months.
+
+    Returns:
+        dict: "percentiles"; per property (in input order) the "baseline" cash flow at today's
+        figures, its "bands" (one total per percentile) and "loss_probability"; and for the
+        "portfolio" the monthly bands (one list of months per percentile), total bands and
+        loss probability.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(properties)
+    rent = _column(properties, "rent")
+    costs = sum(_column(properties, name) for name in COST_COLUMNS)
+    units = _column(properties, "units")
+    vacant_units = _column(properties, "vacant_units")
+
+    # Beta(alpha, beta) around the vacant share; the prior counts as VACANCY_PRIOR_UNITS extra units.
+    alpha = vacant_units + VACANCY_PRIOR * VACANCY_PRIOR_UNITS
+    beta = units - vacant_units + (1.0 - VACANCY_PRIOR) * VACANCY_PRIOR_UNITS
+    initially_vacant = np.where(units > 0, vacant_units / np.maximum(units, 1), VACANCY_PRIOR)
+
+    growth = rng.normal(RENT_GROWTH / 12, RENT_GROWTH_VOLATILITY / np.sqrt(12), size=(paths, months))
+    rent_index = np.exp(np.cumsum(growth, axis=1))
+
+    portfolio = np.zeros((paths, months))
+    bands = np.empty((count, len(PERCENTILES)))
+    loss_probability = np.empty(count)
+    chunk = max(1, CHUNK_ELEMENTS // (paths * months))
+    for start in range(0, count, chunk):
+        part = slice(start, min(count, start + chunk))
+        size = part.stop - part.start
+        vacancy_rate = rng.beta(alpha[part], beta[part], size=(paths, size))
+        occupied = _occupancy(rng, vacancy_rate, initially_vacant[part], months)
+
+        # Collected rent without materializing paths x properties x months of money: per
+        # property, occupied months weighted by the market index; per month, rent over properties.
+        totals = rent[part] * np.matmul(rent_index[:, None, :].astype(np.float32), occupied)[:, 0, :]
+        totals -= costs[part] * months
+        portfolio += np.matmul(occupied, rent[part].astype(np.float32)) * rent_index - costs[part].sum()
+
+        struck, cost = _repairs(rng, rent[part], (paths, months, size))
+        totals -= np.bincount(struck // (months * size) * size + struck % size, cost, paths * size).reshape(paths, size)
+        portfolio -= np.bincount(struck // size, cost, paths * months).reshape(paths, months)
+
+        bands[part] = np.percentile(totals, PERCENTILES, axis=0).T
+        loss_probability[part] = (totals < 0).mean(axis=0)
+
+    portfolio_totals = portfolio.sum(axis=1)
+    return {
+        "paths": paths,
+        "months": months,
+        "percentiles": list(PERCENTILES),
+        "properties": [
+            {"property_id": row.get("property_id"), "baseline": float((rent[i] - costs[i]) * months),
+             "bands": bands[i].tolist(), "loss_probability": float(loss_probability[i])}
+            for i, row in enumerate(properties)
+        ],
+        "portfolio": {
+            "monthly": np.percentile(portfolio, PERCENTILES, axis=0).tolist(),
+            "bands": np.percentile(portfolio_totals, PERCENTILES).tolist(),
+            "loss_probability": float((portfolio_totals < 0).mean()),
+        },
+    }
@@ -0,0 +1,195 @@
+"""
+Deadline reminders: lease and insurance end dates, unpaid tax and rent due dates and mortgage
+maturities, delivered to each owner as one batched message.
+
+Rather than polling every dated table, DeadlineScheduler loads only the reminders that fire
+within the next REMINDER_HORIZON_DAYS (one indexed range query per table, combined into one
+statement), keeps them in a timer heap and sleeps until the earliest one is due. When the change
+log reports that a user's data changed, refresh_user() reloads just that user's reminders.
+"""
+
+import os
+import heapq
+import asyncio
+import itertools
+from datetime import date, datetime, time, timedelta
+from database import Database, Query, Tables, db_context, MAINTENANCE
+
+# Days before the due date that each kind of deadline is reminded.
+LEAD_DAYS = {
+    "lease": int(os.environ.get("REMIND_LEASE_DAYS", "30")),
+    "insurance": int(os.environ.get("REMIND_INSURANCE_DAYS", "30")),
+    "tax": int(os.environ.get("REMIND_TAX_DAYS", "14")),
+    "payment": int(os.environ.get("REMIND_PAYMENT_DAYS", "3")),
+    "mortgage": int(os.environ.get("REMIND_MORTGAGE_DAYS", "60")),
+}
+# Order of the branches in Query.UPCOMING_DEADLINES.
+DEADLINE_KINDS = ("lease", "insurance", "tax", "payment", "mortgage")
+# Tables whose changes can add, move or remove a user's reminders (see changelog.py).
+DEADLINE_TABLES = (Tables.LEASE_AGREEMENTS, Tables.INSURANCE_POLICIES, Tables.TAX_RECORDS, Tables.PAYMENT_HISTORIES,
+                   Tables.MORTGAGES, Tables.PORTFOLIO_PROPERTIES, Tables.USER_PORTFOLIOS)
+
+REMINDER_HOUR = int(os.environ.get("REMINDER_HOUR", "9"))
+REMINDER_HORIZON_DAYS = 1
+
+DESCRIPTIONS = {
+    "lease": "Lease ends",
+    "insurance": "Insurance policy ends",
+    "tax": "Property tax due",
+    "payment": "Rent payment due",
+    "mortgage": "Mortgage term ends",
+}
+
+
+def deadline_ranges(start, days):
+    """
+    Due-date ranges whose reminders fire on days start..start+days-1, as the flat parameter
+    list for Query.UPCOMING_DEADLINES (one (from, to) pair per kind).
+    """
+    values = []
+    for kind in DEADLINE_KINDS:
+        lead = timedelta(days=LEAD_DAYS[kind])
+        values += [start + lead, start + timedelta(days=days) + lead]
+    return values
+
+
+def fire_time(row):
+    return datetime.combine(row["due_date"] - timedelta(days=LEAD_DAYS[row["kind"]]), time(REMINDER_HOUR))
+
+
+def format_reminder(rows):
+    """One message listing a user's due reminders, earliest deadline first."""
+    lines = ["**Upcoming deadlines**"]
+    for row in sorted(rows, key=lambda r: (r["due_date"], r["kind"])):
+        detail = f" ({row['detail']})" if row.get("detail") else ""
+        lines.append(f"• {DESCRIPTIONS[row['kind']]} {row['due_date']} — {row.get('property_address', 'N/A')}{detail}")
+    return "\n".join(lines)
+
+
+class DeadlineScheduler:
+    """
+    Timer heap of pending reminders, delivered per owner in one batch.
+
+    Heap entries are (fire_at, seq, generation, row). refresh_user() bumps the user's
+    generation and pushes their freshly loaded rows; entries from an older generation are
+    dropped when they reach the top, so a refresh never has to search the heap.
+    deliver(user_id, text) is the coroutine that actually sends a message; long texts are
+    split by the outbound queue.
+    """
+
+    def __init__(self, deliver, horizon_days=REMINDER_HORIZON_DAYS):
+        self.deliver = deliver
+        self.horizon_days = horizon_days
+        self._heap = []
+        self._seq = itertools.count()
+        self._generations = {}
+        self._sent = set()
+        self._horizon = None
+        self._wake = None
+        self._task = None
+        self._refreshes = set()
+        self.reminders_sent = 0
+        self.batches_sent = 0
+
+    def start(self):
+        """Starts the scheduler. Must be called from inside the running event loop."""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            with db_context(work_class=MAINTENANCE):
+                self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._refreshes, return_exceptions=True)
+            self._task = None
+
+    async def load(self, today=None):
+        """Loads every reminder firing before the new horizon with one query."""
+        today = today or date.today()
+        rows = await Database.select_async(Query.UPCOMING_DEADLINES, deadline_ranges(today, self.horizon_days)) or []
+        self._heap = []
+        self._generations = {}
+        self._sent = {key for key in self._sent if key[2] >= today}
+        for row in rows:
+            self._push(row)
+        self._horizon = today + timedelta(days=self.horizon_days)
+
+    async def reload_user(self, user_id, today=None):
+        today = today or date.today()
+        values = []
+        for start, end in zip(*[iter(deadline_ranges(today, self.horizon_days))] * 2):
+            values += [start, end, user_id]
+        rows = await Database.select_async(Query.UPCOMING_DEADLINES_BY_USER, values, primary=True) or []
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        for row in rows:
+            self._push(row)
+        if self._wake is not None:
+            self._wake.set()
+
+    def refresh_user(self, user_id):
+        """Reloads a user's reminders in the background after their data changed."""
+        if self._task is None or self._horizon is None:
+            return
+        task = asyncio.create_task(self.reload_user(user_id))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    def _push(self, row):
+        user_id = row["user_id"]
+        generation = self._generations.setdefault(user_id, 0)
+        heapq.heappush(self._heap, (fire_time(row), next(self._seq), generation, row))
+
+    def due(self, now=None):
+        """Pops every current reminder whose fire time has passed, grouped by user."""
+        now = now or datetime.now()
+        batches = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, _, generation, row = heapq.heappop(self._heap)
+            user_id = row["user_id"]
+            key = (row["kind"], row["item_id"], row["due_date"])
+            if generation != self._generations.get(user_id) or key in self._sent:
+                continue
+            self._sent.add(key)
+            batches.setdefault(user_id, []).append(row)
+        return batches
+
+    async def send_due(self, now=None):
+        # Owners are delivered concurrently; the outbound queue paces the actual sends.
+        await asyncio.gather(*(self._deliver_batch(user_id, rows) for user_id, rows in self.due(now).items()))
+
+    async def _deliver_batch(self, user_id, rows):
+        try:
+            await self.deliver(user_id, format_reminder(rows))
+            self.batches_sent += 1
+            self.reminders_sent += len(rows)
+        except Exception as err:
+            print(f"Could not deliver reminders to user {user_id}: {err}")
+
+    def next_wake(self, now=None):
+        """Seconds until the earliest reminder fires or the horizon ends."""
+        now = now or datetime.now()
+        target = datetime.combine(self._horizon, time.min)
+        if self._heap and self._heap[0][0] < target:
+            target = self._heap[0][0]
+        return max(0.0, (target - now).total_seconds())
+
+    async def _run(self):
+        while True:
+            try:
+                if self._horizon is None or date.today() >= self._horizon:
+                    await self.load()
+                await self.send_due()
+            except Exception as err:
+                print(f"Deadline reminder run failed: {err}")
+                await asyncio.sleep(60)
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.next_wake())
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {"scheduled": len(self._heap), "reminders_sent": self.reminders_sent,
+                "batches_sent": self.batches_sent}
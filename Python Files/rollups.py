@@ -0,0 +1,145 @@
+"""
+Reconciliation of the portfolio rollups (Portfolios.num_properties, num_mortgages and the
+rent, mortgage, principal, capex, purchase price, mortgaged purchase price and appraised
+totals) and of the monthly ledger rollups (LedgerRollups).
+
+Triggers keep the rollups current on every write (Business Requirements #8 and #10 in
+business_requirements.sql). RollupReconciler verifies them in the background: it walks
+Portfolios in primary key order, RECONCILE_BATCH_SIZE rows per transaction, recomputes each
+batch's totals from the source rows with one grouped query and rewrites only the portfolios
+that drifted. LedgerRollupReconciler does the same for each property's monthly income and
+expense rows. The first run after an upgrade also backfills databases that predate the triggers.
+"""
+
+import os
+from database import Database, Query
+from periodic import PeriodicJob
+
+ROLLUP_COLUMNS = ("num_properties", "num_mortgages", "total_rent", "total_mortgage_payment", "total_principal",
+                  "total_capex", "total_purchase_price", "mortgaged_purchase_price", "last_appraised_val")
+
+RECONCILE_BATCH_SIZE = int(os.environ.get("RECONCILE_BATCH_SIZE", "200"))
+RECONCILE_INTERVAL_HOURS = float(os.environ.get("RECONCILE_INTERVAL_HOURS", "24"))
+RECONCILE_START_DELAY = 300.0
+# Money totals are DOUBLE sums maintained by adding deltas; smaller differences are rounding.
+TOLERANCE = 0.005
+
+
+def drifted_columns(stored, actual):
+    """The rollup columns whose stored value differs from the recomputed one."""
+    return [column for column in ROLLUP_COLUMNS
+            if abs(float(stored.get(column) or 0) - float(actual.get(column) or 0)) > TOLERANCE]
+
+
+def _ledger_rollups(rows):
+    """LedgerRollups rows -> {property_id: {(month, kind, category): (total, entries)}}, without empty rows."""
+    grouped = {}
+    for row in rows:
+        if row["entries"]:
+            key = (str(row["month"]), row["kind"], row["category"])
+            grouped.setdefault(row["property_id"], {})[key] = (float(row["total"] or 0), int(row["entries"]))
+    return grouped
+
+
+def ledger_rollups_match(stored, actual):
+    """Whether one property's stored monthly rollups equal the recomputed ones."""
+    return stored.keys() == actual.keys() and all(
+        stored[key][1] == actual[key][1] and abs(stored[key][0] - actual[key][0]) <= TOLERANCE for key in stored)
+
+
+class RollupReconciler(PeriodicJob):
+    """
+    Periodically verifies the portfolio rollups in batches and repairs any drift.
+
+    Each batch locks its Portfolios rows (SELECT ... FOR UPDATE) before recomputing them, so
+    a trigger adjusting one of those portfolios concurrently waits and then applies its
+    delta on top of the repaired value instead of being overwritten.
+    """
+
+    DESCRIPTION = "Portfolio rollup reconciliation"
+
+    def __init__(self, batch_size=RECONCILE_BATCH_SIZE, interval_hours=RECONCILE_INTERVAL_HOURS):
+        super().__init__(interval_hours * 3600, RECONCILE_START_DELAY)
+        self.batch_size = batch_size
+        self.runs = 0
+        self.checked = 0
+        self.repaired = 0
+
+    async def reconcile_batch(self, after):
+        """
+        Checks the batch of portfolios with IDs above after. Returns the last portfolio ID
+        checked, or None when there are no more.
+        """
+        async with Database.transaction_async() as tx:
+            rows = await tx.select(Query.PORTFOLIO_ROLLUPS_AFTER, (after, self.batch_size)) or []
+            if not rows:
+                return None
+            ids = tuple(row["portfolio_id"] for row in rows)
+            actuals = {row["portfolio_id"]: row for row in await tx.select(Query.PORTFOLIO_ROLLUP_ACTUALS, (ids,)) or []}
+            for row in rows:
+                # Portfolios without properties have no row in the recomputed totals: all zero.
+                actual = actuals.get(row["portfolio_id"], {})
+                drifted = drifted_columns(row, actual)
+                if not drifted:
+                    continue
+                print(f"Repairing rollups of portfolio {row['portfolio_id']}: {', '.join(drifted)}")
+                values = {column: actual.get(column) or 0 for column in ROLLUP_COLUMNS}
+                values["portfolio_id"] = row["portfolio_id"]
+                await tx.update(Query.SET_PORTFOLIO_ROLLUPS, values)
+                self.repaired += 1
+        self.checked += len(rows)
+        return ids[-1]
+
+    async def reconcile(self):
+        """Checks every portfolio, one batch at a time."""
+        after = 0
+        while after is not None:
+            after = await self.reconcile_batch(after)
+        self.runs += 1
+
+    async def run_once(self):
+        await self.reconcile()
+
+    def stats(self):
+        return {"runs": self.runs, "checked": self.checked, "repaired": self.repaired}
+
+
+class LedgerRollupReconciler(RollupReconciler):
+    """
+    Periodically verifies the monthly ledger rollups, a batch of properties at a time.
+
+    Each batch locks the properties' LedgerRollups rows before recomputing them from the
+    ledgers and their archives; properties whose rows differ (including rows left at zero
+    entries) have all their rows rewritten.
+    """
+
+    DESCRIPTION = "Ledger rollup reconciliation"
+
+    async def reconcile_batch(self, after):
+        """
+        Checks the batch of properties with IDs above after. Returns the last property ID
+        checked, or None when there are no more.
+        """
+        async with Database.transaction_async() as tx:
+            rows = await tx.select(Query.LEDGER_ROLLUP_PROPERTIES_AFTER, (after, self.batch_size)) or []
+            if not rows:
+                return None
+            ids = tuple(row["property_id"] for row in rows)
+            stored = _ledger_rollups(await tx.select(Query.LEDGER_ROLLUPS_BY_PROPERTIES, (ids,)) or [])
+            actual_rows = await tx.select(Query.LEDGER_ROLLUP_ACTUALS, (ids,) * 4) or []
+            actual = _ledger_rollups(actual_rows)
+            drifted = {property_id for property_id in ids
+                       if not ledger_rollups_match(stored.get(property_id, {}), actual.get(property_id, {}))}
+            if drifted:
+                print(f"Rebuilding ledger rollups of {len(drifted)} properties")
+                await tx.delete(Query.DELETE_LEDGER_ROLLUPS, (tuple(drifted),))
+                rebuilt = [row for row in actual_rows if row["property_id"] in drifted]
+                if rebuilt:
+                    await tx.insert(Query.INSERT_LEDGER_ROLLUP, rebuilt, many_entities=True)
+                self.repaired += len(drifted)
+        self.checked += len(ids)
+        return ids[-1]
+
+
+rollup_reconciler = RollupReconciler()
+ledger_rollup_reconciler = LedgerRollupReconciler()
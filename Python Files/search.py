@@ -0,0 +1,164 @@
+"""
+Per-user search over tenants, properties, projects and contractors for the !search command.
+
+A user's documents are loaded with one query the first time they search and kept in an
+in-process trigram index: every word is padded ("  elm ") and cut into overlapping
+three-character grams, and each gram maps to the set of documents containing it. Query
+words are padded at the front only, so "el" and "elm" match "Elm" as a prefix, and documents
+are ranked by the share of the query's grams they contain, which tolerates typos ("kitchn").
+A lookup only touches the posting sets of the query's grams, never the document text.
+
+Built indexes are kept current from the change log: changed tenants, properties, projects
+and contractors are re-read by ID and replaced in place, while changes that move rows
+between properties or portfolios drop the user's index so their next search rebuilds it.
+"""
+
+import os
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from database import Database, Query
+from cache import UserIndexCache
+
+# How many users' indexes are kept in memory (least recently used are dropped).
+SEARCH_INDEX_USERS = int(os.environ.get("SEARCH_INDEX_USERS", "2000"))
+# Indexes are rebuilt after this many seconds, which also picks up edits to Addresses (not in the change log).
+SEARCH_INDEX_TTL = float(os.environ.get("SEARCH_INDEX_TTL", "3600"))
+# Share of the query's grams a document must contain to be a match.
+MIN_SIMILARITY = 0.5
+RESULT_LIMIT = 10
+
+TEXT_COLUMNS = ("title", "subtitle", "body")
+
+# Change log tables whose rows are documents, with the query that re-reads them by ID.
+DOCUMENT_TABLES = {
+    "Tenants": ("tenant", Query.SEARCH_TENANTS_BY_IDS),
+    "Properties": ("property", Query.SEARCH_PROPERTIES_BY_IDS),
+    "ProjectInfos": ("project", Query.SEARCH_PROJECTS_BY_IDS),
+    "Contractors": ("contractor", Query.SEARCH_CONTRACTORS_BY_IDS),
+}
+# Tables that decide which documents a user owns; a change rebuilds the user's index.
+OWNERSHIP_TABLES = frozenset({"UserPortfolios", "PortfolioProperties", "LeaseAgreements"})
+SEARCH_TABLES = frozenset(DOCUMENT_TABLES) | OWNERSHIP_TABLES
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def document_trigrams(text):
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def query_trigrams(text):
+    # No trailing pad: a query word matches any word it is a prefix of.
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word}"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """Trigram index over one user's documents (rows with kind, doc_id and the TEXT_COLUMNS)."""
+
+    def __init__(self, rows=()):
+        self.documents = {}  # (kind, doc_id) -> row
+        self._grams = {}     # (kind, doc_id) -> the document's grams, to unindex it again
+        self._postings = defaultdict(set)
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        key = (row["kind"], row["doc_id"])
+        self.remove(*key)
+        grams = document_trigrams(" ".join(str(row[column]) for column in TEXT_COLUMNS if row.get(column)))
+        self.documents[key] = row
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings[gram].add(key)
+
+    def remove(self, kind, doc_id):
+        key = (kind, doc_id)
+        self.documents.pop(key, None)
+        for gram in self._grams.pop(key, ()):
+            posting = self._postings[gram]
+            posting.discard(key)
+            if not posting:
+                del self._postings[gram]
+
+    def search(self, text, limit=RESULT_LIMIT, min_similarity=MIN_SIMILARITY):
+        """The best matching rows, each with its similarity score, best first."""
+        grams = query_trigrams(text)
+        if not grams:
+            return []
+        needed = math.ceil(len(grams) * min_similarity)
+        postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+        # A match contains at least `needed` grams, so it is in one of the len - needed + 1 rarest
+        # postings; common grams ("  e") are then only probed for those candidates.
+        rare = len(postings) - needed + 1
+        counts = Counter()
+        for posting in postings[:rare]:
+            counts.update(posting)
+        common = postings[rare:]
+        matches = []
+        for key, matched in counts.items():
+            if common:
+                matched += sum(key in posting for posting in common)
+            if matched >= needed:
+                matches.append((-matched, key))
+        # Most grams first; ties go by kind and ID so results are stable.
+        return [dict(self.documents[key], score=-negated / len(grams))
+                for negated, key in heapq.nsmallest(limit, matches)]
+
+    def __len__(self):
+        return len(self.documents)
+
+
+class SearchIndexes(UserIndexCache):
+    """The search indexes of the users who searched recently."""
+
+    def __init__(self, maxsize=SEARCH_INDEX_USERS, ttl=SEARCH_INDEX_TTL):
+        super().__init__(maxsize, ttl)
+
+    async def build(self, user_id):
+        rows = await Database.select_async(Query.SEARCH_DOCUMENTS_BY_USER, (user_id,) * 4) or []
+        return SearchIndex(rows)
+
+    async def search(self, user_id, text, limit=RESULT_LIMIT):
+        return (await self.index_for(user_id)).search(text, limit)
+
+    async def apply_changes(self, changes):
+        """Change log subscriber: brings the built indexes up to date with changes."""
+        stale = defaultdict(set)  # (user_id, table) -> changed primary keys
+        for change in changes:
+            user_id = change["user_id"]
+            index = self._indexes.get(user_id) if user_id is not None else None
+            if index is None:
+                continue
+            if change["table_name"] in OWNERSHIP_TABLES:
+                self.drop(user_id)
+            elif change["op"] == "D":
+                index.remove(DOCUMENT_TABLES[change["table_name"]][0], change["pk"])
+            else:
+                stale[(user_id, change["table_name"])].add(change["pk"])
+
+        for (user_id, table), ids in stale.items():
+            index = self._indexes.get(user_id)
+            if index is None:
+                continue
+            kind, query = DOCUMENT_TABLES[table]
+            rows = await Database.select_async(query, (user_id, tuple(ids)), primary=True) or []
+            # IDs that no longer match are no longer the user's (for example a tenant moved to another lease).
+            for doc_id in ids - {row["doc_id"] for row in rows}:
+                index.remove(kind, doc_id)
+            for row in rows:
+                index.add(row)
+            self.refreshed += len(ids)
+
+
+# Shared indexes used by the bot; kept current by the change log tailer (see main.create_bot).
+search_indexes = SearchIndexes()
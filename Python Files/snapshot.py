@@ -0,0 +1,351 @@
+"""
+Warm-cache snapshots: the in-process caches (registered users with their roles, and the
+per-user view results) are written to a local file on shutdown and every few minutes, and
+mapped back in at startup so a restart does not send every active user's first command to
+the database at once.
+
+File format (all integers little-endian):
+    header  magic b"REPMSNAP", format version (u16), change log seq (i64),
+            written at (f64, Unix time), entry count (u32)
+    entry   cache number (u8), expires at (f64, Unix time), key length (u32), value length (u32),
+            pickled key, pickled value
+
+The seq is the change log position the caches had caught up with when they were written.
+Each entry keeps the expiry it had in its cache: once that passes it is treated as missing,
+and an entry restored earlier only lives for the rest of its TTL. Data the change log does
+not cover (e.g. view results that depend on today's date) is therefore never served for
+longer than its cache's TTL, however old the snapshot is.
+At startup every user with a change after it is dropped from the snapshot, and the remaining
+entries stay in the mapped file until they are first asked for (see SnapshotCache). When the
+log no longer reaches back to the snapshot, only the user IDs are kept and their rows are
+reloaded with one IN-list query.
+"""
+
+import os
+import mmap
+import time
+import pickle
+import struct
+import asyncio
+import threading
+from collections import OrderedDict
+from database import Database, Query, db_context, MAINTENANCE
+import cache
+
+SNAPSHOT_FILE = os.environ.get("CACHE_SNAPSHOT_FILE", ".cache_snapshot")
+# Seconds between periodic snapshots, so a crash loses at most this much warmth (0 disables).
+SNAPSHOT_SECONDS = float(os.environ.get("CACHE_SNAPSHOT_SECONDS", "300"))
+# How many recently active users are snapshotted, together with their view results (0 disables).
+WARM_USERS_LIMIT = int(os.environ.get("WARM_USERS_LIMIT", "500"))
+
+MAGIC = b"REPMSNAP"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sHqdI")
+ENTRY = struct.Struct("<BdII")
+# Entry cache numbers; new caches are appended so existing files stay readable.
+CACHE_NAMES = ("registered_users", "view_results")
+
+
+def _user_of(name, key):
+    # registered_users is keyed by user ID, view_results by (view model name, user ID).
+    return key if name == "registered_users" else key[1]
+
+
+class CacheSnapshot:
+    """
+    A snapshot file mapped into memory. Keys are indexed when it is opened; a value is only
+    unpickled when take() is called for it, and each entry can be taken once. Expired entries
+    are skipped as if they had been taken.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.seq, self.written_at, count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"unsupported snapshot format {magic!r} v{version}")
+            self._index = {name: OrderedDict() for name in CACHE_NAMES}
+            offset = HEADER.size
+            for _ in range(count):
+                number, expires_at, key_length, value_length = ENTRY.unpack_from(self._map, offset)
+                offset += ENTRY.size
+                key = pickle.loads(self._map[offset:offset + key_length])
+                offset += key_length
+                if offset + value_length > len(self._map):
+                    raise ValueError("truncated snapshot")
+                self._index[CACHE_NAMES[number]][key] = (offset, value_length, expires_at)
+                offset += value_length
+        except Exception:
+            self.close()
+            raise
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        """The snapshot at path, or None if there is none or it cannot be read."""
+        try:
+            return cls(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, pickle.UnpicklingError, IndexError) as err:
+            print(f"Ignoring cache snapshot {path}: {err}")
+            return None
+
+    def take(self, name, key):
+        """
+        Removes the entry from the snapshot and returns (value, seconds it has left to live),
+        or None if it is not there or has expired.
+        """
+        with self._lock:
+            location = self._index[name].pop(key, None)
+            if location is None:
+                return None
+            offset, length, expires_at = location
+            ttl = expires_at - time.time()
+            if ttl <= 0:
+                return None
+            return pickle.loads(self._map[offset:offset + length]), ttl
+
+    def discard(self, name, key):
+        with self._lock:
+            self._index[name].pop(key, None)
+
+    def discard_users(self, user_ids):
+        """Drops every entry belonging to one of user_ids."""
+        user_ids = set(user_ids)
+        with self._lock:
+            for name, index in self._index.items():
+                for key in [k for k in index if _user_of(name, k) in user_ids]:
+                    del index[key]
+
+    def discard_all(self, name=None):
+        with self._lock:
+            for index_name, index in self._index.items():
+                if name is None or index_name == name:
+                    index.clear()
+
+    def keys(self, name, include_expired=False):
+        """Keys not yet taken, in file order (most recently used first)."""
+        now = time.time()
+        with self._lock:
+            return [key for key, (_, _, expires_at) in self._index[name].items()
+                    if include_expired or expires_at > now]
+
+    def expiring_items(self, name):
+        """Live (key, value, seconds left to live) triples, in file order."""
+        now = time.time()
+        with self._lock:
+            locations = [(key, location) for key, location in self._index[name].items() if location[2] > now]
+        return [(key, pickle.loads(self._map[offset:offset + length]), expires_at - now)
+                for key, (offset, length, expires_at) in locations]
+
+    def items(self, name):
+        return [(key, value) for key, value, _ in self.expiring_items(name)]
+
+    def discard_expired(self):
+        """Drops every entry whose TTL has run out."""
+        now = time.time()
+        with self._lock:
+            for index in self._index.values():
+                for key in [k for k, (_, _, expires_at) in index.items() if expires_at <= now]:
+                    del index[key]
+
+    def __len__(self):
+        return sum(len(index) for index in self._index.values())
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class SnapshotCache:
+    """
+    TTLCache-compatible wrapper whose misses fall back to a snapshot's entries. An entry
+    found in the snapshot is moved into the wrapped cache; delete() and clear() drop the
+    snapshot's copy too, so an invalidation is never undone by an older snapshot entry.
+    """
+
+    def __init__(self, inner, snapshot, name):
+        self.inner = inner
+        self.snapshot = snapshot
+        self.name = name
+        self.snapshot_hits = 0
+
+    def get(self, key, default=None):
+        value = self.inner.get(key)
+        if value is None:
+            entry = self.snapshot.take(self.name, key)
+            if entry is None:
+                return default
+            value, ttl = entry
+            self.snapshot_hits += 1
+            self.inner.set(key, value, ttl)  # Only the rest of the TTL it had when snapshotted
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.snapshot.discard(self.name, key)
+        self.inner.set(key, value, ttl)
+
+    def delete(self, key):
+        self.snapshot.discard(self.name, key)
+        self.inner.delete(key)
+
+    def clear(self):
+        self.snapshot.discard_all(self.name)
+        self.inner.clear()
+
+    def keys(self):
+        keys = self.inner.keys()
+        live = set(keys)
+        return keys + [k for k in self.snapshot.keys(self.name) if k not in live]
+
+    def items(self):
+        items = self.inner.items()
+        live = {key for key, _ in items}
+        return items + [(k, v) for k, v in self.snapshot.items(self.name) if k not in live]
+
+    def expiring_items(self):
+        items = self.inner.expiring_items()
+        live = {key for key, _, _ in items}
+        return items + [entry for entry in self.snapshot.expiring_items(self.name) if entry[0] not in live]
+
+    def __len__(self):
+        return len(self.inner)
+
+    def stats(self):
+        return {**self.inner.stats(), "snapshot_hits": self.snapshot_hits,
+                "snapshot_pending": len(self.snapshot.keys(self.name))}
+
+
+def _unwrap(c):
+    return c.inner if isinstance(c, SnapshotCache) else c
+
+
+def snapshots_enabled():
+    """Snapshots only apply to in-process caches; the shared tiers outlive a worker restart."""
+    return bool(WARM_USERS_LIMIT) and isinstance(_unwrap(cache.registered_users), cache.TTLCache)
+
+
+def write_snapshot(seq, path=None, limit=None):
+    """
+    Writes the most recently used limit users and their view results, tagged with seq.
+    The file is replaced atomically, so a crash mid-write leaves the previous snapshot.
+    Returns the number of entries written.
+    """
+    path = path or SNAPSHOT_FILE
+    limit = WARM_USERS_LIMIT if limit is None else limit
+    users = cache.registered_users.expiring_items()[:limit]
+    user_ids = {key for key, _, _ in users}
+    views = [entry for entry in cache.view_results.expiring_items() if entry[0][1] in user_ids]
+    now = time.time()
+    entries = [(number, key, value, now + ttl)
+               for number, items in enumerate((users, views)) for key, value, ttl in items]
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, seq, now, len(entries)))
+            for number, key, value, expires_at in entries:
+                key_bytes = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+                value_bytes = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                f.write(ENTRY.pack(number, expires_at, len(key_bytes), len(value_bytes)))
+                f.write(key_bytes)
+                f.write(value_bytes)
+        os.replace(temporary, path)
+    except OSError as err:
+        print(f"Could not write cache snapshot: {err}")
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        return 0
+    return len(entries)
+
+
+def install(snapshot):
+    """Puts the snapshot behind this process's caches."""
+    uninstall()
+    cache.registered_users = SnapshotCache(_unwrap(cache.registered_users), snapshot, "registered_users")
+    cache.view_results = SnapshotCache(_unwrap(cache.view_results), snapshot, "view_results")
+
+
+def uninstall():
+    """Closes the installed snapshot, if any, and returns the plain caches."""
+    for name in CACHE_NAMES:
+        c = getattr(cache, name)
+        if isinstance(c, SnapshotCache):
+            c.snapshot.close()
+            setattr(cache, name, c.inner)
+
+
+async def restore(tailer, path=None, limit=None):
+    """
+    Loads the snapshot and revalidates it against the change log. The tailer is positioned
+    at the end of the log first, so every later change reaches the caches through it and
+    every earlier one is covered here. Returns the number of entries kept.
+    """
+    limit = WARM_USERS_LIMIT if limit is None else limit
+    snapshot = CacheSnapshot.open(path or SNAPSHOT_FILE)
+    if snapshot is None:
+        return 0
+    await tailer.seek_to_end()
+    upto = tailer.last_seq
+    oldest = tailer.stats()["truncated_upto"]
+    if oldest <= snapshot.seq <= upto:
+        snapshot.discard_expired()
+        if snapshot.seq < upto:
+            rows = await Database.select_async(Query.CHANGED_USERS_BETWEEN, (snapshot.seq, upto), primary=True) or []
+            snapshot.discard_users(row["user_id"] for row in rows)
+        install(snapshot)
+        return len(snapshot)
+
+    # The changes since the snapshot have been truncated (or it belongs to another database):
+    # its contents cannot be trusted, but it still says who was active.
+    ids = snapshot.keys("registered_users", include_expired=True)[:limit]
+    snapshot.close()
+    if not ids:
+        return 0
+    rows = await Database.select_async(Query.REGISTERED_USERS_BY_IDS, (tuple(ids),)) or []
+    for row in rows:
+        cache.registered_users.set(row["tracking_id"], row)
+    return len(rows)
+
+
+class SnapshotWriter:
+    """Rewrites the snapshot every SNAPSHOT_SECONDS at the tailer's current position."""
+
+    def __init__(self, interval=SNAPSHOT_SECONDS):
+        self.interval = interval
+        self._task = None
+        self.written = 0
+
+    def start(self, tailer):
+        """Starts the periodic snapshots. Must be called from inside the running event loop."""
+        if self._task is None and self.interval and snapshots_enabled():
+            with db_context(work_class=MAINTENANCE):
+                self._task = asyncio.create_task(self._run(tailer))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, tailer):
+        while True:
+            await asyncio.sleep(self.interval)
+            seq = tailer.position()
+            if seq is None:
+                continue
+            try:
+                await asyncio.to_thread(write_snapshot, seq)
+                self.written += 1
+            except Exception as err:
+                print(f"Cache snapshot failed: {err}")
+
+
+snapshot_writer = SnapshotWriter()
@@ -0,0 +1,55 @@
+"""
+Startup helpers for the bot process: phase timing, connection warm-up and restoring the
+caches from the snapshot written before the last shutdown (see snapshot.py).
+"""
+
+import time
+import asyncio
+from database import Database
+import compute
+import snapshot
+
+
+class StartupTimer:
+    """Records how long each startup phase took, measured from process start."""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def summary(self):
+        parts = ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        return f"Startup: {parts} (total {self.total() * 1000:.0f}ms)"
+
+
+async def warm_up(timer, changelog):
+    """
+    Runs the startup warm-up phases; called from the bot's setup_hook before it goes online.
+    Restoring the cache snapshot positions changelog at the end of the log.
+    """
+    # The CPU pool's worker processes start while the connection pools open.
+    await asyncio.gather(Database.warm_up_async(), asyncio.to_thread(compute.warm_up))
+    timer.mark("connection and CPU pool warm-up")
+    if snapshot.snapshots_enabled():
+        restored = await snapshot.restore(changelog)
+        timer.mark(f"cache snapshot restore ({restored} entries)")
+
+
+async def shut_down(changelog):
+    """Snapshots the caches, closes the database pools and stops the CPU pool."""
+    if snapshot.snapshots_enabled():
+        # Not yet polled: the entries are tagged as unverified, which keeps only the user IDs.
+        seq = changelog.position()
+        snapshot.write_snapshot(-1 if seq is None else seq)
+        snapshot.uninstall()
+    Database.close()
+    compute.shut_down()
@@ -0,0 +1,122 @@
+"""
+Supervisor entry point for sharded, multi-process deployments.
+
+Starts the shared cache server, then one worker process per shard range. Each worker runs
+an AutoShardedBot for its own shards, so gateway events, command handling and result
+formatting are spread across CPU cores, while registered users and view results are
+cached once for all workers. Crashed workers are restarted with a backoff.
+
+    WORKER_PROCESSES=4 SHARD_COUNT=8 python "Python Files/supervisor.py"
+"""
+
+import os
+import sys
+import time
+import signal
+import multiprocessing
+import cache
+import compute
+
+# Discord only allows one IDENTIFY per 5 seconds for most bots, so workers start staggered
+# by this much per shard that comes before them.
+IDENTIFY_DELAY = float(os.environ.get("IDENTIFY_DELAY", "5"))
+RESTART_BACKOFF_MAX = 60.0
+# A worker that stayed up this long before exiting is restarted without backoff again.
+RESTART_STABLE_AFTER = float(os.environ.get("RESTART_STABLE_AFTER", "300"))
+
+
+def shard_ranges(shard_count, workers):
+    """Splits shard ids 0..shard_count-1 into `workers` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def _run_worker(shard_ids, shard_count, start_delay):
+    # Runs in the child process; cache location and auth key arrive through the environment.
+    time.sleep(start_delay)
+    import main
+    main.run_worker(shard_ids, shard_count)
+
+
+class Supervisor:
+
+    def __init__(self, shard_count, workers):
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, workers)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = {}
+        self._restarts = {}
+        self._started = {}  # index -> monotonic time the worker's process began running
+        self._stopping = False
+        self._cache_manager = None
+
+    def start(self):
+        authkey = os.urandom(16)
+        self._cache_manager = cache.start_shared_cache(authkey=authkey)
+        host, port = self._cache_manager.address
+        os.environ["CACHE_ADDRESS"] = f"{host}:{port}"
+        os.environ["CACHE_AUTHKEY"] = authkey.hex()
+        print(f"Shared cache listening on {host}:{port}")
+        # Every worker would otherwise size its CPU pool for the whole machine.
+        os.environ.setdefault("CPU_WORKERS", str(compute.default_workers(len(self.ranges))))
+
+        for index, shard_ids in enumerate(self.ranges):
+            self._spawn(index, start_delay=IDENTIFY_DELAY * shard_ids[0])
+
+    def _spawn(self, index, start_delay=0.0):
+        shard_ids = self.ranges[index]
+        process = self._context.Process(target=_run_worker, args=(shard_ids, self.shard_count, start_delay),
+                                        name=f"repm-shards-{shard_ids[0]}-{shard_ids[-1]}")
+        process.start()
+        self._processes[index] = process
+        self._started[index] = time.monotonic() + start_delay
+        print(f"Started worker {process.name} (pid {process.pid})")
+
+    def monitor(self):
+        """Restarts workers that exit unexpectedly, backing off if one keeps crashing."""
+        while not self._stopping:
+            for index, process in list(self._processes.items()):
+                if process.is_alive() or self._stopping:
+                    continue
+                restarts = self._restarts.get(index, 0)
+                if time.monotonic() - self._started.get(index, 0) >= RESTART_STABLE_AFTER:
+                    restarts = 0  # It had been stable, so this is a new crash rather than a crash loop
+                delay = min(RESTART_BACKOFF_MAX, 2 ** restarts)
+                print(f"Worker {process.name} exited with code {process.exitcode}; restarting in {delay:.0f}s")
+                self._restarts[index] = restarts + 1
+                self._spawn(index, start_delay=delay)
+            time.sleep(1)
+
+    def stop(self, *_):
+        self._stopping = True
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(timeout=30)
+        if self._cache_manager is not None:
+            self._cache_manager.shutdown()
+
+
+def main():
+    workers = int(os.environ.get("WORKER_PROCESSES", os.cpu_count() or 1))
+    shard_count = int(os.environ.get("SHARD_COUNT", workers))
+    supervisor = Supervisor(shard_count, workers)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    supervisor.start()
+    try:
+        supervisor.monitor()
+    finally:
+        supervisor.stop()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Seeded synthetic data for load tests: N users x M properties x K units. Each unit gets a few
+years of leases with their tenants and monthly rent payments; each property a mortgage (most
+of them), tax records, an insurance policy, a purchase history with expenses, and projects
+with contractors.
+
+    python "Python Files/synthetic.py" generate USERS PROPERTIES UNITS [SEED]
+    python "Python Files/synthetic.py" cleanup [SEED]
+
+The same seed and as-of date (SYNTHETIC_AS_OF, default today) always produce the same rows.
+The users of seed S get the tracking IDs SYNTHETIC_USER_BASE + S * SEED_USERS + 0, 1, ...,
+far above any Discord ID, so cleanup finds exactly them.
+
+Rows are generated as a stream and written in batches of about SYNTHETIC_BATCH_ROWS rows,
+one transaction per batch and one executemany per table (which PyMySQL sends as multi-row
+INSERTs). Every row carries its own ID, allocated above the table's highest when the run
+starts, so children never wait for their parents' IDs to be read back. Run it against a
+load-test database: rows the bot inserts meanwhile would take the same IDs.
+
+Cleanup is just as bulk: it deletes whole ID sets per table, children first, a few hundred
+properties or users per transaction.
+"""
+
+import os
+import sys
+import time
+import random
+from datetime import date, timedelta
+from collections import Counter, defaultdict
+from database import Database, Query
+
+SYNTHETIC_BATCH_ROWS = int(os.environ.get("SYNTHETIC_BATCH_ROWS", "20000"))
+# Months of lease and payment history generated per unit, up to the as-of date.
+SYNTHETIC_HISTORY_MONTHS = int(os.environ.get("SYNTHETIC_HISTORY_MONTHS", "36"))
+SYNTHETIC_USER_BASE = 9_000_000_000_000_000_000
+SEED_USERS = 1_000_000_000
+MAX_SEED = (2 ** 63 - 1 - SYNTHETIC_USER_BASE) // SEED_USERS - 1  # IDs stay within a signed BIGINT
+# IDs per cleanup statement; SQLite builds older than 3.32 allow 999 parameters.
+CLEANUP_BATCH_IDS = 500
+CONTRACTORS_PER_USER = 4
+OWNER_ROLE = 1
+
+# Generated tables and their columns, the ID first, in an order where parents come before
+# their children: a batch is written table by table in this order.
+TABLES = {
+    "RegisteredUsers": ("tracking_id", "email", "first_name", "last_name", "role_id"),
+    "Portfolios": ("portfolio_id",),
+    "UserPortfolios": ("tracking_id", "user_id", "portfolio_id", "last_appraised_val"),
+    "Contractors": ("tracking_id", "company_name", "services", "first_name", "last_name", "user_id"),
+    "Addresses": ("address_id", "country", "state_province", "city", "street", "number"),
+    "Properties": ("property_id", "total_rent", "monthly_capex", "bedroom_count", "bathroom_count", "sqft",
+                   "lot_size", "target_arv", "address_id"),
+    "PortfolioProperties": ("tracking_id", "property_id", "portfolio_id", "property_rent"),
+    "TaxRecords": ("tracking_id", "property_id", "payment_date", "due_date", "amount_paid", "year"),
+    "Mortgages": ("tracking_id", "lender_name", "principal_balance", "interest_rate", "monthly_payment",
+                  "start_date", "end_date", "property_id", "terms"),
+    "InsurancePolicies": ("tracking_id", "policy_number", "provider", "monthly_cost", "start_date", "end_date",
+                          "property_id"),
+    "PropertyHistories": ("history_id", "purchase_price", "maintenance_notes", "last_appraised_val",
+                          "purchase_date", "property_id"),
+    "ExpenseHistories": ("expense_id", "date", "cost", "label", "history_id"),
+    "ProjectInfos": ("project_id", "in_progress", "project_title", "project_description", "property_id"),
+    "ProjectUpdates": ("update_id", "project_id", "updates", "date"),
+    "ProjectContractors": ("tracking_id", "project_id", "contractor_id", "services"),
+    "Units": ("unit_id", "property_id", "bedroom_count", "bathroom_count", "rent", "vacant", "address_id"),
+    "LeaseAgreements": ("lease_id", "rent", "start_date", "end_date", "terms", "property_id"),
+    "Tenants": ("tenant_id", "notes", "first_name", "last_name", "lease_id", "past_due_balance"),
+    "PaymentHistories": ("history_id", "amount", "paid_date", "due_date", "unit_id", "tenant_id"),
+    "UnitTenants": ("tracking_id", "unit_id", "tenant_id", "tenant_name", "address_id", "lease_id"),
+}
+
+INSERTS = {table: Query.SYNTHETIC_INSERT.format(table=table, columns=", ".join(columns),
+                                                placeholders=", ".join(["%s"] * len(columns)))
+           for table, columns in TABLES.items()}
+
+FIRST_NAMES = ("James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Maria")
+LAST_NAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee")
+CITIES = (("California", "Los Angeles"), ("California", "San Diego"), ("New York", "New York City"),
+          ("Florida", "Miami"), ("Florida", "Orlando"), ("Texas", "Houston"), ("Texas", "Austin"),
+          ("Illinois", "Chicago"), ("Arizona", "Phoenix"), ("Washington", "Seattle"), ("Georgia", "Atlanta"))
+STREETS = ("Main St", "Oak Ave", "Maple Dr", "Cedar Ln", "Pine St", "Elm St", "Lake Shore Dr", "Sunset Blvd",
+           "Park Ave", "Washington St", "Hillside Rd", "River Rd")
+LENDERS = ("Bank A", "Bank B", "Bank C", "First National", "Coastal Credit Union", "Summit Lending")
+INSURERS = ("Insurance Co A", "Insurance Co B", "Insurance Co C", "Harbor Mutual", "Keystone Insurance")
+CONTRACTORS = (  # company, services
+    ("Construction Co A", "General contracting, kitchen remodel"),
+    ("Construction Co B", "Bathroom remodeling, plumbing"),
+    ("Roofing Co C", "Roof repairs, maintenance"),
+    ("Landscaping Co D", "Landscaping, yard design"),
+    ("HVAC Co E", "HVAC installation, maintenance"),
+    ("Foundation Co F", "Foundation inspection and repair"),
+    ("Sparks Electric", "Electrical wiring, panel upgrades"),
+    ("Fresh Coat Painters", "Interior and exterior painting"),
+)
+PROJECTS = (  # title, description
+    ("Kitchen Renovation", "Renovating the kitchen for better functionality."),
+    ("Bathroom Remodel", "Updating the bathroom with new fixtures and tiles."),
+    ("Roof Repair", "Fixing leaks and ensuring the roof is stable."),
+    ("Landscaping", "Landscaping the front yard to increase curb appeal."),
+    ("HVAC System Upgrade", "Installing a new energy-efficient HVAC system."),
+    ("Unit Turnover", "Painting and cleaning between tenants."),
+)
+EXPENSE_LABELS = ("Repairs", "Maintenance", "Utilities", "Cleaning", "Landscaping", "Appliances")
+TENANT_NOTES = ("Reliable renter.", "Moved in early.", "Prefers email contact.", "Has a pet.", None)
+
+
+def synthetic_user_id(seed, index):
+    return SYNTHETIC_USER_BASE + seed * SEED_USERS + index
+
+
+def _month(day, months):
+    """The first day of the month `months` months after day's."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class IdRanges:
+    """The next free ID of every generated table; users are numbered by seed instead."""
+
+    def __init__(self, highest=None):
+        highest = highest or {}
+        self._next = {table: (highest.get(table) or 0) + 1 for table in TABLES}
+
+    @classmethod
+    def from_database(cls):
+        return cls({table: Database.select(Query.TABLE_MAX_KEY.format(table=table, key=columns[0]),
+                                           primary=True)[0]["max_key"]
+                    for table, columns in TABLES.items() if table != "RegisteredUsers"})
+
+    def next(self, table):
+        value = self._next[table]
+        self._next[table] = value + 1
+        return value
+
+
+def user_rows(seed, index, properties, units, as_of, ids):
+    """Yields (table, row) for synthetic user `index` of seed, each parent before its children."""
+    rng = random.Random(f"{seed}:{index}")
+    user_id = synthetic_user_id(seed, index)
+    yield "RegisteredUsers", (user_id, f"load{seed}.{index}@synthetic.invalid",
+                              rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), OWNER_ROLE)
+    portfolio_id = ids.next("Portfolios")
+    yield "Portfolios", (portfolio_id,)
+    yield "UserPortfolios", (ids.next("UserPortfolios"), user_id, portfolio_id, "0")
+    contractors = []
+    for company, services in rng.sample(CONTRACTORS, CONTRACTORS_PER_USER):
+        contractor_id = ids.next("Contractors")
+        contractors.append((contractor_id, services))
+        yield "Contractors", (contractor_id, company, services, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), user_id)
+    for _ in range(properties):
+        yield from _property_rows(rng, portfolio_id, contractors, units, as_of, ids)
+
+
+def _property_rows(rng, portfolio_id, contractors, units, as_of, ids):
+    state, city = rng.choice(CITIES)
+    address_id = ids.next("Addresses")
+    yield "Addresses", (address_id, "USA", state, city, rng.choice(STREETS), rng.randint(1, 9999))
+
+    layouts = []  # bedrooms, bathrooms, rent per unit
+    for _ in range(units):
+        bedrooms = rng.randint(1, 4)
+        layouts.append((bedrooms, max(1, bedrooms - rng.randint(0, 1)), round(rng.uniform(700, 1100) * bedrooms, -1)))
+    rent = sum(layout[2] for layout in layouts)
+    value = round(rent * rng.uniform(150, 220), -3)
+    property_id = ids.next("Properties")
+    yield "Properties", (property_id, rent, round(rent * 0.1), sum(layout[0] for layout in layouts),
+                         sum(layout[1] for layout in layouts), rng.randint(600, 1400) * units,
+                         rng.randint(2000, 10000), round(value * 1.2, -3), address_id)
+    yield "PortfolioProperties", (ids.next("PortfolioProperties"), property_id, portfolio_id, rent)
+
+    this_month = _month(as_of, 0)
+    purchased = _month(as_of, -rng.randint(SYNTHETIC_HISTORY_MONTHS, SYNTHETIC_HISTORY_MONTHS + 120))
+    for year in (as_of.year - 1, as_of.year):
+        due = date(year, 4, 15)
+        paid = due - timedelta(days=rng.randint(0, 14)) if due <= as_of else None
+        yield "TaxRecords", (ids.next("TaxRecords"), property_id, paid, due, round(value * rng.uniform(0.008, 0.015)), year)
+    if rng.random() < 0.7:
+        principal = round(value * rng.uniform(0.5, 0.8), -2)
+        rate = round(rng.uniform(3.0, 7.5), 2)
+        monthly_rate = rate / 1200
+        payment = round(principal * monthly_rate / (1 - (1 + monthly_rate) ** -360), 2)
+        yield "Mortgages", (ids.next("Mortgages"), rng.choice(LENDERS), principal, rate, payment, purchased,
+                            _month(purchased, 360), property_id, "30-year fixed")
+    policy_start = _month(as_of, -rng.randint(0, 11))
+    yield "InsurancePolicies", (ids.next("InsurancePolicies"), rng.randint(100000, 999999), rng.choice(INSURERS),
+                                round(value * 0.0004), policy_start, _month(policy_start, 12), property_id)
+
+    history_id = ids.next("PropertyHistories")
+    yield "PropertyHistories", (history_id, round(value * rng.uniform(0.7, 0.95), -3), "Synthetic load-test property",
+                                value, purchased, property_id)
+    for months_ago in range(SYNTHETIC_HISTORY_MONTHS):
+        if rng.random() < 0.3:
+            day = _month(this_month, -months_ago) + timedelta(days=rng.randint(0, 27))
+            yield "ExpenseHistories", (ids.next("ExpenseHistories"), day, round(rng.uniform(50, 3000), 2),
+                                       rng.choice(EXPENSE_LABELS), history_id)
+    for title, description in rng.sample(PROJECTS, rng.randint(0, 2)):
+        project_id = ids.next("ProjectInfos")
+        contractor_id, services = rng.choice(contractors)
+        yield "ProjectInfos", (project_id, int(rng.random() < 0.5), title, description, property_id)
+        yield "ProjectUpdates", (ids.next("ProjectUpdates"), project_id, f"{title} scheduled.",
+                                 this_month - timedelta(days=rng.randint(0, 90)))
+        yield "ProjectContractors", (ids.next("ProjectContractors"), project_id, contractor_id, services)
+
+    for bedrooms, bathrooms, unit_rent in layouts:
+        yield from _unit_rows(rng, property_id, address_id, bedrooms, bathrooms, unit_rent, as_of, ids)
+
+
+def _unit_rows(rng, property_id, address_id, bedrooms, bathrooms, rent, as_of, ids):
+    # Back-to-back leases from the start of the history, with an occasional vacant month or two.
+    leases = []
+    start = _month(as_of, -SYNTHETIC_HISTORY_MONTHS + rng.randint(0, 3))
+    while start <= as_of:
+        months = rng.choice((6, 12, 12, 12, 24))
+        end = _month(start, months)
+        leases.append((start, end, months))
+        start = _month(end, rng.choice((0, 0, 0, 1, 2)))
+    unit_id = ids.next("Units")
+    occupied = any(start <= as_of < end for start, end, _ in leases)
+    yield "Units", (unit_id, property_id, bedrooms, bathrooms, rent, int(not occupied), address_id)
+
+    for start, end, months in leases:
+        lease_id, tenant_id = ids.next("LeaseAgreements"), ids.next("Tenants")
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        payments, past_due = [], 0
+        due = start
+        while due < end and due <= as_of:
+            chance = rng.random()
+            if chance < 0.9:
+                paid = due + timedelta(days=rng.randint(0, 4))
+            elif chance < 0.97:
+                paid = due + timedelta(days=rng.randint(5, 25))
+            else:
+                paid, past_due = None, past_due + rent
+            payments.append((ids.next("PaymentHistories"), rent, paid if paid is None or paid <= as_of else None,
+                             due, unit_id, tenant_id))
+            due = _month(due, 1)
+        yield "LeaseAgreements", (lease_id, rent, start, end, f"{months}-month lease", property_id)
+        yield "Tenants", (tenant_id, rng.choice(TENANT_NOTES), first, last, lease_id, int(past_due))
+        for payment in payments:
+            yield "PaymentHistories", payment
+        yield "UnitTenants", (ids.next("UnitTenants"), unit_id, tenant_id, f"{first} {last}", address_id, lease_id)
+
+
+def _write(batch):
+    """Inserts a batch (table -> rows) in one transaction, parents first. Returns rows per table."""
+    written = Counter()
+    with Database.transaction() as tx:
+        for table in TABLES:
+            rows = batch.get(table)
+            if rows:
+                tx.insert(INSERTS[table], rows, many_entities=True)
+                written[table] = len(rows)
+    batch.clear()
+    return written
+
+
+def generate(users, properties, units, seed=0, as_of=None, batch_rows=SYNTHETIC_BATCH_ROWS):
+    """Writes the synthetic users of seed to the database. Returns the rows written per table."""
+    if not 0 < users <= SEED_USERS:
+        raise ValueError(f"users must be between 1 and {SEED_USERS}")
+    if not 0 <= seed <= MAX_SEED:
+        raise ValueError(f"seed must be between 0 and {MAX_SEED}")
+    as_of = as_of or date.today()
+    first = synthetic_user_id(seed, 0)
+    if Database.select(Query.SYNTHETIC_USERS, (first, first + users - 1), primary=True):
+        raise ValueError(f"Seed {seed} already has synthetic users; run cleanup first")
+    ids = IdRanges.from_database()
+    batch, pending, written = defaultdict(list), 0, Counter()
+    started = time.monotonic()
+    for index in range(users):
+        for table, row in user_rows(seed, index, properties, units, as_of, ids):
+            batch[table].append(row)
+            pending += 1
+            if pending >= batch_rows:
+                written += _write(batch)
+                pending = 0
+                elapsed = time.monotonic() - started
+                print(f"  {sum(written.values())} rows ({index + 1}/{users} users), "
+                      f"{sum(written.values()) / elapsed:.0f} rows/s")
+    if pending:
+        written += _write(batch)
+    return written
+
+
+def cleanup(seed=None):
+    """Deletes the synthetic users of seed (or of every seed) and all their rows. Returns how many users."""
+    first = synthetic_user_id(seed, 0) if seed is not None else SYNTHETIC_USER_BASE
+    last = synthetic_user_id(seed, SEED_USERS - 1) if seed is not None else 2 ** 63 - 1
+    users = [row["tracking_id"] for row in Database.select(Query.SYNTHETIC_USERS, (first, last), primary=True) or []]
+    for start in range(0, len(users), CLEANUP_BATCH_IDS):
+        chunk = tuple(users[start:start + CLEANUP_BATCH_IDS])
+        rows = Database.select(Query.SYNTHETIC_USER_PROPERTIES, (chunk,), primary=True) or []
+        portfolios = Database.select(Query.SYNTHETIC_USER_PORTFOLIOS, (chunk,), primary=True) or []
+        _delete("properties", [row["property_id"] for row in rows])
+        _delete("addresses", sorted({row["address_id"] for row in rows if row["address_id"] is not None}))
+        _delete("users", list(chunk))
+        _delete("portfolios", [row["portfolio_id"] for row in portfolios if row["portfolio_id"] is not None])
+    return len(users)
+
+
+def _delete(parameter, ids):
+    """Runs the SYNTHETIC_CLEANUP statements taking parameter for ids, a batch per transaction."""
+    statements = [statement for name, statement in Query.SYNTHETIC_CLEANUP if name == parameter]
+    for start in range(0, len(ids), CLEANUP_BATCH_IDS):
+        chunk = tuple(ids[start:start + CLEANUP_BATCH_IDS])
+        with Database.transaction() as tx:
+            for statement in statements:
+                tx.delete(statement, (chunk,))
+
+
+def main(argv):
+    usage = 'Usage: python "Python Files/synthetic.py" generate USERS PROPERTIES UNITS [SEED] | cleanup [SEED]'
+    command = argv[1] if len(argv) > 1 else None
+    try:
+        if command == "generate" and 5 <= len(argv) <= 6:
+            users, properties, units = (int(arg) for arg in argv[2:5])
+            seed = int(argv[5]) if len(argv) > 5 else 0
+            as_of = date.fromisoformat(os.environ["SYNTHETIC_AS_OF"]) if os.environ.get("SYNTHETIC_AS_OF") else date.today()
+            started = time.monotonic()
+            written = generate(users, properties, units, seed, as_of)
+            elapsed = time.monotonic() - started
+            print(f"Wrote {sum(written.values())} rows for {users} users (seed {seed}, as of {as_of}) "
+                  f"in {elapsed:.1f} s")
+            for table, count in written.most_common():
+                print(f"  {table:<20} {count:>10}")
+        elif command == "cleanup" and len(argv) <= 3:
+            seed = int(argv[2]) if len(argv) > 2 else None
+            started = time.monotonic()
+            removed = cleanup(seed)
+            print(f"Removed {removed} synthetic users in {time.monotonic() - started:.1f} s")
+        else:
+            print(usage)
+            return 2
+    finally:
+        Database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
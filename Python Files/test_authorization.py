@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import pytest
+from contextlib import asynccontextmanager
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+from database import Query
+from cache import TTLCache
+from authorization import Role, Permission, RoleExpirySweeper, effective_role, has_permission
+
+TODAY = date(2025, 6, 1)
+
+
+@pytest.mark.unit
+class TestPermissions:
+
+    def test_owner_keeps_role_until_expiry_date_has_passed(self):
+        owner = {"role_id": Role.OWNER, "role_expires": TODAY}
+        assert effective_role(owner, TODAY) == Role.OWNER
+        assert effective_role(owner, date(2025, 6, 2)) == Role.GUEST
+
+    def test_role_without_expiry_never_expires(self):
+        assert effective_role({"role_id": Role.OWNER, "role_expires": None}, TODAY) == Role.OWNER
+
+    def test_only_owners_may_view_portfolio(self):
+        assert has_permission({"role_id": Role.OWNER}, Permission.VIEW_PORTFOLIO, TODAY)
+        assert not has_permission({"role_id": Role.GUEST}, Permission.VIEW_PORTFOLIO, TODAY)
+        assert not has_permission({"role_id": Role.ADMIN}, Permission.MANAGE_DATA, TODAY)
+
+    def test_command_check_uses_cached_user_row(self):
+        import main
+
+        async def command(ctx):
+            pass
+        predicate = main.requires_permission(Permission.VIEW_PORTFOLIO)(command).__commands_checks__[0]
+        ctx = SimpleNamespace(author=SimpleNamespace(id=42))
+        users = TTLCache()
+        users.set(42, {"tracking_id": 42, "role_id": Role.GUEST, "role_expires": None})
+
+        with patch("cache.registered_users", users), patch("models.Database.select_async") as mock_select:
+            with pytest.raises(main.RoleNotPermitted):
+                asyncio.run(predicate(ctx))
+
+        mock_select.assert_not_called()
+
+
+class FakeTransaction:
+
+    def __init__(self, expired_ids):
+        self.expired_ids = expired_ids
+        self.updates = []
+
+    async def select(self, query, values=None, fetch=True):
+        return [{"tracking_id": i} for i in self.expired_ids]
+
+    async def update(self, query, values=None):
+        self.updates.append((query, values))
+
+
+@pytest.mark.unit
+class TestRoleExpirySweeper:
+
+    def test_load_builds_heap_from_one_range_query(self):
+        rows = [{"tracking_id": 2, "role_expires": date(2025, 6, 5)},
+                {"tracking_id": 1, "role_expires": date(2025, 6, 3)}]
+        sweeper = RoleExpirySweeper(horizon_days=7)
+
+        with patch("authorization.Database.select_async", new=AsyncMock(return_value=rows)) as mock_select:
+            asyncio.run(sweeper.load(TODAY))
+
+        mock_select.assert_awaited_once_with(Query.ROLE_EXPIRIES_BEFORE, (date(2025, 6, 8), Role.GUEST), primary=True)
+        assert sweeper._heap[0] == (date(2025, 6, 3), 1)
+
+    def test_sweep_expires_roles_in_one_update_and_invalidates_users(self):
+        sweeper = RoleExpirySweeper()
+        sweeper._horizon = date(2025, 6, 8)
+        sweeper.schedule(1, date(2025, 5, 31))
+        sweeper.schedule(2, date(2025, 6, 5))
+        tx = FakeTransaction([1, 7])
+
+        @asynccontextmanager
+        async def transaction_async(read_only=False):
+            yield tx
+
+        users = TTLCache()
+        users.set(1, {"tracking_id": 1})
+        with patch("authorization.Database.transaction_async", new=transaction_async), \
+             patch("cache.registered_users", users):
+            expired = asyncio.run(sweeper.sweep(TODAY))
+
+        assert expired == [1, 7]
+        assert tx.updates == [(Query.EXPIRE_ROLES, (Role.GUEST, Role.GUEST))]
+        assert users.get(1) is None
+        assert sweeper._heap == [(date(2025, 6, 5), 2)]
+
+    def test_sweep_invalidates_a_shared_tier_off_the_event_loop(self):
+        class RemoteUsers:
+            # Stands in for a shared-tier proxy: records the thread each delete ran on.
+            def delete(self, key):
+                self.deleted = (key, threading.current_thread())
+
+        @asynccontextmanager
+        async def transaction_async(read_only=False):
+            yield FakeTransaction([3])
+
+        users = RemoteUsers()
+        with patch("authorization.Database.transaction_async", new=transaction_async), \
+             patch("cache.registered_users", users), patch("cache.view_results", TTLCache()):
+            asyncio.run(RoleExpirySweeper().sweep(TODAY))
+
+        assert users.deleted[0] == 3 and users.deleted[1] is not threading.main_thread()
+
+    def test_schedule_ignores_expiries_beyond_horizon(self):
+        sweeper = RoleExpirySweeper()
+        sweeper._horizon = date(2025, 6, 8)
+        sweeper.schedule(1, date(2026, 1, 1))
+        assert sweeper.stats()["scheduled"] == 0
+
+    def test_overdue_expiry_wakes_immediately(self):
+        sweeper = RoleExpirySweeper()
+        sweeper._horizon = date(2025, 6, 8)
+        sweeper.schedule(1, date(2025, 5, 1))
+        assert sweeper.next_wake(TODAY) == 0.0
@@ -1,5 +1,6 @@
 import pytest
 from models import *
+from rollups import drifted_columns
 
 @pytest.mark.integration
 def test_register(registered_test_user):
@@ -45,3 +46,41 @@ def test_reset_user_data(registered_test_user):
 
     assert after_count == before_count - 6, \
         f"Expected -6 properties, got {after_count - before_count}"
+
+
+@pytest.mark.integration
+def test_assign_role_sets_user_expiry(registered_test_user):
+    """AssignRole should store the expiry on the user, and expired roles are swept to Guest."""
+    Database.callprocedure(Query.PROC_AssignRole, (registered_test_user, 1, "2000-01-01"))
+    row = Database.select(Query.REGISTERED_USER, (registered_test_user,), primary=True)[0]
+    assert str(row["role_expires"]) == "2000-01-01"
+
+    Database.update(Query.EXPIRE_ROLES, (3, 3))
+
+    row = Database.select(Query.REGISTERED_USER, (registered_test_user,), primary=True)[0]
+    assert row["role_id"] == 3
+
+
+@pytest.mark.integration
+def test_sample_data_is_recorded_in_change_log(registered_test_user):
+    """Rows written by CreateSampleUserData should be logged to ChangeLog under the calling user."""
+    start = Database.select(Query.CHANGE_SEQ_RANGE, primary=True)[0]["last_seq"]
+
+    Database.callprocedure(Query.PROC_CreateSampleUserData, (registered_test_user,))
+
+    changes = Database.select(Query.CHANGES_AFTER, (start, 100000), primary=True)
+    mortgages = [c for c in changes if c["table_name"] == "Mortgages" and c["user_id"] == registered_test_user]
+    assert mortgages and all(c["op"] == "I" for c in mortgages)
+
+
+@pytest.mark.integration
+def test_portfolio_rollups_match_source_rows(registered_test_user):
+    """Rollups maintained by triggers should equal the totals recomputed from the source rows."""
+    Database.callprocedure(Query.PROC_CreateSampleUserData, (registered_test_user,))
+    portfolio_id = Database.select(Query.PORTFOLIOS_BY_USER, (registered_test_user,), primary=True)[0]["portfolio_id"]
+
+    stored = Database.select(Query.PORTFOLIO, (portfolio_id,), primary=True)[0]
+    actual = Database.select(Query.PORTFOLIO_ROLLUP_ACTUALS, ((portfolio_id,),), primary=True)[0]
+
+    assert stored["num_properties"] == 6
+    assert drifted_columns(stored, actual) == []
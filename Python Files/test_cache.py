@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import Mock, patch
+import cache
+from cache import TTLCache, UserIndexCache
+
+
+@pytest.mark.unit
+class TestTTLCache:
+
+    def test_get_returns_stored_value(self):
+        c = TTLCache()
+        c.set("a", 1)
+
+        assert c.get("a") == 1
+        assert c.get("missing") is None
+
+    def test_expired_entries_are_missing(self):
+        # time.monotonic is pinned so expiry is tested without sleeping.
+        c = TTLCache(ttl=10)
+        with patch("cache.time.monotonic", return_value=100.0):
+            c.set("a", 1)
+        with patch("cache.time.monotonic", return_value=111.0):
+            assert c.get("a") is None
+
+    def test_evicts_least_recently_used(self):
+        c = TTLCache(maxsize=2)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.get("a")  # "b" is now the least recently used entry
+        c.set("c", 3)
+
+        assert c.get("b") is None
+        assert c.get("a") == 1 and c.get("c") == 3
+
+    def test_keys_most_recent_first(self):
+        c = TTLCache()
+        for key in ("a", "b", "c"):
+            c.set(key, key)
+        c.get("a")
+
+        assert c.keys() == ["a", "c", "b"]
+
+
+class CountingIndexes(UserIndexCache):
+
+    async def build(self, user_id):
+        return {"user_id": user_id}
+
+
+@pytest.mark.unit
+class TestUserIndexCache:
+
+    def test_index_is_built_once_until_dropped(self):
+        async def run():
+            indexes = CountingIndexes(10, 60)
+            first = await indexes.index_for(1)
+            assert await indexes.index_for(1) is first
+            indexes.drop(1)
+            assert await indexes.index_for(1) is not first
+            return indexes
+
+        assert asyncio.run(run()).stats()["builds"] == 2
+
+
+class RemoteCache(TTLCache):
+    # Stands in for a shared-tier proxy: records which thread each get ran on.
+
+    def get(self, key, default=None):
+        self.thread = threading.current_thread()
+        return super().get(key, default)
+
+
+@pytest.mark.unit
+class TestAsyncAccess:
+
+    def test_in_process_caches_are_called_on_the_event_loop(self):
+        local = TTLCache()
+        local.set(1, "row")
+        with patch("cache.registered_users", local), patch("cache.view_results", TTLCache()):
+            assert asyncio.run(cache.run_async(local.get, 1)) == "row"
+
+    def test_shared_tier_calls_run_off_the_event_loop(self):
+        remote = RemoteCache()
+        remote.set(1, "row")
+        with patch("cache.registered_users", Mock()), patch("cache.view_results", remote):
+            assert asyncio.run(cache.run_async(remote.get, 1)) == "row"
+
+        assert remote.thread is not threading.main_thread()
@@ -0,0 +1,168 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from database import Query, Tables
+from changelog import ChangeLogTailer, changed_users, GAP_TIMEOUT_SECONDS
+
+
+def change(seq, table=Tables.MORTGAGES, user_id=42, op="U"):
+    return {"seq": seq, "table_name": table, "pk": seq, "op": op, "user_id": user_id}
+
+
+class FakeChangeLog:
+    """Answers the tailer's queries from an in-memory list of committed ChangeLog rows."""
+
+    def __init__(self, rows, consumed=None):
+        self.rows = rows
+        self.consumed = consumed
+        self.deleted = []
+
+    async def select(self, query, values=None, primary=False):
+        if query == Query.CHANGE_SEQ_RANGE:
+            seqs = [row["seq"] for row in self.rows]
+            return [{"first_seq": min(seqs, default=1), "last_seq": max(seqs, default=0)}]
+        if query == Query.CHANGES_AFTER:
+            after, limit = values
+            return sorted((r for r in self.rows if r["seq"] > after), key=lambda r: r["seq"])[:limit]
+        if query == Query.CHANGES_BY_SEQ:
+            return [r for r in self.rows if r["seq"] in values[0]]
+        if query == Query.CONSUMED_CHANGE_SEQ:
+            return [{"seq": self.consumed}]
+        raise AssertionError(query)
+
+    async def delete(self, query, values=None):
+        if query == Query.TRUNCATE_CHANGELOG:
+            self.deleted.append(values)
+
+
+def patched(log):
+    return patch.multiple("changelog.Database", select_async=AsyncMock(side_effect=log.select),
+                          delete_async=AsyncMock(side_effect=log.delete), insert_async=AsyncMock())
+
+
+@pytest.mark.unit
+class TestChangeLogTailer:
+
+    def test_starts_at_end_of_log_and_publishes_new_changes(self):
+        log = FakeChangeLog([change(1), change(2)])
+        tailer = ChangeLogTailer()
+        received = []
+        tailer.subscribe(received.extend)
+
+        async def scenario():
+            await tailer.poll()
+            log.rows.append(change(3, user_id=43))
+            await tailer.poll()
+
+        with patched(log):
+            asyncio.run(scenario())
+
+        assert [c["seq"] for c in received] == [3]
+        assert tailer.position() == 3
+
+    def test_reads_in_batches(self):
+        log = FakeChangeLog([])
+        tailer = ChangeLogTailer(batch_size=2)
+
+        async def scenario():
+            await tailer.poll()
+            log.rows += [change(seq) for seq in range(1, 6)]
+            return [await tailer.poll() for _ in range(3)]
+
+        with patched(log):
+            assert asyncio.run(scenario()) == [2, 2, 1]
+
+    def test_subscribers_only_get_their_tables(self):
+        log = FakeChangeLog([])
+        tailer = ChangeLogTailer()
+        calls = []
+        tailer.subscribe(calls.append, tables=[Tables.LEASE_AGREEMENTS])
+
+        async def scenario():
+            await tailer.poll()
+            log.rows += [change(1, Tables.MORTGAGES), change(2, Tables.LEASE_AGREEMENTS)]
+            await tailer.poll()
+
+        with patched(log):
+            asyncio.run(scenario())
+
+        assert [[c["seq"] for c in batch] for batch in calls] == [[2]]
+
+    def test_late_committed_change_fills_its_gap(self):
+        log = FakeChangeLog([])
+        tailer = ChangeLogTailer()
+        received = []
+
+        async def subscriber(changes):
+            received.extend(c["seq"] for c in changes)
+        tailer.subscribe(subscriber)
+
+        async def scenario():
+            await tailer.poll()
+            log.rows += [change(1), change(3)]  # seq 2 is still uncommitted
+            await tailer.poll()
+            position_with_gap = tailer.position()
+            log.rows.append(change(2))
+            await tailer.poll()
+            return position_with_gap
+
+        with patched(log):
+            assert asyncio.run(scenario()) == 1
+
+        assert received == [1, 3, 2]
+        assert tailer.position() == 3
+
+    def test_unfilled_gap_is_given_up_after_timeout(self):
+        log = FakeChangeLog([])
+        tailer = ChangeLogTailer()
+
+        async def scenario():
+            await tailer.poll()
+            log.rows += [change(1), change(3)]
+            await tailer.poll()
+            tailer._gaps = {seq: seen - GAP_TIMEOUT_SECONDS - 1 for seq, seen in tailer._gaps.items()}
+            await tailer.poll()
+
+        with patched(log):
+            asyncio.run(scenario())
+
+        assert tailer.position() == 3
+
+    def test_failing_subscriber_does_not_stop_others(self):
+        log = FakeChangeLog([])
+        tailer = ChangeLogTailer()
+        received = []
+
+        def broken(changes):
+            raise RuntimeError("boom")
+        tailer.subscribe(broken)
+        tailer.subscribe(received.extend)
+
+        async def scenario():
+            await tailer.poll()
+            log.rows.append(change(1))
+            await tailer.poll()
+
+        with patched(log):
+            asyncio.run(scenario())
+
+        assert len(received) == 1
+
+    def test_checkpoint_truncates_what_all_consumers_read_in_chunks(self):
+        log = FakeChangeLog([change(seq) for seq in range(101, 111)], consumed=108)
+        tailer = ChangeLogTailer()
+
+        async def scenario():
+            await tailer.poll()
+            with patch("changelog.TRUNCATE_CHUNK", 5):
+                await tailer.checkpoint()
+
+        with patched(log):
+            asyncio.run(scenario())
+
+        assert log.deleted == [(100, 105), (105, 108)]
+
+    def test_changed_users_skips_unknown_owners(self):
+        changes = [change(1, user_id=42), change(2, user_id=None), change(3, Tables.TENANTS, user_id=43)]
+        assert changed_users(changes) == {42, 43}
+        assert changed_users(changes, tables=[Tables.TENANTS]) == {43}
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import compute
+from compute import pack_rows, unpack_rows, run_rows, run_cpu, ResultTooLarge
+from datetime import date
+from formatting import format_mortgages, format_cashflow_history
+
+MORTGAGES = [
+    {"mortgage_id": 1, "lender_name": "Chase", "property_address": "1 Main St", "principal_balance": 250000,
+     "interest_rate": 6.5, "monthly_payment": 1800, "start_date": "2020-01-01", "end_date": "2050-01-01",
+     "purchase_price": 300000},
+    {"mortgage_id": None, "lender_name": "Total", "property_address": None, "principal_balance": 250000,
+     "interest_rate": None, "monthly_payment": 1800, "start_date": None, "end_date": None,
+     "purchase_price": 300000},
+]
+
+
+def repeat(text, times):
+    return text * times
+
+
+@pytest.mark.unit
+class TestCompute:
+
+    def test_pack_rows_round_trips(self):
+        columns, values = pack_rows(MORTGAGES)
+        assert columns[0] == "mortgage_id" and len(values) == 2
+        assert unpack_rows(columns, values) == MORTGAGES
+
+    def test_short_listings_are_formatted_inline(self):
+        with patch("compute._get_pool") as mock_pool:
+            entries = asyncio.run(run_rows(format_mortgages, MORTGAGES))
+
+        mock_pool.assert_not_called()
+        assert entries == format_mortgages(MORTGAGES)
+
+    def test_long_listings_are_formatted_on_process_pool(self):
+        rows = MORTGAGES[:1] * 50 + MORTGAGES[1:]
+        try:
+            with patch("compute.CPU_WORKERS", 1), patch("compute.OFFLOAD_MIN_ROWS", 10):
+                entries = asyncio.run(run_rows(format_mortgages, rows))
+        finally:
+            compute.shut_down()
+
+        assert entries == format_mortgages(rows)
+
+    def test_oversized_result_is_refused(self):
+        with patch("compute.CPU_WORKERS", 0):
+            with pytest.raises(ResultTooLarge):
+                asyncio.run(run_cpu(repeat, "x", 10000, max_result_bytes=1000))
+
+
+@pytest.mark.unit
+class TestFormatting:
+
+    def test_mortgage_listing_matches_previous_output(self):
+        entries = format_mortgages(MORTGAGES)
+
+        assert entries[0] == "**Mortgages** — ordered by start date (totals row last):\n"
+        assert entries[1] == (
+            "**Chase** (ID: 1)\n"
+            "  Property:          1 Main St\n"
+            "  Principal Balance: $250,000.00\n"
+            "  Interest Rate:     6.5%\n"
+            "  Monthly Payment:   $1,800.00\n"
+            "  Term:              2020-01-01 → 2050-01-01\n"
+            "  Purchase Price:    $300,000.00\n"
+        )
+        assert entries[2].startswith("**— Totals —**\n")
+
+    def test_cashflow_history_shows_recent_months_and_net_chart(self):
+        rows = [
+            {"month": date(2024, 1, 1), "kind": "expense", "category": "Kitchen remodel", "total": 5000.0},
+            {"month": date(2024, 2, 1), "kind": "expense", "category": "Roof repairs", "total": 500.0},
+            {"month": date(2024, 2, 1), "kind": "income", "category": "Rent", "total": 2500.0},
+            {"month": date(2024, 3, 1), "kind": "income", "category": "Rent", "total": 1000.0},
+        ]
+
+        entries = format_cashflow_history(rows, months=2)
+
+        assert len(entries) == 4 and "last 2 months" in entries[0]
+        assert entries[1].startswith("**2024-02**\n") and "Roof repairs: $500.00" in entries[1]
+        assert "Net:      $2,000.00" in entries[1]
+        chart = entries[3].split("```")[1].strip().splitlines()
+        assert chart == ["2024-02 +" + "█" * 20 + " $2,000", "2024-03 +" + "█" * 10 + " " * 10 + " $1,000"]
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from database import Database, Query
+from formatting import format_contractor_workloads, format_contractor_matches
+from contractors import ContractorIndex, ContractorIndexes
+
+USER_ID = 42
+
+
+def assignment(contractor_id, company, services, assignment_id=None, project_id=None, title=None, in_progress=None):
+    return {"contractor_id": contractor_id, "company_name": company, "full_name": f"{company} Owner",
+            "services": services, "assignment_id": assignment_id, "project_id": project_id,
+            "project_title": title, "in_progress": in_progress}
+
+
+ROWS = [
+    assignment(1, "Construction Co B", "Bathroom remodeling, plumbing", 10, 100, "Bathroom Renovation", 1),
+    assignment(1, "Construction Co B", "Bathroom remodeling, plumbing", 11, 101, "Kitchen Renovation", 1),
+    assignment(1, "Construction Co B", "Bathroom remodeling, plumbing", 12, 102, "Water Heater", 1),
+    assignment(2, "Pipes Inc", "Plumbing, drains", 13, 103, "Drain Repair", 0),
+    assignment(3, "Roofing Co C", "Roof repairs, maintenance"),
+]
+
+
+def change(table, pk, op="U", user_id=USER_ID):
+    return {"seq": 1, "table_name": table, "pk": pk, "op": op, "user_id": user_id}
+
+
+@pytest.fixture()
+def built():
+    # A ContractorIndexes whose index for USER_ID has already been built from ROWS.
+    indexes = ContractorIndexes()
+    with patch("contractors.Database.select_async", new=AsyncMock(return_value=ROWS)):
+        asyncio.run(indexes.index_for(USER_ID))
+    return indexes
+
+
+def companies(rows):
+    return [row["company_name"] for row in rows]
+
+
+@pytest.mark.unit
+class TestContractorIndex:
+
+    def test_workloads_count_projects_in_progress(self):
+        rows = ContractorIndex(ROWS).workloads()
+
+        assert companies(rows) == ["Construction Co B", "Pipes Inc", "Roofing Co C"]
+        assert (rows[0]["active_projects"], rows[0]["total_projects"], rows[0]["overloaded"]) == (3, 3, True)
+        assert (rows[1]["active_projects"], rows[1]["total_projects"], rows[1]["overloaded"]) == (0, 1, False)
+        assert rows[0]["active_titles"] == ["Bathroom Renovation", "Kitchen Renovation", "Water Heater"]
+
+    def test_services_match_by_word_prefix_least_busy_first(self):
+        index = ContractorIndex(ROWS)
+
+        assert companies(index.find("plumb")) == ["Pipes Inc", "Construction Co B"]
+        assert companies(index.find("Bathroom plumbing")) == ["Construction Co B"]
+        assert index.find("electrical") == [] and index.find(" !! ") == []
+
+    def test_removed_contractors_are_unindexed(self):
+        index = ContractorIndex(ROWS)
+        index.remove(2)
+
+        assert companies(index.find("drains")) == []
+        assert "drains" not in index._services and 13 not in index.owners and 103 not in index.projects
+
+
+@pytest.mark.unit
+class TestContractorIndexes:
+
+    def test_index_is_built_with_one_query_and_reused(self):
+        indexes = ContractorIndexes()
+
+        with patch("contractors.Database.select_async", new=AsyncMock(return_value=ROWS)) as mock_select:
+            asyncio.run(indexes.index_for(USER_ID))
+            asyncio.run(indexes.index_for(USER_ID))
+
+        mock_select.assert_awaited_once_with(Query.CONTRACTOR_ASSIGNMENTS_BY_USER, (USER_ID,))
+
+    def test_finished_project_rereads_its_contractors(self, built):
+        finished = [dict(row, in_progress=0) if row["project_id"] == 100 else row for row in ROWS[:3]]
+
+        with patch("contractors.Database.select_async", new=AsyncMock(return_value=finished)) as mock_select:
+            asyncio.run(built.apply_changes([change("ProjectInfos", 100), change("ProjectInfos", 999)]))
+            rows = asyncio.run(built.index_for(USER_ID)).workloads()
+
+        mock_select.assert_awaited_once_with(Query.CONTRACTOR_ASSIGNMENTS_BY_IDS, (USER_ID, (1,)), primary=True)
+        assert rows[0]["active_projects"] == 2 and not rows[0]["overloaded"]
+
+    def test_new_assignment_looks_up_its_contractor(self, built):
+        reread = [assignment(3, "Roofing Co C", "Roof repairs, maintenance", 14, 104, "New Roof", 1)]
+        select = AsyncMock(side_effect=[[{"contractor_id": 3}], reread])
+
+        with patch("contractors.Database.select_async", new=select):
+            asyncio.run(built.apply_changes([change("ProjectContractors", 14, op="I")]))
+
+        assert select.await_args_list[0].args == (Query.CONTRACTORS_OF_ASSIGNMENTS, ((14,),))
+        index = asyncio.run(built.index_for(USER_ID))
+        assert index.workload(3)["active_titles"] == ["New Roof"] and index.owners[14] == 3
+
+    def test_deleted_contractor_and_assignment_are_removed(self, built):
+        reread = ROWS[:2]
+
+        with patch("contractors.Database.select_async", new=AsyncMock(return_value=reread)) as mock_select:
+            asyncio.run(built.apply_changes([change("Contractors", 2, op="D"), change("ProjectContractors", 12, op="D")]))
+
+        assert mock_select.await_args.args == (Query.CONTRACTOR_ASSIGNMENTS_BY_IDS, (USER_ID, (1, 2)))
+        index = asyncio.run(built.index_for(USER_ID))
+        assert companies(index.workloads()) == ["Construction Co B", "Roofing Co C"]
+        assert index.workload(1)["active_projects"] == 2
+
+    def test_changes_for_users_without_an_index_are_ignored(self, built):
+        with patch("contractors.Database.select_async", new=AsyncMock()) as mock_select:
+            asyncio.run(built.apply_changes([change("Contractors", 1, user_id=7), change("Contractors", 1, user_id=None)]))
+
+        mock_select.assert_not_awaited()
+
+
+@pytest.mark.unit
+class TestContractorFormatting:
+
+    def test_workloads_flag_overloaded_contractors(self):
+        index = ContractorIndex(ROWS)
+
+        entries = format_contractor_workloads(index.workloads())
+        matches = format_contractor_matches("plumbing", index.find("plumbing"))
+
+        assert "Construction Co B** — overloaded" in entries[1] and "Working on:  Bathroom" in entries[1]
+        assert "Working on" not in entries[3]
+        assert matches[1].startswith("**Pipes Inc**") and "In progress: 0 projects" in matches[1]
+
+
+@pytest.mark.unit
+class TestContractorQueries:
+
+    def test_index_follows_assignment_changes_through_the_change_log(self, sample_user):
+        indexes = ContractorIndexes()
+        index = asyncio.run(indexes.index_for(sample_user))
+        assert len(index) == 6 and len(index.owners) == 6
+        start = Database.select("SELECT MAX(seq) AS seq FROM ChangeLog")[0]["seq"]
+        assignment_id = next(iter(index.assignments[min(index.contractors)]))
+
+        Database.delete("DELETE FROM ProjectContractors WHERE tracking_id = %s", (assignment_id,))
+        changes = Database.select("SELECT * FROM ChangeLog WHERE seq > %s", (start,))
+        asyncio.run(indexes.apply_changes(changes))
+
+        assert [(row["table_name"], row["op"], row["user_id"]) for row in changes] == [
+            ("ProjectContractors", "D", sample_user)]
+        assert index.workload(min(index.contractors))["total_projects"] == 0
@@ -0,0 +1,476 @@
+import time
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pymysql
+import database
+from database import Database, Query, ConnectionPool, PreparedStatementCache, SingleFlight, ReplicaRouter, normalize_query
+from database import MySQLBackend
+from database import DBScheduler, INTERACTIVE, WRITES, MAINTENANCE, db_context
+
+
+class FakeCursor:
+    # Records every statement sent to the "server" so tests can assert on round trips.
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, values=None):
+        self.connection.executed.append((query, values))
+
+    def executemany(self, query, values):
+        self.connection.executed.append((query, values))
+
+    def callproc(self, name, values):
+        self.connection.executed.append((name, values))
+
+    def fetchall(self):
+        return self.connection.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+
+    def __init__(self, thread_id=1, rows=None):
+        self._thread_id = thread_id
+        self.rows = rows or []
+        self.executed = []
+        self.begins = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def thread_id(self):
+        return self._thread_id
+
+    def ping(self, reconnect=True):
+        pass
+
+    def close(self):
+        pass
+
+    def cursor(self, *args):
+        return FakeCursor(self)
+
+    def begin(self):
+        self.begins += 1
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakePool:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def acquire(self):
+        return self.connection
+
+    def release(self, conn):
+        pass
+
+
+@pytest.fixture()
+def fake_connection():
+    # Every test gets its own statement cache so prepared state never leaks between tests.
+    conn = FakeConnection(rows=[{"tracking_id": 1}])
+    with patch("database._get_pool", return_value=FakePool(conn)), \
+         patch("database._backend", MySQLBackend()), \
+         patch("database._statements", PreparedStatementCache()), \
+         patch("database.prepared_statements_enabled", True):
+        yield conn
+
+
+@pytest.mark.unit
+class TestNormalizeQuery:
+
+    def test_collapses_whitespace(self):
+        assert normalize_query(Query.REGISTERED_USER) == "SELECT * FROM RegisteredUsers WHERE tracking_id = %s"
+
+    def test_keeps_whitespace_inside_literals(self):
+        # CONCAT separators and other string literals must reach MySQL unchanged.
+        assert normalize_query("SELECT CONCAT(a,  '  ,  ', b)\n   FROM t") == "SELECT CONCAT(a, '  ,  ', b) FROM t"
+
+    def test_line_comments_do_not_swallow_the_rest_of_the_statement(self):
+        query = "SELECT a -- first column\n  , '--kept' AS b -- it's a literal\n FROM t --\n WHERE a = %s"
+        assert normalize_query(query) == "SELECT a , '--kept' AS b FROM t WHERE a = %s"
+
+
+@pytest.mark.unit
+class TestPreparedStatements:
+
+    def test_prepares_once_then_reuses(self, fake_connection):
+        # The first call prepares the statement, later calls only bind and execute it.
+        Database.select(Query.REGISTERED_USER, (1,))
+        Database.select(Query.REGISTERED_USER, (2,))
+
+        prepares = [q for q, _ in fake_connection.executed if q.startswith("PREPARE")]
+        executes = [q for q, _ in fake_connection.executed if "EXECUTE" in q]
+        assert len(prepares) == 1
+        assert len(executes) == 2
+        assert "?" in fake_connection.executed[0][1][0]
+        # Bind and execute are separate statements: pooled connections refuse stacked queries.
+        assert [q.split()[0] for q, _ in fake_connection.executed[1:]] == ["SET", "EXECUTE", "SET", "EXECUTE"]
+
+    def test_returns_rows_from_execute_result(self, fake_connection):
+        assert Database.select(Query.TENANTS_BY_USER, (1,)) == [{"tracking_id": 1}]
+
+    def test_reprepares_after_reconnect(self, fake_connection):
+        # A new server thread id means a new session, which has lost its prepared statements.
+        Database.select(Query.REGISTERED_USER, (1,))
+        fake_connection._thread_id = 2
+        Database.select(Query.REGISTERED_USER, (1,))
+
+        prepares = [q for q, _ in fake_connection.executed if q.startswith("PREPARE")]
+        assert len(prepares) == 2
+
+    def test_named_parameter_queries_use_text_protocol(self, fake_connection):
+        data = {"tracking_id": 1, "email": "a@b.c", "first_name": "A", "last_name": "B", "role_id": 1}
+        Database.insert(Query.INSERT_REGISTERED_USER, data)
+
+        assert fake_connection.executed == [(normalize_query(Query.INSERT_REGISTERED_USER), data)]
+
+    def test_counters_are_exact_across_threads(self):
+        statements = PreparedStatementCache()
+        connections = [FakeConnection(thread_id=i) for i in range(8)]
+
+        def read(connection):
+            for _ in range(500):
+                statements.handle(connection, connection.cursor(), Query.REGISTERED_USER)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(read, connections))
+
+        assert (statements.prepares, statements.hits) == (8, 8 * 499)
+
+    def test_disabled_sends_plain_sql(self, fake_connection):
+        with patch("database.prepared_statements_enabled", False):
+            Database.select(Query.REGISTERED_USER, (1,))
+
+        assert fake_connection.executed == [(normalize_query(Query.REGISTERED_USER), (1,))]
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+
+    def run_concurrently(self, calls):
+        # Database.select is replaced by a slow fake so the async calls overlap in time.
+        executed = []
+
+        def slow_select(query, values=None, fetch=True, primary=False):
+            executed.append(values)
+            time.sleep(0.05)
+            return [{"user_id": values[0]}]
+
+        async def gather():
+            return await asyncio.gather(*(Database.select_async(q, v) for q, v in calls))
+
+        with patch("database.Database.select", side_effect=slow_select), \
+             patch("database._single_flight", SingleFlight()), \
+             patch("database._db_scheduler", None):
+            results = asyncio.run(gather())
+            stats = Database.single_flight_stats()
+        return executed, results, stats
+
+    def test_identical_reads_share_one_query(self):
+        executed, results, stats = self.run_concurrently([(Query.PORTFOLIO_PERFORMANCE_BY_USER, (7,))] * 5)
+
+        assert len(executed) == 1
+        assert all(r == [{"user_id": 7}] for r in results)
+        assert stats["coalesced"] == 4
+
+    def test_each_caller_gets_its_own_list(self):
+        _, results, _ = self.run_concurrently([(Query.TENANTS_BY_USER, (7,))] * 2)
+
+        assert results[0] is not results[1]
+
+    def test_distinct_parameters_are_not_coalesced(self):
+        executed, _, stats = self.run_concurrently([(Query.TENANTS_BY_USER, (1,)), (Query.TENANTS_BY_USER, (2,))])
+
+        assert sorted(executed) == [(1,), (2,)]
+        assert stats["coalesced"] == 0
+
+
+@pytest.mark.unit
+class TestTransactions:
+
+    def test_single_select_sends_no_commit(self, fake_connection):
+        # Reads rely on autocommit, so no COMMIT round trip follows them.
+        Database.select(Query.REGISTERED_USER, (1,))
+
+        assert fake_connection.commits == 0
+
+    def test_procedure_runs_in_one_transaction(self, fake_connection):
+        Database.callprocedure(Query.PROC_ResetUserData, (1,))
+
+        assert (fake_connection.begins, fake_connection.commits) == (1, 1)
+
+    def test_transaction_commits_once_for_many_statements(self, fake_connection):
+        with Database.transaction() as tx:
+            tx.delete(Query.DELETE_USER_CONTRACTORS, (1,))
+            tx.callprocedure(Query.PROC_ResetUserData, (1,))
+            tx.delete(Query.DELETE_REGISTERED_USER, (1,))
+
+        assert len(fake_connection.executed) == 3
+        assert (fake_connection.begins, fake_connection.commits, fake_connection.rollbacks) == (1, 1, 0)
+
+    def test_user_cleanup_can_run_as_one_transaction(self, fake_connection):
+        # The registered_test_user cleanup as one unit of work: six statements, one BEGIN and one COMMIT.
+        with Database.transaction() as tx:
+            tx.delete(Query.DELETE_USER_PROJECT_CONTRACTORS, (1,))
+            tx.delete(Query.DELETE_USER_CONTRACTORS, (1,))
+            tx.callprocedure(Query.PROC_ResetUserData, (1,))
+            tx.callprocedure(Query.PROC_CleanOrphanedData)
+            tx.delete(Query.DELETE_USER_PORTFOLIO, (1,))
+            tx.delete(Query.DELETE_REGISTERED_USER, (1,))
+
+        assert len(fake_connection.executed) == 6
+        assert (fake_connection.begins, fake_connection.commits, fake_connection.rollbacks) == (1, 1, 0)
+
+    def test_transaction_rolls_back_on_error(self, fake_connection):
+        with pytest.raises(ValueError):
+            with Database.transaction() as tx:
+                tx.delete(Query.DELETE_USER_CONTRACTORS, (1,))
+                raise ValueError("boom")
+
+        assert (fake_connection.commits, fake_connection.rollbacks) == (0, 1)
+
+    def test_read_only_transaction_skips_begin_and_commit(self, fake_connection):
+        with Database.transaction(read_only=True) as tx:
+            tx.select(Query.REGISTERED_USER, (1,))
+            with pytest.raises(RuntimeError):
+                tx.delete(Query.DELETE_REGISTERED_USER, (1,))
+
+        assert (fake_connection.begins, fake_connection.commits) == (0, 0)
+
+    def test_read_only_transaction_refuses_procedures(self, fake_connection):
+        with Database.transaction(read_only=True) as tx:
+            with pytest.raises(RuntimeError):
+                tx.callprocedure(Query.PROC_ResetUserData, (1,))
+
+        assert fake_connection.executed == []
+
+    def test_async_transaction_commits_once(self, fake_connection):
+        async def scenario():
+            async with Database.transaction_async() as tx:
+                await tx.delete(Query.DELETE_USER_PORTFOLIO, (1,))
+                return await tx.select(Query.REGISTERED_USER, (1,))
+
+        with patch("database._db_scheduler", None):
+            rows = asyncio.run(scenario())
+
+        assert rows == [{"tracking_id": 1}]
+        assert (fake_connection.begins, fake_connection.commits) == (1, 1)
+
+
+class HostConnection(FakeConnection):
+    # Connection stand-in that remembers which host's pool created it.
+
+    def __init__(self, host, fail=False):
+        super().__init__(rows=[{"host": host}])
+        self.host = host
+        self.fail = fail
+
+    def cursor(self, *args):
+        if self.fail:
+            raise pymysql.err.OperationalError(2003, "Can't connect")
+        return FakeCursor(self)
+
+
+@pytest.fixture()
+def replicated():
+    # Primary plus two fake replicas; every pool hands out HostConnections for its host.
+    failing = set()
+
+    def make_connection(pool):
+        return HostConnection(pool.host, fail=pool.host in failing)
+
+    router = ReplicaRouter(["replica-1", "replica-2"], lag_window=5.0)
+    with patch("database.ConnectionPool._make_connection", make_connection), \
+         patch("database.db_host", "primary"), \
+         patch("database._pool", None), \
+         patch("database._backend", MySQLBackend()), \
+         patch("database._router", router), \
+         patch("database.prepared_statements_enabled", False):
+        yield router, failing
+
+
+@pytest.mark.unit
+class TestPoolWarmUp:
+
+    def test_pool_opens_connections_in_parallel(self):
+        # Four 50ms handshakes should take ~50ms in parallel, not ~200ms back to back.
+        def slow_connect(pool):
+            time.sleep(0.05)
+            return FakeConnection()
+
+        with patch("database.ConnectionPool._make_connection", slow_connect):
+            start = time.perf_counter()
+            ConnectionPool(4)
+            elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.15
+
+    def test_warm_up_validates_every_connection(self, replicated):
+        Database.warm_up()
+
+        assert database._pool.size == 4 and database._pool.in_use == 0
+        assert set(replicated[0]._pools) == {"replica-1", "replica-2"}
+
+
+@pytest.mark.unit
+class TestReplicaRouting:
+
+    def test_reads_round_robin_across_replicas(self, replicated):
+        hosts = [Database.select(Query.TENANTS_BY_USER, (1,))[0]["host"] for _ in range(4)]
+
+        assert hosts == ["replica-1", "replica-2", "replica-1", "replica-2"]
+
+    def test_writes_go_to_primary_and_pin_following_reads(self, replicated):
+        # Read-your-writes: right after a write, reads are served by the primary.
+        Database.insert(Query.DELETE_REGISTERED_USER, (1,))
+
+        assert Database.select(Query.REGISTERED_USER, (1,))[0]["host"] == "primary"
+
+    def test_a_write_pins_only_its_own_users_reads(self, replicated):
+        with db_context(user=1):
+            Database.insert(Query.DELETE_REGISTERED_USER, (1,))
+            assert Database.select(Query.REGISTERED_USER, (1,))[0]["host"] == "primary"
+        with db_context(user=2):
+            assert Database.select(Query.REGISTERED_USER, (2,))[0]["host"] != "primary"
+
+    def test_async_writes_pin_the_user_set_by_db_context(self, replicated):
+        async def scenario():
+            with db_context(user=1):
+                await Database.insert_async(Query.DELETE_REGISTERED_USER, (1,))
+                own = await Database.select_async(Query.REGISTERED_USER, (1,))
+            with db_context(user=2):
+                other = await Database.select_async(Query.REGISTERED_USER, (1,))
+            return own[0]["host"], other[0]["host"]
+
+        with patch("database._db_scheduler", None), patch("database._single_flight", None):
+            assert asyncio.run(scenario()) == ("primary", "replica-1")
+
+    def test_primary_flag_bypasses_replicas(self, replicated):
+        assert Database.select(Query.REGISTERED_USER, (1,), primary=True)[0]["host"] == "primary"
+
+    def test_failed_replica_falls_back_and_is_skipped(self, replicated):
+        router, failing = replicated
+        failing.add("replica-1")
+
+        first = Database.select(Query.TENANTS_BY_USER, (1,))[0]["host"]
+        later = {Database.select(Query.TENANTS_BY_USER, (1,))[0]["host"] for _ in range(3)}
+
+        assert first == "primary"
+        assert later == {"replica-2"}
+        assert router.fallbacks == 1
+
+    def test_replica_reads_are_counted_across_threads(self, replicated):
+        router, _ = replicated
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda _: Database.select(Query.TENANTS_BY_USER, (1,)), range(200)))
+
+        assert router.replica_reads == 200
+
+    def test_least_connections_prefers_idle_replica(self, replicated):
+        router, _ = replicated
+        router.strategy = "least_connections"
+        busy = router.pool_for_read()
+        busy.acquire()  # Hold one connection on the first chosen replica
+
+        assert router.pool_for_read().host != busy.host
+
+
+@pytest.mark.unit
+class TestDBScheduler:
+
+    def run_jobs(self, scheduler, jobs, hold=0.01):
+        # jobs: (label, work_class, user, guild). One slot-holding job is started first so
+        # every later job has to queue and the scheduler's order becomes visible.
+        order = []
+
+        async def job(label, work_class, user, guild=None):
+            async with scheduler.slot(work_class, user, guild):
+                order.append(label)
+                await asyncio.sleep(hold)
+
+        async def scenario():
+            blocker = asyncio.create_task(job("blocker", INTERACTIVE, "blocker"))
+            await asyncio.sleep(0)
+            await asyncio.gather(blocker, *(job(*spec) for spec in jobs))
+        asyncio.run(scenario())
+        return order[1:]
+
+    def test_higher_classes_are_served_first(self):
+        scheduler = DBScheduler(1, user_cap=1)
+        order = self.run_jobs(scheduler, [("reset", MAINTENANCE, 1, None), ("write", WRITES, 2, None),
+                                          ("read", INTERACTIVE, 3, None)])
+        assert order == ["read", "write", "reset"]
+
+    def test_users_take_turns_within_a_class(self):
+        scheduler = DBScheduler(1, user_cap=1)
+        jobs = [("a1", INTERACTIVE, "a", None), ("a2", INTERACTIVE, "a", None), ("a3", INTERACTIVE, "a", None),
+                ("b1", INTERACTIVE, "b", None)]
+        assert self.run_jobs(scheduler, jobs) == ["a1", "b1", "a2", "a3"]
+
+    def test_one_user_cannot_take_every_slot(self):
+        scheduler = DBScheduler(4, user_cap=2)
+        peak = {"a": 0}
+
+        async def job(user):
+            async with scheduler.slot(WRITES, user):
+                peak[user] = max(peak.get(user, 0), scheduler._running_user[user])
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            await asyncio.gather(*(job("a") for _ in range(6)), job("b"))
+        asyncio.run(scenario())
+
+        assert peak["a"] == 2
+
+    def test_maintenance_is_capped(self):
+        scheduler = DBScheduler(4, user_cap=4, maintenance_cap=1)
+        running = []
+
+        async def job(user):
+            async with scheduler.slot(MAINTENANCE, user):
+                running.append(scheduler._running_class[MAINTENANCE])
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            await asyncio.gather(*(job(user) for user in range(3)))
+        asyncio.run(scenario())
+
+        assert max(running) == 1
+
+    def test_aged_waiters_are_not_starved(self):
+        scheduler = DBScheduler(1, user_cap=1, aging=0.0)
+        order = self.run_jobs(scheduler, [("reset", MAINTENANCE, 1, None), ("read", INTERACTIVE, 2, None)])
+        assert order == ["reset", "read"]
+
+    def test_stats_report_queue_depth_and_wait(self):
+        scheduler = DBScheduler(1)
+        self.run_jobs(scheduler, [("read", INTERACTIVE, 1, None)])
+        stats = scheduler.stats()
+        assert stats["interactive"]["queued"] == 0 and stats["interactive"]["max_wait"] > 0
+
+    def test_long_procedures_run_in_maintenance_class(self):
+        classes = []
+        original = DBScheduler.slot
+
+        def recording_slot(self, work_class=INTERACTIVE, user=None, guild=None):
+            classes.append(work_class)
+            return original(self, work_class, user, guild)
+
+        with patch("database.Database.callprocedure"), patch("database._db_scheduler", None), \
+             patch.object(DBScheduler, "slot", recording_slot):
+            asyncio.run(Database.callprocedure_async(Query.PROC_ResetUserData, (1,)))
+            asyncio.run(Database.callprocedure_async(Query.PROC_AssignRole, (1, 1, None)))
+
+        assert classes == [MAINTENANCE, WRITES]
@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from datetime import date
+from database import Database, Query
+from ledger import LedgerArchiver, archive_cutoff, payment_ledger, expense_ledger
+from models import CashflowHistoryModel
+from rollups import LedgerRollupReconciler
+
+
+def count(table):
+    return Database.select(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"]
+
+
+def archive(today, batch_size=1000):
+    archiver = LedgerArchiver(batch_size=batch_size, months=24)
+    moved = asyncio.run(archiver.archive(today))
+    return archiver, moved
+
+
+@pytest.mark.unit
+class TestArchiveCutoff:
+
+    def test_cutoff_is_the_first_of_the_month_months_ago(self):
+        assert archive_cutoff(date(2026, 10, 18), months=24) == date(2024, 10, 1)
+        assert archive_cutoff(date(2026, 1, 31), months=1) == date(2025, 12, 1)
+        assert archive_cutoff(date(2026, 3, 1), months=0) == date(2026, 3, 1)
+
+
+@pytest.mark.unit
+class TestLedgerArchiver:
+
+    def test_closed_rows_move_in_batches(self, sample_user):
+        archiver, moved = archive(date(2026, 12, 15), batch_size=4)
+
+        # Cutoff 2024-12-01: every expense is older, no payment is due before it.
+        assert moved == {"payments": 0, "expenses": 6}
+        assert count("ExpenseHistories") == 0 and count("ExpenseHistoriesArchive") == 6
+        assert count("PaymentHistories") == 6 and count("PaymentHistoriesArchive") == 0
+        assert archiver.stats() == {"runs": 1, "payments_archived": 0, "expenses_archived": 6}
+
+    def test_unpaid_payments_stay_in_the_hot_table(self, sample_user):
+        Database.update("UPDATE PaymentHistories SET paid_date = NULL WHERE amount = 1000")
+
+        _, moved = archive(date(2027, 1, 15))
+
+        assert moved["payments"] == 5
+        assert [row["amount"] for row in Database.select("SELECT amount FROM PaymentHistories")] == [1000]
+
+    def test_reset_user_data_clears_the_archives(self, sample_user):
+        archive(date(2027, 1, 15))
+
+        Database.callprocedure(Query.PROC_ResetUserData, (sample_user,))
+
+        assert count("PaymentHistoriesArchive") == 0 and count("ExpenseHistoriesArchive") == 0
+
+
+@pytest.mark.unit
+class TestLedgerReads:
+
+    def test_reads_combine_hot_and_archived_rows(self, sample_user):
+        tenant_id = Database.select("SELECT tenant_id FROM PaymentHistories WHERE amount = 2500")[0]["tenant_id"]
+        history_id = Database.select("SELECT history_id FROM ExpenseHistories WHERE cost = 5000")[0]["history_id"]
+        Database.insert(Query.INSERT_PAYMENT_HISTORY, {"amount": 2500, "paid_date": None, "due_date": "2025-01-01",
+                                                       "unit_id": None, "tenant_id": tenant_id})
+        archive(date(2027, 1, 15))
+
+        payments = asyncio.run(payment_ledger(tenant_id))
+        assert [(str(row["due_date"]), row["archived"]) for row in payments] == [("2024-12-01", 1), ("2025-01-01", 0)]
+        assert asyncio.run(payment_ledger(tenant_id, start=date(2025, 1, 1)))[0]["archived"] == 0
+        assert [row["cost"] for row in asyncio.run(expense_ledger(history_id, end=date(2024, 2, 1)))] == [5000]
+
+    def test_single_rows_are_found_after_archival(self, sample_user):
+        history_id = Database.select("SELECT history_id FROM PaymentHistories WHERE amount = 1000")[0]["history_id"]
+        archive(date(2027, 1, 15))
+
+        rows = Database.select(Query.PAYMENT_HISTORY, (history_id,) * 2)
+
+        assert len(rows) == 1 and rows[0]["amount"] == 1000
+
+
+def cashflow(user_id):
+    return {(str(row["month"]), row["kind"], row["category"]): (row["total"], row["entries"])
+            for row in Database.select(Query.CASHFLOW_HISTORY_BY_USER, (user_id,))}
+
+
+@pytest.mark.unit
+class TestLedgerRollups:
+
+    def test_triggers_roll_ledger_rows_up_by_month_and_category(self, sample_user):
+        rollups = cashflow(sample_user)
+
+        assert rollups[("2024-01-01", "expense", "Kitchen remodel")] == (5000, 1)
+        assert rollups[("2024-12-01", "income", "Rent")] == (2500 + 1000, 2)
+        assert rollups[("2024-11-01", "income", "Rent")] == (5000 + 1100 + 5500, 3)
+
+        Database.update("UPDATE PaymentHistories SET paid_date = NULL WHERE amount = 2500")
+
+        assert cashflow(sample_user)[("2024-12-01", "income", "Rent")] == (1000, 1)
+
+    def test_archival_leaves_rollups_unchanged(self, sample_user):
+        before = cashflow(sample_user)
+
+        archive(date(2027, 1, 15))
+
+        assert count("PaymentHistoriesArchive") == 6
+        assert cashflow(sample_user) == before
+
+    def test_reconciler_backfills_and_repairs_rollups(self, sample_user):
+        before = cashflow(sample_user)
+        property_id = Database.select("SELECT MIN(property_id) AS id FROM Properties")[0]["id"]
+        Database.delete("DELETE FROM LedgerRollups WHERE property_id <> %s", (property_id,))
+        Database.update("UPDATE LedgerRollups SET total = total + 1")
+
+        reconciler = LedgerRollupReconciler(batch_size=4)
+        asyncio.run(reconciler.reconcile())
+        asyncio.run(reconciler.reconcile())
+
+        assert cashflow(sample_user) == before
+        assert reconciler.stats() == {"runs": 2, "checked": 12, "repaired": 6}
+
+    def test_history_model_reads_the_rollups(self, sample_user):
+        rows = asyncio.run(CashflowHistoryModel.load_async(sample_user)).rows
+
+        assert len(rows) == len(cashflow(sample_user))
+        assert str(rows[0]["month"]) == "2024-01-01"
@@ -0,0 +1,151 @@
+import pytest
+from unittest.mock import patch
+from database import Database, Query
+from migrations import Migration, MigrationRunner, Statement, Backfill, copy_swap, describe_state, MIGRATIONS
+
+
+# Example migrations are numbered from 101, clear of MIGRATIONS, whose versions new databases record as applied.
+ADD_COLUMN = Statement("ALTER TABLE Tenants ADD COLUMN visits INT NOT NULL DEFAULT 0, ALGORITHM=INSTANT",
+                       sqlite="ALTER TABLE Tenants ADD COLUMN visits INT NOT NULL DEFAULT 0")
+COUNT_VISITS = Backfill("Tenants", "tenant_id",
+                        "UPDATE Tenants SET visits = visits + 1 WHERE tenant_id > %s AND tenant_id <= %s")
+
+
+def runner(*migrations, batch_size=2):
+    return MigrationRunner(list(migrations), batch_size=batch_size, pause=0)
+
+
+def visits():
+    return [row["visits"] for row in Database.select("SELECT visits FROM Tenants ORDER BY tenant_id")]
+
+
+@pytest.mark.unit
+class TestMigrationDefinitions:
+
+    def test_locking_alters_of_busy_tables_are_refused(self):
+        with pytest.raises(ValueError, match="LOCK=NONE"):
+            Statement("ALTER TABLE PaymentHistories MODIFY amount DECIMAL(10, 2)")
+
+        Statement("ALTER TABLE PaymentHistories ADD INDEX paid_idx (paid_date), ALGORITHM=INPLACE, LOCK=NONE")
+        Statement("ALTER TABLE Contractors MODIFY services TEXT")
+
+    def test_names_put_into_sql_must_be_plain(self):
+        with pytest.raises(ValueError):
+            Backfill("Tenants; DROP TABLE Tenants", "tenant_id", "")
+
+    def test_duplicate_versions_are_refused(self):
+        with pytest.raises(ValueError, match="Duplicate"):
+            MigrationRunner([Migration(1, "a"), Migration(1, "b")])
+
+
+@pytest.mark.unit
+class TestMigrationRunner:
+
+    def test_migrations_in_the_schema_are_recorded_as_applied(self, sample_user):
+        assert runner(*MIGRATIONS).pending() == []
+
+    def test_statement_and_backfill_are_applied_once(self, sample_user):
+        migration = Migration(101, "Tenant visits", ADD_COLUMN, COUNT_VISITS)
+
+        assert runner(migration).apply() == [101]
+        assert runner(migration).apply() == []
+
+        assert visits() == [1] * 6
+        (_, row), = runner(migration).status()
+        assert row["step"] == 2 and row["rows_done"] == 6 and row["finished_at"] is not None
+        assert describe_state(migration, row).startswith("applied")
+
+    def test_interrupted_backfill_resumes_after_its_last_batch(self, sample_user):
+        migration = Migration(101, "Tenant visits", ADD_COLUMN, COUNT_VISITS)
+
+        # Stopped while pausing after its second batch of two rows.
+        with patch("migrations.time.sleep", side_effect=[None, KeyboardInterrupt]):
+            with pytest.raises(KeyboardInterrupt):
+                runner(migration).apply()
+        (_, row), = runner(migration).status()
+        assert (row["step"], row["rows_done"], row["finished_at"]) == (1, 4, None)
+        assert visits() == [1, 1, 1, 1, 0, 0]
+        assert "stopped at step 2/2" in describe_state(migration, row)
+
+        assert runner(migration).apply() == [101]
+        assert visits() == [1] * 6
+
+    def test_apply_stops_at_the_requested_version(self, sample_user):
+        migrations = [Migration(102, "Count again", COUNT_VISITS), Migration(101, "Tenant visits", ADD_COLUMN)]
+
+        assert runner(*migrations).apply(up_to=101) == [101]
+        assert [migration.version for migration in runner(*migrations).pending()] == [102]
+        assert runner(*migrations, batch_size=100).apply() == [102]
+        assert visits() == [1] * 6
+
+    def test_copy_swap_runs_its_sqlite_statement(self, sample_user):
+        migration = Migration(101, "Tenant visits", copy_swap(
+            "Tenants", "tenant_id", "ADD COLUMN visits INT NOT NULL DEFAULT 0",
+            sqlite="ALTER TABLE Tenants ADD COLUMN visits INT NOT NULL DEFAULT 0"))
+
+        assert runner(migration).apply() == [101]
+        assert visits() == [0] * 6
+
+
+class FakeMySQL:
+    """Stands in for a runner's database access, recording the DDL it would run on MySQL."""
+
+    def __init__(self, runner):
+        self.statements = []
+        self.copied = []
+        self.swapped = False
+        runner.dialect = "mysql"
+        runner.ddl = lambda *statements, **kwargs: self.statements.extend(statements)
+        runner.select = self.select
+        runner.batches = lambda table, key, last_key, apply: self.copied.append((table, key, last_key))
+
+    def select(self, query, values=None):
+        if query == Query.MIGRATION_TABLE_COLUMNS:
+            columns = ["tenant_id", "notes", "first_name", "lease_id"]
+            return [{"name": name} for name in (columns if values == ("Tenants",) else columns[:1] + columns[2:])]
+        if query == Query.MIGRATION_TABLE_EXISTS:
+            return [{"found": 1}]
+        if query == Query.MIGRATION_TABLE_TRIGGERS:
+            return [{"name": "Tenants_changelog_insert", "timing": "AFTER", "event": "INSERT",
+                     "body": "INSERT INTO ChangeLog (table_name, pk, op) VALUES ('Tenants', NEW.tenant_id, 'I')"}]
+        if query == Query.MIGRATION_FOREIGN_KEYS:
+            return [{"name": "fk_Tenants_Lease", "table_name": "Tenants__old", "columns": "lease_id",
+                     "referenced_table": "LeaseAgreements", "referenced_columns": "lease_id",
+                     "update_rule": "NO ACTION", "delete_rule": "SET NULL"},
+                    {"name": "fk_UnitTenants_Tenant", "table_name": "UnitTenants", "columns": "tenant_id",
+                     "referenced_table": "Tenants__old", "referenced_columns": "tenant_id",
+                     "update_rule": "NO ACTION", "delete_rule": "CASCADE"}]
+        return []
+
+
+@pytest.mark.unit
+class TestCopySwap:
+
+    def test_table_is_rebuilt_through_a_mirrored_shadow_copy(self):
+        steps = copy_swap("Tenants", "tenant_id", "DROP COLUMN notes")
+        migration_runner = runner(Migration(1, "Drop tenant notes", steps))
+        fake = FakeMySQL(migration_runner)
+
+        for step in steps:
+            step.run(migration_runner, None)
+
+        statements = [" ".join(statement.split()) for statement in fake.statements]
+        assert statements[:3] == ["DROP TABLE IF EXISTS Tenants__new", "CREATE TABLE Tenants__new LIKE Tenants",
+                                  "ALTER TABLE Tenants__new DROP COLUMN notes"]
+        assert ("CREATE TRIGGER Tenants__mirror_insert AFTER INSERT ON Tenants FOR EACH ROW REPLACE INTO "
+                "Tenants__new (tenant_id, first_name, lease_id) VALUES (NEW.tenant_id, NEW.first_name, NEW.lease_id)"
+                in statements)
+        assert fake.copied == [("Tenants", "tenant_id", None)]
+        swap = statements.index("RENAME TABLE Tenants TO Tenants__old, Tenants__new TO Tenants")
+        assert statements[swap + 4:swap + 6] == [
+            "DROP TRIGGER Tenants_changelog_insert",
+            "CREATE TRIGGER Tenants_changelog_insert AFTER INSERT ON Tenants FOR EACH ROW "
+            "INSERT INTO ChangeLog (table_name, pk, op) VALUES ('Tenants', NEW.tenant_id, 'I')"]
+        assert ("ALTER TABLE Tenants ADD CONSTRAINT fk_Tenants_Lease FOREIGN KEY (lease_id) REFERENCES "
+                "LeaseAgreements (lease_id) ON DELETE SET NULL ON UPDATE NO ACTION, ALGORITHM=INPLACE, LOCK=NONE"
+                in statements)
+        assert "ALTER TABLE UnitTenants DROP FOREIGN KEY fk_UnitTenants_Tenant" in statements
+        assert ("ALTER TABLE UnitTenants ADD CONSTRAINT fk_UnitTenants_Tenant FOREIGN KEY (tenant_id) REFERENCES "
+                "Tenants (tenant_id) ON DELETE CASCADE ON UPDATE NO ACTION, ALGORITHM=INPLACE, LOCK=NONE"
+                in statements)
+        assert statements[-1] == "DROP TABLE IF EXISTS Tenants__old"
@@ -1,6 +1,9 @@
+import asyncio
 import pytest
-from unittest.mock import patch
-from models import RegisteredUserModel, ModelFactory, Tables
+from unittest.mock import patch, AsyncMock
+from models import RegisteredUserModel, ModelFactory, Tables, Query, PortfolioPerformanceModel, ViewTenantsModel, find_registered_user, invalidate_user_cache
+from models import ViewMortgagesModel, mortgage_totals, MORTGAGE_ROW_KEYS
+from cache import TTLCache
 
 
 @pytest.mark.unit
@@ -82,3 +85,109 @@ class TestModelFactory:
 
         _, kwargs = mock_insert.call_args
         assert kwargs["values"] == data
+
+
+@pytest.mark.unit
+class TestUserViewModel:
+
+    def test_load_async_uses_select_async(self):
+        # load_async must go through the async (coalescing) path, not the blocking select.
+        rows = [{"Property_ID": 1, "cash_flow": 100}]
+        with patch("models.Database.select_async", new=AsyncMock(return_value=rows)) as mock_select, \
+             patch("models.Database.select") as mock_sync, \
+             patch("cache.view_results", TTLCache()):
+            performance = asyncio.run(PortfolioPerformanceModel.load_async(42))
+
+        mock_select.assert_awaited_once_with(Query.PORTFOLIO_PERFORMANCE_BY_USER, (42,))
+        mock_sync.assert_not_called()
+        assert performance.rows == rows
+
+    def test_load_async_handles_none_result(self):
+        with patch("models.Database.select_async", new=AsyncMock(return_value=None)), \
+             patch("cache.view_results", TTLCache()):
+            tenants = asyncio.run(ViewTenantsModel.load_async(42))
+
+        assert tenants.rows == []
+
+    def test_load_async_serves_cached_rows_until_invalidated(self):
+        rows = [{"tenant_id": 1}]
+        with patch("models.Database.select_async", new=AsyncMock(return_value=rows)) as mock_select, \
+             patch("cache.view_results", TTLCache()), patch("cache.registered_users", TTLCache()):
+            asyncio.run(ViewTenantsModel.load_async(42))
+            asyncio.run(ViewTenantsModel.load_async(42))
+            invalidate_user_cache(42)
+            asyncio.run(ViewTenantsModel.load_async(42))
+
+        assert mock_select.await_count == 2
+
+
+def mortgage_row(mortgage_id, principal, payment, purchase, start, property=None, history=None):
+    # A MORTGAGE_DETAILS_BY_USER row; each mortgage is on its own property with one purchase record by default.
+    return {"portfolio_property_id": property or mortgage_id, "history_id": history or mortgage_id,
+            "user_id": 42, "mortgage_id": mortgage_id, "lender_name": "Chase", "principal_balance": principal,
+            "interest_rate": 6.5, "monthly_payment": payment, "start_date": start, "end_date": "2045-01-01",
+            "purchase_price": purchase, "property_address": "1 Main St, LA", "registered_user": "Jane Doe"}
+
+
+def view_row(row):
+    return {column: value for column, value in row.items() if column not in MORTGAGE_ROW_KEYS}
+
+
+@pytest.mark.unit
+class TestViewMortgagesModel:
+
+    def test_detail_rows_are_read_once_and_totals_row_appended(self):
+        rows = [mortgage_row(1, 200000.0, 1500.0, 300000.0, "2020-01-01"),
+                mortgage_row(2, 100000.0, 800.0, 150000.0, "2021-06-01")]
+        with patch("models.Database.select_async", new=AsyncMock(return_value=list(rows))) as mock_select, \
+             patch("cache.view_results", TTLCache()):
+            mortgages = asyncio.run(ViewMortgagesModel.load_async(42))
+
+        mock_select.assert_awaited_once_with(Query.MORTGAGE_DETAILS_BY_USER, (42,))
+        assert mortgages.rows[:2] == [view_row(row) for row in rows]
+        assert mortgages.rows[2] == {
+            "user_id": 42, "mortgage_id": None, "lender_name": "Total", "principal_balance": 300000.0,
+            "interest_rate": None, "monthly_payment": 2300.0, "start_date": None, "end_date": None,
+            "purchase_price": 450000.0, "property_address": None, "registered_user": "Jane Doe"}
+
+    def test_no_mortgages_means_no_totals_row(self):
+        with patch("models.Database.select_async", new=AsyncMock(return_value=[])), \
+             patch("cache.view_results", TTLCache()):
+            assert asyncio.run(ViewMortgagesModel.load_async(42)).rows == []
+
+    def test_each_mortgage_and_purchase_is_counted_once(self):
+        # Property 1 has two mortgages and two purchase records: four detail rows.
+        totals = mortgage_totals([mortgage_row(1, 100.0, 10.0, 1000.0, "2020-01-01", property=1, history=1),
+                                  mortgage_row(1, 100.0, 10.0, 50.0, "2020-01-01", property=1, history=2),
+                                  mortgage_row(2, 200.0, 20.0, 1000.0, "2021-01-01", property=1, history=1),
+                                  mortgage_row(2, 200.0, 20.0, 50.0, "2021-01-01", property=1, history=2),
+                                  mortgage_row(3, 300.0, 30.0, 500.0, "2022-01-01", property=2, history=3)])
+        assert (totals["principal_balance"], totals["monthly_payment"], totals["purchase_price"]) == (600.0, 60.0, 1550.0)
+
+    def test_missing_values_count_as_zero_like_the_rollups(self):
+        totals = mortgage_totals([mortgage_row(1, None, 900.0, None, "2020-01-01"),
+                                  mortgage_row(2, None, 100.0, 5.0, "2021-01-01")])
+        assert (totals["principal_balance"], totals["monthly_payment"], totals["purchase_price"]) == (0.0, 1000.0, 5.0)
+
+
+@pytest.mark.unit
+class TestFindRegisteredUser:
+
+    def test_second_lookup_is_served_from_cache(self):
+        row = {"tracking_id": 42, "email": "a@b.c"}
+        with patch("cache.registered_users", TTLCache()), \
+             patch("models.Database.select_async", new=AsyncMock(return_value=[row])) as mock_select:
+            first = asyncio.run(find_registered_user(42))
+            second = asyncio.run(find_registered_user(42))
+
+        assert first == second == row
+        mock_select.assert_awaited_once()
+
+    def test_unregistered_users_are_not_cached(self):
+        # Caching a miss would hide the user right after they run !register.
+        with patch("cache.registered_users", TTLCache()), \
+             patch("models.Database.select_async", new=AsyncMock(return_value=[])) as mock_select:
+            asyncio.run(find_registered_user(42))
+            asyncio.run(find_registered_user(42))
+
+        assert mock_select.await_count == 2
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from datetime import date
+from unittest.mock import patch
+from database import Database, Query
+from models import OccupancyModel
+from occupancy import occupancy, unit_timelines, OPEN_END
+from formatting import format_occupancy
+
+TODAY = date(2024, 12, 31)
+
+
+def lease(property_id, unit_id, start=None, end=None):
+    return {"property_id": property_id, "address": f"{property_id} Main St", "unit_id": unit_id,
+            "start_date": start, "end_date": end}
+
+
+@pytest.mark.unit
+class TestUnitTimelines:
+
+    def test_overlapping_and_touching_leases_merge(self):
+        rows = [
+            lease(1, 10, "2024-06-01", "2025-06-01"),
+            lease(1, 10, date(2024, 1, 1), date(2024, 6, 1)),
+            lease(1, 10, "2024-03-01", "2024-04-01"),
+            lease(1, 11, "2024-01-01", "2024-02-01"),
+            lease(1, 11, "2024-03-01", None),
+            lease(1, 12),
+        ]
+
+        timelines = unit_timelines(rows)
+
+        assert timelines[10] == [(date(2024, 1, 1).toordinal(), date(2025, 6, 1).toordinal())]
+        assert timelines[11] == [(date(2024, 1, 1).toordinal(), date(2024, 2, 1).toordinal()),
+                                 (date(2024, 3, 1).toordinal(), OPEN_END)]
+        assert timelines[12] == []
+
+
+@pytest.mark.unit
+class TestOccupancy:
+
+    def test_rates_vacancy_and_turnover_per_property(self):
+        rows = [
+            lease(1, 10, "2024-01-01", "2026-01-01"),
+            lease(1, 11, "2023-01-01", "2024-07-01"),
+            lease(1, 11, "2024-10-01", "2025-10-01"),
+            lease(2, 20),
+        ]
+
+        first, second, portfolio = occupancy(rows, today=TODAY, window_days=100)
+
+        # Window: 2024-09-23 to 2024-12-31. Unit 11 is vacant until 2024-10-01, 8 days.
+        assert first["units"] == 2 and first["occupied_units"] == 2
+        assert first["occupancy_rate"] == pytest.approx(192 / 200)
+        assert first["avg_days_vacant"] == 4
+        assert first["turnover"] == 0
+        assert second["occupancy_rate"] == 0 and second["avg_days_vacant"] == 100
+        assert portfolio["property_id"] is None and portfolio["units"] == 3
+        assert portfolio["occupancy_rate"] == pytest.approx(192 / 300)
+
+    def test_renewal_without_gap_is_not_a_move_out(self):
+        rows = [
+            lease(1, 10, "2024-01-01", "2024-06-01"),
+            lease(1, 10, "2024-06-01", "2025-06-01"),
+            lease(1, 11, "2024-01-01", "2024-06-01"),
+            lease(1, 11, "2024-08-01", "2025-08-01"),
+        ]
+
+        summary = occupancy(rows, today=TODAY, window_days=365)[0]
+
+        assert summary["turnover"] == 0.5
+        assert summary["avg_days_vacant"] == pytest.approx(61 / 2)
+
+    def test_roll_offs_are_occupied_stretches_ending_soon(self):
+        rows = [
+            lease(1, 10, "2024-01-01", "2025-02-01"),
+            lease(1, 11, "2024-01-01", "2025-01-15"),
+            lease(1, 11, "2025-01-15", "2026-01-15"),
+            lease(1, 12, "2024-01-01", None),
+            lease(1, 13, "2024-01-01", "2025-06-01"),
+        ]
+
+        summary = occupancy(rows, today=TODAY, roll_off_days=90)[0]
+
+        assert summary["roll_offs"] == 1
+        assert summary["next_roll_off"] == date(2025, 2, 1)
+
+    def test_no_rows_means_no_summary(self):
+        assert occupancy([]) == []
+
+    def test_report_starts_with_portfolio_then_least_occupied(self):
+        rows = occupancy([lease(1, 10, "2024-01-01", "2026-01-01"), lease(2, 20)], today=TODAY)
+
+        entries = format_occupancy(rows, 365)
+
+        assert entries[1].startswith("**Portfolio**") and "1 of 2 units" in entries[1]
+        assert entries[2].startswith("**2 Main St**") and "0.0%" in entries[2]
+        assert "Leases ending:   0\n" in entries[3]
+
+
+@pytest.mark.unit
+class TestOccupancyModel:
+
+    def test_model_summarizes_the_sample_leases(self, sample_user):
+        rows = Database.select(Query.UNIT_LEASES_BY_USER, (sample_user,))
+        assert len(rows) == 6
+
+        # The sample leases start between 2024-01-01 and 2024-06-01 and run for a year.
+        with patch("occupancy.date") as mock_date:
+            mock_date.today.return_value = TODAY
+            mock_date.fromisoformat, mock_date.fromordinal = date.fromisoformat, date.fromordinal
+            summary = asyncio.run(OccupancyModel.load_async(sample_user)).rows
+
+        assert len(summary) == 7
+        assert summary[-1]["occupied_units"] == 6 and summary[-1]["roll_offs"] == 3
+        assert summary[-1]["next_roll_off"] == date(2025, 1, 1)
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import pytest
+from outbound import OutboundQueue, TokenBucket, split_message, BULK, INTERACTIVE, MAX_MESSAGE_LENGTH
+
+
+class FakeChannel:
+
+    def __init__(self, id=1, fail=False):
+        self.id = id
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, content):
+        if self.fail:
+            raise RuntimeError("Missing permissions")
+        self.sent.append(content)
+
+
+@pytest.mark.unit
+class TestOutboundQueue:
+
+    def test_consecutive_messages_are_merged(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            queue = OutboundQueue()
+            await queue.send_all(channel, ["header", "row 1", "row 2"])
+            return queue
+
+        queue = asyncio.run(scenario())
+
+        assert channel.sent == ["header\nrow 1\nrow 2"]
+        assert queue.stats()["saved"] == 2
+
+    def test_merged_messages_never_exceed_discord_limit(self):
+        channel = FakeChannel()
+        rows = ["x" * 900] * 5
+
+        asyncio.run(OutboundQueue().send_all(channel, rows))
+
+        assert len(channel.sent) == 3
+        assert all(len(message) <= MAX_MESSAGE_LENGTH for message in channel.sent)
+
+    def test_interactive_replies_go_before_queued_bulk_output(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            queue = OutboundQueue()
+            bulk = asyncio.create_task(queue.send_all(channel, ["b" * 1500, "b" * 1500], priority=BULK))
+            await asyncio.sleep(0)  # Bulk output is queued but not sent yet
+            await queue.send(channel, "reply", priority=INTERACTIVE)
+            await bulk
+
+        asyncio.run(scenario())
+
+        assert channel.sent == ["reply", "b" * 1500, "b" * 1500]
+
+    def test_sends_are_paced_by_channel_bucket(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            queue = OutboundQueue(channel_rate=(2, 0.2))
+            start = time.monotonic()
+            await asyncio.gather(*(queue.send(channel, "m" * 1500) for _ in range(3)))
+            return time.monotonic() - start
+
+        elapsed = asyncio.run(scenario())
+
+        assert len(channel.sent) == 3
+        assert elapsed >= 0.08  # The third send waited for a token to refill
+
+    def test_failed_send_is_raised_to_the_sender(self):
+        channel = FakeChannel(fail=True)
+        queue = OutboundQueue()
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(queue.send(channel, "hello"))
+        assert queue.stats()["failed"] == 1
+
+
+@pytest.mark.unit
+class TestMessageHelpers:
+
+    def test_split_message_respects_length_limit(self):
+        text = "\n".join(["x" * 50] * 100)
+        chunks = split_message(text, limit=200)
+        assert all(len(chunk) <= 200 for chunk in chunks)
+        assert "\n".join(chunks) == text
+
+    def test_split_message_wraps_overlong_lines(self):
+        assert split_message("y" * 450, limit=200) == ["y" * 200, "y" * 200, "y" * 50]
+
+    def test_bulk_waits_while_interactive_sender_is_waiting(self):
+        async def scenario():
+            bucket = TokenBucket(1, 0.05)
+            await bucket.acquire()
+            order = []
+
+            async def take(priority, label):
+                await bucket.acquire(priority)
+                order.append(label)
+            bulk = asyncio.create_task(take(BULK, "bulk"))
+            await asyncio.sleep(0)
+            await asyncio.gather(take(INTERACTIVE, "interactive"), bulk)
+            return order
+
+        assert asyncio.run(scenario()) == ["interactive", "bulk"]
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import projection
+from projection import simulate
+from database import Database
+from models import ProjectionInputsModel
+from formatting import format_cashflow_projection
+
+
+needs_numpy = pytest.mark.skipif(not projection.available(), reason="NumPy is not installed")
+
+PROPERTIES = [
+    {"property_id": 1, "address": "1 Main St, Springfield", "rent": 3000, "mortgage": 1500, "capex": 150,
+     "tax": 250, "insurance": 100, "units": 2, "vacant_units": 0},
+    {"property_id": 2, "address": "2 Oak Ave, Springfield", "rent": 1800, "mortgage": 1700, "capex": 100,
+     "tax": 200, "insurance": 120, "units": 1, "vacant_units": 1},
+    {"property_id": 3, "address": None, "rent": 2400, "mortgage": None, "capex": None,
+     "tax": 180, "insurance": None, "units": 0, "vacant_units": 0},
+]
+
+
+def without_risk():
+    # No rent drift, no repairs and (practically) no vacancy: every path is today's figures.
+    return patch.multiple(projection, RENT_GROWTH=0.0, RENT_GROWTH_VOLATILITY=0.0, REPAIR_PROBABILITY=0.0,
+                          VACANCY_PRIOR=1e-12)
+
+
+@needs_numpy
+@pytest.mark.unit
+class TestSimulate:
+
+    def test_bands_are_ordered_and_shaped(self):
+        result = simulate(PROPERTIES, months=6, paths=2000, seed=1)
+
+        assert [prop["property_id"] for prop in result["properties"]] == [1, 2, 3]
+        for prop in result["properties"]:
+            low, median, high = prop["bands"]
+            assert low <= median <= high
+            assert 0 <= prop["loss_probability"] <= 1
+        monthly = result["portfolio"]["monthly"]
+        assert len(monthly) == 3 and all(len(band) == 6 for band in monthly)
+        assert all(low <= high for low, high in zip(monthly[0], monthly[2]))
+
+    def test_without_risk_every_path_is_the_baseline(self):
+        rows = [dict(row, units=10, vacant_units=0) for row in PROPERTIES]
+        with without_risk():
+            result = simulate(rows, months=12, paths=500, seed=2)
+
+        baselines = [(3000 - 2000) * 12, (1800 - 2120) * 12, (2400 - 180) * 12]
+        assert [prop["baseline"] for prop in result["properties"]] == baselines
+        for prop, baseline in zip(result["properties"], baselines):
+            assert prop["bands"] == pytest.approx([baseline] * 3, rel=1e-5)
+        assert [prop["loss_probability"] for prop in result["properties"]] == [0.0, 1.0, 0.0]
+        assert result["portfolio"]["bands"] == pytest.approx([sum(baselines)] * 3, rel=1e-5)
+        assert result["portfolio"]["monthly"][1] == pytest.approx([sum(baselines) / 12] * 12, rel=1e-5)
+
+    def test_vacancy_and_repairs_only_lower_cash_flow(self):
+        with patch.multiple(projection, RENT_GROWTH=0.0, RENT_GROWTH_VOLATILITY=0.0):
+            result = simulate(PROPERTIES, months=12, paths=4000, seed=3)
+
+        vacant = result["properties"][1]
+        assert vacant["bands"][2] <= vacant["baseline"] + 1e-6
+        assert vacant["bands"][0] < vacant["baseline"]
+
+    def test_chunked_simulation_covers_every_property(self):
+        rows = [dict(PROPERTIES[0], property_id=i, units=10) for i in range(7)]
+        with without_risk(), patch("projection.CHUNK_ELEMENTS", 2 * 100 * 12):
+            result = simulate(rows, months=12, paths=100, seed=4)
+
+        assert len(result["properties"]) == 7
+        assert all(prop["bands"] == pytest.approx([12000] * 3, rel=1e-5) for prop in result["properties"])
+        assert result["portfolio"]["bands"][1] == pytest.approx(7 * 12000, rel=1e-5)
+
+    def test_same_seed_gives_the_same_projection(self):
+        assert simulate(PROPERTIES, months=3, paths=300, seed=5) == simulate(PROPERTIES, months=3, paths=300, seed=5)
+
+
+@needs_numpy
+@pytest.mark.unit
+class TestFormatCashflowProjection:
+
+    def test_properties_are_listed_most_at_risk_first(self):
+        result = simulate(PROPERTIES, months=3, paths=500, seed=6)
+
+        entries = format_cashflow_projection(PROPERTIES, result)
+
+        assert "next 3 months, 500 scenarios" in entries[0]
+        assert entries[1].startswith("**Portfolio**") and entries[1].count("\n") >= 3 + 5
+        assert entries[2].startswith("**2 Oak Ave, Springfield**")
+        assert "**N/A**" in "".join(entries[2:])
+
+
+@pytest.mark.unit
+class TestProjectionInputs:
+
+    def test_inputs_have_one_row_per_property(self, sample_user):
+        rows = asyncio.run(ProjectionInputsModel.load_async(sample_user)).rows
+        properties = Database.select("SELECT COUNT(*) AS n FROM PortfolioProperties")[0]["n"]
+
+        assert len(rows) == properties
+        assert sum(row["units"] for row in rows) == 6 and sum(row["vacant_units"] for row in rows) == 3
+        assert all(row["insurance"] > 0 and row["tax"] > 0 and row["address"] for row in rows)
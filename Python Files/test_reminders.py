@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch, AsyncMock
+from database import Query
+from reminders import DeadlineScheduler, deadline_ranges, format_reminder, LEAD_DAYS, DEADLINE_KINDS
+
+TODAY = date(2025, 6, 1)
+MORNING = datetime(2025, 6, 1, 10, 0)
+
+
+def deadline(kind, item_id, user_id, days_ahead=None):
+    lead = LEAD_DAYS[kind] if days_ahead is None else days_ahead
+    return {"kind": kind, "item_id": item_id, "user_id": user_id,
+            "due_date": date.fromordinal(TODAY.toordinal() + lead),
+            "property_address": "123 Main St", "detail": None}
+
+
+def load(scheduler, rows):
+    with patch("reminders.Database.select_async", new=AsyncMock(return_value=rows)) as mock_select:
+        asyncio.run(scheduler.load(TODAY))
+    return mock_select
+
+
+@pytest.mark.unit
+class TestDeadlineScheduler:
+
+    def test_load_reads_each_kind_with_its_own_due_date_range(self):
+        mock_select = load(DeadlineScheduler(AsyncMock()), [])
+
+        query, values = mock_select.await_args.args
+        assert query == Query.UPCOMING_DEADLINES
+        assert len(values) == 2 * len(DEADLINE_KINDS)
+        assert values[:2] == [date(2025, 7, 1), date(2025, 7, 2)]  # leases are reminded 30 days ahead
+
+    def test_due_reminders_are_batched_per_owner(self):
+        scheduler = DeadlineScheduler(AsyncMock())
+        load(scheduler, [deadline("lease", 1, 42), deadline("payment", 7, 42), deadline("tax", 3, 43)])
+
+        batches = scheduler.due(MORNING)
+
+        assert sorted(batches) == [42, 43]
+        assert [row["kind"] for row in batches[42]] == ["lease", "payment"]
+
+    def test_reminders_are_not_sent_before_reminder_hour(self):
+        scheduler = DeadlineScheduler(AsyncMock())
+        load(scheduler, [deadline("lease", 1, 42)])
+
+        assert scheduler.due(datetime(2025, 6, 1, 6, 0)) == {}
+        assert scheduler.next_wake(datetime(2025, 6, 1, 6, 0)) > 0
+
+    def test_send_due_delivers_one_message_per_owner(self):
+        deliver = AsyncMock()
+        scheduler = DeadlineScheduler(deliver)
+        load(scheduler, [deadline("lease", 1, 42), deadline("insurance", 2, 42)])
+
+        asyncio.run(scheduler.send_due(MORNING))
+
+        deliver.assert_awaited_once()
+        assert deliver.await_args.args[0] == 42
+        assert scheduler.stats()["reminders_sent"] == 2
+
+    def test_refresh_replaces_a_users_pending_reminders(self):
+        scheduler = DeadlineScheduler(AsyncMock())
+        load(scheduler, [deadline("lease", 1, 42), deadline("lease", 5, 43)])
+        refreshed = [deadline("mortgage", 9, 42)]
+
+        with patch("reminders.Database.select_async", new=AsyncMock(return_value=refreshed)) as mock_select:
+            asyncio.run(scheduler.reload_user(42, TODAY))
+        batches = scheduler.due(MORNING)
+
+        assert mock_select.await_args.args[0] == Query.UPCOMING_DEADLINES_BY_USER
+        assert [row["item_id"] for row in batches[42]] == [9]
+        assert [row["item_id"] for row in batches[43]] == [5]
+
+    def test_each_reminder_is_sent_once(self):
+        scheduler = DeadlineScheduler(AsyncMock())
+        rows = [deadline("lease", 1, 42)]
+        load(scheduler, rows)
+        scheduler.due(MORNING)
+        load(scheduler, rows)
+
+        assert scheduler.due(MORNING) == {}
+
+
+@pytest.mark.unit
+class TestReminderFormatting:
+
+    def test_earliest_deadline_listed_first(self):
+        text = format_reminder([deadline("lease", 1, 42), deadline("payment", 2, 42)])
+        lines = text.split("\n")
+        assert lines[1].startswith("• Rent payment due") and lines[2].startswith("• Lease ends")
+
+    def test_deadline_ranges_cover_one_day_of_fire_dates(self):
+        values = deadline_ranges(TODAY, 1)
+        payment = DEADLINE_KINDS.index("payment")
+        assert values[2 * payment:2 * payment + 2] == [date(2025, 6, 4), date(2025, 6, 5)]
@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from decimal import Decimal
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+from database import Query
+from rollups import RollupReconciler, drifted_columns, ledger_rollups_match, ROLLUP_COLUMNS
+
+
+def rollup(portfolio_id, **values):
+    row = {column: 0 for column in ROLLUP_COLUMNS}
+    row.update(values, portfolio_id=portfolio_id)
+    return row
+
+
+class FakeTransaction:
+    """Serves stored rollups by portfolio ID range and the recomputed totals for a batch."""
+
+    def __init__(self, stored, actual):
+        self.stored = stored
+        self.actual = actual
+        self.selects = []
+        self.updates = []
+
+    async def select(self, query, values=None, fetch=True):
+        self.selects.append((query, values))
+        if query == Query.PORTFOLIO_ROLLUPS_AFTER:
+            after, limit = values
+            return [row for row in self.stored if row["portfolio_id"] > after][:limit]
+        return [row for row in self.actual if row["portfolio_id"] in values[0]]
+
+    async def update(self, query, values=None):
+        self.updates.append((query, values))
+
+
+def reconcile(tx, batch_size=200):
+    @asynccontextmanager
+    async def transaction_async(read_only=False):
+        yield tx
+
+    reconciler = RollupReconciler(batch_size=batch_size)
+    with patch("rollups.Database.transaction_async", new=transaction_async):
+        asyncio.run(reconciler.reconcile())
+    return reconciler
+
+
+@pytest.mark.unit
+class TestRollupReconciler:
+
+    def test_matching_rollups_are_left_alone(self):
+        stored = [rollup(1, num_properties=3, total_rent=4500.0), rollup(2)]
+        tx = FakeTransaction(stored, [rollup(1, num_properties=3, total_rent=Decimal("4500.001"))])
+
+        reconciler = reconcile(tx)
+
+        assert tx.updates == []
+        assert reconciler.stats() == {"runs": 1, "checked": 2, "repaired": 0}
+
+    def test_drifted_portfolio_is_rewritten_with_recomputed_totals(self):
+        stored = [rollup(1, num_properties=4, total_principal=100.0)]
+        tx = FakeTransaction(stored, [rollup(1, num_properties=3, total_principal=250.0)])
+
+        reconcile(tx)
+
+        query, values = tx.updates[0]
+        assert query == Query.SET_PORTFOLIO_ROLLUPS
+        assert values["portfolio_id"] == 1
+        assert values["num_properties"] == 3 and values["total_principal"] == 250.0
+
+    def test_portfolio_without_properties_is_reset_to_zero(self):
+        tx = FakeTransaction([rollup(5, num_properties=2, total_rent=900.0)], [])
+
+        reconcile(tx)
+
+        assert tx.updates[0][1] == rollup(5)
+
+    def test_portfolios_are_walked_in_batches(self):
+        stored = [rollup(i) for i in range(1, 6)]
+        tx = FakeTransaction(stored, [])
+
+        reconciler = reconcile(tx, batch_size=2)
+
+        afters = [values[0] for query, values in tx.selects if query == Query.PORTFOLIO_ROLLUPS_AFTER]
+        assert afters == [0, 2, 4, 5]
+        assert reconciler.checked == 5
+
+    def test_failed_run_is_retried_on_the_next_interval(self):
+        calls = []
+
+        async def reconcile_once():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise RuntimeError("lost connection")
+
+        async def run():
+            reconciler = RollupReconciler(interval_hours=0)
+            reconciler.start_delay = 0
+            with patch.object(reconciler, "reconcile", new=reconcile_once):
+                reconciler.start()
+                while len(calls) < 3:
+                    await asyncio.sleep(0)
+                await reconciler.close()
+            return reconciler
+
+        reconciler = asyncio.run(run())
+
+        assert len(calls) >= 3 and reconciler._task is None
+
+    def test_drifted_columns_names_only_changed_totals(self):
+        stored = rollup(1, num_properties=2, total_capex=300.0)
+        assert drifted_columns(stored, rollup(1, num_properties=2, total_capex=350.0)) == ["total_capex"]
+
+    def test_ledger_rollups_match_within_rounding_only(self):
+        stored = {("2024-01-01", "income", "Rent"): (5000.0, 1)}
+
+        assert ledger_rollups_match(stored, {("2024-01-01", "income", "Rent"): (5000.001, 1)})
+        assert not ledger_rollups_match(stored, {("2024-01-01", "income", "Rent"): (5000.0, 2)})
+        assert not ledger_rollups_match(stored, {})
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from database import Query
+from formatting import format_search_results
+from search import SearchIndex, SearchIndexes
+
+USER_ID = 42
+
+
+def doc(kind, doc_id, title, subtitle=None, body=None, past_due_balance=None):
+    return {"kind": kind, "doc_id": doc_id, "title": title, "subtitle": subtitle, "body": body,
+            "past_due_balance": past_due_balance}
+
+
+DOCUMENTS = [
+    doc("tenant", 1, "Alice Johnson", "12 Elm St", "Tenant is late with payments.", 11000),
+    doc("tenant", 2, "John Doe", "7 Oak Ave", "Tenant is a reliable renter."),
+    doc("property", 3, "12 Elm St", "Austin, Texas"),
+    doc("project", 4, "Kitchen Renovation", "7 Oak Ave", "Renovating the kitchen for better functionality."),
+    doc("contractor", 5, "Roofing Co C", "Michael Johnson", "Roof repairs, maintenance"),
+]
+
+
+def change(table, pk, op="U", user_id=USER_ID):
+    return {"seq": 1, "table_name": table, "pk": pk, "op": op, "user_id": user_id}
+
+
+@pytest.fixture()
+def built():
+    # A SearchIndexes whose index for USER_ID has already been built from DOCUMENTS.
+    indexes = SearchIndexes()
+    with patch("search.Database.select_async", new=AsyncMock(return_value=DOCUMENTS)):
+        asyncio.run(indexes.index_for(USER_ID))
+    return indexes
+
+
+def ids(rows):
+    return [(row["kind"], row["doc_id"]) for row in rows]
+
+
+@pytest.mark.unit
+class TestSearchIndex:
+
+    def test_all_words_must_match_for_top_rank(self):
+        results = SearchIndex(DOCUMENTS).search("elm late")
+
+        assert ids(results)[0] == ("tenant", 1)
+        assert results[0]["score"] == 1.0
+
+    def test_words_match_as_prefixes(self):
+        assert ids(SearchIndex(DOCUMENTS).search("ki")) == [("project", 4)]
+
+    def test_misspelled_words_still_match(self):
+        assert ids(SearchIndex(DOCUMENTS).search("kitchn renovaton")) == [("project", 4)]
+
+    def test_unrelated_words_do_not_match(self):
+        assert SearchIndex(DOCUMENTS).search("swimming pool") == []
+        assert SearchIndex(DOCUMENTS).search("  !! ") == []
+
+    def test_removed_documents_are_unindexed(self):
+        index = SearchIndex(DOCUMENTS)
+        index.remove("contractor", 5)
+
+        assert index.search("roofing") == []
+        assert "roo" not in index._postings
+
+
+@pytest.mark.unit
+class TestSearchIndexes:
+
+    def test_index_is_built_with_one_query_and_reused(self):
+        indexes = SearchIndexes()
+
+        with patch("search.Database.select_async", new=AsyncMock(return_value=DOCUMENTS)) as mock_select:
+            asyncio.run(indexes.search(USER_ID, "elm"))
+            asyncio.run(indexes.search(USER_ID, "oak"))
+
+        mock_select.assert_awaited_once_with(Query.SEARCH_DOCUMENTS_BY_USER, (USER_ID,) * 4)
+
+    def test_changed_documents_are_reread_by_id(self, built):
+        renamed = doc("tenant", 2, "John Doe", "7 Oak Ave", "Tenant owns a dog.")
+
+        with patch("search.Database.select_async", new=AsyncMock(return_value=[renamed])) as mock_select:
+            asyncio.run(built.apply_changes([change("Tenants", 2), change("Contractors", 5, op="D")]))
+            assert ids(asyncio.run(built.search(USER_ID, "dog"))) == [("tenant", 2)]
+            assert asyncio.run(built.search(USER_ID, "roofing")) == []
+
+        mock_select.assert_awaited_once_with(Query.SEARCH_TENANTS_BY_IDS, (USER_ID, (2,)), primary=True)
+
+    def test_ownership_changes_rebuild_the_index(self, built):
+        with patch("search.Database.select_async", new=AsyncMock(return_value=[])) as mock_select:
+            asyncio.run(built.apply_changes([change("PortfolioProperties", 9), change("Tenants", 1)]))
+            assert asyncio.run(built.search(USER_ID, "elm")) == []
+
+        mock_select.assert_awaited_once_with(Query.SEARCH_DOCUMENTS_BY_USER, (USER_ID,) * 4)
+
+    def test_changes_for_users_without_an_index_are_ignored(self, built):
+        with patch("search.Database.select_async", new=AsyncMock()) as mock_select:
+            asyncio.run(built.apply_changes([change("Tenants", 1, user_id=7), change("Tenants", 1, user_id=None)]))
+
+        mock_select.assert_not_awaited()
+
+
+@pytest.mark.unit
+class TestSearchFormatting:
+
+    def test_results_show_kind_address_and_balance(self):
+        entries = format_search_results("elm late", SearchIndex(DOCUMENTS).search("elm late", limit=1))
+
+        assert len(entries) == 2
+        assert "Alice Johnson** (Tenant ID: 1)" in entries[1]
+        assert "12 Elm St" in entries[1] and "$11,000.00" in entries[1]
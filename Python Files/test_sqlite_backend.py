@@ -0,0 +1,179 @@
+import pytest
+import sqlite3
+from collections import Counter
+from datetime import date
+from unittest.mock import patch
+from database import Database, Query, SQLiteBackend, SQLITE_SCHEMA_VERSION, _sqlite_bind, _sqlite_statement
+from models import ViewMortgagesModel
+from rollups import drifted_columns
+
+def property_count(user_id):
+    return Database.select(Query.CHECK_NUM_PROPERTIES, (user_id,))[0]["property_count"]
+
+
+@pytest.mark.unit
+class TestSQLiteDialect:
+
+    def test_in_list_parameter_expands_to_placeholders(self):
+        sql, parameters = _sqlite_bind(_sqlite_statement(Query.REGISTERED_USERS_BY_IDS), ((1, 2, 3),))
+
+        assert sql == "SELECT * FROM RegisteredUsers WHERE tracking_id IN (?, ?, ?)"
+        assert parameters == [1, 2, 3]
+
+    def test_named_parameters_and_literals(self):
+        segments = _sqlite_statement("SELECT '%s  x', %(a)s, %s FROM t WHERE b LIKE 'a%%'")
+
+        assert segments == ("SELECT '%s  x', :a, ", " FROM t WHERE b LIKE 'a%%'")
+
+    def test_row_locks_and_mysql_dates_are_translated(self):
+        sql, _ = _sqlite_bind(_sqlite_statement(Query.EXPIRED_ROLE_USERS), (3,))
+
+        assert "FOR UPDATE" not in sql
+        assert "role_expires < date('now', 'localtime')" in sql
+
+
+@pytest.mark.unit
+class TestSQLiteBackend:
+
+    def test_new_file_gets_schema_in_wal_mode(self, sqlite_db):
+        connection = sqlite_db.connect()
+        try:
+            assert connection.execute("PRAGMA journal_mode").fetchone()["journal_mode"] == "wal"
+            assert connection.execute("PRAGMA foreign_keys").fetchone()["foreign_keys"] == 1
+            assert connection.execute("PRAGMA mmap_size").fetchone()["mmap_size"] == sqlite_db.mmap_mb * 1024 * 1024
+            assert connection.execute("PRAGMA user_version").fetchone()["user_version"] == SQLITE_SCHEMA_VERSION
+        finally:
+            connection.close()
+
+    def test_older_schema_is_upgraded_in_place(self, tmp_path):
+        path = str(tmp_path / "old.sqlite3")
+        SQLiteBackend(path).connect().close()
+        connection = sqlite3.connect(path)
+        connection.executescript("DROP TABLE PaymentHistoriesArchive; PRAGMA user_version = 1;")
+        connection.close()
+
+        connection = SQLiteBackend(path).connect()
+        try:
+            assert connection.execute("PRAGMA user_version").fetchone()["user_version"] == SQLITE_SCHEMA_VERSION
+            assert connection.execute("SELECT COUNT(*) AS n FROM PaymentHistoriesArchive").fetchone()["n"] == 0
+        finally:
+            connection.close()
+
+    def test_mortgaged_purchase_price_is_added_to_older_files(self, sqlite_db, sample_user):
+        Database.close()
+        connection = sqlite3.connect(sqlite_db.path)
+        triggers = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%mortgaged_purchase_price%'")]
+        connection.executescript("".join(f"DROP TRIGGER {name};" for name in triggers) + "DROP VIEW ViewMortgages;"
+                                 "ALTER TABLE Portfolios DROP COLUMN mortgaged_purchase_price; PRAGMA user_version = 5;")
+        connection.close()
+
+        with patch("database._backend", SQLiteBackend(sqlite_db.path)):
+            portfolio_id = Database.select(Query.PORTFOLIOS_BY_USER, (sample_user,))[0]["portfolio_id"]
+            stored = Database.select(Query.PORTFOLIO, (portfolio_id,))[0]
+            actual = Database.select(Query.PORTFOLIO_ROLLUP_ACTUALS, ((portfolio_id,),))[0]
+            Database.close()
+
+        assert stored["mortgaged_purchase_price"] == stored["total_purchase_price"] > 0
+        assert drifted_columns(stored, actual) == []
+
+    def test_transaction_rolls_back_on_error(self, sqlite_db):
+        with pytest.raises(RuntimeError):
+            with Database.transaction() as tx:
+                tx.insert(Query.INSERT_PORTFOLIO, {"portfolio_id": 7})
+                raise RuntimeError("boom")
+
+        assert Database.select(Query.PORTFOLIO, (7,)) == []
+
+    def test_sample_data_is_created_once_and_removed_again(self, sample_user):
+        Database.callprocedure(Query.PROC_CreateSampleUserData, (sample_user,))
+        assert property_count(sample_user) == 6
+
+        Database.callprocedure(Query.PROC_ResetUserData, (sample_user,))
+        Database.callprocedure(Query.PROC_CleanOrphanedData)
+
+        assert property_count(sample_user) == 0
+        for table in ("Properties", "Addresses", "Mortgages", "Tenants", "Contractors", "LedgerRollups"):
+            assert Database.select(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"] == 0
+
+    def test_rollup_triggers_match_source_rows(self, sample_user):
+        portfolio_id = Database.select(Query.PORTFOLIOS_BY_USER, (sample_user,))[0]["portfolio_id"]
+        Database.update("UPDATE Properties SET monthly_capex = monthly_capex + 1")
+
+        stored = Database.select(Query.PORTFOLIO, (portfolio_id,))[0]
+        actual = Database.select(Query.PORTFOLIO_ROLLUP_ACTUALS, ((portfolio_id,),))[0]
+
+        assert stored["num_mortgages"] == 6
+        assert drifted_columns(stored, actual) == []
+
+    def test_mortgaged_purchase_price_counts_each_mortgaged_property_once(self, sample_user):
+        portfolio_id = Database.select(Query.PORTFOLIOS_BY_USER, (sample_user,))[0]["portfolio_id"]
+        first, second = [row["property_id"] for row in Database.select(
+            "SELECT property_id FROM Mortgages ORDER BY property_id LIMIT 2")]
+        purchase = {row["property_id"]: row["purchase_price"] for row in Database.select(
+            "SELECT property_id, purchase_price FROM PropertyHistories WHERE property_id IN %s", ((first, second),))}
+        before = Database.select(Query.PORTFOLIO, (portfolio_id,))[0]
+
+        Database.update("INSERT INTO Mortgages (lender_name, principal_balance, monthly_payment, property_id) "
+                        "VALUES ('Second Bank', 1000, 10, %s)", (first,))
+        Database.update("UPDATE PropertyHistories SET purchase_price = purchase_price + 100 WHERE property_id = %s",
+                        (first,))
+        Database.update("DELETE FROM Mortgages WHERE property_id = %s", (second,))
+        Database.update("UPDATE PropertyHistories SET purchase_price = purchase_price + 50 WHERE property_id = %s",
+                        (second,))
+
+        stored = Database.select(Query.PORTFOLIO, (portfolio_id,))[0]
+        actual = Database.select(Query.PORTFOLIO_ROLLUP_ACTUALS, ((portfolio_id,),))[0]
+        assert stored["mortgaged_purchase_price"] == before["mortgaged_purchase_price"] + 100 - purchase[second]
+        assert stored["total_purchase_price"] == before["total_purchase_price"] + 150
+        assert drifted_columns(stored, actual) == []
+
+    def test_views_match_model_output(self, sample_user):
+        # One property gets a second mortgage and another loses its only one.
+        first, second = [row["property_id"] for row in Database.select(
+            "SELECT property_id FROM Mortgages ORDER BY property_id LIMIT 2")]
+        Database.update("INSERT INTO Mortgages (lender_name, principal_balance, monthly_payment, start_date, "
+                        "property_id) VALUES ('Second Bank', 1000, 10, '2001-01-01', %s)", (first,))
+        Database.update("DELETE FROM Mortgages WHERE property_id = %s", (second,))
+        mortgaged = Database.select(
+            "SELECT SUM(purchase_price) AS total FROM PropertyHistories "
+            "WHERE property_id IN (SELECT property_id FROM Mortgages)")[0]["total"]
+
+        view_rows = Database.callprocedure(Query.PROC_GetMortgages, (sample_user,), fetch=True)
+
+        assert view_rows == ViewMortgagesModel(sample_user).rows
+        assert view_rows[0]["start_date"] == date(2000, 1, 1)
+        assert len(view_rows) == 7 and view_rows[-1]["lender_name"] == "Total"
+        assert view_rows[-1]["purchase_price"] == mortgaged
+        assert len(Database.select(Query.TENANTS_BY_USER, (sample_user,))) == 6
+
+    def test_change_log_records_owning_user(self, sample_user):
+        changes = Database.select(Query.CHANGES_AFTER, (0, 1000))
+
+        mortgages = [c for c in changes if c["table_name"] == "Mortgages"]
+        assert len(mortgages) == 6 and all(c["user_id"] == sample_user and c["op"] == "I" for c in mortgages)
+
+    def test_search_documents_cover_every_kind(self, sample_user):
+        rows = Database.select(Query.SEARCH_DOCUMENTS_BY_USER, (sample_user,) * 4)
+        alice = next(row["doc_id"] for row in rows if row["title"] == "Alice Johnson")
+        late = Database.select(Query.SEARCH_TENANTS_BY_IDS, (sample_user, (alice,)))
+
+        assert Counter(row["kind"] for row in rows) == {"tenant": 6, "property": 6, "project": 6, "contractor": 6}
+        assert late[0]["body"] == "Tenant is late with payments." and late[0]["past_due_balance"] == 11000
+
+    def test_consumer_position_is_upserted(self, sqlite_db):
+        Database.insert(Query.SAVE_CHANGELOG_POSITION, ("bot", 5))
+        Database.insert(Query.SAVE_CHANGELOG_POSITION, ("bot", 9))
+
+        assert Database.select(Query.CONSUMED_CHANGE_SEQ, (60,))[0]["seq"] == 9
+
+    def test_guests_may_not_run_checked_queries(self, sample_user):
+        Database.callprocedure(Query.PROC_AssignRole, (sample_user, 1, "2000-01-01"))
+
+        with pytest.raises(Exception, match="Guests may not execute this query."):
+            Database.callprocedure(Query.PROC_CheckBeforeQuery, (sample_user, "SELECT 1"))
+
+    def test_owners_run_checked_queries(self, sample_user):
+        rows = Database.callprocedure(Query.PROC_CheckBeforeQuery, (sample_user, "SELECT COUNT(*) AS n FROM Units"), fetch=True)
+
+        assert rows == [{"n": 6}]
@@ -0,0 +1,142 @@
+import sys
+import time
+import asyncio
+import subprocess
+import pytest
+from pathlib import Path
+from unittest.mock import patch, AsyncMock
+import cache
+import snapshot
+from cache import TTLCache
+from changelog import ChangeLogTailer
+from database import Query
+
+
+@pytest.fixture()
+def fresh_caches():
+    with patch("cache.registered_users", TTLCache()), patch("cache.view_results", TTLCache()):
+        yield
+        snapshot.uninstall()
+
+
+def write_snapshot(path, seq, *user_ids):
+    # Snapshots the given users' cache entries and empties the caches, as after a restart.
+    for user_id in user_ids:
+        cache.registered_users.set(user_id, {"tracking_id": user_id, "role_id": 2})
+        cache.view_results.set(("ViewTenantsModel", user_id), [{"tenant": user_id}])
+    written = snapshot.write_snapshot(seq, path)
+    cache.registered_users.clear()
+    cache.view_results.clear()
+    return written
+
+
+def change_log(first_seq, last_seq, *results):
+    # CHANGE_SEQ_RANGE for the tailer's seek, then whatever restore() queries next.
+    return AsyncMock(side_effect=[[{"first_seq": first_seq, "last_seq": last_seq}], *results])
+
+
+@pytest.mark.unit
+class TestCacheSnapshot:
+
+    def test_entries_are_restored_lazily(self, tmp_path, fresh_caches):
+        path = str(tmp_path / "snapshot")
+        assert write_snapshot(path, 10, 1, 2) == 4
+
+        with patch("snapshot.Database.select_async", new=change_log(1, 10)) as mock_select:
+            restored = asyncio.run(snapshot.restore(ChangeLogTailer(), path))
+
+        assert restored == 4 and mock_select.await_count == 1
+        assert cache.registered_users.stats()["snapshot_pending"] == 2
+        assert cache.registered_users.get(2) == {"tracking_id": 2, "role_id": 2}
+        assert cache.view_results.get(("ViewTenantsModel", 1)) == [{"tenant": 1}]
+        assert cache.registered_users.stats()["snapshot_pending"] == 1
+
+    def test_users_changed_since_snapshot_are_dropped(self, tmp_path, fresh_caches):
+        path = str(tmp_path / "snapshot")
+        write_snapshot(path, 10, 1, 2)
+        tailer = ChangeLogTailer()
+
+        with patch("snapshot.Database.select_async", new=change_log(6, 12, [{"user_id": 2}])) as mock_select:
+            restored = asyncio.run(snapshot.restore(tailer, path))
+
+        mock_select.assert_awaited_with(Query.CHANGED_USERS_BETWEEN, (10, 12), primary=True)
+        assert restored == 2 and tailer.position() == 12
+        assert cache.registered_users.get(2) is None
+        assert cache.view_results.get(("ViewTenantsModel", 2)) is None
+        assert cache.registered_users.get(1) is not None
+
+    def test_truncated_log_reloads_users_in_one_query(self, tmp_path, fresh_caches):
+        path = str(tmp_path / "snapshot")
+        write_snapshot(path, 10, 1, 2)
+        rows = [{"tracking_id": 1}, {"tracking_id": 2}]
+
+        with patch("snapshot.Database.select_async", new=change_log(21, 30, rows)) as mock_select:
+            restored = asyncio.run(snapshot.restore(ChangeLogTailer(), path))
+
+        mock_select.assert_awaited_with(Query.REGISTERED_USERS_BY_IDS, ((2, 1),))
+        assert restored == 2
+        assert cache.registered_users.get(1) == {"tracking_id": 1}
+        assert cache.view_results.get(("ViewTenantsModel", 1)) is None
+
+    def test_entries_only_live_out_the_ttl_they_had(self, tmp_path, fresh_caches):
+        path = str(tmp_path / "snapshot")
+        cache.registered_users.set(1, {"tracking_id": 1}, ttl=600)
+        cache.view_results.set(("OccupancyModel", 1), [{"occupied": 3}], ttl=60)
+        snapshot.write_snapshot(10, path)
+        cache.registered_users.clear()
+        cache.view_results.clear()
+
+        # Restarted two minutes later: the view result's 60 seconds have run out.
+        with patch("snapshot.time.time", return_value=time.time() + 120), \
+             patch("snapshot.Database.select_async", new=change_log(1, 10)):
+            restored = asyncio.run(snapshot.restore(ChangeLogTailer(), path))
+            assert restored == 1
+            assert cache.view_results.get(("OccupancyModel", 1)) is None
+            assert cache.registered_users.get(1) == {"tracking_id": 1}
+
+        (_, _, ttl), = cache.registered_users.inner.expiring_items()
+        assert 470 < ttl <= 480
+
+    def test_invalidation_drops_snapshot_entry(self, tmp_path, fresh_caches):
+        path = str(tmp_path / "snapshot")
+        write_snapshot(path, 10, 1)
+        snapshot.install(snapshot.CacheSnapshot(path))
+
+        cache.registered_users.delete(1)
+
+        assert cache.registered_users.get(1) is None
+        assert cache.view_results.get(("ViewTenantsModel", 1)) == [{"tenant": 1}]
+
+    def test_missing_or_unknown_file_is_ignored(self, tmp_path, fresh_caches):
+        unknown = tmp_path / "recent.json"
+        unknown.write_text("[1, 2]")
+
+        with patch("snapshot.Database.select_async", new=AsyncMock()) as mock_select:
+            assert asyncio.run(snapshot.restore(ChangeLogTailer(), str(tmp_path / "none"))) == 0
+            assert asyncio.run(snapshot.restore(ChangeLogTailer(), str(unknown))) == 0
+
+        mock_select.assert_not_awaited()
+
+
+@pytest.mark.unit
+class TestEntryPoint:
+
+    def test_importing_main_has_no_side_effects(self):
+        # Importing main must not need DISCORD_TOKEN, start the bot or open DB connections.
+        env = {"PATH": "", "DB_HOST": "", "PYTHONPATH": str(Path(__file__).parent)}
+        result = subprocess.run([sys.executable, "-c", "import main; print(callable(main.main))"],
+                                capture_output=True, text=True, env=env, timeout=60, cwd=str(Path(__file__).parent))
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "True"
+
+    def test_command_modules_are_not_imported_with_main(self):
+        # They load on first use, so every spawned shard worker starts without NumPy and the models.
+        env = {"PATH": "", "DB_HOST": "", "PYTHONPATH": str(Path(__file__).parent)}
+        code = ("import sys, main; print(sorted(m for m in ('models', 'formatting', 'compute', 'projection', 'numpy')"
+                " if m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code],
+                                capture_output=True, text=True, env=env, timeout=60, cwd=str(Path(__file__).parent))
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
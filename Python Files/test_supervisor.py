@@ -0,0 +1,121 @@
+import os
+import pytest
+from unittest.mock import Mock, patch
+import cache
+from cache import TTLCache
+from supervisor import shard_ranges, Supervisor
+
+
+@pytest.mark.unit
+class TestShardRanges:
+
+    def test_splits_evenly(self):
+        assert shard_ranges(8, 4) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+
+    def test_spreads_remainder_over_first_workers(self):
+        assert shard_ranges(5, 2) == [[0, 1, 2], [3, 4]]
+
+    def test_never_more_workers_than_shards(self):
+        assert shard_ranges(2, 4) == [[0], [1]]
+
+
+@pytest.mark.unit
+class TestWorkerEnvironment:
+
+    def test_cpu_pool_is_split_between_shard_workers(self, monkeypatch):
+        # Set then deleted, so monkeypatch restores whatever the environment had afterwards.
+        for key in ("CPU_WORKERS", "CACHE_ADDRESS", "CACHE_AUTHKEY"):
+            monkeypatch.setenv(key, "")
+        monkeypatch.delenv("CPU_WORKERS")
+        monkeypatch.setattr("os.cpu_count", lambda: 16)
+        supervisor = Supervisor(8, 4)
+
+        with patch("cache.start_shared_cache") as start_cache, patch.object(Supervisor, "_spawn"):
+            start_cache.return_value.address = ("127.0.0.1", 50000)
+            supervisor.start()
+
+        # 16 cores, 4 of them running the bots: each worker gets 3 pool processes, not 15.
+        assert os.environ["CPU_WORKERS"] == "3"
+
+
+class DeadProcess:
+    # A worker process that has already exited by the time the supervisor looks at it.
+
+    def __init__(self, target, args, name):
+        self.start_delay = args[2]
+        self.name = name
+        self.pid = 1
+        self.exitcode = 1
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return False
+
+
+@pytest.mark.unit
+class TestRestartBackoff:
+
+    def test_backoff_resets_after_a_stable_run(self):
+        supervisor = Supervisor(1, 1)
+        supervisor._context = Mock(Process=DeadProcess)
+        now = [0.0]
+        naps = iter([10, 1000])
+        started = []
+
+        def spawn(index, start_delay=0.0):
+            started.append(start_delay)
+            original_spawn(index, start_delay)
+
+        def sleep(_):
+            # Each monitor pass moves the clock on; the third one ends the loop.
+            nap = next(naps, None)
+            if nap is None:
+                supervisor._stopping = True
+            else:
+                now[0] += nap
+
+        original_spawn = supervisor._spawn
+        with patch("supervisor.time") as fake_time, patch.object(supervisor, "_spawn", spawn):
+            fake_time.monotonic.side_effect = lambda: now[0]
+            fake_time.sleep.side_effect = sleep
+            supervisor._spawn(0)
+            supervisor.monitor()
+
+        # Crash loop: 1s, then 2s. After running for well over RESTART_STABLE_AFTER, back to 1s.
+        assert started == [0.0, 1, 2, 1]
+
+
+@pytest.mark.unit
+class TestSharedCache:
+
+    def test_workers_share_entries_through_cache_server(self):
+        # Two separate client connections stand in for two worker processes.
+        manager = cache.start_shared_cache()
+        try:
+            with patch("cache.registered_users", TTLCache()), patch("cache.view_results", TTLCache()):
+                cache.connect_shared_cache(manager.address, manager._authkey)
+                cache.registered_users.set(42, {"tracking_id": 42})
+                other_worker = cache.SharedCacheManager(address=manager.address, authkey=manager._authkey)
+                other_worker.connect()
+
+                assert other_worker.cache("registered_users").get(42) == {"tracking_id": 42}
+
+                other_worker.cache("registered_users").delete(42)
+                assert cache.registered_users.get(42) is None
+        finally:
+            manager.shutdown()
+
+
+@pytest.mark.unit
+class TestShardedBot:
+
+    def test_create_bot_with_shards_builds_auto_sharded_bot(self):
+        from discord.ext import commands
+        import main
+
+        bot = main.create_bot(shard_ids=[2, 3], shard_count=8)
+
+        assert isinstance(bot, commands.AutoShardedBot)
+        assert bot.shard_ids == [2, 3] and bot.shard_count == 8
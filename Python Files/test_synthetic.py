@@ -0,0 +1,79 @@
+import pytest
+from datetime import date
+from collections import Counter
+from database import Database, Query
+from synthetic import IdRanges, user_rows, generate, cleanup, synthetic_user_id, TABLES
+
+AS_OF = date(2024, 12, 31)
+
+
+def rows_of(seed, index=0, properties=2, units=3):
+    return list(user_rows(seed, index, properties, units, AS_OF, IdRanges()))
+
+
+def counts(table):
+    return Database.select(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"]
+
+
+@pytest.mark.unit
+class TestUserRows:
+
+    def test_same_seed_gives_the_same_rows(self):
+        assert rows_of(5) == rows_of(5)
+        assert rows_of(5) != rows_of(6) and rows_of(5) != rows_of(5, index=1)
+
+    def test_every_property_has_its_units_and_parents_come_first(self):
+        rows = rows_of(5)
+        tables = Counter(table for table, _ in rows)
+        order = list(TABLES)
+
+        assert (tables["RegisteredUsers"], tables["Properties"], tables["Units"]) == (1, 2, 6)
+        assert tables["Tenants"] == tables["LeaseAgreements"] == tables["UnitTenants"]
+        assert all(len(row) == len(TABLES[table]) for table, row in rows)
+        first_seen = {}
+        for position, (table, _) in enumerate(rows):
+            first_seen.setdefault(table, position)
+        assert first_seen["Properties"] < first_seen["Units"] < first_seen["LeaseAgreements"]
+        assert order.index("Tenants") < order.index("PaymentHistories")
+
+    def test_payments_fall_within_their_lease_and_before_the_as_of_date(self):
+        rows = rows_of(9, units=4)
+        tenants = {row[0]: row[4] for table, row in rows if table == "Tenants"}
+        leases = {row[0]: (row[2], row[3]) for table, row in rows if table == "LeaseAgreements"}
+        payments = [row for table, row in rows if table == "PaymentHistories"]
+
+        assert payments
+        for _, _, paid, due, _, tenant_id in payments:
+            start, end = leases[tenants[tenant_id]]
+            assert start <= due < end and due <= AS_OF and (paid is None or paid <= AS_OF)
+        units = [row for table, row in rows if table == "Units"]
+        occupied = {row[1] for table, row in rows if table == "UnitTenants"
+                    if leases[row[5]][0] <= AS_OF < leases[row[5]][1]}
+        assert all(row[5] == (row[0] not in occupied) for row in units)
+
+
+@pytest.mark.unit
+class TestGenerateAndCleanup:
+
+    def test_generated_rows_are_written_in_batches_and_removed_in_bulk(self, sample_user):
+        before = {table: counts(table) for table in TABLES}
+
+        written = generate(2, 2, 2, seed=3, as_of=AS_OF, batch_rows=50)
+
+        assert all(counts(table) == before[table] + written[table] for table in TABLES)
+        assert written["RegisteredUsers"] == 2 and written["Units"] == 8
+        portfolio = Database.select(
+            "SELECT p.num_properties FROM Portfolios p JOIN UserPortfolios up ON up.portfolio_id = p.portfolio_id "
+            "WHERE up.user_id = %s", (synthetic_user_id(3, 1),))
+        assert portfolio == [{"num_properties": 2}]
+        with pytest.raises(ValueError, match="cleanup"):
+            generate(2, 2, 2, seed=3, as_of=AS_OF)
+
+        assert cleanup(seed=4) == 0
+        assert cleanup(seed=3) == 2
+        assert {table: counts(table) for table in TABLES} == before
+        assert len(Database.select(Query.SYNTHETIC_USER_PROPERTIES, ((sample_user,),))) == 6
+
+    def test_seed_must_keep_user_ids_in_range(self):
+        with pytest.raises(ValueError, match="seed"):
+            generate(1, 1, 1, seed=-1)
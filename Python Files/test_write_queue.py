@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from datetime import date
+from database import Database, Query, Tables
+from models import record_payment, add_project_update
+from cache import TTLCache
+from write_queue import WriteBehindQueue
+
+PAYMENT = {"amount": 1000, "paid_date": "2024-12-01", "due_date": "2024-12-01", "unit_id": 1, "tenant_id": 1}
+
+
+@pytest.mark.unit
+class TestWriteBehindQueue:
+
+    def test_size_threshold_flushes_one_multi_row_insert(self):
+        # Reaching max_batch flushes immediately as one executemany call, not one insert per row.
+        async def scenario():
+            queue = WriteBehindQueue(max_batch=3, flush_interval=60)
+            await asyncio.gather(*(queue.write(Tables.PAYMENT_HISTORIES, PAYMENT) for _ in range(3)))
+            await queue.close()
+            return queue
+
+        with patch("write_queue.Database.insert_async", new=AsyncMock()) as mock_insert:
+            queue = asyncio.run(scenario())
+
+        mock_insert.assert_awaited_once_with(Query.INSERT_PAYMENT_HISTORY, [PAYMENT] * 3, many_entities=True)
+        assert queue.stats()["rows_written"] == 3
+
+    def test_interval_flushes_partial_batch(self):
+        async def scenario():
+            queue = WriteBehindQueue(max_batch=100, flush_interval=0.01)
+            await asyncio.wait_for(queue.write(Tables.PROJECT_UPDATES, {"project_id": 1, "updates": "x", "date": None}), 1)
+            await queue.close()
+
+        with patch("write_queue.Database.insert_async", new=AsyncMock()) as mock_insert:
+            asyncio.run(scenario())
+
+        mock_insert.assert_awaited_once()
+
+    def test_failed_batch_fails_every_acknowledgement(self):
+        async def scenario():
+            queue = WriteBehindQueue(max_batch=2, flush_interval=60)
+            results = await asyncio.gather(*(queue.write(Tables.PAYMENT_HISTORIES, PAYMENT) for _ in range(2)),
+                                           return_exceptions=True)
+            await queue.close()
+            return results
+
+        with patch("write_queue.Database.insert_async", new=AsyncMock(side_effect=RuntimeError("db down"))):
+            results = asyncio.run(scenario())
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_close_flushes_buffered_rows(self):
+        # Rows below both thresholds must still be written when the bot shuts down.
+        async def scenario():
+            queue = WriteBehindQueue(max_batch=100, flush_interval=60)
+            ack = await queue.submit(Tables.PAYMENT_HISTORIES, PAYMENT)
+            await queue.close()
+            return ack
+
+        with patch("write_queue.Database.insert_async", new=AsyncMock()) as mock_insert:
+            ack = asyncio.run(scenario())
+
+        assert ack.done() and ack.exception() is None
+        mock_insert.assert_awaited_once()
+
+    def test_rows_arriving_during_a_flush_share_the_next_batch(self):
+        # Group commit: an idle table flushes at once; rows that queue up behind it go out together.
+        async def scenario():
+            release = asyncio.Event()
+            sizes = []
+
+            async def insert(query, rows, many_entities):
+                sizes.append(len(rows))
+                if len(sizes) == 1:
+                    await release.wait()
+
+            with patch("write_queue.Database.insert_async", new=insert):
+                queue = WriteBehindQueue(max_batch=100, flush_interval=60)
+                first = await queue.submit(Tables.PAYMENT_HISTORIES, PAYMENT)
+                await asyncio.sleep(0)
+                later = [await queue.submit(Tables.PAYMENT_HISTORIES, PAYMENT) for _ in range(5)]
+                await asyncio.sleep(0.01)
+                held = sizes == [1]
+                release.set()
+                await asyncio.wait_for(asyncio.gather(first, *later), 1)
+                await queue.close()
+            return held, sizes
+
+        assert asyncio.run(scenario()) == (True, [1, 5])
+
+    def test_backpressure_waits_for_space(self):
+        # With max_pending=1 a second submit cannot buffer until the first row is flushed.
+        async def scenario():
+            queue = WriteBehindQueue(max_batch=100, flush_interval=60, max_pending=1)
+            await queue.submit(Tables.PAYMENT_HISTORIES, PAYMENT)
+            second = asyncio.create_task(queue.submit(Tables.PAYMENT_HISTORIES, PAYMENT))
+            await asyncio.sleep(0)
+            blocked = not second.done()
+            await queue.flush()
+            await asyncio.wait_for(second, 1)
+            await queue.close()
+            return blocked
+
+        with patch("write_queue.Database.insert_async", new=AsyncMock()):
+            assert asyncio.run(scenario())
+
+    def test_rejects_unsupported_table(self):
+        with pytest.raises(ValueError):
+            asyncio.run(WriteBehindQueue().submit(Tables.REGISTERED_USERS, {}))
+
+
+@pytest.mark.unit
+class TestWriteBehindCommands:
+
+    def test_payments_and_project_updates_are_written_behind(self, sample_user):
+        async def scenario(queue):
+            results = await asyncio.gather(
+                *(record_payment(sample_user, tenant_id, 100 * tenant_id, date(2025, 1, 1)) for tenant_id in (1, 2, 3)),
+                add_project_update(sample_user, 1, "Cabinets installed", date(2025, 1, 2)),
+                record_payment(sample_user, 999, 50), add_project_update(sample_user, 999, "Not mine"))
+            await queue.close()
+            return results
+
+        queue = WriteBehindQueue(max_batch=100, flush_interval=0.05)
+        with patch("models.write_queue", queue), \
+             patch("cache.registered_users", TTLCache()), patch("cache.view_results", TTLCache()):
+            results = asyncio.run(scenario(queue))
+
+        assert [row["tenant_id"] for row in results[:3]] == [1, 2, 3]
+        assert results[3]["project_title"] == "Kitchen Renovation" and results[4:] == [None, None]
+        assert queue.stats()["rows_written"] == 4
+        payments = Database.select("SELECT amount, tenant_id, unit_id FROM PaymentHistories WHERE due_date = '2025-01-01'")
+        assert sorted((row["tenant_id"], row["unit_id"], row["amount"]) for row in payments) == [
+            (1, 1, 100), (2, 2, 200), (3, 3, 300)]
+        assert Database.select("SELECT updates FROM ProjectUpdates WHERE date = '2025-01-02'") == [
+            {"updates": "Cabinets installed"}]
@@ -0,0 +1,149 @@
+"""
+Write-behind batching for high-frequency appends (payment histories, project updates).
+
+Rows are buffered per table and flushed as one multi-row INSERT (PyMySQL rewrites
+executemany on an INSERT ... VALUES statement into a single statement) committed once,
+instead of one round trip and one commit per row.
+"""
+
+import asyncio
+from database import Database, Query, Tables, db_context
+
+# Tables that may be written behind, and the Query used to insert their rows.
+WRITE_BEHIND_QUERIES = {
+    Tables.PAYMENT_HISTORIES: Query.INSERT_PAYMENT_HISTORY,
+    Tables.PROJECT_UPDATES: Query.INSERT_PROJECT_UPDATE,
+}
+
+
+class WriteBehindQueue:
+    """
+    Buffers inserts per table and flushes them in batches (group commit).
+
+    While no batch of a table is being written, its rows are flushed on the next turn of the
+    event loop; rows that arrive while a batch is in flight wait for it and then go out
+    together in the next one, so batches grow with the write rate instead of with a timer.
+    A batch is also flushed as soon as it reaches max_batch rows, and anything left buffered
+    is flushed every flush_interval seconds. Every submitted row gets a future that resolves
+    once its batch has been committed (or fails with the batch's exception).
+    At most max_pending rows can be buffered or in flight at once; submit() waits for
+    space beyond that, which pushes back on producers instead of growing without bound.
+    """
+
+    def __init__(self, max_batch=500, flush_interval=0.5, max_pending=5000):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._buffers = {}
+        self._flushes = set()
+        self._in_flight = {}  # table -> batches being written
+        self._flush_scheduled = set()
+        self._slots = None
+        self._timer = None
+        self._closed = False
+        self.rows_written = 0
+        self.batches = 0
+        self.failed_rows = 0
+
+    def start(self):
+        """Starts the interval flusher. Must be called from inside the running event loop."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def submit(self, table, data):
+        """
+        Buffers one row for table and returns a future that resolves when it is committed.
+        Waits first if max_pending rows are already queued.
+        """
+        if table not in WRITE_BEHIND_QUERIES:
+            raise ValueError(f"Table {table} does not support write-behind inserts")
+        if self._closed:
+            raise RuntimeError("WriteBehindQueue is closed")
+        self.start()
+
+        await self._slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        buffer = self._buffers.setdefault(table, [])
+        buffer.append((data, future))
+        if len(buffer) >= self.max_batch:
+            self._spawn_flush(table)
+        elif not self._in_flight.get(table):
+            self._flush_soon(table)
+        return future
+
+    async def write(self, table, data):
+        """Buffers one row and waits until its batch has been committed."""
+        await (await self.submit(table, data))
+
+    async def flush(self):
+        """Flushes every buffered row and waits for all in-flight batches."""
+        for table in list(self._buffers):
+            self._spawn_flush(table)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def close(self):
+        """Stops accepting rows and flushes what is buffered (call on bot shutdown)."""
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    def stats(self):
+        return {
+            "buffered": sum(len(b) for b in self._buffers.values()),
+            "rows_written": self.rows_written,
+            "batches": self.batches,
+            "failed_rows": self.failed_rows,
+        }
+
+    def _flush_soon(self, table):
+        # Deferred to the next loop iteration, so rows submitted in the same tick share the batch.
+        if table not in self._flush_scheduled:
+            self._flush_scheduled.add(table)
+            asyncio.get_running_loop().call_soon(self._spawn_flush, table)
+
+    def _spawn_flush(self, table):
+        self._flush_scheduled.discard(table)
+        batch = self._buffers.pop(table, None)
+        if not batch:
+            return
+        self._in_flight[table] = self._in_flight.get(table, 0) + 1
+        # A batch holds many users' rows, so it is not attributed to whoever filled it.
+        with db_context():
+            task = asyncio.create_task(self._write_batch(table, batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write_batch(self, table, batch):
+        try:
+            await Database.insert_async(WRITE_BEHIND_QUERIES[table], [data for data, _ in batch], many_entities=True)
+        except Exception as err:
+            self.failed_rows += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+        else:
+            self.rows_written += len(batch)
+            self.batches += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            for _ in batch:
+                self._slots.release()
+            self._in_flight[table] -= 1
+            if self._buffers.get(table) and not self._in_flight[table]:
+                self._spawn_flush(table)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            for table in list(self._buffers):
+                self._spawn_flush(table)
+
+
+write_queue = WriteBehindQueue()
@@ -33,15 +33,12 @@ DELIMITER $$
 DROP PROCEDURE IF EXISTS AssignRole;
 CREATE PROCEDURE AssignRole(IN in_user_id INT, IN in_role_id INT, IN in_expires DATE)
 BEGIN
-    -- Update the RegisteredUsers table with the new role and expiration date
+    -- Update the RegisteredUsers table with the new role and expiration date.
+    -- The expiry belongs to the user's assignment, not to the role shared by every user.
     UPDATE RegisteredUsers 
-    SET role_id = in_role_id
+    SET role_id = in_role_id,
+        role_expires = in_expires
     WHERE tracking_id = in_user_id;
-
-    -- Update the expiration date in the Roles table
-    UPDATE Roles
-    SET expires = in_expires
-    WHERE role_id = in_role_id;
 END$$
 
 -- 2
@@ -56,10 +53,9 @@ BEGIN
     SET today = CURDATE();
     
     -- Get the user's role and expiration date
-    SELECT RU.role_id, R.expires
+    SELECT RU.role_id, RU.role_expires
     INTO user_role_id, exp_date
     FROM RegisteredUsers RU
-    JOIN Roles R ON RU.role_id = R.role_id
     WHERE RU.tracking_id = in_user_id;
     
     -- If the role is expired, change the user to Guest
@@ -93,15 +89,11 @@ DROP PROCEDURE IF EXISTS RefreshRole;
 CREATE PROCEDURE RefreshRole(IN in_user_id INT, IN in_role_id INT)
 BEGIN
 
-	-- Update the RegisteredUsers table first to make sure the right role is set
+	-- Set the role and extend the user's expiration date by a year
 	UPDATE RegisteredUsers
-    SET role_id = in_role_id
+    SET role_id = in_role_id,
+        role_expires = DATE_ADD(CURDATE(), INTERVAL 1 YEAR)
     WHERE tracking_id = in_user_id;
-    
-    -- Then update the expiration date in the Roles table
-    UPDATE Roles
-    SET expires = DATE_ADD(CURDATE(), INTERVAL 1 YEAR)
-    WHERE role_id = in_role_id;
     END$$
 
     DELIMITER ;
@@ -274,7 +266,10 @@ CALL GetTenants(1);
 
     Implementation Plan:
         1. Join the correct tables to get mortgage infos, addresses, and purchase prices.
-        2. Display a total principal balance and purchase price at the bottom using UNION
+        2. Display a total principal balance and purchase price at the bottom using UNION, read from the maintained
+           portfolio totals. The purchase price total counts each mortgaged property once (mortgaged_purchase_price).
+        3. The bot reads only the detail rows (Query.MORTGAGE_DETAILS_BY_USER, one pass over the user's
+           mortgages) and adds the totals row itself, counting each mortgage and each purchase record once.
 */
 
 CREATE OR REPLACE VIEW ViewMortgages AS
@@ -304,26 +299,24 @@ JOIN Addresses a ON p.address_id = a.address_id
 -- 2
 UNION ALL
 
+-- Read from the portfolio rollups (Business Requirement #8): one row per portfolio instead of a join over every mortgage.
 SELECT
 	ru.tracking_id AS user_id,
     NULL AS mortgage_id,
     'Total' AS lender_name,
-    SUM(m.principal_balance) AS total_principal_balance,
+    SUM(pf.total_principal) AS total_principal_balance,
     NULL AS interest_rate,
-    SUM(m.monthly_payment) AS total_monthly_payment,
+    SUM(pf.total_mortgage_payment) AS total_monthly_payment,
     NULL AS start_date,
     NULL AS end_date,
-    SUM(ph.purchase_price) as purchase_price,
+    SUM(pf.mortgaged_purchase_price) as purchase_price,
     NULL AS property_address,
     ru.full_name AS registered_user
-FROM Mortgages m
-JOIN Properties p ON m.property_id = p.property_id
-JOIN PropertyHistories ph ON ph.property_id = p.property_id
-JOIN PortfolioProperties pp ON pp.property_id = p.property_id
-JOIN Portfolios pf ON pf.portfolio_id = pp.portfolio_id
+FROM Portfolios pf
 JOIN UserPortfolios up ON up.portfolio_id = pf.portfolio_id
 JOIN RegisteredUsers ru ON ru.tracking_id = up.user_id
-GROUP BY ru.tracking_id;
+GROUP BY ru.tracking_id
+HAVING SUM(pf.num_mortgages) > 0;
 
 
 DELIMITER ;
@@ -773,6 +766,13 @@ JOIN PortfolioProperties pp ON u.property_id = pp.property_id
 JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
 WHERE up.user_id = @user_id;
 
+-- 1b Delete archived PaymentHistories (Business Requirement #9)
+DELETE pha FROM PaymentHistoriesArchive pha
+JOIN Units u ON pha.unit_id = u.unit_id
+JOIN PortfolioProperties pp ON u.property_id = pp.property_id
+JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
+WHERE up.user_id = @user_id;
+
 -- 2️ Delete UnitTenants
 DELETE ut FROM UnitTenants ut
 JOIN Units u ON ut.unit_id = u.unit_id
@@ -802,6 +802,13 @@ JOIN PortfolioProperties pp ON ph.property_id = pp.property_id
 JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
 WHERE up.user_id = @user_id;
 
+-- 5b Delete archived ExpenseHistories
+DELETE eha FROM ExpenseHistoriesArchive eha
+JOIN PropertyHistories ph ON eha.history_id = ph.history_id
+JOIN PortfolioProperties pp ON ph.property_id = pp.property_id
+JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
+WHERE up.user_id = @user_id;
+
 -- 6️ Delete InspectionRecords
 DELETE ir FROM InspectionRecords ir
 JOIN PropertyHistories ph ON ir.history_id = ph.history_id
@@ -854,6 +861,12 @@ JOIN PortfolioProperties pp ON u.property_id = pp.property_id
 JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
 WHERE up.user_id = @user_id;
 
+-- 13b Delete LedgerRollups (Business Requirement #10); the ledger deletes above left them at zero
+DELETE lr FROM LedgerRollups lr
+JOIN PortfolioProperties pp ON lr.property_id = pp.property_id
+JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
+WHERE up.user_id = @user_id;
+
 -- 14️ Delete PortfolioProperties
 DELETE pp FROM PortfolioProperties pp
 JOIN UserPortfolios up ON pp.portfolio_id = up.portfolio_id
@@ -981,10 +994,21 @@ LEFT JOIN PortfolioProperties pp ON m.property_id = pp.property_id
 WHERE pp.property_id IS NULL;
 
 -- 16. PortfolioProperties entries whose Property or Portfolio no longer exists
+-- Missing portfolios are collected first: the rollup triggers on PortfolioProperties (Business Requirement #8)
+-- update Portfolios, so the DELETE itself may not read it.
+DROP TEMPORARY TABLE IF EXISTS MissingPortfolios;
+CREATE TEMPORARY TABLE MissingPortfolios AS
+SELECT DISTINCT pp.portfolio_id
+FROM PortfolioProperties pp
+LEFT JOIN Portfolios pf ON pp.portfolio_id = pf.portfolio_id
+WHERE pf.portfolio_id IS NULL;
+
 DELETE pp FROM PortfolioProperties pp
 LEFT JOIN Properties p ON pp.property_id = p.property_id
-LEFT JOIN Portfolios pf ON pp.portfolio_id = pf.portfolio_id
-WHERE p.property_id IS NULL OR pf.portfolio_id IS NULL;
+LEFT JOIN MissingPortfolios mp ON pp.portfolio_id = mp.portfolio_id
+WHERE p.property_id IS NULL OR mp.portfolio_id IS NOT NULL;
+
+DROP TEMPORARY TABLE MissingPortfolios;
 
 -- 17. Properties not in any portfolio
 DELETE p FROM Properties p
@@ -1106,10 +1130,884 @@ DELETE pf FROM Portfolios pf
 LEFT JOIN UserPortfolios up ON pf.portfolio_id = up.portfolio_id
 WHERE up.portfolio_id IS NULL;
 
+-- 21. Archived ledger rows (Business Requirement #9) whose Unit, Tenant or PropertyHistory no longer exists.
+-- The archive tables are partitioned and cannot have foreign keys, so this runs last, after every parent is gone.
+DELETE pha FROM PaymentHistoriesArchive pha
+LEFT JOIN Units u ON pha.unit_id = u.unit_id
+LEFT JOIN Tenants t ON pha.tenant_id = t.tenant_id
+WHERE u.unit_id IS NULL OR t.tenant_id IS NULL;
+
+DELETE eha FROM ExpenseHistoriesArchive eha
+LEFT JOIN PropertyHistories ph ON eha.history_id = ph.history_id
+WHERE ph.history_id IS NULL;
+
+-- 22. LedgerRollups (Business Requirement #10) of properties that no longer exist
+DELETE lr FROM LedgerRollups lr
+LEFT JOIN Properties p ON lr.property_id = p.property_id
+WHERE p.property_id IS NULL;
+
 
 END $$
 
 -- To call from workbench, use:
 SET SQL_SAFE_UPDATES = 0;
 CALL CleanOrphanedData();
-SET SQL_SAFE_UPDATES = 1;
\ No newline at end of file
+SET SQL_SAFE_UPDATES = 1;
+
+/*
+Business Requirement #7:
+----------------------------------------------------
+Purpose: Record every change to a user's data so that caches and incremental consumers in the bot can be kept current.
+
+Description: Writes reach the database through plain INSERT/UPDATE/DELETE statements and through stored procedures
+(CreateSampleUserData, ResetUserData, AssignRole, ...) that the bot cannot observe. Every insert, update and delete
+on the core tables appends one compact row (table, primary key, operation, owning user) to ChangeLog. The bot
+tails ChangeLog by sequence number and drops or refreshes whatever it derived from the changed user's data.
+
+Challenge: Child tables do not store their owner. The owning user must be resolved from the row's property or
+portfolio inside the trigger, cheaply, and deletes must still be attributed where the owner is still reachable.
+
+Assumptions: A property belongs to one portfolio and a portfolio to one user. Rows whose owner can no longer be
+resolved (for example a PortfolioProperties row deleted after its UserPortfolios link) are logged with a NULL user_id.
+
+Implementation plan:
+1. Create PortfolioOwner and PropertyOwner functions that resolve the owning user with indexed lookups.
+2. Create AFTER INSERT, AFTER UPDATE and AFTER DELETE triggers on the core tables that insert into ChangeLog.
+   An update that moves a row to another property or portfolio is logged for the old owner as well.
+   Portfolios is not logged: its columns are rollups (Business Requirement #8) that only change together
+   with a logged PortfolioProperties, Properties, Mortgages or PropertyHistories row.
+3. ChangeLog rows are deleted by the bot once every active consumer (ChangeLogConsumers) has read them.
+*/
+
+DELIMITER $$
+
+-- 1
+DROP FUNCTION IF EXISTS PortfolioOwner $$
+CREATE FUNCTION PortfolioOwner(in_portfolio_id INT) RETURNS BIGINT UNSIGNED
+READS SQL DATA
+BEGIN
+    RETURN (SELECT user_id FROM UserPortfolios WHERE portfolio_id = in_portfolio_id LIMIT 1);
+END $$
+
+DROP FUNCTION IF EXISTS PropertyOwner $$
+CREATE FUNCTION PropertyOwner(in_property_id INT) RETURNS BIGINT UNSIGNED
+READS SQL DATA
+BEGIN
+    RETURN (
+        SELECT up.user_id
+        FROM PortfolioProperties pp
+        JOIN UserPortfolios up ON up.portfolio_id = pp.portfolio_id
+        WHERE pp.property_id = in_property_id
+        LIMIT 1
+    );
+END $$
+
+-- 2
+-- RegisteredUsers
+DROP TRIGGER IF EXISTS RegisteredUsers_changelog_insert $$
+CREATE TRIGGER RegisteredUsers_changelog_insert AFTER INSERT ON RegisteredUsers FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('RegisteredUsers', NEW.tracking_id, 'I', NEW.tracking_id);
+END $$
+
+DROP TRIGGER IF EXISTS RegisteredUsers_changelog_update $$
+CREATE TRIGGER RegisteredUsers_changelog_update AFTER UPDATE ON RegisteredUsers FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('RegisteredUsers', NEW.tracking_id, 'U', NEW.tracking_id);
+END $$
+
+DROP TRIGGER IF EXISTS RegisteredUsers_changelog_delete $$
+CREATE TRIGGER RegisteredUsers_changelog_delete AFTER DELETE ON RegisteredUsers FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('RegisteredUsers', OLD.tracking_id, 'D', OLD.tracking_id);
+END $$
+
+-- UserPortfolios
+DROP TRIGGER IF EXISTS UserPortfolios_changelog_insert $$
+CREATE TRIGGER UserPortfolios_changelog_insert AFTER INSERT ON UserPortfolios FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('UserPortfolios', NEW.tracking_id, 'I', NEW.user_id);
+END $$
+
+DROP TRIGGER IF EXISTS UserPortfolios_changelog_update $$
+CREATE TRIGGER UserPortfolios_changelog_update AFTER UPDATE ON UserPortfolios FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('UserPortfolios', NEW.tracking_id, 'U', NEW.user_id);
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.user_id <=> NEW.user_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('UserPortfolios', OLD.tracking_id, 'U', OLD.user_id);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS UserPortfolios_changelog_delete $$
+CREATE TRIGGER UserPortfolios_changelog_delete AFTER DELETE ON UserPortfolios FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('UserPortfolios', OLD.tracking_id, 'D', OLD.user_id);
+END $$
+
+-- PortfolioProperties
+DROP TRIGGER IF EXISTS PortfolioProperties_changelog_insert $$
+CREATE TRIGGER PortfolioProperties_changelog_insert AFTER INSERT ON PortfolioProperties FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PortfolioProperties', NEW.tracking_id, 'I', PortfolioOwner(NEW.portfolio_id));
+END $$
+
+DROP TRIGGER IF EXISTS PortfolioProperties_changelog_update $$
+CREATE TRIGGER PortfolioProperties_changelog_update AFTER UPDATE ON PortfolioProperties FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PortfolioProperties', NEW.tracking_id, 'U', PortfolioOwner(NEW.portfolio_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.portfolio_id <=> NEW.portfolio_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('PortfolioProperties', OLD.tracking_id, 'U', PortfolioOwner(OLD.portfolio_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS PortfolioProperties_changelog_delete $$
+CREATE TRIGGER PortfolioProperties_changelog_delete AFTER DELETE ON PortfolioProperties FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PortfolioProperties', OLD.tracking_id, 'D', PortfolioOwner(OLD.portfolio_id));
+END $$
+
+-- Properties
+DROP TRIGGER IF EXISTS Properties_changelog_insert $$
+CREATE TRIGGER Properties_changelog_insert AFTER INSERT ON Properties FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Properties', NEW.property_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS Properties_changelog_update $$
+CREATE TRIGGER Properties_changelog_update AFTER UPDATE ON Properties FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Properties', NEW.property_id, 'U', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS Properties_changelog_delete $$
+CREATE TRIGGER Properties_changelog_delete AFTER DELETE ON Properties FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Properties', OLD.property_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- TaxRecords
+DROP TRIGGER IF EXISTS TaxRecords_changelog_insert $$
+CREATE TRIGGER TaxRecords_changelog_insert AFTER INSERT ON TaxRecords FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('TaxRecords', NEW.tracking_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS TaxRecords_changelog_update $$
+CREATE TRIGGER TaxRecords_changelog_update AFTER UPDATE ON TaxRecords FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('TaxRecords', NEW.tracking_id, 'U', PropertyOwner(NEW.property_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.property_id <=> NEW.property_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('TaxRecords', OLD.tracking_id, 'U', PropertyOwner(OLD.property_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS TaxRecords_changelog_delete $$
+CREATE TRIGGER TaxRecords_changelog_delete AFTER DELETE ON TaxRecords FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('TaxRecords', OLD.tracking_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- Mortgages
+DROP TRIGGER IF EXISTS Mortgages_changelog_insert $$
+CREATE TRIGGER Mortgages_changelog_insert AFTER INSERT ON Mortgages FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Mortgages', NEW.tracking_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS Mortgages_changelog_update $$
+CREATE TRIGGER Mortgages_changelog_update AFTER UPDATE ON Mortgages FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Mortgages', NEW.tracking_id, 'U', PropertyOwner(NEW.property_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.property_id <=> NEW.property_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('Mortgages', OLD.tracking_id, 'U', PropertyOwner(OLD.property_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS Mortgages_changelog_delete $$
+CREATE TRIGGER Mortgages_changelog_delete AFTER DELETE ON Mortgages FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Mortgages', OLD.tracking_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- InsurancePolicies
+DROP TRIGGER IF EXISTS InsurancePolicies_changelog_insert $$
+CREATE TRIGGER InsurancePolicies_changelog_insert AFTER INSERT ON InsurancePolicies FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('InsurancePolicies', NEW.tracking_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS InsurancePolicies_changelog_update $$
+CREATE TRIGGER InsurancePolicies_changelog_update AFTER UPDATE ON InsurancePolicies FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('InsurancePolicies', NEW.tracking_id, 'U', PropertyOwner(NEW.property_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.property_id <=> NEW.property_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('InsurancePolicies', OLD.tracking_id, 'U', PropertyOwner(OLD.property_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS InsurancePolicies_changelog_delete $$
+CREATE TRIGGER InsurancePolicies_changelog_delete AFTER DELETE ON InsurancePolicies FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('InsurancePolicies', OLD.tracking_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- ProjectInfos
+DROP TRIGGER IF EXISTS ProjectInfos_changelog_insert $$
+CREATE TRIGGER ProjectInfos_changelog_insert AFTER INSERT ON ProjectInfos FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectInfos', NEW.project_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS ProjectInfos_changelog_update $$
+CREATE TRIGGER ProjectInfos_changelog_update AFTER UPDATE ON ProjectInfos FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectInfos', NEW.project_id, 'U', PropertyOwner(NEW.property_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.property_id <=> NEW.property_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('ProjectInfos', OLD.project_id, 'U', PropertyOwner(OLD.property_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS ProjectInfos_changelog_delete $$
+CREATE TRIGGER ProjectInfos_changelog_delete AFTER DELETE ON ProjectInfos FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectInfos', OLD.project_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- ProjectUpdates
+DROP TRIGGER IF EXISTS ProjectUpdates_changelog_insert $$
+CREATE TRIGGER ProjectUpdates_changelog_insert AFTER INSERT ON ProjectUpdates FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectUpdates', NEW.update_id, 'I', PropertyOwner((SELECT property_id FROM ProjectInfos WHERE project_id = NEW.project_id)));
+END $$
+
+DROP TRIGGER IF EXISTS ProjectUpdates_changelog_update $$
+CREATE TRIGGER ProjectUpdates_changelog_update AFTER UPDATE ON ProjectUpdates FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectUpdates', NEW.update_id, 'U', PropertyOwner((SELECT property_id FROM ProjectInfos WHERE project_id = NEW.project_id)));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.project_id <=> NEW.project_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('ProjectUpdates', OLD.update_id, 'U', PropertyOwner((SELECT property_id FROM ProjectInfos WHERE project_id = OLD.project_id)));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS ProjectUpdates_changelog_delete $$
+CREATE TRIGGER ProjectUpdates_changelog_delete AFTER DELETE ON ProjectUpdates FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectUpdates', OLD.update_id, 'D', PropertyOwner((SELECT property_id FROM ProjectInfos WHERE project_id = OLD.project_id)));
+END $$
+
+-- Contractors
+DROP TRIGGER IF EXISTS Contractors_changelog_insert $$
+CREATE TRIGGER Contractors_changelog_insert AFTER INSERT ON Contractors FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Contractors', NEW.tracking_id, 'I', NEW.user_id);
+END $$
+
+DROP TRIGGER IF EXISTS Contractors_changelog_update $$
+CREATE TRIGGER Contractors_changelog_update AFTER UPDATE ON Contractors FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Contractors', NEW.tracking_id, 'U', NEW.user_id);
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.user_id <=> NEW.user_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('Contractors', OLD.tracking_id, 'U', OLD.user_id);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS Contractors_changelog_delete $$
+CREATE TRIGGER Contractors_changelog_delete AFTER DELETE ON Contractors FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Contractors', OLD.tracking_id, 'D', OLD.user_id);
+END $$
+
+-- PropertyHistories
+DROP TRIGGER IF EXISTS PropertyHistories_changelog_insert $$
+CREATE TRIGGER PropertyHistories_changelog_insert AFTER INSERT ON PropertyHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PropertyHistories', NEW.history_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS PropertyHistories_changelog_update $$
+CREATE TRIGGER PropertyHistories_changelog_update AFTER UPDATE ON PropertyHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PropertyHistories', NEW.history_id, 'U', PropertyOwner(NEW.property_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.property_id <=> NEW.property_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('PropertyHistories', OLD.history_id, 'U', PropertyOwner(OLD.property_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS PropertyHistories_changelog_delete $$
+CREATE TRIGGER PropertyHistories_changelog_delete AFTER DELETE ON PropertyHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PropertyHistories', OLD.history_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- ExpenseHistories
+DROP TRIGGER IF EXISTS ExpenseHistories_changelog_insert $$
+CREATE TRIGGER ExpenseHistories_changelog_insert AFTER INSERT ON ExpenseHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ExpenseHistories', NEW.expense_id, 'I', PropertyOwner((SELECT property_id FROM PropertyHistories WHERE history_id = NEW.history_id)));
+END $$
+
+DROP TRIGGER IF EXISTS ExpenseHistories_changelog_update $$
+CREATE TRIGGER ExpenseHistories_changelog_update AFTER UPDATE ON ExpenseHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ExpenseHistories', NEW.expense_id, 'U', PropertyOwner((SELECT property_id FROM PropertyHistories WHERE history_id = NEW.history_id)));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.history_id <=> NEW.history_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('ExpenseHistories', OLD.expense_id, 'U', PropertyOwner((SELECT property_id FROM PropertyHistories WHERE history_id = OLD.history_id)));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS ExpenseHistories_changelog_delete $$
+CREATE TRIGGER ExpenseHistories_changelog_delete AFTER DELETE ON ExpenseHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ExpenseHistories', OLD.expense_id, 'D', PropertyOwner((SELECT property_id FROM PropertyHistories WHERE history_id = OLD.history_id)));
+END $$
+
+-- Units
+DROP TRIGGER IF EXISTS Units_changelog_insert $$
+CREATE TRIGGER Units_changelog_insert AFTER INSERT ON Units FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Units', NEW.unit_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS Units_changelog_update $$
+CREATE TRIGGER Units_changelog_update AFTER UPDATE ON Units FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Units', NEW.unit_id, 'U', PropertyOwner(NEW.property_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.property_id <=> NEW.property_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('Units', OLD.unit_id, 'U', PropertyOwner(OLD.property_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS Units_changelog_delete $$
+CREATE TRIGGER Units_changelog_delete AFTER DELETE ON Units FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Units', OLD.unit_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- LeaseAgreements
+DROP TRIGGER IF EXISTS LeaseAgreements_changelog_insert $$
+CREATE TRIGGER LeaseAgreements_changelog_insert AFTER INSERT ON LeaseAgreements FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('LeaseAgreements', NEW.lease_id, 'I', PropertyOwner(NEW.property_id));
+END $$
+
+DROP TRIGGER IF EXISTS LeaseAgreements_changelog_update $$
+CREATE TRIGGER LeaseAgreements_changelog_update AFTER UPDATE ON LeaseAgreements FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('LeaseAgreements', NEW.lease_id, 'U', PropertyOwner(NEW.property_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.property_id <=> NEW.property_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('LeaseAgreements', OLD.lease_id, 'U', PropertyOwner(OLD.property_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS LeaseAgreements_changelog_delete $$
+CREATE TRIGGER LeaseAgreements_changelog_delete AFTER DELETE ON LeaseAgreements FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('LeaseAgreements', OLD.lease_id, 'D', PropertyOwner(OLD.property_id));
+END $$
+
+-- Tenants
+DROP TRIGGER IF EXISTS Tenants_changelog_insert $$
+CREATE TRIGGER Tenants_changelog_insert AFTER INSERT ON Tenants FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Tenants', NEW.tenant_id, 'I', PropertyOwner((SELECT property_id FROM LeaseAgreements WHERE lease_id = NEW.lease_id)));
+END $$
+
+DROP TRIGGER IF EXISTS Tenants_changelog_update $$
+CREATE TRIGGER Tenants_changelog_update AFTER UPDATE ON Tenants FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Tenants', NEW.tenant_id, 'U', PropertyOwner((SELECT property_id FROM LeaseAgreements WHERE lease_id = NEW.lease_id)));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.lease_id <=> NEW.lease_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('Tenants', OLD.tenant_id, 'U', PropertyOwner((SELECT property_id FROM LeaseAgreements WHERE lease_id = OLD.lease_id)));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS Tenants_changelog_delete $$
+CREATE TRIGGER Tenants_changelog_delete AFTER DELETE ON Tenants FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Tenants', OLD.tenant_id, 'D', PropertyOwner((SELECT property_id FROM LeaseAgreements WHERE lease_id = OLD.lease_id)));
+END $$
+
+-- PaymentHistories
+DROP TRIGGER IF EXISTS PaymentHistories_changelog_insert $$
+CREATE TRIGGER PaymentHistories_changelog_insert AFTER INSERT ON PaymentHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PaymentHistories', NEW.history_id, 'I', PropertyOwner((SELECT property_id FROM Units WHERE unit_id = NEW.unit_id)));
+END $$
+
+DROP TRIGGER IF EXISTS PaymentHistories_changelog_update $$
+CREATE TRIGGER PaymentHistories_changelog_update AFTER UPDATE ON PaymentHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PaymentHistories', NEW.history_id, 'U', PropertyOwner((SELECT property_id FROM Units WHERE unit_id = NEW.unit_id)));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.unit_id <=> NEW.unit_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('PaymentHistories', OLD.history_id, 'U', PropertyOwner((SELECT property_id FROM Units WHERE unit_id = OLD.unit_id)));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS PaymentHistories_changelog_delete $$
+CREATE TRIGGER PaymentHistories_changelog_delete AFTER DELETE ON PaymentHistories FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PaymentHistories', OLD.history_id, 'D', PropertyOwner((SELECT property_id FROM Units WHERE unit_id = OLD.unit_id)));
+END $$
+
+-- ProjectContractors (owned through the contractor)
+DROP TRIGGER IF EXISTS ProjectContractors_changelog_insert $$
+CREATE TRIGGER ProjectContractors_changelog_insert AFTER INSERT ON ProjectContractors FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectContractors', NEW.tracking_id, 'I', (SELECT user_id FROM Contractors WHERE tracking_id = NEW.contractor_id));
+END $$
+
+DROP TRIGGER IF EXISTS ProjectContractors_changelog_update $$
+CREATE TRIGGER ProjectContractors_changelog_update AFTER UPDATE ON ProjectContractors FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectContractors', NEW.tracking_id, 'U', (SELECT user_id FROM Contractors WHERE tracking_id = NEW.contractor_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    IF NOT (OLD.contractor_id <=> NEW.contractor_id) THEN
+        INSERT INTO ChangeLog (table_name, pk, op, user_id)
+        VALUES ('ProjectContractors', OLD.tracking_id, 'U', (SELECT user_id FROM Contractors WHERE tracking_id = OLD.contractor_id));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS ProjectContractors_changelog_delete $$
+CREATE TRIGGER ProjectContractors_changelog_delete AFTER DELETE ON ProjectContractors FOR EACH ROW
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectContractors', OLD.tracking_id, 'D', (SELECT user_id FROM Contractors WHERE tracking_id = OLD.contractor_id));
+END $$
+
+DELIMITER ;
+
+
+/*
+Business Requirement #8:
+----------------------------------------------------
+Purpose: Keep portfolio totals current so portfolio summaries and the mortgage totals are single-row reads.
+
+Description: Portfolios holds rollups of its properties: the number of properties and mortgages, and the total rent,
+mortgage payment, principal balance, monthly capex, purchase price and appraised value (last_appraised_val),
+plus the purchase price of the mortgaged properties alone (mortgaged_purchase_price) for the mortgage totals.
+They are adjusted by the change in each row whenever PortfolioProperties, Mortgages, Properties or
+PropertyHistories rows are inserted, updated or deleted, instead of being recounted with joins on every read.
+
+Challenge: Every path that writes these tables (procedures, the bot, manual fixes) must keep the totals exact.
+Doing it in triggers covers all of them; the bot's reconciliation job verifies the totals in batches and
+repairs any drift (for example on a database that existed before these triggers).
+
+Assumptions: A property's rows count towards every portfolio that holds it. A property only counts once it is
+in PortfolioProperties, and that row must be deleted before the property itself, so inserting or deleting a
+Properties row changes no totals; only updates to its monthly_capex do. A property's purchase price counts
+towards mortgaged_purchase_price once while it has at least one mortgage, however many it has.
+
+Implementation Plan:
+    1. Create AdjustPortfolioRollup to add deltas to one portfolio, AdjustPropertyRollup to add them to every
+       portfolio holding a property, and AddPropertyToRollup to add or remove a whole property's contribution.
+       AdjustPurchaseRollup applies a purchase price change to mortgaged_purchase_price too when the property
+       has a mortgage, and AddMortgagedPurchase adds or removes a property's purchase price when it gets its
+       first mortgage or loses its last.
+    2. Create AFTER INSERT, UPDATE and DELETE triggers on PortfolioProperties, Mortgages and PropertyHistories,
+       and an AFTER UPDATE trigger on Properties, that call them with the row's change.
+*/
+
+DELIMITER $$
+
+-- 1
+DROP PROCEDURE IF EXISTS AdjustPortfolioRollup $$
+CREATE PROCEDURE AdjustPortfolioRollup(
+    IN in_portfolio_id INT, IN d_properties INT, IN d_mortgages INT, IN d_rent DOUBLE, IN d_payment DOUBLE,
+    IN d_principal DOUBLE, IN d_capex DOUBLE, IN d_purchase DOUBLE, IN d_mortgaged_purchase DOUBLE,
+    IN d_appraised DOUBLE)
+BEGIN
+    UPDATE Portfolios
+    SET num_properties = num_properties + d_properties,
+        num_mortgages = num_mortgages + d_mortgages,
+        total_rent = total_rent + d_rent,
+        total_mortgage_payment = total_mortgage_payment + d_payment,
+        total_principal = total_principal + d_principal,
+        total_capex = total_capex + d_capex,
+        total_purchase_price = total_purchase_price + d_purchase,
+        mortgaged_purchase_price = mortgaged_purchase_price + d_mortgaged_purchase,
+        last_appraised_val = last_appraised_val + d_appraised
+    WHERE portfolio_id = in_portfolio_id;
+END $$
+
+DROP PROCEDURE IF EXISTS AdjustPropertyRollup $$
+CREATE PROCEDURE AdjustPropertyRollup(
+    IN in_property_id INT, IN d_mortgages INT, IN d_payment DOUBLE, IN d_principal DOUBLE,
+    IN d_capex DOUBLE, IN d_purchase DOUBLE, IN d_mortgaged_purchase DOUBLE, IN d_appraised DOUBLE)
+BEGIN
+    UPDATE Portfolios pf
+    JOIN PortfolioProperties pp ON pp.portfolio_id = pf.portfolio_id
+    SET pf.num_mortgages = pf.num_mortgages + d_mortgages,
+        pf.total_mortgage_payment = pf.total_mortgage_payment + d_payment,
+        pf.total_principal = pf.total_principal + d_principal,
+        pf.total_capex = pf.total_capex + d_capex,
+        pf.total_purchase_price = pf.total_purchase_price + d_purchase,
+        pf.mortgaged_purchase_price = pf.mortgaged_purchase_price + d_mortgaged_purchase,
+        pf.last_appraised_val = pf.last_appraised_val + d_appraised
+    WHERE pp.property_id = in_property_id;
+END $$
+
+DROP PROCEDURE IF EXISTS AddPropertyToRollup $$
+CREATE PROCEDURE AddPropertyToRollup(IN in_portfolio_id INT, IN in_property_id INT, IN in_rent DOUBLE, IN in_sign INT)
+BEGIN
+    -- in_sign is 1 when the property joins the portfolio and -1 when it leaves.
+    DECLARE v_mortgages INT DEFAULT 0;
+    DECLARE v_payment, v_principal, v_capex, v_purchase, v_appraised DOUBLE DEFAULT 0;
+
+    SELECT COUNT(*), IFNULL(SUM(monthly_payment), 0), IFNULL(SUM(principal_balance), 0)
+    INTO v_mortgages, v_payment, v_principal
+    FROM Mortgages WHERE property_id = in_property_id;
+
+    SELECT IFNULL(SUM(purchase_price), 0), IFNULL(SUM(last_appraised_val), 0)
+    INTO v_purchase, v_appraised
+    FROM PropertyHistories WHERE property_id = in_property_id;
+
+    SET v_capex = IFNULL((SELECT monthly_capex FROM Properties WHERE property_id = in_property_id), 0);
+
+    CALL AdjustPortfolioRollup(in_portfolio_id, in_sign, in_sign * v_mortgages, in_sign * IFNULL(in_rent, 0),
+        in_sign * v_payment, in_sign * v_principal, in_sign * v_capex, in_sign * v_purchase,
+        IF(v_mortgages > 0, in_sign * v_purchase, 0), in_sign * v_appraised);
+END $$
+
+DROP PROCEDURE IF EXISTS AdjustPurchaseRollup $$
+CREATE PROCEDURE AdjustPurchaseRollup(IN in_property_id INT, IN d_purchase DOUBLE, IN d_appraised DOUBLE)
+BEGIN
+    DECLARE v_mortgaged_purchase DOUBLE DEFAULT 0;
+
+    IF EXISTS (SELECT 1 FROM Mortgages WHERE property_id = in_property_id) THEN
+        SET v_mortgaged_purchase = d_purchase;
+    END IF;
+
+    CALL AdjustPropertyRollup(in_property_id, 0, 0, 0, 0, d_purchase, v_mortgaged_purchase, d_appraised);
+END $$
+
+DROP PROCEDURE IF EXISTS AddMortgagedPurchase $$
+CREATE PROCEDURE AddMortgagedPurchase(IN in_property_id INT, IN in_sign INT)
+BEGIN
+    -- in_sign is 1 when the property gets its first mortgage and -1 when its last one is removed.
+    DECLARE v_purchase DOUBLE DEFAULT 0;
+
+    SELECT IFNULL(SUM(purchase_price), 0) INTO v_purchase
+    FROM PropertyHistories WHERE property_id = in_property_id;
+
+    CALL AdjustPropertyRollup(in_property_id, 0, 0, 0, 0, 0, in_sign * v_purchase, 0);
+END $$
+
+-- 2
+DROP TRIGGER IF EXISTS PortfolioProperties_rollup_insert $$
+CREATE TRIGGER PortfolioProperties_rollup_insert AFTER INSERT ON PortfolioProperties FOR EACH ROW
+BEGIN
+    CALL AddPropertyToRollup(NEW.portfolio_id, NEW.property_id, NEW.property_rent, 1);
+END $$
+
+DROP TRIGGER IF EXISTS PortfolioProperties_rollup_update $$
+CREATE TRIGGER PortfolioProperties_rollup_update AFTER UPDATE ON PortfolioProperties FOR EACH ROW
+BEGIN
+    IF OLD.portfolio_id <> NEW.portfolio_id OR OLD.property_id <> NEW.property_id THEN
+        CALL AddPropertyToRollup(OLD.portfolio_id, OLD.property_id, OLD.property_rent, -1);
+        CALL AddPropertyToRollup(NEW.portfolio_id, NEW.property_id, NEW.property_rent, 1);
+    ELSEIF NOT (OLD.property_rent <=> NEW.property_rent) THEN
+        CALL AdjustPortfolioRollup(NEW.portfolio_id, 0, 0, IFNULL(NEW.property_rent, 0) - IFNULL(OLD.property_rent, 0),
+            0, 0, 0, 0, 0, 0);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS PortfolioProperties_rollup_delete $$
+CREATE TRIGGER PortfolioProperties_rollup_delete AFTER DELETE ON PortfolioProperties FOR EACH ROW
+BEGIN
+    CALL AddPropertyToRollup(OLD.portfolio_id, OLD.property_id, OLD.property_rent, -1);
+END $$
+
+DROP TRIGGER IF EXISTS Mortgages_rollup_insert $$
+CREATE TRIGGER Mortgages_rollup_insert AFTER INSERT ON Mortgages FOR EACH ROW
+BEGIN
+    CALL AdjustPropertyRollup(NEW.property_id, 1, IFNULL(NEW.monthly_payment, 0), IFNULL(NEW.principal_balance, 0), 0, 0, 0, 0);
+    IF (SELECT COUNT(*) FROM Mortgages WHERE property_id = NEW.property_id) = 1 THEN
+        CALL AddMortgagedPurchase(NEW.property_id, 1);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS Mortgages_rollup_update $$
+CREATE TRIGGER Mortgages_rollup_update AFTER UPDATE ON Mortgages FOR EACH ROW
+BEGIN
+    IF OLD.property_id <=> NEW.property_id THEN
+        CALL AdjustPropertyRollup(NEW.property_id, 0,
+            IFNULL(NEW.monthly_payment, 0) - IFNULL(OLD.monthly_payment, 0),
+            IFNULL(NEW.principal_balance, 0) - IFNULL(OLD.principal_balance, 0), 0, 0, 0, 0);
+    ELSE
+        CALL AdjustPropertyRollup(OLD.property_id, -1, -IFNULL(OLD.monthly_payment, 0), -IFNULL(OLD.principal_balance, 0), 0, 0, 0, 0);
+        IF NOT EXISTS (SELECT 1 FROM Mortgages WHERE property_id = OLD.property_id) THEN
+            CALL AddMortgagedPurchase(OLD.property_id, -1);
+        END IF;
+        CALL AdjustPropertyRollup(NEW.property_id, 1, IFNULL(NEW.monthly_payment, 0), IFNULL(NEW.principal_balance, 0), 0, 0, 0, 0);
+        IF (SELECT COUNT(*) FROM Mortgages WHERE property_id = NEW.property_id) = 1 THEN
+            CALL AddMortgagedPurchase(NEW.property_id, 1);
+        END IF;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS Mortgages_rollup_delete $$
+CREATE TRIGGER Mortgages_rollup_delete AFTER DELETE ON Mortgages FOR EACH ROW
+BEGIN
+    CALL AdjustPropertyRollup(OLD.property_id, -1, -IFNULL(OLD.monthly_payment, 0), -IFNULL(OLD.principal_balance, 0), 0, 0, 0, 0);
+    IF NOT EXISTS (SELECT 1 FROM Mortgages WHERE property_id = OLD.property_id) THEN
+        CALL AddMortgagedPurchase(OLD.property_id, -1);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS Properties_rollup_update $$
+CREATE TRIGGER Properties_rollup_update AFTER UPDATE ON Properties FOR EACH ROW
+BEGIN
+    IF NOT (OLD.monthly_capex <=> NEW.monthly_capex) THEN
+        CALL AdjustPropertyRollup(NEW.property_id, 0, 0, 0, IFNULL(NEW.monthly_capex, 0) - IFNULL(OLD.monthly_capex, 0), 0, 0, 0);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS PropertyHistories_rollup_insert $$
+CREATE TRIGGER PropertyHistories_rollup_insert AFTER INSERT ON PropertyHistories FOR EACH ROW
+BEGIN
+    CALL AdjustPurchaseRollup(NEW.property_id, IFNULL(NEW.purchase_price, 0), IFNULL(NEW.last_appraised_val, 0));
+END $$
+
+DROP TRIGGER IF EXISTS PropertyHistories_rollup_update $$
+CREATE TRIGGER PropertyHistories_rollup_update AFTER UPDATE ON PropertyHistories FOR EACH ROW
+BEGIN
+    IF OLD.property_id <=> NEW.property_id THEN
+        CALL AdjustPurchaseRollup(NEW.property_id,
+            IFNULL(NEW.purchase_price, 0) - IFNULL(OLD.purchase_price, 0),
+            IFNULL(NEW.last_appraised_val, 0) - IFNULL(OLD.last_appraised_val, 0));
+    ELSE
+        CALL AdjustPurchaseRollup(OLD.property_id, -IFNULL(OLD.purchase_price, 0), -IFNULL(OLD.last_appraised_val, 0));
+        CALL AdjustPurchaseRollup(NEW.property_id, IFNULL(NEW.purchase_price, 0), IFNULL(NEW.last_appraised_val, 0));
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS PropertyHistories_rollup_delete $$
+CREATE TRIGGER PropertyHistories_rollup_delete AFTER DELETE ON PropertyHistories FOR EACH ROW
+BEGIN
+    CALL AdjustPurchaseRollup(OLD.property_id, -IFNULL(OLD.purchase_price, 0), -IFNULL(OLD.last_appraised_val, 0));
+END $$
+
+DELIMITER ;
+
+
+/*
+Business Requirement #9:
+----------------------------------------------------
+Purpose: Keep the payment and expense ledgers small while preserving their full history.
+
+Description: PaymentHistories and ExpenseHistories only ever grow, and aging and expense reports scan them by
+date. Rows of closed months (paid payments due, and expenses dated, before the archive cutoff) are moved into
+PaymentHistoriesArchive and ExpenseHistoriesArchive, which are compressed and partitioned by year, so the hot
+tables and their indexes only hold the recent working set. Both pairs are indexed on (tenant_id, due_date)
+and (history_id, date) for per-tenant and per-property range scans.
+
+Challenge: Readers must not notice the move. Ledger reads go through the queries in database.py that combine
+the hot table and its archive with UNION ALL, each side restricted to the requested date range, so MySQL
+only touches the archive partitions of the years asked for.
+
+Assumptions: Archived rows are never edited. A payment that is still unpaid stays in PaymentHistories however
+old it is. Partitioned InnoDB tables cannot have foreign keys, so ResetUserData and CleanOrphanedData delete
+archived rows explicitly.
+
+Implementation Plan:
+    1. Create the archive tables in databasemodel.sql with ROW_FORMAT=COMPRESSED and PARTITION BY RANGE on the
+       year of the ledger date, with a catch-all p_later partition to be reorganized as years are added.
+    2. The bot's ledger archiver (ledger.py) moves rows in batches: it locks a batch of the oldest archivable
+       IDs, copies them to the archive and deletes them from the hot table in one transaction.
+*/
+
+
+/*
+Business Requirement #10:
+----------------------------------------------------
+Purpose: Show owners their monthly income and expenses over time without scanning years of ledger rows.
+
+Description: LedgerRollups holds one row per property, month, kind ('income' or 'expense') and category with the
+month's total and number of entries. Paid rent counts as income in the month it was paid (category 'Rent');
+expenses count in the month of their date, under their label ('Other' if they have none). The rows are
+adjusted by triggers whenever PaymentHistories, ExpenseHistories or their archives (Business Requirement #9) are
+written, so !cashflow_history reads a few hundred rollup rows per user.
+
+Challenge: Archiving moves rows between the ledgers and their archives. Both sides have triggers, so the delete
+from the hot table and the insert into the archive cancel out and the totals never change during a move.
+
+Assumptions: A row belongs to the property of its unit (payments) or property history (expenses) at the time it
+is written; rows without one are not counted. Unpaid payments are not income yet. Rows whose entries drop to
+zero are left in place and cleared by the bot's reconciliation job, which also backfills existing ledgers.
+
+Implementation Plan:
+    1. Create AdjustLedgerRollup to add a total and entry count to one property's month and category.
+    2. Create AFTER INSERT, UPDATE and DELETE triggers on PaymentHistories and ExpenseHistories, and AFTER INSERT
+       and DELETE triggers on their archives, that call it with the row's change.
+*/
+
+DELIMITER $$
+
+-- 1
+DROP PROCEDURE IF EXISTS AdjustLedgerRollup $$
+CREATE PROCEDURE AdjustLedgerRollup(
+    IN in_property_id INT, IN in_date DATE, IN in_kind VARCHAR(7), IN in_category VARCHAR(45),
+    IN d_total DOUBLE, IN d_entries INT)
+BEGIN
+    IF in_property_id IS NOT NULL AND in_date IS NOT NULL THEN
+        INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+        VALUES (in_property_id, DATE_SUB(in_date, INTERVAL DAYOFMONTH(in_date) - 1 DAY), in_kind,
+                IFNULL(in_category, 'Other'), d_total, d_entries)
+        ON DUPLICATE KEY UPDATE total = total + d_total, entries = entries + d_entries;
+    END IF;
+END $$
+
+-- 2
+DROP TRIGGER IF EXISTS PaymentHistories_ledger_insert $$
+CREATE TRIGGER PaymentHistories_ledger_insert AFTER INSERT ON PaymentHistories FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM Units WHERE unit_id = NEW.unit_id), NEW.paid_date,
+        'income', 'Rent', IFNULL(NEW.amount, 0), 1);
+END $$
+
+DROP TRIGGER IF EXISTS PaymentHistories_ledger_update $$
+CREATE TRIGGER PaymentHistories_ledger_update AFTER UPDATE ON PaymentHistories FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM Units WHERE unit_id = OLD.unit_id), OLD.paid_date,
+        'income', 'Rent', -IFNULL(OLD.amount, 0), -1);
+    CALL AdjustLedgerRollup((SELECT property_id FROM Units WHERE unit_id = NEW.unit_id), NEW.paid_date,
+        'income', 'Rent', IFNULL(NEW.amount, 0), 1);
+END $$
+
+DROP TRIGGER IF EXISTS PaymentHistories_ledger_delete $$
+CREATE TRIGGER PaymentHistories_ledger_delete AFTER DELETE ON PaymentHistories FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM Units WHERE unit_id = OLD.unit_id), OLD.paid_date,
+        'income', 'Rent', -IFNULL(OLD.amount, 0), -1);
+END $$
+
+DROP TRIGGER IF EXISTS PaymentHistoriesArchive_ledger_insert $$
+CREATE TRIGGER PaymentHistoriesArchive_ledger_insert AFTER INSERT ON PaymentHistoriesArchive FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM Units WHERE unit_id = NEW.unit_id), NEW.paid_date,
+        'income', 'Rent', IFNULL(NEW.amount, 0), 1);
+END $$
+
+DROP TRIGGER IF EXISTS PaymentHistoriesArchive_ledger_delete $$
+CREATE TRIGGER PaymentHistoriesArchive_ledger_delete AFTER DELETE ON PaymentHistoriesArchive FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM Units WHERE unit_id = OLD.unit_id), OLD.paid_date,
+        'income', 'Rent', -IFNULL(OLD.amount, 0), -1);
+END $$
+
+DROP TRIGGER IF EXISTS ExpenseHistories_ledger_insert $$
+CREATE TRIGGER ExpenseHistories_ledger_insert AFTER INSERT ON ExpenseHistories FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM PropertyHistories WHERE history_id = NEW.history_id), NEW.date,
+        'expense', NEW.label, IFNULL(NEW.cost, 0), 1);
+END $$
+
+DROP TRIGGER IF EXISTS ExpenseHistories_ledger_update $$
+CREATE TRIGGER ExpenseHistories_ledger_update AFTER UPDATE ON ExpenseHistories FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM PropertyHistories WHERE history_id = OLD.history_id), OLD.date,
+        'expense', OLD.label, -IFNULL(OLD.cost, 0), -1);
+    CALL AdjustLedgerRollup((SELECT property_id FROM PropertyHistories WHERE history_id = NEW.history_id), NEW.date,
+        'expense', NEW.label, IFNULL(NEW.cost, 0), 1);
+END $$
+
+DROP TRIGGER IF EXISTS ExpenseHistories_ledger_delete $$
+CREATE TRIGGER ExpenseHistories_ledger_delete AFTER DELETE ON ExpenseHistories FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM PropertyHistories WHERE history_id = OLD.history_id), OLD.date,
+        'expense', OLD.label, -IFNULL(OLD.cost, 0), -1);
+END $$
+
+DROP TRIGGER IF EXISTS ExpenseHistoriesArchive_ledger_insert $$
+CREATE TRIGGER ExpenseHistoriesArchive_ledger_insert AFTER INSERT ON ExpenseHistoriesArchive FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM PropertyHistories WHERE history_id = NEW.history_id), NEW.date,
+        'expense', NEW.label, IFNULL(NEW.cost, 0), 1);
+END $$
+
+DROP TRIGGER IF EXISTS ExpenseHistoriesArchive_ledger_delete $$
+CREATE TRIGGER ExpenseHistoriesArchive_ledger_delete AFTER DELETE ON ExpenseHistoriesArchive FOR EACH ROW
+BEGIN
+    CALL AdjustLedgerRollup((SELECT property_id FROM PropertyHistories WHERE history_id = OLD.history_id), OLD.date,
+        'expense', OLD.label, -IFNULL(OLD.cost, 0), -1);
+END $$
+
+DELIMITER ;
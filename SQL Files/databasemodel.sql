@@ -41,6 +41,7 @@ CREATE TABLE IF NOT EXISTS `RegisteredUsers` (
   PRIMARY KEY (`tracking_id`),
   UNIQUE INDEX `email_UNIQUE` (`email` ASC) VISIBLE,
   INDEX `role_id_idx` (`role_id` ASC) VISIBLE,
+  INDEX `role_expires_idx` (`role_expires` ASC) VISIBLE,
   CONSTRAINT `fk_RegisteredUsers_Role`
     FOREIGN KEY (`role_id`)
     REFERENCES `Roles` (`role_id`)
@@ -57,7 +58,14 @@ DROP TABLE IF EXISTS `Portfolios` ;
 CREATE TABLE IF NOT EXISTS `Portfolios` (
   `portfolio_id` INT NOT NULL AUTO_INCREMENT,
   `num_properties` INT NOT NULL DEFAULT 0,
-  `last_appraised_val` VARCHAR(45) NOT NULL DEFAULT 0,
+  `num_mortgages` INT NOT NULL DEFAULT 0,
+  `total_rent` DOUBLE NOT NULL DEFAULT 0,
+  `total_mortgage_payment` DOUBLE NOT NULL DEFAULT 0,
+  `total_principal` DOUBLE NOT NULL DEFAULT 0,
+  `total_capex` DOUBLE NOT NULL DEFAULT 0,
+  `total_purchase_price` DOUBLE NOT NULL DEFAULT 0,
+  `mortgaged_purchase_price` DOUBLE NOT NULL DEFAULT 0,
+  `last_appraised_val` DOUBLE NOT NULL DEFAULT 0,
   PRIMARY KEY (`portfolio_id`))
 ENGINE = InnoDB;
 
@@ -170,6 +178,7 @@ CREATE TABLE IF NOT EXISTS `TaxRecords` (
   `year` INT NULL,
   PRIMARY KEY (`tracking_id`),
   INDEX `property_id_idx` (`property_id` ASC) VISIBLE,
+  INDEX `due_date_idx` (`due_date` ASC) VISIBLE,
   CONSTRAINT `fk_TaxRecords_Property`
     FOREIGN KEY (`property_id`)
     REFERENCES `Properties` (`property_id`)
@@ -195,6 +204,7 @@ CREATE TABLE IF NOT EXISTS `Mortgages` (
   `terms` LONGTEXT NULL,
   PRIMARY KEY (`tracking_id`),
   INDEX `property_id_idx` (`property_id` ASC) VISIBLE,
+  INDEX `end_date_idx` (`end_date` ASC) VISIBLE,
   CONSTRAINT `fk_Mortgages_Property`
     FOREIGN KEY (`property_id`)
     REFERENCES `Properties` (`property_id`)
@@ -218,6 +228,7 @@ CREATE TABLE IF NOT EXISTS `InsurancePolicies` (
   `property_id` INT NULL,
   PRIMARY KEY (`tracking_id`),
   INDEX `property_id_idx` (`property_id` ASC) VISIBLE,
+  INDEX `end_date_idx` (`end_date` ASC) VISIBLE,
   CONSTRAINT `fk_InsurancePolicies_Property`
     FOREIGN KEY (`property_id`)
     REFERENCES `Properties` (`property_id`)
@@ -352,7 +363,8 @@ CREATE TABLE IF NOT EXISTS `ExpenseHistories` (
   `history_id` INT NULL,
   `ExpenseHistoriescol` VARCHAR(45) NULL,
   PRIMARY KEY (`expense_id`),
-  INDEX `history_id_idx` (`history_id` ASC) VISIBLE,
+  INDEX `history_date_idx` (`history_id` ASC, `date` ASC) VISIBLE,
+  INDEX `date_idx` (`date` ASC) VISIBLE,
   CONSTRAINT `fk_ExpenseHistories_History`
     FOREIGN KEY (`history_id`)
     REFERENCES `PropertyHistories` (`history_id`)
@@ -427,6 +439,7 @@ CREATE TABLE IF NOT EXISTS `LeaseAgreements` (
   `property_id` INT NULL,
   PRIMARY KEY (`lease_id`),
   INDEX `property_id_idx` (`property_id` ASC) VISIBLE,
+  INDEX `end_date_idx` (`end_date` ASC) VISIBLE,
   CONSTRAINT `fk_LeaseAgreements_Property`
     FOREIGN KEY (`property_id`)
     REFERENCES `Properties` (`property_id`)
@@ -472,7 +485,8 @@ CREATE TABLE IF NOT EXISTS `PaymentHistories` (
   `tenant_id` INT NULL,
   PRIMARY KEY (`history_id`),
   INDEX `unit_id_idx` (`unit_id` ASC) VISIBLE,
-  INDEX `tenant_id_idx` (`tenant_id` ASC) VISIBLE,
+  INDEX `tenant_due_date_idx` (`tenant_id` ASC, `due_date` ASC) VISIBLE,
+  INDEX `due_date_idx` (`due_date` ASC) VISIBLE,
   CONSTRAINT `fk_PaymentHistories_Unit`
     FOREIGN KEY (`unit_id`)
     REFERENCES `Units` (`unit_id`)
@@ -527,6 +541,147 @@ CREATE TABLE IF NOT EXISTS `UnitTenants` (
 ENGINE = InnoDB;
 
 
+-- -----------------------------------------------------
+-- Table `ChangeLog`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `ChangeLog` ;
+
+CREATE TABLE IF NOT EXISTS `ChangeLog` (
+  `seq` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  `table_name` VARCHAR(32) NOT NULL,
+  `pk` BIGINT UNSIGNED NOT NULL,
+  `op` CHAR(1) NOT NULL,
+  `user_id` BIGINT(20) UNSIGNED NULL,
+  PRIMARY KEY (`seq`))
+ENGINE = InnoDB;
+
+
+-- -----------------------------------------------------
+-- Table `ChangeLogConsumers`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `ChangeLogConsumers` ;
+
+CREATE TABLE IF NOT EXISTS `ChangeLogConsumers` (
+  `consumer_id` VARCHAR(64) NOT NULL,
+  `last_seq` BIGINT UNSIGNED NOT NULL DEFAULT 0,
+  `updated_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`consumer_id`))
+ENGINE = InnoDB;
+
+
+-- -----------------------------------------------------
+-- Table `SchemaMigrations`
+-- -----------------------------------------------------
+-- Progress of the online schema migrations run by migrations.py: the step in progress and
+-- the last key that step finished, so an interrupted migration resumes where it stopped.
+DROP TABLE IF EXISTS `SchemaMigrations` ;
+
+CREATE TABLE IF NOT EXISTS `SchemaMigrations` (
+  `version` INT NOT NULL,
+  `name` VARCHAR(100) NOT NULL,
+  `step` INT NOT NULL DEFAULT 0,
+  `last_key` BIGINT NULL,
+  `rows_done` BIGINT NOT NULL DEFAULT 0,
+  `started_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `finished_at` TIMESTAMP NULL,
+  PRIMARY KEY (`version`))
+ENGINE = InnoDB;
+
+-- Migrations already contained in this schema, so new databases skip them.
+INSERT INTO `SchemaMigrations` (`version`, `name`, `step`, `finished_at`)
+VALUES (1, 'Mortgaged purchase price rollup', 2, CURRENT_TIMESTAMP);
+
+
+-- -----------------------------------------------------
+-- Table `PaymentHistoriesArchive`
+-- -----------------------------------------------------
+-- Paid payments of closed months, moved out of PaymentHistories by the ledger archiver
+-- (Business Requirement #9). Compressed and partitioned by year of due date; partitioned
+-- InnoDB tables cannot have foreign keys, so CleanOrphanedData removes orphaned rows instead.
+-- Years after the last partition land in p_later until it is reorganized.
+DROP TABLE IF EXISTS `PaymentHistoriesArchive` ;
+
+CREATE TABLE IF NOT EXISTS `PaymentHistoriesArchive` (
+  `history_id` INT NOT NULL,
+  `amount` DOUBLE NULL,
+  `paid_date` DATE NULL,
+  `due_date` DATE NOT NULL,
+  `unit_id` INT NULL,
+  `tenant_id` INT NULL,
+  PRIMARY KEY (`history_id`, `due_date`),
+  INDEX `tenant_due_date_idx` (`tenant_id` ASC, `due_date` ASC) VISIBLE,
+  INDEX `unit_id_idx` (`unit_id` ASC) VISIBLE)
+ENGINE = InnoDB
+ROW_FORMAT = COMPRESSED
+PARTITION BY RANGE (YEAR(`due_date`)) (
+  PARTITION p_earlier VALUES LESS THAN (2020),
+  PARTITION p2020 VALUES LESS THAN (2021),
+  PARTITION p2021 VALUES LESS THAN (2022),
+  PARTITION p2022 VALUES LESS THAN (2023),
+  PARTITION p2023 VALUES LESS THAN (2024),
+  PARTITION p2024 VALUES LESS THAN (2025),
+  PARTITION p2025 VALUES LESS THAN (2026),
+  PARTITION p2026 VALUES LESS THAN (2027),
+  PARTITION p2027 VALUES LESS THAN (2028),
+  PARTITION p2028 VALUES LESS THAN (2029),
+  PARTITION p2029 VALUES LESS THAN (2030),
+  PARTITION p2030 VALUES LESS THAN (2031),
+  PARTITION p_later VALUES LESS THAN MAXVALUE);
+
+
+-- -----------------------------------------------------
+-- Table `ExpenseHistoriesArchive`
+-- -----------------------------------------------------
+-- Expenses of closed months, moved out of ExpenseHistories by the ledger archiver.
+DROP TABLE IF EXISTS `ExpenseHistoriesArchive` ;
+
+CREATE TABLE IF NOT EXISTS `ExpenseHistoriesArchive` (
+  `expense_id` INT NOT NULL,
+  `date` DATE NOT NULL,
+  `cost` DOUBLE NULL,
+  `label` VARCHAR(45) NULL,
+  `history_id` INT NULL,
+  `ExpenseHistoriescol` VARCHAR(45) NULL,
+  PRIMARY KEY (`expense_id`, `date`),
+  INDEX `history_date_idx` (`history_id` ASC, `date` ASC) VISIBLE)
+ENGINE = InnoDB
+ROW_FORMAT = COMPRESSED
+PARTITION BY RANGE (YEAR(`date`)) (
+  PARTITION p_earlier VALUES LESS THAN (2020),
+  PARTITION p2020 VALUES LESS THAN (2021),
+  PARTITION p2021 VALUES LESS THAN (2022),
+  PARTITION p2022 VALUES LESS THAN (2023),
+  PARTITION p2023 VALUES LESS THAN (2024),
+  PARTITION p2024 VALUES LESS THAN (2025),
+  PARTITION p2025 VALUES LESS THAN (2026),
+  PARTITION p2026 VALUES LESS THAN (2027),
+  PARTITION p2027 VALUES LESS THAN (2028),
+  PARTITION p2028 VALUES LESS THAN (2029),
+  PARTITION p2029 VALUES LESS THAN (2030),
+  PARTITION p2030 VALUES LESS THAN (2031),
+  PARTITION p_later VALUES LESS THAN MAXVALUE);
+
+
+-- -----------------------------------------------------
+-- Table `LedgerRollups`
+-- -----------------------------------------------------
+-- Monthly income and expense totals per property and category (Business Requirement #10),
+-- kept current by triggers on the ledgers and their archives. Rows are not removed when
+-- their entries drop to zero; the bot's reconciliation job clears them. No foreign key:
+-- CleanOrphanedData removes the rows of deleted properties.
+DROP TABLE IF EXISTS `LedgerRollups` ;
+
+CREATE TABLE IF NOT EXISTS `LedgerRollups` (
+  `property_id` INT NOT NULL,
+  `month` DATE NOT NULL,
+  `kind` VARCHAR(7) NOT NULL,
+  `category` VARCHAR(45) NOT NULL,
+  `total` DOUBLE NOT NULL DEFAULT 0,
+  `entries` INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`property_id`, `month`, `kind`, `category`))
+ENGINE = InnoDB;
+
+
 SET SQL_MODE=@OLD_SQL_MODE;
 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS;
 SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS;
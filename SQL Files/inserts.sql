@@ -14,11 +14,12 @@ VALUES
 (2, 'owner@example.com', 'Owner', 'Two', 1), 
 (3, 'owner2@example.com', 'Owner', 'Three', 1); 
 
-INSERT INTO `Portfolios` (portfolio_id, num_properties, last_appraised_val)
+-- Rollup columns (num_properties, totals, last_appraised_val) are maintained by triggers as properties are added.
+INSERT INTO `Portfolios` (portfolio_id)
 VALUES
-(1, 3, 3000000),
-(2, 2, 700000),
-(3, 1, 1000000);
+(1),
+(2),
+(3);
 
 INSERT INTO `UserPortfolios` (user_id, portfolio_id, last_appraised_val)
 VALUES
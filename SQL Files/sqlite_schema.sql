@@ -0,0 +1,1189 @@
+-- SQLite port of databasemodel.sql and the views and triggers of business_requirements.sql,
+-- used by the embedded backend (DB_BACKEND=sqlite in database.py). The stored procedures are
+-- reimplemented in Python in database.py. Applied to a new database file and re-applied to
+-- files whose PRAGMA user_version is older than the one set at the end; every statement is
+-- idempotent, so re-applying it only adds what is missing.
+--
+-- Differences from the MySQL schema:
+--   * AUTO_INCREMENT keys are INTEGER PRIMARY KEY (rowid) columns; only ChangeLog uses
+--     AUTOINCREMENT, so its sequence numbers are never reused after truncation.
+--   * ENUM becomes a CHECK constraint, CONCAT in generated columns and views becomes ||.
+--   * The PortfolioOwner and PropertyOwner functions become inline lookups and the
+--     PropertyOwners view; the rollup procedures are inlined into their triggers.
+--   * Roles are seeded here because every registered user references one.
+
+PRAGMA foreign_keys = ON;
+
+-- -----------------------------------------------------
+-- Tables
+-- -----------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS Roles (
+  role_id INTEGER PRIMARY KEY,
+  role_type TEXT NULL CHECK (role_type IN ('Admin', 'Owner', 'Guest'))
+);
+
+CREATE TABLE IF NOT EXISTS RegisteredUsers (
+  tracking_id INTEGER NOT NULL PRIMARY KEY,
+  email VARCHAR(45) NOT NULL UNIQUE,
+  first_name VARCHAR(45) NULL,
+  last_name VARCHAR(45) NULL,
+  full_name VARCHAR(100) GENERATED ALWAYS AS (first_name || ' ' || last_name) VIRTUAL,
+  role_id INT NULL REFERENCES Roles (role_id),
+  role_expires DATE NULL,
+  has_sample_data TINYINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS RegisteredUsers_role_id_idx ON RegisteredUsers (role_id);
+CREATE INDEX IF NOT EXISTS RegisteredUsers_role_expires_idx ON RegisteredUsers (role_expires);
+
+CREATE TABLE IF NOT EXISTS Portfolios (
+  portfolio_id INTEGER PRIMARY KEY,
+  num_properties INT NOT NULL DEFAULT 0,
+  num_mortgages INT NOT NULL DEFAULT 0,
+  total_rent DOUBLE NOT NULL DEFAULT 0,
+  total_mortgage_payment DOUBLE NOT NULL DEFAULT 0,
+  total_principal DOUBLE NOT NULL DEFAULT 0,
+  total_capex DOUBLE NOT NULL DEFAULT 0,
+  total_purchase_price DOUBLE NOT NULL DEFAULT 0,
+  mortgaged_purchase_price DOUBLE NOT NULL DEFAULT 0,
+  last_appraised_val DOUBLE NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS UserPortfolios (
+  tracking_id INTEGER PRIMARY KEY,
+  user_id INTEGER NULL REFERENCES RegisteredUsers (tracking_id),
+  portfolio_id INT NULL REFERENCES Portfolios (portfolio_id),
+  last_appraised_val VARCHAR(45) NULL
+);
+CREATE INDEX IF NOT EXISTS UserPortfolios_portfolio_id_idx ON UserPortfolios (portfolio_id);
+CREATE INDEX IF NOT EXISTS UserPortfolios_user_id_idx ON UserPortfolios (user_id);
+
+CREATE TABLE IF NOT EXISTS Addresses (
+  address_id INTEGER PRIMARY KEY,
+  country VARCHAR(45) NULL,
+  state_province VARCHAR(45) NULL,
+  city VARCHAR(45) NULL,
+  street VARCHAR(45) NULL,
+  number INT NULL,
+  numbered_street VARCHAR(45) GENERATED ALWAYS AS (number || ' ' || street) VIRTUAL
+);
+
+CREATE TABLE IF NOT EXISTS Properties (
+  total_rent DOUBLE NULL DEFAULT 0,
+  property_id INTEGER PRIMARY KEY,
+  monthly_capex DOUBLE NULL,
+  bedroom_count INT NULL,
+  bathroom_count INT NULL,
+  sqft INT NULL,
+  lot_size INT NULL,
+  target_arv DOUBLE NULL,
+  address_id INT NULL REFERENCES Addresses (address_id)
+);
+CREATE INDEX IF NOT EXISTS Properties_address_id_idx ON Properties (address_id);
+
+CREATE TABLE IF NOT EXISTS PortfolioProperties (
+  tracking_id INTEGER PRIMARY KEY,
+  property_id INT NOT NULL REFERENCES Properties (property_id),
+  portfolio_id INT NOT NULL REFERENCES Portfolios (portfolio_id),
+  property_rent DOUBLE NULL
+);
+CREATE INDEX IF NOT EXISTS PortfolioProperties_property_id_idx ON PortfolioProperties (property_id);
+CREATE INDEX IF NOT EXISTS PortfolioProperties_portfolio_id_idx ON PortfolioProperties (portfolio_id);
+
+CREATE TABLE IF NOT EXISTS TaxRecords (
+  tracking_id INTEGER PRIMARY KEY,
+  property_id INT NULL REFERENCES Properties (property_id),
+  payment_date DATE NULL,
+  due_date DATE NULL,
+  amount_paid DOUBLE NULL,
+  year INT NULL
+);
+CREATE INDEX IF NOT EXISTS TaxRecords_property_id_idx ON TaxRecords (property_id);
+CREATE INDEX IF NOT EXISTS TaxRecords_due_date_idx ON TaxRecords (due_date);
+
+CREATE TABLE IF NOT EXISTS Mortgages (
+  tracking_id INTEGER PRIMARY KEY,
+  lender_name VARCHAR(45) NULL,
+  principal_balance DOUBLE NULL,
+  interest_rate DOUBLE NULL,
+  monthly_payment DOUBLE NULL,
+  start_date DATE NULL,
+  end_date DATE NULL,
+  property_id INT NULL REFERENCES Properties (property_id),
+  terms LONGTEXT NULL
+);
+CREATE INDEX IF NOT EXISTS Mortgages_property_id_idx ON Mortgages (property_id);
+CREATE INDEX IF NOT EXISTS Mortgages_end_date_idx ON Mortgages (end_date);
+
+CREATE TABLE IF NOT EXISTS InsurancePolicies (
+  tracking_id INTEGER PRIMARY KEY,
+  policy_number INT NULL,
+  provider VARCHAR(45) NULL,
+  monthly_cost DOUBLE NULL,
+  start_date DATE NULL,
+  end_date DATE NULL,
+  property_id INT NULL REFERENCES Properties (property_id)
+);
+CREATE INDEX IF NOT EXISTS InsurancePolicies_property_id_idx ON InsurancePolicies (property_id);
+CREATE INDEX IF NOT EXISTS InsurancePolicies_end_date_idx ON InsurancePolicies (end_date);
+
+CREATE TABLE IF NOT EXISTS ProjectInfos (
+  project_id INTEGER PRIMARY KEY,
+  in_progress TINYINT NULL,
+  project_title VARCHAR(100) NULL,
+  project_description LONGTEXT NULL,
+  ProjectInfoscol VARCHAR(45) NULL,
+  property_id INT NULL REFERENCES Properties (property_id)
+);
+CREATE INDEX IF NOT EXISTS ProjectInfos_property_id_idx ON ProjectInfos (property_id);
+
+CREATE TABLE IF NOT EXISTS ProjectUpdates (
+  update_id INTEGER PRIMARY KEY,
+  project_id INT NOT NULL REFERENCES ProjectInfos (project_id),
+  updates LONGTEXT NULL,
+  date DATE NULL
+);
+CREATE INDEX IF NOT EXISTS ProjectUpdates_project_id_idx ON ProjectUpdates (project_id);
+
+CREATE TABLE IF NOT EXISTS Contractors (
+  tracking_id INTEGER PRIMARY KEY,
+  company_name VARCHAR(45) NULL,
+  services MEDIUMTEXT NULL,
+  first_name VARCHAR(45) NULL,
+  last_name VARCHAR(45) NULL,
+  full_name VARCHAR(100) GENERATED ALWAYS AS (first_name || ' ' || last_name) VIRTUAL,
+  user_id INTEGER NOT NULL REFERENCES RegisteredUsers (tracking_id)
+);
+CREATE INDEX IF NOT EXISTS Contractors_user_id_idx ON Contractors (user_id);
+
+CREATE TABLE IF NOT EXISTS ProjectContractors (
+  tracking_id INTEGER PRIMARY KEY,
+  project_id INT NULL REFERENCES ProjectInfos (project_id),
+  contractor_id INT NULL REFERENCES Contractors (tracking_id),
+  services MEDIUMTEXT NULL
+);
+CREATE INDEX IF NOT EXISTS ProjectContractors_project_id_idx ON ProjectContractors (project_id);
+CREATE INDEX IF NOT EXISTS ProjectContractors_contractor_id_idx ON ProjectContractors (contractor_id);
+
+CREATE TABLE IF NOT EXISTS PropertyHistories (
+  purchase_price DOUBLE NULL,
+  history_id INTEGER PRIMARY KEY,
+  maintenance_notes LONGTEXT NULL,
+  last_appraised_val DOUBLE NULL,
+  purchase_date DATE NULL,
+  property_id INT NULL REFERENCES Properties (property_id)
+);
+CREATE INDEX IF NOT EXISTS PropertyHistories_property_id_idx ON PropertyHistories (property_id);
+
+CREATE TABLE IF NOT EXISTS ExpenseHistories (
+  expense_id INTEGER PRIMARY KEY,
+  date DATE NULL,
+  cost DOUBLE NULL,
+  label VARCHAR(45) NULL,
+  history_id INT NULL REFERENCES PropertyHistories (history_id),
+  ExpenseHistoriescol VARCHAR(45) NULL
+);
+CREATE INDEX IF NOT EXISTS ExpenseHistories_history_date_idx ON ExpenseHistories (history_id, date);
+CREATE INDEX IF NOT EXISTS ExpenseHistories_date_idx ON ExpenseHistories (date);
+
+CREATE TABLE IF NOT EXISTS InspectionRecords (
+  inspection_id INTEGER PRIMARY KEY,
+  notes LONGTEXT NULL,
+  inspector_firstname VARCHAR(45) NULL,
+  inspector_lastname VARCHAR(45) NULL,
+  inspector_name VARCHAR(100) GENERATED ALWAYS AS (inspector_firstname || ' ' || inspector_lastname) VIRTUAL,
+  history_id INT NULL REFERENCES PropertyHistories (history_id)
+);
+CREATE INDEX IF NOT EXISTS InspectionRecords_history_id_idx ON InspectionRecords (history_id);
+
+CREATE TABLE IF NOT EXISTS Units (
+  unit_id INTEGER PRIMARY KEY,
+  property_id INT NULL REFERENCES Properties (property_id) ON UPDATE CASCADE,
+  bedroom_count INT NULL,
+  bathroom_count INT NULL,
+  rent DOUBLE NULL,
+  vacant TINYINT NULL,
+  address_id INT NULL REFERENCES Addresses (address_id) ON UPDATE CASCADE,
+  Unitscol VARCHAR(45) NULL
+);
+CREATE INDEX IF NOT EXISTS Units_property_id_idx ON Units (property_id);
+CREATE INDEX IF NOT EXISTS Units_address_id_idx ON Units (address_id);
+
+CREATE TABLE IF NOT EXISTS LeaseAgreements (
+  lease_id INTEGER PRIMARY KEY,
+  rent DOUBLE NULL,
+  start_date DATE NULL,
+  end_date DATE NULL,
+  terms LONGTEXT NULL,
+  property_id INT NULL REFERENCES Properties (property_id)
+);
+CREATE INDEX IF NOT EXISTS LeaseAgreements_property_id_idx ON LeaseAgreements (property_id);
+CREATE INDEX IF NOT EXISTS LeaseAgreements_end_date_idx ON LeaseAgreements (end_date);
+
+CREATE TABLE IF NOT EXISTS Tenants (
+  tenant_id INTEGER PRIMARY KEY,
+  notes LONGTEXT NULL,
+  first_name VARCHAR(45) NULL,
+  last_name VARCHAR(45) NULL,
+  full_name VARCHAR(100) GENERATED ALWAYS AS (first_name || ' ' || last_name) VIRTUAL,
+  lease_id INT NULL REFERENCES LeaseAgreements (lease_id),
+  past_due_balance INT NULL
+);
+CREATE INDEX IF NOT EXISTS Tenants_lease_id_idx ON Tenants (lease_id);
+
+CREATE TABLE IF NOT EXISTS PaymentHistories (
+  history_id INTEGER PRIMARY KEY,
+  amount DOUBLE NULL,
+  paid_date DATE NULL,
+  due_date DATE NULL,
+  unit_id INT NULL REFERENCES Units (unit_id),
+  tenant_id INT NULL REFERENCES Tenants (tenant_id)
+);
+CREATE INDEX IF NOT EXISTS PaymentHistories_unit_id_idx ON PaymentHistories (unit_id);
+CREATE INDEX IF NOT EXISTS PaymentHistories_tenant_due_date_idx ON PaymentHistories (tenant_id, due_date);
+CREATE INDEX IF NOT EXISTS PaymentHistories_due_date_idx ON PaymentHistories (due_date);
+
+CREATE TABLE IF NOT EXISTS UnitTenants (
+  tracking_id INTEGER PRIMARY KEY,
+  unit_id INT NULL REFERENCES Units (unit_id),
+  tenant_id INT NULL REFERENCES Tenants (tenant_id),
+  tenant_name VARCHAR(100) NULL,
+  address_id INT NULL REFERENCES Addresses (address_id),
+  lease_id INT NULL REFERENCES LeaseAgreements (lease_id),
+  UnitTenantscol VARCHAR(45) NULL
+);
+CREATE INDEX IF NOT EXISTS UnitTenants_unit_id_idx ON UnitTenants (unit_id);
+CREATE INDEX IF NOT EXISTS UnitTenants_tenant_id_idx ON UnitTenants (tenant_id);
+CREATE INDEX IF NOT EXISTS UnitTenants_lease_id_idx ON UnitTenants (lease_id);
+CREATE INDEX IF NOT EXISTS UnitTenants_address_id_idx ON UnitTenants (address_id);
+
+CREATE TABLE IF NOT EXISTS ChangeLog (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  table_name VARCHAR(32) NOT NULL,
+  pk INTEGER NOT NULL,
+  op CHAR(1) NOT NULL,
+  user_id INTEGER NULL
+);
+
+CREATE TABLE IF NOT EXISTS ChangeLogConsumers (
+  consumer_id VARCHAR(64) NOT NULL PRIMARY KEY,
+  last_seq INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS SchemaMigrations (
+  version INT NOT NULL PRIMARY KEY,
+  name VARCHAR(100) NOT NULL,
+  step INT NOT NULL DEFAULT 0,
+  last_key INTEGER NULL,
+  rows_done INTEGER NOT NULL DEFAULT 0,
+  started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  finished_at TIMESTAMP NULL
+);
+
+-- Migrations already contained in this schema, so migrations.py skips them.
+INSERT OR IGNORE INTO SchemaMigrations (version, name, step, finished_at)
+VALUES (1, 'Mortgaged purchase price rollup', 2, CURRENT_TIMESTAMP);
+
+-- Ledger archives (Business Requirement #9); SQLite has no partitioning or page compression.
+CREATE TABLE IF NOT EXISTS PaymentHistoriesArchive (
+  history_id INT NOT NULL,
+  amount DOUBLE NULL,
+  paid_date DATE NULL,
+  due_date DATE NOT NULL,
+  unit_id INT NULL,
+  tenant_id INT NULL,
+  PRIMARY KEY (history_id, due_date)
+);
+CREATE INDEX IF NOT EXISTS PaymentHistoriesArchive_tenant_due_date_idx ON PaymentHistoriesArchive (tenant_id, due_date);
+CREATE INDEX IF NOT EXISTS PaymentHistoriesArchive_unit_id_idx ON PaymentHistoriesArchive (unit_id);
+
+CREATE TABLE IF NOT EXISTS ExpenseHistoriesArchive (
+  expense_id INT NOT NULL,
+  date DATE NOT NULL,
+  cost DOUBLE NULL,
+  label VARCHAR(45) NULL,
+  history_id INT NULL,
+  ExpenseHistoriescol VARCHAR(45) NULL,
+  PRIMARY KEY (expense_id, date)
+);
+CREATE INDEX IF NOT EXISTS ExpenseHistoriesArchive_history_date_idx ON ExpenseHistoriesArchive (history_id, date);
+
+-- Monthly ledger totals (Business Requirement #10), adjusted by the ledger triggers at the end.
+CREATE TABLE IF NOT EXISTS LedgerRollups (
+  property_id INT NOT NULL,
+  month DATE NOT NULL,
+  kind VARCHAR(7) NOT NULL,
+  category VARCHAR(45) NOT NULL,
+  total DOUBLE NOT NULL DEFAULT 0,
+  entries INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (property_id, month, kind, category)
+);
+
+-- Replaced by the composite ledger indexes above (schema version 2).
+DROP INDEX IF EXISTS ExpenseHistories_history_id_idx;
+DROP INDEX IF EXISTS PaymentHistories_tenant_id_idx;
+
+INSERT OR IGNORE INTO Roles (role_id, role_type)
+VALUES
+(1, 'Owner'),
+(2, 'Admin'),
+(3, 'Guest');
+
+-- -----------------------------------------------------
+-- Views (Business Requirements #2 - #5)
+-- -----------------------------------------------------
+
+CREATE VIEW IF NOT EXISTS PortfolioPerformance AS
+WITH CashFlowCTE AS (
+    SELECT
+        pp.property_id,
+        pp.property_rent,
+        IFNULL(m.monthly_payment, 0) AS monthly_payment,
+        IFNULL(prop.monthly_capex, 0) AS monthly_capex,
+        (pp.property_rent - (IFNULL(m.monthly_payment, 0) + IFNULL(prop.monthly_capex, 0))) AS cash_flow
+    FROM PortfolioProperties pp
+    INNER JOIN Properties prop ON pp.property_id = prop.property_id
+    LEFT JOIN Mortgages m ON prop.property_id = m.property_id
+)
+SELECT
+    ru.tracking_id AS User_ID,
+    ru.email,
+    p.portfolio_id AS Portfolio_ID,
+    pp.property_id AS Property_ID,
+    a.number || ' ' || a.street || ', ' || a.city || ', ' || a.state_province || ', ' || a.country AS Address,
+    pp.property_rent AS Rental_Income,
+    m.monthly_payment AS Mortgage,
+    prop.monthly_capex AS Capital_Expenditures,
+    cfte.cash_flow,
+    ph.purchase_price AS Purchase_Price,
+    prop.target_arv AS ARV
+FROM RegisteredUsers ru
+INNER JOIN UserPortfolios up ON ru.tracking_id = up.user_id
+INNER JOIN Portfolios p ON up.portfolio_id = p.portfolio_id
+INNER JOIN PortfolioProperties pp ON p.portfolio_id = pp.portfolio_id
+INNER JOIN Properties prop ON pp.property_id = prop.property_id
+INNER JOIN PropertyHistories ph ON prop.property_id = ph.property_id
+LEFT JOIN Mortgages m ON prop.property_id = m.property_id
+LEFT JOIN Addresses a ON prop.address_id = a.address_id
+LEFT JOIN CashFlowCTE cfte ON pp.property_id = cfte.property_id;
+
+CREATE VIEW IF NOT EXISTS ViewTenants AS
+SELECT
+    ru.tracking_id AS user_id,
+    t.tenant_id,
+    t.full_name AS tenant_name,
+    ut.unit_id,
+    a.numbered_street AS property_address,
+    t.past_due_balance
+FROM RegisteredUsers ru
+JOIN UserPortfolios up ON ru.tracking_id = up.user_id
+JOIN Portfolios pf ON up.portfolio_id = pf.portfolio_id
+JOIN PortfolioProperties pp ON pf.portfolio_id = pp.portfolio_id
+JOIN Properties p ON pp.property_id = p.property_id
+JOIN Units u ON p.property_id = u.property_id
+JOIN UnitTenants ut ON u.unit_id = ut.unit_id
+JOIN Tenants t ON ut.tenant_id = t.tenant_id
+JOIN Addresses a ON p.address_id = a.address_id;
+
+-- Recreated in schema version 6: the totals row reads mortgaged_purchase_price.
+DROP VIEW IF EXISTS ViewMortgages;
+CREATE VIEW IF NOT EXISTS ViewMortgages AS
+SELECT
+    ru.tracking_id AS user_id,
+    m.tracking_id AS mortgage_id,
+    m.lender_name,
+    m.principal_balance,
+    m.interest_rate,
+    m.monthly_payment,
+    m.start_date,
+    m.end_date,
+    ph.purchase_price,
+    a.number || ' ' || a.street || ', ' || a.city || ', ' || a.state_province || ', ' || a.country AS property_address,
+    ru.full_name AS registered_user
+FROM Mortgages m
+JOIN Properties p ON m.property_id = p.property_id
+JOIN PropertyHistories ph ON ph.property_id = p.property_id
+JOIN PortfolioProperties pp ON pp.property_id = p.property_id
+JOIN Portfolios pf ON pf.portfolio_id = pp.portfolio_id
+JOIN UserPortfolios up ON up.portfolio_id = pf.portfolio_id
+JOIN RegisteredUsers ru ON ru.tracking_id = up.user_id
+JOIN Addresses a ON p.address_id = a.address_id
+UNION ALL
+SELECT
+    ru.tracking_id AS user_id,
+    NULL AS mortgage_id,
+    'Total' AS lender_name,
+    SUM(pf.total_principal) AS total_principal_balance,
+    NULL AS interest_rate,
+    SUM(pf.total_mortgage_payment) AS total_monthly_payment,
+    NULL AS start_date,
+    NULL AS end_date,
+    SUM(pf.mortgaged_purchase_price) AS purchase_price,
+    NULL AS property_address,
+    ru.full_name AS registered_user
+FROM Portfolios pf
+JOIN UserPortfolios up ON up.portfolio_id = pf.portfolio_id
+JOIN RegisteredUsers ru ON ru.tracking_id = up.user_id
+GROUP BY ru.tracking_id
+HAVING SUM(pf.num_mortgages) > 0;
+
+CREATE VIEW IF NOT EXISTS CurrentProjects AS
+SELECT
+    ru.tracking_id AS user_id,
+    a.numbered_street,
+    a.city,
+    pi.project_title AS project,
+    pi.in_progress,
+    pi.project_description,
+    c.company_name AS contractor_company,
+    c.full_name AS contractor,
+    c.services
+FROM RegisteredUsers ru
+JOIN UserPortfolios up ON ru.tracking_id = up.user_id
+JOIN Portfolios p ON up.portfolio_id = p.portfolio_id
+JOIN PortfolioProperties pp ON p.portfolio_id = pp.portfolio_id
+JOIN Properties prop ON pp.property_id = prop.property_id
+JOIN ProjectInfos pi ON prop.property_id = pi.property_id
+JOIN ProjectContractors pc ON pc.project_id = pi.project_id
+JOIN Contractors c ON pc.contractor_id = c.tracking_id
+JOIN Addresses a ON prop.address_id = a.address_id;
+
+-- -----------------------------------------------------
+-- Change data capture (Business Requirement #7)
+-- -----------------------------------------------------
+
+-- Stands in for the PropertyOwner function: the user owning a property, through its portfolio.
+CREATE VIEW IF NOT EXISTS PropertyOwners AS
+SELECT pp.property_id, up.user_id
+FROM PortfolioProperties pp
+JOIN UserPortfolios up ON up.portfolio_id = pp.portfolio_id;
+
+-- RegisteredUsers
+CREATE TRIGGER IF NOT EXISTS RegisteredUsers_changelog_insert AFTER INSERT ON RegisteredUsers
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('RegisteredUsers', NEW.tracking_id, 'I', NEW.tracking_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS RegisteredUsers_changelog_update AFTER UPDATE ON RegisteredUsers
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('RegisteredUsers', NEW.tracking_id, 'U', NEW.tracking_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS RegisteredUsers_changelog_delete AFTER DELETE ON RegisteredUsers
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('RegisteredUsers', OLD.tracking_id, 'D', OLD.tracking_id);
+END;
+
+-- UserPortfolios
+CREATE TRIGGER IF NOT EXISTS UserPortfolios_changelog_insert AFTER INSERT ON UserPortfolios
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('UserPortfolios', NEW.tracking_id, 'I', NEW.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS UserPortfolios_changelog_update AFTER UPDATE ON UserPortfolios
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('UserPortfolios', NEW.tracking_id, 'U', NEW.user_id);
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'UserPortfolios', OLD.tracking_id, 'U', OLD.user_id
+    WHERE OLD.user_id IS NOT NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS UserPortfolios_changelog_delete AFTER DELETE ON UserPortfolios
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('UserPortfolios', OLD.tracking_id, 'D', OLD.user_id);
+END;
+
+-- PortfolioProperties
+CREATE TRIGGER IF NOT EXISTS PortfolioProperties_changelog_insert AFTER INSERT ON PortfolioProperties
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PortfolioProperties', NEW.tracking_id, 'I', (SELECT user_id FROM UserPortfolios WHERE portfolio_id = NEW.portfolio_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS PortfolioProperties_changelog_update AFTER UPDATE ON PortfolioProperties
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PortfolioProperties', NEW.tracking_id, 'U', (SELECT user_id FROM UserPortfolios WHERE portfolio_id = NEW.portfolio_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'PortfolioProperties', OLD.tracking_id, 'U', (SELECT user_id FROM UserPortfolios WHERE portfolio_id = OLD.portfolio_id LIMIT 1)
+    WHERE OLD.portfolio_id IS NOT NEW.portfolio_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PortfolioProperties_changelog_delete AFTER DELETE ON PortfolioProperties
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PortfolioProperties', OLD.tracking_id, 'D', (SELECT user_id FROM UserPortfolios WHERE portfolio_id = OLD.portfolio_id LIMIT 1));
+END;
+
+-- Properties
+CREATE TRIGGER IF NOT EXISTS Properties_changelog_insert AFTER INSERT ON Properties
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Properties', NEW.property_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS Properties_changelog_update AFTER UPDATE ON Properties
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Properties', NEW.property_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS Properties_changelog_delete AFTER DELETE ON Properties
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Properties', OLD.property_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- TaxRecords
+CREATE TRIGGER IF NOT EXISTS TaxRecords_changelog_insert AFTER INSERT ON TaxRecords
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('TaxRecords', NEW.tracking_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS TaxRecords_changelog_update AFTER UPDATE ON TaxRecords
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('TaxRecords', NEW.tracking_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'TaxRecords', OLD.tracking_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1)
+    WHERE OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS TaxRecords_changelog_delete AFTER DELETE ON TaxRecords
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('TaxRecords', OLD.tracking_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- Mortgages
+CREATE TRIGGER IF NOT EXISTS Mortgages_changelog_insert AFTER INSERT ON Mortgages
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Mortgages', NEW.tracking_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS Mortgages_changelog_update AFTER UPDATE ON Mortgages
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Mortgages', NEW.tracking_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'Mortgages', OLD.tracking_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1)
+    WHERE OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Mortgages_changelog_delete AFTER DELETE ON Mortgages
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Mortgages', OLD.tracking_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- InsurancePolicies
+CREATE TRIGGER IF NOT EXISTS InsurancePolicies_changelog_insert AFTER INSERT ON InsurancePolicies
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('InsurancePolicies', NEW.tracking_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS InsurancePolicies_changelog_update AFTER UPDATE ON InsurancePolicies
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('InsurancePolicies', NEW.tracking_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'InsurancePolicies', OLD.tracking_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1)
+    WHERE OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS InsurancePolicies_changelog_delete AFTER DELETE ON InsurancePolicies
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('InsurancePolicies', OLD.tracking_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- ProjectInfos
+CREATE TRIGGER IF NOT EXISTS ProjectInfos_changelog_insert AFTER INSERT ON ProjectInfos
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectInfos', NEW.project_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS ProjectInfos_changelog_update AFTER UPDATE ON ProjectInfos
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectInfos', NEW.project_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'ProjectInfos', OLD.project_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1)
+    WHERE OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ProjectInfos_changelog_delete AFTER DELETE ON ProjectInfos
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectInfos', OLD.project_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- ProjectUpdates
+CREATE TRIGGER IF NOT EXISTS ProjectUpdates_changelog_insert AFTER INSERT ON ProjectUpdates
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectUpdates', NEW.update_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM ProjectInfos WHERE project_id = NEW.project_id) LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS ProjectUpdates_changelog_update AFTER UPDATE ON ProjectUpdates
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectUpdates', NEW.update_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM ProjectInfos WHERE project_id = NEW.project_id) LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'ProjectUpdates', OLD.update_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM ProjectInfos WHERE project_id = OLD.project_id) LIMIT 1)
+    WHERE OLD.project_id IS NOT NEW.project_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ProjectUpdates_changelog_delete AFTER DELETE ON ProjectUpdates
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectUpdates', OLD.update_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM ProjectInfos WHERE project_id = OLD.project_id) LIMIT 1));
+END;
+
+-- Contractors
+CREATE TRIGGER IF NOT EXISTS Contractors_changelog_insert AFTER INSERT ON Contractors
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Contractors', NEW.tracking_id, 'I', NEW.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Contractors_changelog_update AFTER UPDATE ON Contractors
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Contractors', NEW.tracking_id, 'U', NEW.user_id);
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'Contractors', OLD.tracking_id, 'U', OLD.user_id
+    WHERE OLD.user_id IS NOT NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Contractors_changelog_delete AFTER DELETE ON Contractors
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Contractors', OLD.tracking_id, 'D', OLD.user_id);
+END;
+
+-- PropertyHistories
+CREATE TRIGGER IF NOT EXISTS PropertyHistories_changelog_insert AFTER INSERT ON PropertyHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PropertyHistories', NEW.history_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS PropertyHistories_changelog_update AFTER UPDATE ON PropertyHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PropertyHistories', NEW.history_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'PropertyHistories', OLD.history_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1)
+    WHERE OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PropertyHistories_changelog_delete AFTER DELETE ON PropertyHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PropertyHistories', OLD.history_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- ExpenseHistories
+CREATE TRIGGER IF NOT EXISTS ExpenseHistories_changelog_insert AFTER INSERT ON ExpenseHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ExpenseHistories', NEW.expense_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM PropertyHistories WHERE history_id = NEW.history_id) LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExpenseHistories_changelog_update AFTER UPDATE ON ExpenseHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ExpenseHistories', NEW.expense_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM PropertyHistories WHERE history_id = NEW.history_id) LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'ExpenseHistories', OLD.expense_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM PropertyHistories WHERE history_id = OLD.history_id) LIMIT 1)
+    WHERE OLD.history_id IS NOT NEW.history_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExpenseHistories_changelog_delete AFTER DELETE ON ExpenseHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ExpenseHistories', OLD.expense_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM PropertyHistories WHERE history_id = OLD.history_id) LIMIT 1));
+END;
+
+-- Units
+CREATE TRIGGER IF NOT EXISTS Units_changelog_insert AFTER INSERT ON Units
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Units', NEW.unit_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS Units_changelog_update AFTER UPDATE ON Units
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Units', NEW.unit_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'Units', OLD.unit_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1)
+    WHERE OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Units_changelog_delete AFTER DELETE ON Units
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Units', OLD.unit_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- LeaseAgreements
+CREATE TRIGGER IF NOT EXISTS LeaseAgreements_changelog_insert AFTER INSERT ON LeaseAgreements
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('LeaseAgreements', NEW.lease_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS LeaseAgreements_changelog_update AFTER UPDATE ON LeaseAgreements
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('LeaseAgreements', NEW.lease_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = NEW.property_id LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'LeaseAgreements', OLD.lease_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1)
+    WHERE OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS LeaseAgreements_changelog_delete AFTER DELETE ON LeaseAgreements
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('LeaseAgreements', OLD.lease_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = OLD.property_id LIMIT 1));
+END;
+
+-- Tenants
+CREATE TRIGGER IF NOT EXISTS Tenants_changelog_insert AFTER INSERT ON Tenants
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Tenants', NEW.tenant_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM LeaseAgreements WHERE lease_id = NEW.lease_id) LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS Tenants_changelog_update AFTER UPDATE ON Tenants
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Tenants', NEW.tenant_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM LeaseAgreements WHERE lease_id = NEW.lease_id) LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'Tenants', OLD.tenant_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM LeaseAgreements WHERE lease_id = OLD.lease_id) LIMIT 1)
+    WHERE OLD.lease_id IS NOT NEW.lease_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Tenants_changelog_delete AFTER DELETE ON Tenants
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('Tenants', OLD.tenant_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM LeaseAgreements WHERE lease_id = OLD.lease_id) LIMIT 1));
+END;
+
+-- PaymentHistories
+CREATE TRIGGER IF NOT EXISTS PaymentHistories_changelog_insert AFTER INSERT ON PaymentHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PaymentHistories', NEW.history_id, 'I', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM Units WHERE unit_id = NEW.unit_id) LIMIT 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS PaymentHistories_changelog_update AFTER UPDATE ON PaymentHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PaymentHistories', NEW.history_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM Units WHERE unit_id = NEW.unit_id) LIMIT 1));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'PaymentHistories', OLD.history_id, 'U', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM Units WHERE unit_id = OLD.unit_id) LIMIT 1)
+    WHERE OLD.unit_id IS NOT NEW.unit_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PaymentHistories_changelog_delete AFTER DELETE ON PaymentHistories
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('PaymentHistories', OLD.history_id, 'D', (SELECT user_id FROM PropertyOwners WHERE property_id = (SELECT property_id FROM Units WHERE unit_id = OLD.unit_id) LIMIT 1));
+END;
+
+-- ProjectContractors (owned through the contractor)
+CREATE TRIGGER IF NOT EXISTS ProjectContractors_changelog_insert AFTER INSERT ON ProjectContractors
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectContractors', NEW.tracking_id, 'I', (SELECT user_id FROM Contractors WHERE tracking_id = NEW.contractor_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS ProjectContractors_changelog_update AFTER UPDATE ON ProjectContractors
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectContractors', NEW.tracking_id, 'U', (SELECT user_id FROM Contractors WHERE tracking_id = NEW.contractor_id));
+    -- Moved to another owner: the previous owner's data changed too.
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    SELECT 'ProjectContractors', OLD.tracking_id, 'U', (SELECT user_id FROM Contractors WHERE tracking_id = OLD.contractor_id)
+    WHERE OLD.contractor_id IS NOT NEW.contractor_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ProjectContractors_changelog_delete AFTER DELETE ON ProjectContractors
+BEGIN
+    INSERT INTO ChangeLog (table_name, pk, op, user_id)
+    VALUES ('ProjectContractors', OLD.tracking_id, 'D', (SELECT user_id FROM Contractors WHERE tracking_id = OLD.contractor_id));
+END;
+
+-- -----------------------------------------------------
+-- Portfolio rollups (Business Requirement #8)
+-- -----------------------------------------------------
+-- AddPropertyToRollup and AdjustPropertyRollup are inlined: a property's whole contribution is
+-- read with correlated subqueries, and property deltas go to every portfolio holding it.
+
+-- Recreated in schema version 6 to maintain mortgaged_purchase_price.
+DROP TRIGGER IF EXISTS PortfolioProperties_rollup_insert;
+DROP TRIGGER IF EXISTS PortfolioProperties_rollup_update;
+DROP TRIGGER IF EXISTS PortfolioProperties_rollup_delete;
+DROP TRIGGER IF EXISTS Mortgages_rollup_insert;
+DROP TRIGGER IF EXISTS Mortgages_rollup_update;
+DROP TRIGGER IF EXISTS Mortgages_rollup_delete;
+DROP TRIGGER IF EXISTS PropertyHistories_rollup_insert;
+DROP TRIGGER IF EXISTS PropertyHistories_rollup_update;
+DROP TRIGGER IF EXISTS PropertyHistories_rollup_delete;
+
+CREATE TRIGGER IF NOT EXISTS PortfolioProperties_rollup_insert AFTER INSERT ON PortfolioProperties
+BEGIN
+    UPDATE Portfolios
+    SET num_properties = num_properties + 1,
+        num_mortgages = num_mortgages + (SELECT COUNT(*) FROM Mortgages m WHERE m.property_id = NEW.property_id),
+        total_rent = total_rent + IFNULL(NEW.property_rent, 0),
+        total_mortgage_payment = total_mortgage_payment
+            + (SELECT IFNULL(SUM(m.monthly_payment), 0) FROM Mortgages m WHERE m.property_id = NEW.property_id),
+        total_principal = total_principal
+            + (SELECT IFNULL(SUM(m.principal_balance), 0) FROM Mortgages m WHERE m.property_id = NEW.property_id),
+        total_capex = total_capex
+            + IFNULL((SELECT p.monthly_capex FROM Properties p WHERE p.property_id = NEW.property_id), 0),
+        total_purchase_price = total_purchase_price
+            + (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            + (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id
+               AND EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = NEW.property_id)),
+        last_appraised_val = last_appraised_val
+            + (SELECT IFNULL(SUM(h.last_appraised_val), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id)
+    WHERE portfolio_id = NEW.portfolio_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PortfolioProperties_rollup_update AFTER UPDATE ON PortfolioProperties
+BEGIN
+    -- Moved to another portfolio or property: remove the old contribution and add the new one.
+    UPDATE Portfolios
+    SET num_properties = num_properties - 1,
+        num_mortgages = num_mortgages - (SELECT COUNT(*) FROM Mortgages m WHERE m.property_id = OLD.property_id),
+        total_rent = total_rent - IFNULL(OLD.property_rent, 0),
+        total_mortgage_payment = total_mortgage_payment
+            - (SELECT IFNULL(SUM(m.monthly_payment), 0) FROM Mortgages m WHERE m.property_id = OLD.property_id),
+        total_principal = total_principal
+            - (SELECT IFNULL(SUM(m.principal_balance), 0) FROM Mortgages m WHERE m.property_id = OLD.property_id),
+        total_capex = total_capex
+            - IFNULL((SELECT p.monthly_capex FROM Properties p WHERE p.property_id = OLD.property_id), 0),
+        total_purchase_price = total_purchase_price
+            - (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            - (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id
+               AND EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = OLD.property_id)),
+        last_appraised_val = last_appraised_val
+            - (SELECT IFNULL(SUM(h.last_appraised_val), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id)
+    WHERE portfolio_id = OLD.portfolio_id
+      AND (OLD.portfolio_id <> NEW.portfolio_id OR OLD.property_id <> NEW.property_id);
+
+    UPDATE Portfolios
+    SET num_properties = num_properties + 1,
+        num_mortgages = num_mortgages + (SELECT COUNT(*) FROM Mortgages m WHERE m.property_id = NEW.property_id),
+        total_rent = total_rent + IFNULL(NEW.property_rent, 0),
+        total_mortgage_payment = total_mortgage_payment
+            + (SELECT IFNULL(SUM(m.monthly_payment), 0) FROM Mortgages m WHERE m.property_id = NEW.property_id),
+        total_principal = total_principal
+            + (SELECT IFNULL(SUM(m.principal_balance), 0) FROM Mortgages m WHERE m.property_id = NEW.property_id),
+        total_capex = total_capex
+            + IFNULL((SELECT p.monthly_capex FROM Properties p WHERE p.property_id = NEW.property_id), 0),
+        total_purchase_price = total_purchase_price
+            + (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            + (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id
+               AND EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = NEW.property_id)),
+        last_appraised_val = last_appraised_val
+            + (SELECT IFNULL(SUM(h.last_appraised_val), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id)
+    WHERE portfolio_id = NEW.portfolio_id
+      AND (OLD.portfolio_id <> NEW.portfolio_id OR OLD.property_id <> NEW.property_id);
+
+    -- Same property and portfolio: only the rent can have changed.
+    UPDATE Portfolios
+    SET total_rent = total_rent + IFNULL(NEW.property_rent, 0) - IFNULL(OLD.property_rent, 0)
+    WHERE portfolio_id = NEW.portfolio_id
+      AND OLD.portfolio_id = NEW.portfolio_id AND OLD.property_id = NEW.property_id
+      AND OLD.property_rent IS NOT NEW.property_rent;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PortfolioProperties_rollup_delete AFTER DELETE ON PortfolioProperties
+BEGIN
+    UPDATE Portfolios
+    SET num_properties = num_properties - 1,
+        num_mortgages = num_mortgages - (SELECT COUNT(*) FROM Mortgages m WHERE m.property_id = OLD.property_id),
+        total_rent = total_rent - IFNULL(OLD.property_rent, 0),
+        total_mortgage_payment = total_mortgage_payment
+            - (SELECT IFNULL(SUM(m.monthly_payment), 0) FROM Mortgages m WHERE m.property_id = OLD.property_id),
+        total_principal = total_principal
+            - (SELECT IFNULL(SUM(m.principal_balance), 0) FROM Mortgages m WHERE m.property_id = OLD.property_id),
+        total_capex = total_capex
+            - IFNULL((SELECT p.monthly_capex FROM Properties p WHERE p.property_id = OLD.property_id), 0),
+        total_purchase_price = total_purchase_price
+            - (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            - (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id
+               AND EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = OLD.property_id)),
+        last_appraised_val = last_appraised_val
+            - (SELECT IFNULL(SUM(h.last_appraised_val), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id)
+    WHERE portfolio_id = OLD.portfolio_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Mortgages_rollup_insert AFTER INSERT ON Mortgages
+BEGIN
+    UPDATE Portfolios
+    SET num_mortgages = num_mortgages + 1,
+        mortgaged_purchase_price = mortgaged_purchase_price
+            + CASE WHEN (SELECT COUNT(*) FROM Mortgages m WHERE m.property_id = NEW.property_id) = 1
+              THEN (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id)
+              ELSE 0 END,
+        total_mortgage_payment = total_mortgage_payment + IFNULL(NEW.monthly_payment, 0),
+        total_principal = total_principal + IFNULL(NEW.principal_balance, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = NEW.property_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Mortgages_rollup_update AFTER UPDATE ON Mortgages
+BEGIN
+    UPDATE Portfolios
+    SET total_mortgage_payment = total_mortgage_payment + IFNULL(NEW.monthly_payment, 0) - IFNULL(OLD.monthly_payment, 0),
+        total_principal = total_principal + IFNULL(NEW.principal_balance, 0) - IFNULL(OLD.principal_balance, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = NEW.property_id)
+      AND OLD.property_id IS NEW.property_id;
+
+    UPDATE Portfolios
+    SET num_mortgages = num_mortgages - 1,
+        mortgaged_purchase_price = mortgaged_purchase_price
+            - CASE WHEN EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = OLD.property_id) THEN 0
+              ELSE (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id) END,
+        total_mortgage_payment = total_mortgage_payment - IFNULL(OLD.monthly_payment, 0),
+        total_principal = total_principal - IFNULL(OLD.principal_balance, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = OLD.property_id)
+      AND OLD.property_id IS NOT NEW.property_id;
+
+    UPDATE Portfolios
+    SET num_mortgages = num_mortgages + 1,
+        mortgaged_purchase_price = mortgaged_purchase_price
+            + CASE WHEN (SELECT COUNT(*) FROM Mortgages m WHERE m.property_id = NEW.property_id) = 1
+              THEN (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = NEW.property_id)
+              ELSE 0 END,
+        total_mortgage_payment = total_mortgage_payment + IFNULL(NEW.monthly_payment, 0),
+        total_principal = total_principal + IFNULL(NEW.principal_balance, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = NEW.property_id)
+      AND OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Mortgages_rollup_delete AFTER DELETE ON Mortgages
+BEGIN
+    UPDATE Portfolios
+    SET num_mortgages = num_mortgages - 1,
+        mortgaged_purchase_price = mortgaged_purchase_price
+            - CASE WHEN EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = OLD.property_id) THEN 0
+              ELSE (SELECT IFNULL(SUM(h.purchase_price), 0) FROM PropertyHistories h WHERE h.property_id = OLD.property_id) END,
+        total_mortgage_payment = total_mortgage_payment - IFNULL(OLD.monthly_payment, 0),
+        total_principal = total_principal - IFNULL(OLD.principal_balance, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = OLD.property_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Properties_rollup_update AFTER UPDATE OF monthly_capex ON Properties
+WHEN OLD.monthly_capex IS NOT NEW.monthly_capex
+BEGIN
+    UPDATE Portfolios
+    SET total_capex = total_capex + IFNULL(NEW.monthly_capex, 0) - IFNULL(OLD.monthly_capex, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = NEW.property_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS PropertyHistories_rollup_insert AFTER INSERT ON PropertyHistories
+BEGIN
+    UPDATE Portfolios
+    SET total_purchase_price = total_purchase_price + IFNULL(NEW.purchase_price, 0),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            + CASE WHEN EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = NEW.property_id)
+              THEN IFNULL(NEW.purchase_price, 0) ELSE 0 END,
+        last_appraised_val = last_appraised_val + IFNULL(NEW.last_appraised_val, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = NEW.property_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS PropertyHistories_rollup_update AFTER UPDATE ON PropertyHistories
+BEGIN
+    UPDATE Portfolios
+    SET total_purchase_price = total_purchase_price + IFNULL(NEW.purchase_price, 0) - IFNULL(OLD.purchase_price, 0),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            + CASE WHEN EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = NEW.property_id)
+              THEN IFNULL(NEW.purchase_price, 0) - IFNULL(OLD.purchase_price, 0) ELSE 0 END,
+        last_appraised_val = last_appraised_val + IFNULL(NEW.last_appraised_val, 0) - IFNULL(OLD.last_appraised_val, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = NEW.property_id)
+      AND OLD.property_id IS NEW.property_id;
+
+    UPDATE Portfolios
+    SET total_purchase_price = total_purchase_price - IFNULL(OLD.purchase_price, 0),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            - CASE WHEN EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = OLD.property_id)
+              THEN IFNULL(OLD.purchase_price, 0) ELSE 0 END,
+        last_appraised_val = last_appraised_val - IFNULL(OLD.last_appraised_val, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = OLD.property_id)
+      AND OLD.property_id IS NOT NEW.property_id;
+
+    UPDATE Portfolios
+    SET total_purchase_price = total_purchase_price + IFNULL(NEW.purchase_price, 0),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            + CASE WHEN EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = NEW.property_id)
+              THEN IFNULL(NEW.purchase_price, 0) ELSE 0 END,
+        last_appraised_val = last_appraised_val + IFNULL(NEW.last_appraised_val, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = NEW.property_id)
+      AND OLD.property_id IS NOT NEW.property_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PropertyHistories_rollup_delete AFTER DELETE ON PropertyHistories
+BEGIN
+    UPDATE Portfolios
+    SET total_purchase_price = total_purchase_price - IFNULL(OLD.purchase_price, 0),
+        mortgaged_purchase_price = mortgaged_purchase_price
+            - CASE WHEN EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = OLD.property_id)
+              THEN IFNULL(OLD.purchase_price, 0) ELSE 0 END,
+        last_appraised_val = last_appraised_val - IFNULL(OLD.last_appraised_val, 0)
+    WHERE portfolio_id IN (SELECT portfolio_id FROM PortfolioProperties WHERE property_id = OLD.property_id);
+END;
+
+-- Fills mortgaged_purchase_price in files created before schema version 6 (migration 1 on MySQL).
+UPDATE Portfolios
+SET mortgaged_purchase_price = (
+    SELECT IFNULL(SUM(h.purchase_price), 0)
+    FROM PortfolioProperties pp
+    JOIN PropertyHistories h ON h.property_id = pp.property_id
+    WHERE pp.portfolio_id = Portfolios.portfolio_id
+      AND EXISTS (SELECT 1 FROM Mortgages m WHERE m.property_id = pp.property_id));
+
+-- -----------------------------------------------------
+-- Ledger rollups (Business Requirement #10)
+-- -----------------------------------------------------
+-- AdjustLedgerRollup is inlined as an upsert. A row moved to an archive is subtracted by the
+-- hot table's delete trigger and added back by the archive's insert trigger.
+
+CREATE TRIGGER IF NOT EXISTS PaymentHistories_ledger_insert AFTER INSERT ON PaymentHistories
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(NEW.paid_date, 'start of month'), 'income', 'Rent', IFNULL(NEW.amount, 0), 1
+    FROM Units WHERE unit_id = NEW.unit_id AND property_id IS NOT NULL AND NEW.paid_date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PaymentHistories_ledger_update AFTER UPDATE ON PaymentHistories
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(OLD.paid_date, 'start of month'), 'income', 'Rent', -IFNULL(OLD.amount, 0), -1
+    FROM Units WHERE unit_id = OLD.unit_id AND property_id IS NOT NULL AND OLD.paid_date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(NEW.paid_date, 'start of month'), 'income', 'Rent', IFNULL(NEW.amount, 0), 1
+    FROM Units WHERE unit_id = NEW.unit_id AND property_id IS NOT NULL AND NEW.paid_date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PaymentHistories_ledger_delete AFTER DELETE ON PaymentHistories
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(OLD.paid_date, 'start of month'), 'income', 'Rent', -IFNULL(OLD.amount, 0), -1
+    FROM Units WHERE unit_id = OLD.unit_id AND property_id IS NOT NULL AND OLD.paid_date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PaymentHistoriesArchive_ledger_insert AFTER INSERT ON PaymentHistoriesArchive
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(NEW.paid_date, 'start of month'), 'income', 'Rent', IFNULL(NEW.amount, 0), 1
+    FROM Units WHERE unit_id = NEW.unit_id AND property_id IS NOT NULL AND NEW.paid_date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS PaymentHistoriesArchive_ledger_delete AFTER DELETE ON PaymentHistoriesArchive
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(OLD.paid_date, 'start of month'), 'income', 'Rent', -IFNULL(OLD.amount, 0), -1
+    FROM Units WHERE unit_id = OLD.unit_id AND property_id IS NOT NULL AND OLD.paid_date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExpenseHistories_ledger_insert AFTER INSERT ON ExpenseHistories
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(NEW.date, 'start of month'), 'expense', IFNULL(NEW.label, 'Other'), IFNULL(NEW.cost, 0), 1
+    FROM PropertyHistories WHERE history_id = NEW.history_id AND property_id IS NOT NULL AND NEW.date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExpenseHistories_ledger_update AFTER UPDATE ON ExpenseHistories
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(OLD.date, 'start of month'), 'expense', IFNULL(OLD.label, 'Other'), -IFNULL(OLD.cost, 0), -1
+    FROM PropertyHistories WHERE history_id = OLD.history_id AND property_id IS NOT NULL AND OLD.date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(NEW.date, 'start of month'), 'expense', IFNULL(NEW.label, 'Other'), IFNULL(NEW.cost, 0), 1
+    FROM PropertyHistories WHERE history_id = NEW.history_id AND property_id IS NOT NULL AND NEW.date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExpenseHistories_ledger_delete AFTER DELETE ON ExpenseHistories
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(OLD.date, 'start of month'), 'expense', IFNULL(OLD.label, 'Other'), -IFNULL(OLD.cost, 0), -1
+    FROM PropertyHistories WHERE history_id = OLD.history_id AND property_id IS NOT NULL AND OLD.date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExpenseHistoriesArchive_ledger_insert AFTER INSERT ON ExpenseHistoriesArchive
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(NEW.date, 'start of month'), 'expense', IFNULL(NEW.label, 'Other'), IFNULL(NEW.cost, 0), 1
+    FROM PropertyHistories WHERE history_id = NEW.history_id AND property_id IS NOT NULL AND NEW.date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExpenseHistoriesArchive_ledger_delete AFTER DELETE ON ExpenseHistoriesArchive
+BEGIN
+    INSERT INTO LedgerRollups (property_id, month, kind, category, total, entries)
+    SELECT property_id, date(OLD.date, 'start of month'), 'expense', IFNULL(OLD.label, 'Other'), -IFNULL(OLD.cost, 0), -1
+    FROM PropertyHistories WHERE history_id = OLD.history_id AND property_id IS NOT NULL AND OLD.date IS NOT NULL
+    ON CONFLICT (property_id, month, kind, category) DO UPDATE
+    SET total = total + excluded.total, entries = entries + excluded.entries;
+END;
+
+PRAGMA user_version = 6;